@@ -119,7 +119,7 @@ COMMAND_GROUPS = [
             commands.StoreLegacyGatedCommand,
         ],
     ),
-    craft_cli.CommandGroup("Other", [commands.VersionCommand]),
+    craft_cli.CommandGroup("Other", [commands.CacheCommand, commands.VersionCommand]),
 ]
 
 GLOBAL_ARGS = [
@@ -22,6 +22,7 @@ from .account import (
     StoreLogoutCommand,
     StoreWhoAmICommand,
 )
+from .cache import CacheCommand
 from .discovery import ListPluginsCommand, PluginsCommand
 from .extensions import (
     ExpandExtensionsCommand,
@@ -72,6 +73,7 @@ from .version import VersionCommand
 
 __all__ = [
     "BuildCommand",
+    "CacheCommand",
     "CleanCommand",
     "ExpandExtensionsCommand",
     "ExtensionsCommand",
@@ -0,0 +1,113 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Snapcraft cache command."""
+
+import os
+import textwrap
+from typing import TYPE_CHECKING
+
+from craft_cli import BaseCommand, emit
+from overrides import overrides
+from tabulate import tabulate
+from xdg import BaseDirectory  # type: ignore
+
+if TYPE_CHECKING:
+    import argparse
+
+
+class CacheCommand(BaseCommand):
+    """Show the usage of the snapcraft caches."""
+
+    name = "cache"
+    help_msg = "Show the size and hit rate of the snapcraft caches"
+    overview = textwrap.dedent(
+        """
+        Show the number of entries, size, size limit, hit rate and evictions
+        of each snapcraft cache.
+
+        Least recently used entries are evicted once a cache exceeds its size
+        limit. Limits are set with the SNAPCRAFT_CACHE_MAX_SIZE environment
+        variable, either for all caches (e.g. 5G) or for each cache
+        (e.g. files=10G,download=2G)."""
+    )
+
+    @overrides
+    def fill_parser(self, parser: "argparse.ArgumentParser") -> None:
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            default=False,
+            help="Evict entries exceeding the size limits first",
+        )
+
+    @overrides
+    def run(self, parsed_args):
+        # pylint: disable=C0415
+        from snapcraft_legacy.internal.cache import CacheManager
+
+        cache_manager = CacheManager(
+            os.path.join(BaseDirectory.xdg_cache_home, "snapcraft")
+        )
+
+        if parsed_args.prune:
+            for stats in cache_manager.get_stats():
+                evicted = cache_manager.prune(stats.namespace)
+                if evicted:
+                    emit.progress(
+                        f"Evicted {len(evicted)} entries from {stats.namespace!r}",
+                        permanent=True,
+                    )
+
+        rows = []
+        for stats in cache_manager.get_stats():
+            lookups = stats.hits + stats.misses
+            hit_rate = f"{stats.hits / lookups:.0%}" if lookups else "-"
+            rows.append(
+                [
+                    stats.namespace,
+                    stats.entries,
+                    _format_size(stats.size),
+                    _format_size(stats.max_size),
+                    stats.hits,
+                    stats.misses,
+                    hit_rate,
+                    stats.evictions,
+                    _format_size(stats.evicted_bytes),
+                ]
+            )
+
+        emit.message(
+            tabulate(
+                rows,
+                headers=[
+                    "Cache",
+                    "Entries",
+                    "Size",
+                    "Limit",
+                    "Hits",
+                    "Misses",
+                    "Hit rate",
+                    "Evictions",
+                    "Evicted",
+                ],
+                tablefmt="plain",
+            )
+        )
+
+
+def _format_size(size: float) -> str:
+    return f"{size / 1024 / 1024:.1f} MiB"
@@ -16,21 +16,35 @@
 
 """Snapcraft Store uploading related commands."""
 
+import glob
+import os
 import pathlib
+import subprocess
+import tempfile
 import textwrap
-from typing import TYPE_CHECKING, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional
 
+import craft_store
 from craft_cli import BaseCommand, emit
 from craft_cli.errors import ArgumentParsingError
 from overrides import overrides
 from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
+from tabulate import tabulate
 
-from snapcraft import store, utils
+from snapcraft import errors, store, utils
 from snapcraft_legacy._store import get_data_from_snap_file
+from snapcraft_legacy.file_utils import calculate_sha3_384
+from snapcraft_legacy.internal import deltas
+from snapcraft_legacy.internal.cache import SnapCache
+from snapcraft_legacy.internal.errors import SnapcraftError as LegacySnapcraftError
 
 if TYPE_CHECKING:
     import argparse
 
+_MAX_CONCURRENT_UPLOADS = 4
+
 
 class StoreUploadCommand(BaseCommand):
     """Command to upload a snap to the Snap Store."""
@@ -48,6 +62,19 @@ class StoreUploadCommand(BaseCommand):
 
         If --release is used, the channel map will be displayed after the operation
         takes place.
+
+        The last uploaded snap for each snap name and architecture is kept in
+        a local cache, taking as much disk space as the snap itself unless the
+        file system supports reflinks. When a snap for the same architecture
+        was uploaded before, an xdelta3 delta against it is uploaded instead
+        of the full <snap-file> if it is sufficiently smaller.
+
+        A directory or a glob pattern can be used instead of <snap-file> to
+        upload several snaps concurrently. Revisions are released to the
+        channels selected with --release only once all snaps are uploaded.
+        Releasing is not atomic: revisions are released one at a time and
+        releasing stops at the first failure, which is reported along with
+        the revisions already released.
         """
     )
 
@@ -57,7 +84,7 @@ class StoreUploadCommand(BaseCommand):
             "snap_file",
             metavar="snap-file",
             type=str,
-            help="Snap to upload",
+            help="Snap to upload, or a directory or glob pattern of snaps to upload",
         )
         parser.add_argument(
             "--release",
@@ -70,38 +97,464 @@ class StoreUploadCommand(BaseCommand):
 
     @overrides
     def run(self, parsed_args):
-        snap_file = pathlib.Path(parsed_args.snap_file)
-        if not snap_file.exists() or not snap_file.is_file():
-            raise ArgumentParsingError(f"{str(snap_file)!r} is not a valid file")
-
         channels: Optional[List[str]] = None
         if parsed_args.channels:
             channels = parsed_args.channels.split(",")
 
+        snap_file = pathlib.Path(parsed_args.snap_file)
+        if not snap_file.is_file():
+            _upload_batch(_get_snap_files(parsed_args.snap_file), channels=channels)
+            return
+
         client = store.StoreClientCLI()
 
         snap_yaml = get_data_from_snap_file(snap_file)
         snap_name = snap_yaml["name"]
-        built_at = snap_yaml.get("snapcraft-started-at")
 
         client.verify_upload(snap_name=snap_name)
 
-        upload_id = client.store_client.upload_file(
-            filepath=snap_file, monitor_callback=create_callback
+        revision = _upload_snap(
+            client, snap_file=snap_file, snap_yaml=snap_yaml, channels=channels
         )
 
+        message = f"Revision {revision!r} created for {snap_name!r}"
+        if channels:
+            message += f" and released to {utils.humanize_list(channels, 'and')}"
+        emit.message(message)
+
+
+def _get_snap_files(pattern: str) -> List[pathlib.Path]:
+    """Get the snap files in a directory or matching a glob pattern."""
+    path = pathlib.Path(pattern)
+    if path.is_dir():
+        snap_files = sorted(p for p in path.glob("*.snap") if p.is_file())
+    elif any(c in pattern for c in "*?["):
+        snap_files = sorted(
+            pathlib.Path(p) for p in glob.glob(pattern) if os.path.isfile(p)
+        )
+    else:
+        raise ArgumentParsingError(f"{pattern!r} is not a valid file")
+
+    if not snap_files:
+        raise ArgumentParsingError(f"No snap files found in {pattern!r}")
+
+    return snap_files
+
+
+class _Upload(NamedTuple):
+    """A file uploaded to storage, the snap or a delta to apply to a snap."""
+
+    upload_id: str
+    size: int
+    delta_info: Optional[Dict[str, str]]
+
+
+def _upload_snap(
+    client: store.StoreClientCLI,
+    *,
+    snap_file: pathlib.Path,
+    snap_yaml: Dict[str, Any],
+    channels: Optional[List[str]],
+) -> int:
+    """Upload a snap, as a delta if possible, and notify the store.
+
+    :returns: the snap's processed revision.
+    """
+    snap_name = snap_yaml["name"]
+    built_at = snap_yaml.get("snapcraft-started-at")
+
+    snap_cache = SnapCache(project_name=snap_name)
+    snap_arch = snap_yaml.get("architectures", ["all"])[0]
+
+    upload = _upload_binary(
+        client,
+        snap_file=snap_file,
+        source_snap=_get_delta_source(snap_cache, snap_arch),
+    )
+    try:
         revision = client.notify_upload(
             snap_name=snap_name,
-            upload_id=upload_id,
+            upload_id=upload.upload_id,
             built_at=built_at,
             channels=channels,
-            snap_file_size=snap_file.stat().st_size,
+            snap_file_size=upload.size,
+            delta_info=upload.delta_info,
+        )
+    except errors.SnapDeltaProcessingError:
+        if upload.delta_info is None:
+            raise
+        _emit_delta_processing_error()
+        upload = _upload_binary(client, snap_file=snap_file, source_snap=None)
+        revision = client.notify_upload(
+            snap_name=snap_name,
+            upload_id=upload.upload_id,
+            built_at=built_at,
+            channels=channels,
+            snap_file_size=upload.size,
+            delta_info=upload.delta_info,
         )
 
-        message = f"Revision {revision!r} created for {snap_name!r}"
-        if channels:
-            message += f" and released to {utils.humanize_list(channels, 'and')}"
-        emit.message(message)
+    _cache_snap(snap_cache, snap_file=snap_file, snap_arch=snap_arch)
+    return revision
+
+
+def _get_delta_source(snap_cache: SnapCache, snap_arch: str) -> Optional[pathlib.Path]:
+    """Get the cached snap to upload a delta against, if any."""
+    source_snap = snap_cache.get(deb_arch=snap_arch)
+    if not source_snap or store.client.is_onprem():
+        return None
+    return pathlib.Path(source_snap)
+
+
+def _emit_delta_processing_error() -> None:
+    emit.progress(
+        "The Snap Store could not process the delta, uploading full snap",
+        permanent=True,
+    )
+
+
+class _UploadResult(NamedTuple):
+    snap_file: pathlib.Path
+    snap_name: str
+    revision: int
+    uploaded_size: int
+    elapsed: float
+
+
+class _PushedUpload(NamedTuple):
+    upload: _Upload
+    status_url: str
+    elapsed: float
+
+
+def _upload_batch(
+    snap_files: List[pathlib.Path], *, channels: Optional[List[str]]
+) -> None:
+    """Upload several snaps concurrently and release them once all are uploaded.
+
+    The files are uploaded concurrently, then the processing status of all
+    uploads is polled at once. Snaps whose delta could not be processed are
+    uploaded again in full.
+
+    :param snap_files: The snaps to upload.
+    :param channels: The channels to release the snaps to.
+    """
+    client = store.StoreClientCLI()
+    jobs = min(len(snap_files), _MAX_CONCURRENT_UPLOADS)
+
+    emit.progress(f"Reading metadata from {len(snap_files)} snaps...")
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        snap_yamls = list(executor.map(get_data_from_snap_file, snap_files))
+
+    for snap_name in sorted({snap_yaml["name"] for snap_yaml in snap_yamls}):
+        client.verify_upload(snap_name=snap_name)
+
+    results: Dict[int, _UploadResult] = {}
+    failures: Dict[int, BaseException] = {}
+    pending = list(range(len(snap_files)))
+    use_delta = True
+    while pending:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                index: executor.submit(
+                    _push_snap,
+                    client,
+                    snap_files[index],
+                    snap_yamls[index],
+                    use_delta=use_delta,
+                )
+                for index in pending
+            }
+            wait(futures.values())
+
+        pushed: Dict[int, _PushedUpload] = {}
+        for index, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                failures[index] = error
+            else:
+                pushed[index] = future.result()
+
+        pending = _track_pushed_uploads(
+            client, pushed, snap_files, snap_yamls, results, failures
+        )
+        use_delta = False
+
+    for index in sorted(results):
+        snap_yaml = snap_yamls[index]
+        _cache_snap(
+            SnapCache(project_name=snap_yaml["name"]),
+            snap_file=snap_files[index],
+            snap_arch=snap_yaml.get("architectures", ["all"])[0],
+        )
+
+    _emit_upload_summary([results[index] for index in sorted(results)])
+
+    if failures:
+        raise errors.SnapcraftError(
+            f"Failed to upload {len(failures)} of {len(snap_files)} snaps",
+            details="\n".join(
+                f"- {snap_files[index].name}: {failures[index]}"
+                for index in sorted(failures)
+            ),
+            resolution="No revisions were released, fix the errors and try again.",
+        )
+
+    if channels:
+        _release_batch(
+            client, [results[index] for index in sorted(results)], channels=channels
+        )
+
+
+def _push_snap(
+    client: store.StoreClientCLI,
+    snap_file: pathlib.Path,
+    snap_yaml: Dict[str, Any],
+    *,
+    use_delta: bool,
+) -> _PushedUpload:
+    """Upload a snap and notify the Snap Store, without waiting for it."""
+    emit.progress(f"Uploading {snap_file.name!r}...")
+    start_time = time.monotonic()
+    source_snap = None
+    if use_delta:
+        snap_cache = SnapCache(project_name=snap_yaml["name"])
+        snap_arch = snap_yaml.get("architectures", ["all"])[0]
+        source_snap = _get_delta_source(snap_cache, snap_arch)
+    upload = _upload_binary(
+        client, snap_file=snap_file, source_snap=source_snap, show_progress=False
+    )
+    elapsed = time.monotonic() - start_time
+    # Release once all snaps are uploaded.
+    status_url = client.push_upload(
+        snap_name=snap_yaml["name"],
+        upload_id=upload.upload_id,
+        built_at=snap_yaml.get("snapcraft-started-at"),
+        channels=None,
+        snap_file_size=upload.size,
+        delta_info=upload.delta_info,
+    )
+    return _PushedUpload(upload, status_url, elapsed)
+
+
+def _track_pushed_uploads(
+    client: store.StoreClientCLI,
+    pushed: Dict[int, _PushedUpload],
+    snap_files: List[pathlib.Path],
+    snap_yamls: List[Dict[str, Any]],
+    results: Dict[int, _UploadResult],
+    failures: Dict[int, BaseException],
+) -> List[int]:
+    """Wait for the Snap Store to process the pushed uploads.
+
+    The revisions created are added to results and errors to failures.
+
+    :returns: The indexes of the snaps to upload again without a delta.
+    """
+    if not pushed:
+        return []
+
+    emit.progress(f"Waiting for the Snap Store to process {len(pushed)} snaps...")
+    statuses = client.track_uploads([p.status_url for p in pushed.values()])
+
+    retry: List[int] = []
+    for (index, pushed_upload), status in zip(pushed.items(), statuses):
+        try:
+            revision = client.get_upload_revision(status)
+        except errors.SnapDeltaProcessingError as error:
+            if pushed_upload.upload.delta_info is None:
+                failures[index] = error
+            else:
+                _emit_delta_processing_error()
+                retry.append(index)
+            continue
+        except errors.SnapcraftError as error:
+            failures[index] = error
+            continue
+
+        emit.progress(
+            f"Revision {revision!r} created for {snap_files[index].name!r}",
+            permanent=True,
+        )
+        results[index] = _UploadResult(
+            snap_files[index],
+            snap_yamls[index]["name"],
+            revision,
+            pushed_upload.upload.size,
+            pushed_upload.elapsed,
+        )
+    return retry
+
+
+def _release_batch(
+    client: store.StoreClientCLI, results: List[_UploadResult], *, channels: List[str]
+) -> None:
+    """Release uploaded revisions, stopping at the first failure.
+
+    The Snap Store releases one revision per request, so releasing a batch
+    is not atomic. A failure is reported with the revisions that were
+    already released.
+    """
+    released: List[_UploadResult] = []
+    for result in results:
+        try:
+            client.release(
+                result.snap_name, revision=result.revision, channels=channels
+            )
+        except (craft_store.errors.CraftStoreError, errors.SnapcraftError) as error:
+            details = [
+                f"- {r.snap_file.name}: revision {r.revision} released"
+                for r in released
+            ]
+            details.append(f"- {result.snap_file.name}: {error}")
+            details.extend(
+                f"- {r.snap_file.name}: revision {r.revision} not released"
+                for r in results[len(released) + 1 :]
+            )
+            raise errors.SnapcraftError(
+                f"Released {len(released)} of {len(results)} revisions to "
+                f"{utils.humanize_list(channels, 'and')}",
+                details="\n".join(details),
+                resolution=(
+                    "Release the remaining revisions with 'snapcraft release'."
+                ),
+            ) from error
+        released.append(result)
+
+    emit.message(
+        f"Released {len(results)} revisions to "
+        f"{utils.humanize_list(channels, 'and')}"
+    )
+
+
+def _emit_upload_summary(results: List[_UploadResult]) -> None:
+    """Report the size uploaded for each snap, a delta or the full snap."""
+    rows = []
+    for result in results:
+        size = result.uploaded_size / 1024 / 1024
+        throughput = size / result.elapsed if result.elapsed > 0 else 0
+        rows.append(
+            [
+                result.snap_file.name,
+                result.revision,
+                f"{size:.1f} MiB",
+                f"{result.elapsed:.1f}s",
+                f"{throughput:.1f} MiB/s",
+            ]
+        )
+
+    if rows:
+        emit.message(
+            tabulate(
+                rows,
+                headers=["Snap", "Revision", "Uploaded", "Time", "Throughput"],
+                tablefmt="plain",
+            )
+        )
+
+
+def _upload_binary(
+    client: store.StoreClientCLI,
+    *,
+    snap_file: pathlib.Path,
+    source_snap: Optional[pathlib.Path],
+    show_progress: bool = True,
+) -> _Upload:
+    """Upload a delta between source_snap and snap_file if possible, or snap_file.
+
+    :param source_snap: The previously uploaded snap, None to upload the full
+        snap.
+    """
+    if source_snap is not None:
+        upload = _upload_delta(
+            client,
+            snap_file=snap_file,
+            source_snap=source_snap,
+            show_progress=show_progress,
+        )
+        if upload is not None:
+            return upload
+
+    upload_id = _upload_file(client, snap_file, show_progress=show_progress)
+    return _Upload(upload_id, snap_file.stat().st_size, None)
+
+
+def _upload_delta(
+    client: store.StoreClientCLI,
+    *,
+    snap_file: pathlib.Path,
+    source_snap: pathlib.Path,
+    show_progress: bool = True,
+) -> Optional[_Upload]:
+    """Upload a delta between source_snap and snap_file.
+
+    :returns: the uploaded delta, or None if the delta could not be generated
+        or was not small enough.
+    """
+    with tempfile.TemporaryDirectory() as delta_dir:
+        emit.progress(f"Generating delta for {snap_file.name!r}")
+        try:
+            delta_file = deltas.XDelta3Generator(
+                source_path=str(source_snap), target_path=str(snap_file)
+            ).make_delta(output_dir=delta_dir)
+        except LegacySnapcraftError as error:
+            emit.progress(
+                f"Not uploading a delta ({error!s}), uploading full snap",
+                permanent=True,
+            )
+            return None
+
+        delta_info: Dict[str, str] = {
+            "delta_format": "xdelta3",
+            "source_hash": calculate_sha3_384(str(source_snap)),
+            "target_hash": calculate_sha3_384(str(snap_file)),
+            "delta_hash": calculate_sha3_384(delta_file),
+        }
+        delta_size = os.path.getsize(delta_file)
+        emit.progress(
+            f"Uploading delta of {delta_size} bytes for a snap of "
+            f"{snap_file.stat().st_size} bytes",
+            permanent=True,
+        )
+
+        upload_id = _upload_file(
+            client, pathlib.Path(delta_file), show_progress=show_progress
+        )
+
+    return _Upload(upload_id, delta_size, delta_info)
+
+
+def _upload_file(
+    client: store.StoreClientCLI, filepath: pathlib.Path, *, show_progress: bool = True
+) -> str:
+    """Upload filepath to storage.
+
+    :param show_progress: Display a progress bar, only one can be displayed
+        at a time.
+
+    :returns: the upload id.
+    """
+    return client.store_client.upload_file(
+        filepath=filepath,
+        monitor_callback=create_callback if show_progress else None,
+    )
+
+
+def _cache_snap(
+    snap_cache: SnapCache, *, snap_file: pathlib.Path, snap_arch: str
+) -> None:
+    """Keep the uploaded snap as the source for future deltas.
+
+    Only the last uploaded snap for each architecture is kept, previously
+    cached snaps are removed.
+    """
+    try:
+        snap_cache.cache(snap_filename=str(snap_file))
+        snap_cache.prune(
+            deb_arch=snap_arch, keep_hash=calculate_sha3_384(str(snap_file))
+        )
+    except (OSError, subprocess.CalledProcessError, LegacySnapcraftError) as error:
+        emit.debug(f"Cannot cache {str(snap_file)!r}: {error}")
 
 
 def create_callback(encoder: MultipartEncoder):
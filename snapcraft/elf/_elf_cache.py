@@ -0,0 +1,240 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Persistent cache of ELF file attributes."""
+
+import contextlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+# The elf_files table is also used by snapcraft_legacy.internal.elf_cache,
+# both must be kept compatible. Errors accessing the database are not
+# reported, the cache is disabled instead and files are parsed again.
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS elf_files (
+        path TEXT PRIMARY KEY,
+        st_ino INTEGER NOT NULL,
+        st_mtime_ns INTEGER NOT NULL,
+        st_size INTEGER NOT NULL,
+        data TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS elf_dependencies (
+        path TEXT PRIMARY KEY,
+        key TEXT NOT NULL,
+        dependencies TEXT NOT NULL
+    )
+    """,
+)
+
+_StatKey = Tuple[int, int, int]
+
+
+class ElfCache:
+    """A persistent cache of ELF file attributes.
+
+    Entries are keyed by the file path, inode number, modification time
+    and size. Files modified after being cached are not found in the cache.
+    The resolved library dependencies of a file can also be stored, keyed
+    by the file path and a caller defined key, along with the paths whose
+    modification invalidates them. Entries added to the cache
+    are written to disk by :meth:`save`, or when leaving the context if the
+    cache is used as a context manager.
+
+    :param path: The path to the cache database file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._entries: Optional[Dict[str, Tuple[_StatKey, str]]] = None
+        self._dependencies: Dict[str, Tuple[str, str]] = {}
+        self._updated: Dict[str, Tuple[_StatKey, str]] = {}
+        self._updated_dependencies: Dict[str, Tuple[str, str]] = {}
+
+    def __enter__(self) -> "ElfCache":
+        """Use the cache as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Write new cache entries to disk when leaving the context."""
+        self.save()
+
+    def get(self, path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """Obtain the cached attributes of an ELF file.
+
+        :param path: The path to the ELF file.
+        :returns: The cached attributes, or None if the file is not in the
+            cache or was modified since it was cached.
+        """
+        key = _get_stat_key(path)
+        if key is None:
+            return None
+
+        entry = self._load().get(os.path.abspath(path))
+        if entry is None or entry[0] != key:
+            return None
+
+        with contextlib.suppress(ValueError):
+            return json.loads(entry[1])
+
+        return None
+
+    def set(self, path: Union[str, Path], data: Dict[str, Any]) -> None:
+        """Add the attributes of an ELF file to the cache.
+
+        :param path: The path to the ELF file.
+        :param data: The ELF file attributes, must be serializable to JSON.
+        """
+        key = _get_stat_key(path)
+        if key is None:
+            return
+
+        entry = (key, json.dumps(data, sort_keys=True))
+        abs_path = os.path.abspath(path)
+        self._load()[abs_path] = entry
+        self._updated[abs_path] = entry
+
+    def get_dependencies(
+        self, path: Union[str, Path], *, key: str
+    ) -> Optional[List[str]]:
+        """Obtain the cached library dependencies of an ELF file.
+
+        :param path: The path to the ELF file.
+        :param key: The key the dependencies were stored with.
+        :returns: The cached dependencies, or None if the file is not in the
+            cache, was stored with a different key, or any of the paths checked
+            changed since it was stored.
+        """
+        self._load()
+        entry = self._dependencies.get(os.path.abspath(path))
+        if entry is None or entry[0] != key:
+            return None
+
+        try:
+            data = json.loads(entry[1])
+            dependencies = data["dependencies"]
+            checked_paths = data["checked-paths"]
+        except (ValueError, TypeError, KeyError):
+            return None
+
+        for checked_path, stat_key in checked_paths.items():
+            current = _get_stat_key(checked_path)
+            if (list(current) if current else None) != stat_key:
+                return None
+
+        return dependencies
+
+    def set_dependencies(
+        self,
+        path: Union[str, Path],
+        dependencies: Iterable[str],
+        *,
+        key: str,
+        checked_paths: Iterable[Union[str, Path]] = (),
+    ) -> None:
+        """Add the library dependencies of an ELF file to the cache.
+
+        :param path: The path to the ELF file.
+        :param dependencies: The paths to the libraries needed by the file.
+        :param key: Identifies the file and the environment used to resolve
+            its dependencies.
+        :param checked_paths: The paths that invalidate the entry if they are
+            created, removed or modified, such as the libraries found and the
+            locations where a library could shadow them.
+        """
+        self._load()
+        data = {
+            "dependencies": sorted(dependencies),
+            "checked-paths": {
+                checked_path: _get_stat_key(checked_path)
+                for checked_path in sorted({str(p) for p in checked_paths})
+            },
+        }
+        entry = (key, json.dumps(data))
+        abs_path = os.path.abspath(path)
+        self._dependencies[abs_path] = entry
+        self._updated_dependencies[abs_path] = entry
+
+    def save(self) -> None:
+        """Write new cache entries to disk."""
+        if not self._updated and not self._updated_dependencies:
+            return
+
+        rows = [
+            (path, *key, data) for path, (key, data) in sorted(self._updated.items())
+        ]
+        dependency_rows = [
+            (path, key, data)
+            for path, (key, data) in sorted(self._updated_dependencies.items())
+        ]
+        self._updated = {}
+        self._updated_dependencies = {}
+
+        with contextlib.suppress(OSError, sqlite3.Error):
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with contextlib.closing(sqlite3.connect(self._path)) as connection:
+                with connection:
+                    _create_tables(connection)
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO elf_files VALUES (?, ?, ?, ?, ?)", rows
+                    )
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO elf_dependencies VALUES (?, ?, ?)",
+                        dependency_rows,
+                    )
+
+    def _load(self) -> Dict[str, Tuple[_StatKey, str]]:
+        """Read all cache entries from disk, once."""
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = {}
+        if not self._path.is_file():
+            return self._entries
+
+        with contextlib.suppress(sqlite3.Error):
+            with contextlib.closing(sqlite3.connect(self._path)) as connection:
+                _create_tables(connection)
+                for path, st_ino, st_mtime_ns, st_size, data in connection.execute(
+                    "SELECT path, st_ino, st_mtime_ns, st_size, data FROM elf_files"
+                ):
+                    self._entries[path] = ((st_ino, st_mtime_ns, st_size), data)
+                for path, key, dependencies in connection.execute(
+                    "SELECT path, key, dependencies FROM elf_dependencies"
+                ):
+                    self._dependencies[path] = (key, dependencies)
+
+        return self._entries
+
+
+def _create_tables(connection: sqlite3.Connection) -> None:
+    for statement in _SCHEMA:
+        connection.execute(statement)
+
+
+def _get_stat_key(path: Union[str, Path]) -> Optional[_StatKey]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
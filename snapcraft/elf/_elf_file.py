@@ -16,12 +16,16 @@
 
 """Helpers to parse and handle ELF binary files."""
 
+import collections
 import contextlib
+import functools
+import glob
 import os
+import platform
 import re
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
 
 import elftools.common.exceptions
 import elftools.elf.constants
@@ -36,7 +40,8 @@ from pkg_resources import parse_version
 
 from snapcraft import utils
 
-from . import errors
+from . import _soname_index, errors
+from ._soname_index import SonameIndex
 
 _ElfArchitectureTuple = Tuple[str, str, str]
 _SonameCacheDict = Dict[Tuple[_ElfArchitectureTuple, str], Path]
@@ -47,6 +52,23 @@ _GNU_VERSION_D = ".gnu.version_d"
 _GNU_VERSION_R = ".gnu.version_r"
 _INTERP = ".interp"
 
+_LD_SO_CONF = Path("/etc/ld.so.conf")
+
+# Basenames of the dynamic linkers for the supported architectures. The
+# dynamic linker is always loaded as the program interpreter and is not
+# listed as a resolved dependency.
+_DYNAMIC_LINKERS = frozenset(
+    [
+        "ld-linux-aarch64.so.1",
+        "ld-linux-armhf.so.3",
+        "ld-linux-riscv64-lp64d.so.1",
+        "ld-linux-x86-64.so.2",
+        "ld-linux.so.2",
+        "ld64.so.1",
+        "ld64.so.2",
+    ]
+)
+
 
 class _NeededLibrary:
     """Represents an ELF library version."""
@@ -61,10 +83,17 @@ class _NeededLibrary:
 
 
 class SonameCache:
-    """A cache for sonames."""
+    """A cache for sonames.
+
+    :param index_dir: The directory to store persistent soname indexes of
+        installed snaps. If not set, installed snaps are crawled to find
+        libraries.
+    """
 
-    def __init__(self):
+    def __init__(self, *, index_dir: Optional[Path] = None):
         self._soname_paths: _SonameCacheDict = {}
+        self._index_dir = index_dir
+        self._indexes: Dict[Path, Optional[SonameIndex]] = {}
 
     def __getitem__(self, key):
         """Obtain cached item."""
@@ -101,6 +130,23 @@ class SonameCache:
 
         self._soname_paths = new_soname_paths
 
+    def get_index(self, path: Path) -> Optional[SonameIndex]:
+        """Obtain the soname index for a directory in an installed snap.
+
+        :param path: The directory to search for libraries.
+        :returns: The soname index, or None if path cannot be indexed.
+        """
+        if self._index_dir is None:
+            return None
+
+        if path not in self._indexes:
+            if _soname_index.is_indexable(path):
+                self._indexes[path] = SonameIndex.load(path, index_dir=self._index_dir)
+            else:
+                self._indexes[path] = None
+
+        return self._indexes[path]
+
 
 class _Library:
     """Represents the soname and path to the library.
@@ -179,6 +225,15 @@ class _Library:
             return self.soname_path
 
         for path in valid_search_paths:
+            # Installed snaps are looked up in a prebuilt index.
+            index = self.soname_cache.get_index(path)
+            if index is not None:
+                for file_path in index.get(self.arch_tuple, self.soname):
+                    if self._is_valid_elf(file_path):
+                        self._update_soname_cache(file_path)
+                        return file_path
+                continue
+
             for root, _, files in os.walk(path):
                 if self.soname not in files:
                     continue
@@ -209,6 +264,8 @@ class ElfFile:
         self.soname = ""
         self.versions: Set[str] = set()
         self.needed: Dict[str, _NeededLibrary] = {}
+        self.rpath = ""
+        self.runpath = ""
         self.execstack_set = False
         self.is_dynamic = True
         self.build_id = ""
@@ -219,11 +276,11 @@ class ElfFile:
         # String of elf enum type, e.g. "ET_DYN", "ET_EXEC", etc.
         self.elf_type: str = "ET_NONE"
 
+        # Nothing is emitted here, ELF files are parsed in worker processes
+        # when listing ELF files.
         try:
-            emit.debug(f"Extracting ELF attributes: {str(path)!r}")
             self._extract_attributes()
         except (UnicodeDecodeError, AttributeError, ConstructError) as exception:
-            emit.debug(f"Extracting ELF attributes exception: {str(exception)}")
             raise errors.CorruptedElfFile(path, exception)
 
     @classmethod
@@ -239,6 +296,58 @@ class ElfFile:
         with path.open("rb") as bin_file:
             return bin_file.read(4) == b"\x7fELF"
 
+    @classmethod
+    def unmarshal(cls, *, path: Path, data: Dict[str, Any]) -> "ElfFile":
+        """Create an ElfFile from previously extracted attributes.
+
+        :param path: The path to the ELF file.
+        :param data: The ELF file attributes, as returned by :meth:`marshal`.
+
+        :raises KeyError: If an attribute is missing.
+        """
+        elf_file = cls.__new__(cls)
+        elf_file.path = path
+        elf_file.dependencies = set()
+        elf_file._required_glibc = ""  # pylint: disable=protected-access
+
+        elf_file.arch_tuple = tuple(data["arch_tuple"])  # type: ignore
+        elf_file.interp = data["interp"]
+        elf_file.soname = data["soname"]
+        elf_file.versions = set(data["versions"])
+        elf_file.needed = {}
+        for name, versions in data["needed"].items():
+            library = _NeededLibrary(name=name)
+            library.versions = set(versions)
+            elf_file.needed[name] = library
+        elf_file.rpath = data["rpath"]
+        elf_file.runpath = data["runpath"]
+        elf_file.execstack_set = data["execstack_set"]
+        elf_file.is_dynamic = data["is_dynamic"]
+        elf_file.build_id = data["build_id"]
+        elf_file.has_debug_info = data["has_debug_info"]
+        elf_file.elf_type = data["elf_type"]
+
+        return elf_file
+
+    def marshal(self) -> Dict[str, Any]:
+        """Return the extracted ELF file attributes as a dictionary."""
+        return {
+            "arch_tuple": self.arch_tuple,
+            "interp": self.interp,
+            "soname": self.soname,
+            "versions": sorted(self.versions),
+            "needed": {
+                name: sorted(library.versions) for name, library in self.needed.items()
+            },
+            "rpath": self.rpath,
+            "runpath": self.runpath,
+            "execstack_set": self.execstack_set,
+            "is_dynamic": self.is_dynamic,
+            "build_id": self.build_id,
+            "has_debug_info": self.has_debug_info,
+            "elf_type": self.elf_type,
+        }
+
     # pylint: disable=too-many-branches
 
     def _extract_attributes(self) -> None:  # noqa: C901
@@ -270,6 +379,10 @@ class ElfFile:
                         self.needed[tag.needed] = _NeededLibrary(name=tag.needed)
                     elif tag.entry.d_tag == "DT_SONAME":
                         self.soname = tag.soname
+                    elif tag.entry.d_tag == "DT_RPATH":
+                        self.rpath = tag.rpath
+                    elif tag.entry.d_tag == "DT_RUNPATH":
+                        self.runpath = tag.runpath
 
             for segment in elf.iter_segments():
                 if segment["p_type"] == "PT_GNU_STACK":
@@ -362,6 +475,11 @@ class ElfFile:
         This may include libraries contained within the project.
         The object's .dependencies attribute is set after loading.
 
+        Libraries are resolved in-process following the search rules of the
+        dynamic linker. Set SNAPCRAFT_ELF_USE_LDD to a true value to resolve
+        them by running ldd instead, e.g. if the resolver disagrees with the
+        dynamic linker of the build environment.
+
         :param root_path: the root path to search for missing dependencies.
         :param base_path: the core base path to search for missing dependencies.
         :param soname_cache: a cache of previously search dependencies.
@@ -384,7 +502,7 @@ class ElfFile:
             )
 
         libraries = _determine_libraries(
-            path=self.path, ld_library_paths=ld_library_paths, arch_triplet=arch_triplet
+            elf_file=self, ld_library_paths=ld_library_paths, arch_triplet=arch_triplet
         )
         for soname, soname_path in libraries.items():
             if self.arch_tuple is None:
@@ -413,7 +531,27 @@ def _get_host_libc_path(arch_triplet) -> Path:
     return Path("/lib") / arch_triplet / "libc.so.6"
 
 
+def _is_ldd_enabled() -> bool:
+    """Check if library dependencies should be determined using ldd."""
+    return utils.strtobool(os.getenv("SNAPCRAFT_ELF_USE_LDD", "n"))
+
+
 def _determine_libraries(
+    *, elf_file: "ElfFile", ld_library_paths: List[str], arch_triplet: str
+) -> Dict[str, str]:
+    if _is_ldd_enabled():
+        return _ldd_determine_libraries(
+            path=elf_file.path,
+            ld_library_paths=ld_library_paths,
+            arch_triplet=arch_triplet,
+        )
+
+    return _resolve_libraries(
+        elf_file=elf_file, ld_library_paths=ld_library_paths, arch_triplet=arch_triplet
+    )
+
+
+def _ldd_determine_libraries(
     *, path: Path, ld_library_paths: List[str], arch_triplet: str
 ) -> Dict[str, str]:
     # Try the usual method with ldd.
@@ -439,6 +577,198 @@ def _determine_libraries(
     return {}
 
 
+def _resolve_libraries(
+    *, elf_file: "ElfFile", ld_library_paths: List[str], arch_triplet: str
+) -> Dict[str, str]:
+    """Determine library dependencies without executing external tools.
+
+    Follow the search rules used by the dynamic linker to resolve the
+    dependency closure of elf_file: DT_RPATH (if there is no DT_RUNPATH),
+    LD_LIBRARY_PATH, DT_RUNPATH, the directories listed in ld.so.conf and
+    the default library directories.
+
+    :returns: Dictionary of dependencies, mapping library name to path, in
+        the same format as the parsed ldd output.
+    """
+    libraries: Dict[str, str] = {}
+    system_paths = [
+        *_get_ld_so_conf_paths(_LD_SO_CONF),
+        *_get_default_library_paths(arch_triplet),
+    ]
+
+    # Objects are identified by soname, libraries already loaded are not
+    # searched for again.
+    loaded: Set[str] = set(_DYNAMIC_LINKERS)
+    if elf_file.interp:
+        loaded.add(os.path.basename(elf_file.interp))
+    if elf_file.soname:
+        loaded.add(elf_file.soname)
+
+    # Each entry holds the object to process and the DT_RPATH entries
+    # inherited from the objects that loaded it.
+    queue: Deque[Tuple[ElfFile, List[str]]] = collections.deque([(elf_file, [])])
+    while queue:
+        current, inherited_rpath = queue.popleft()
+        rpath = [
+            *_expand_search_paths(
+                current.rpath, origin=current.path, arch_triplet=arch_triplet
+            ),
+            *inherited_rpath,
+        ]
+        runpath = _expand_search_paths(
+            current.runpath, origin=current.path, arch_triplet=arch_triplet
+        )
+
+        # DT_RPATH is ignored if the object has DT_RUNPATH.
+        search_paths = [
+            *([] if runpath else rpath),
+            *ld_library_paths,
+            *runpath,
+            *system_paths,
+        ]
+
+        for soname in current.needed:
+            if soname in loaded:
+                continue
+            loaded.add(soname)
+
+            library = _find_library(
+                soname, search_paths=search_paths, arch_tuple=elf_file.arch_tuple
+            )
+            if library is None:
+                libraries[soname] = soname
+                continue
+
+            libraries[soname] = os.path.abspath(library.path)
+            queue.append((library, rpath))
+
+    return libraries
+
+
+def _find_library(
+    soname: str,
+    *,
+    search_paths: List[str],
+    arch_tuple: Optional[_ElfArchitectureTuple],
+) -> Optional["ElfFile"]:
+    """Find the first library matching soname and the given architecture."""
+    if "/" in soname:
+        candidates = [soname]
+    else:
+        candidates = [os.path.join(path, soname) for path in search_paths]
+
+    for candidate in candidates:
+        library = _load_library(candidate)
+        if library is not None and library.arch_tuple == arch_tuple:
+            return library
+
+    return None
+
+
+def _load_library(path: str) -> Optional["ElfFile"]:
+    """Load the ELF file in path, if it exists and is valid."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return _load_library_cached(path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=4096)
+def _load_library_cached(
+    path: str, st_ino: int, st_mtime_ns: int, st_size: int
+) -> Optional["ElfFile"]:
+    # The stat attributes are part of the cache key, so modified files
+    # are loaded again.
+    # pylint: disable=unused-argument
+    library_path = Path(path)
+    if not ElfFile.is_elf(library_path):
+        return None
+
+    try:
+        return ElfFile(path=library_path)
+    except (elftools.common.exceptions.ELFError, errors.CorruptedElfFile) as error:
+        emit.debug(f"Ignoring invalid library {path!r}: {error}")
+        return None
+
+
+def _expand_search_paths(paths: str, *, origin: Path, arch_triplet: str) -> List[str]:
+    """Split a DT_RPATH or DT_RUNPATH string and expand its dynamic tokens."""
+    expanded: List[str] = []
+    for path in paths.split(":"):
+        if not path:
+            continue
+        for token in ("$ORIGIN", "${ORIGIN}"):
+            path = path.replace(token, os.path.dirname(os.path.abspath(origin)))
+        for token in ("$LIB", "${LIB}"):
+            path = path.replace(token, f"lib/{arch_triplet}")
+        for token in ("$PLATFORM", "${PLATFORM}"):
+            path = path.replace(token, platform.machine())
+        expanded.append(path)
+
+    return expanded
+
+
+def _get_default_library_paths(arch_triplet: str) -> List[str]:
+    """Return the trusted directories searched last by the dynamic linker."""
+    return [
+        f"/lib/{arch_triplet}",
+        f"/usr/lib/{arch_triplet}",
+        "/lib",
+        "/usr/lib",
+        "/lib64",
+        "/usr/lib64",
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_ld_so_conf_paths(conf_path: Path) -> Tuple[str, ...]:
+    """Return the library directories listed in an ld.so.conf file.
+
+    Included configuration files are processed recursively.
+    """
+    paths: List[str] = []
+    _parse_ld_so_conf(conf_path, paths=paths, visited=set())
+    return tuple(paths)
+
+
+def _parse_ld_so_conf(conf_path: Path, *, paths: List[str], visited: Set[Path]) -> None:
+    if conf_path in visited:
+        return
+    visited.add(conf_path)
+
+    try:
+        lines = conf_path.read_text().splitlines()
+    except (OSError, UnicodeDecodeError) as error:
+        emit.debug(f"Cannot read {str(conf_path)!r}: {error}")
+        return
+
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line or line.startswith("hwcap "):
+            continue
+
+        if line.startswith("include "):
+            for include_path in _get_ld_so_conf_includes(conf_path, line):
+                _parse_ld_so_conf(include_path, paths=paths, visited=visited)
+            continue
+
+        for path in re.split(r"[:,\s]+", line):
+            if path and path not in paths:
+                paths.append(path)
+
+
+def _get_ld_so_conf_includes(conf_path: Path, line: str) -> List[Path]:
+    """Return the configuration files matched by an include directive."""
+    include_paths: List[Path] = []
+    for pattern in line.split()[1:]:
+        pattern = os.path.join(conf_path.parent, pattern)
+        include_paths.extend(Path(p) for p in sorted(glob.glob(pattern)))
+
+    return include_paths
+
+
 def _ldd(
     path: Path, ld_library_paths: List[str], *, ld_preload: Optional[str] = None
 ) -> Dict[str, str]:
@@ -16,19 +16,23 @@
 
 """Use patchelf to patch ELF files."""
 
+import concurrent.futures
+import contextlib
 import functools
 import os
 import shutil
 import subprocess
 import tempfile
+import time
 from pathlib import Path
-from typing import List, Set
+from typing import Dict, List, Optional, Set, Tuple
 
 from craft_cli import emit
 
 from snapcraft import utils
 
 from ._elf_file import ElfFile
+from ._rewriter import rewrite_in_place
 from .errors import PatcherError
 
 
@@ -59,9 +63,64 @@ class Patcher:
 
         :raises PatcherError: if the ELF file cannot be patched.
         """
-        patchelf_args = []
+        interpreter, rpath = self._get_changes(elf_file)
+
+        # no changes means there is nothing to do.
+        if interpreter is None and rpath is None:
+            return
+
+        self._rewrite(elf_file_path=elf_file.path, interpreter=interpreter, rpath=rpath)
+
+    def patch_all(
+        self, *, elf_files: List[ElfFile], jobs: Optional[int] = None
+    ) -> Dict[Path, float]:
+        """Patch multiple ELF files, running patchelf concurrently.
+
+        :param elf_files: the ELF files to patch.
+        :param jobs: the maximum number of concurrent patchelf processes. If
+            not set, use the number of parallel build jobs for this host.
+
+        :returns: the time in seconds spent patching each modified file.
+
+        :raises PatcherError: if an ELF file cannot be patched.
+        """
+        pending: List[Tuple[Path, Optional[str], Optional[str]]] = []
+        for elf_file in elf_files:
+            emit.progress(f"Patch ELF file: {str(self._relative_path(elf_file))!r}")
+            interpreter, rpath = self._get_changes(elf_file)
+            if interpreter is not None or rpath is not None:
+                pending.append((elf_file.path, interpreter, rpath))
+
+        if not pending:
+            return {}
+
+        jobs = jobs or utils.get_parallel_build_count()
+        start_time = time.monotonic()
+        timings: Dict[Path, float] = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                (path, executor.submit(self._rewrite_timed, path, interpreter, rpath))
+                for path, interpreter, rpath in pending
+            ]
+            for path, future in futures:
+                timings[path] = future.result()
+                emit.debug(f"Patched {str(path)!r} in {timings[path]:.3f}s")
+
+        emit.progress(
+            f"Patched {len(timings)} ELF files in {time.monotonic() - start_time:.2f}s"
+        )
+        return timings
+
+    def _get_changes(self, elf_file: ElfFile) -> Tuple[Optional[str], Optional[str]]:
+        """Determine the new interpreter and rpath for elf_file.
+
+        :returns: A tuple with the interpreter and rpath to set, each of them
+            is None if it does not need to be modified.
+        """
+        interpreter: Optional[str] = None
+        rpath: Optional[str] = None
         if elf_file.interp and elf_file.interp != self._dynamic_linker:
-            patchelf_args.extend(["--set-interpreter", self._dynamic_linker])
+            interpreter = self._dynamic_linker
             emit.progress(f"  Interpreter={self._dynamic_linker!r}")
 
         if elf_file.dependencies:
@@ -71,35 +130,67 @@ class Patcher:
             emit.progress(f"  Current rpath={current_rpath}")
             emit.progress(f"  Proposed rpath={proposed_rpath}")
 
-            # Removing the current rpath should not be necessary after patchelf 0.11,
-            # see https://github.com/NixOS/patchelf/issues/94
-
-            # Parameters:
-            # --force-rpath: use RPATH instead of RUNPATH.
-            # --shrink-rpath: will remove unneeded entries, with the side effect of
-            #                 preferring host libraries so we simply do not use it.
-            # --set-rpath: set the RPATH to the colon separated argument.
-
             # Don't need to patch the binary if all proposed paths are already in rpath
             if not set(proposed_rpath).issubset(set(current_rpath)):
-                formatted_rpath = ":".join(proposed_rpath)
-                patchelf_args.extend(["--force-rpath", "--set-rpath", formatted_rpath])
-
-        # no patchelf_args means there is nothing to do.
-        if not patchelf_args:
+                rpath = ":".join(proposed_rpath)
+
+        return interpreter, rpath
+
+    def _relative_path(self, elf_file: ElfFile) -> Path:
+        try:
+            return elf_file.path.relative_to(self._root_path)
+        except ValueError:
+            return elf_file.path
+
+    def _rewrite_timed(
+        self, elf_file_path: Path, interpreter: Optional[str], rpath: Optional[str]
+    ) -> float:
+        start_time = time.monotonic()
+        self._rewrite(elf_file_path=elf_file_path, interpreter=interpreter, rpath=rpath)
+        return time.monotonic() - start_time
+
+    def _rewrite(
+        self,
+        *,
+        elf_file_path: Path,
+        interpreter: Optional[str],
+        rpath: Optional[str],
+    ) -> None:
+        """Set the interpreter and rpath, in place if they fit in the file."""
+        if rewrite_in_place(elf_file_path, interpreter=interpreter, rpath=rpath):
+            emit.debug(f"Rewrote {str(elf_file_path)!r} in place")
             return
 
-        self._run_patchelf(patchelf_args=patchelf_args, elf_file_path=elf_file.path)
+        # Removing the current rpath should not be necessary after patchelf 0.11,
+        # see https://github.com/NixOS/patchelf/issues/94
+
+        # Parameters:
+        # --force-rpath: use RPATH instead of RUNPATH.
+        # --shrink-rpath: will remove unneeded entries, with the side effect of
+        #                 preferring host libraries so we simply do not use it.
+        # --set-rpath: set the RPATH to the colon separated argument.
+        patchelf_args = []
+        if interpreter is not None:
+            patchelf_args.extend(["--set-interpreter", interpreter])
+        if rpath is not None:
+            patchelf_args.extend(["--force-rpath", "--set-rpath", rpath])
+
+        self._run_patchelf(patchelf_args=patchelf_args, elf_file_path=elf_file_path)
 
     def _run_patchelf(self, *, patchelf_args: List[str], elf_file_path: Path) -> None:
-        # Run patchelf on a copy of the primed file and replace it
-        # after it is successful. This allows us to break the potential
-        # hard link created when migrating the file across the steps of
-        # the part.
-        with tempfile.NamedTemporaryFile() as temp_file:
-            shutil.copy2(elf_file_path, temp_file.name)
-
-            cmd = [self._patchelf_cmd] + patchelf_args + [temp_file.name]
+        # Run patchelf on a copy of the primed file and rename it over the
+        # original after it is successful. This allows us to break the
+        # potential hard link created when migrating the file across the
+        # steps of the part, with a single copy of the file.
+        temp_fd, temp_name = tempfile.mkstemp(
+            dir=elf_file_path.parent, prefix=f".{elf_file_path.name}.", suffix=".tmp"
+        )
+        os.close(temp_fd)
+
+        try:
+            shutil.copy2(elf_file_path, temp_name)
+
+            cmd = [self._patchelf_cmd] + patchelf_args + [temp_name]
             try:
                 emit.debug(f"executing: {' '.join(cmd)}")
                 subprocess.check_call(cmd)
@@ -111,17 +202,19 @@ class Patcher:
                     elf_file_path, cmd=call_error.cmd, code=call_error.returncode
                 ) from call_error
 
-            # We unlink to break the potential hard link
-            os.unlink(elf_file_path)
-            shutil.copy2(temp_file.name, elf_file_path)
+            os.replace(temp_name, elf_file_path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(temp_name)
 
-    @functools.lru_cache(maxsize=1024)  # noqa: B019 Possible memory leaks in lru_cache
     def get_current_rpath(self, elf_file: ElfFile) -> List[str]:
-        """Obtain the current rpath from the ELF file dynamic section."""
-        output = subprocess.check_output(
-            [self._patchelf_cmd, "--print-rpath", str(elf_file.path)]
-        )
-        return [x for x in output.decode().strip().split(":") if x]
+        """Obtain the current rpath from the ELF file dynamic section.
+
+        As in ``patchelf --print-rpath``, DT_RUNPATH is used if set, otherwise
+        DT_RPATH is used.
+        """
+        rpath = elf_file.runpath or elf_file.rpath
+        return [x for x in rpath.split(":") if x]
 
     @functools.lru_cache(maxsize=1024)  # noqa: B019 Possible memory leaks in lru_cache
     def get_proposed_rpath(self, elf_file: ElfFile) -> List[str]:
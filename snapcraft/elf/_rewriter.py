@@ -0,0 +1,240 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""In-place rewriting of ELF interpreter and rpath."""
+
+import contextlib
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from craft_cli import emit
+from elftools.common.exceptions import ELFError
+from elftools.elf.dynamic import DynamicSegment
+from elftools.elf.elffile import ELFFile
+from elftools.elf.gnuversions import GNUVerDefSection, GNUVerNeedSection
+from elftools.elf.sections import SymbolTableSection
+
+_DT_RPATH = 15
+
+# Dynamic section tags with an offset into the dynamic string table.
+_STRING_TAGS = {
+    "DT_NEEDED",
+    "DT_SONAME",
+    "DT_RPATH",
+    "DT_RUNPATH",
+    "DT_AUXILIARY",
+    "DT_FILTER",
+    "DT_CONFIG",
+    "DT_DEPAUDIT",
+    "DT_AUDIT",
+}
+
+# A list of (offset, data) to write to the file.
+_Writes = List[Tuple[int, bytes]]
+
+
+def rewrite_in_place(
+    path: Path, *, interpreter: Optional[str] = None, rpath: Optional[str] = None
+) -> bool:
+    """Set the interpreter and rpath of an ELF file without resizing it.
+
+    The new values are written over the existing PT_INTERP contents and
+    DT_RPATH (or DT_RUNPATH) string if they fit in the space already used
+    by them. As with ``patchelf --force-rpath``, a DT_RUNPATH entry is
+    converted to DT_RPATH. Files with more than one link are copied before
+    they are modified so other links are not affected.
+
+    :param path: The ELF file to modify.
+    :param interpreter: The new interpreter, or None to keep the current one.
+    :param rpath: The new rpath, or None to keep the current one.
+
+    :returns: True if the file was rewritten, False if the file could not be
+        modified in place and was left untouched.
+    """
+    try:
+        writes = _get_writes(path, interpreter=interpreter, rpath=rpath)
+    except (OSError, ELFError, ValueError, struct.error) as error:
+        emit.debug(f"Cannot rewrite {str(path)!r} in place: {error}")
+        return False
+
+    if writes is None:
+        return False
+
+    if path.stat().st_nlink == 1:
+        _apply_writes(path, writes)
+        return True
+
+    temp_fd, temp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    os.close(temp_fd)
+    try:
+        shutil.copy2(path, temp_name)
+        _apply_writes(Path(temp_name), writes)
+        os.replace(temp_name, path)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_name)
+
+    return True
+
+
+def _get_writes(
+    path: Path, *, interpreter: Optional[str], rpath: Optional[str]
+) -> Optional[_Writes]:
+    """Determine the changes to make to the ELF file.
+
+    :returns: The data to write, or None if the changes do not fit.
+    """
+    writes: _Writes = []
+    with path.open("rb") as file:
+        elf_file = ELFFile(file)
+
+        if interpreter is not None:
+            interp_writes = _get_interpreter_writes(elf_file, interpreter)
+            if interp_writes is None:
+                return None
+            writes.extend(interp_writes)
+
+        if rpath is not None:
+            rpath_writes = _get_rpath_writes(elf_file, rpath)
+            if rpath_writes is None:
+                return None
+            writes.extend(rpath_writes)
+
+    return writes
+
+
+def _get_interpreter_writes(elf_file: ELFFile, interpreter: str) -> Optional[_Writes]:
+    segment = next(
+        (s for s in elf_file.iter_segments() if s["p_type"] == "PT_INTERP"), None
+    )
+    if segment is None:
+        return None
+
+    # The segment size includes the terminating NUL, pad the new value
+    # with NULs so the segment size does not need to change.
+    data = interpreter.encode() + b"\0"
+    if b"\0" in data[:-1] or len(data) > segment["p_filesz"]:
+        return None
+
+    return [(segment["p_offset"], data.ljust(segment["p_filesz"], b"\0"))]
+
+
+def _get_rpath_writes(elf_file: ELFFile, rpath: str) -> Optional[_Writes]:
+    segment = next(
+        (s for s in elf_file.iter_segments() if isinstance(s, DynamicSegment)), None
+    )
+    if segment is None:
+        return None
+
+    strtab_addr: Optional[int] = None
+    rpath_entries = []
+    for index, tag in enumerate(segment.iter_tags()):
+        if tag.entry.d_tag == "DT_STRTAB":
+            strtab_addr = tag.entry.d_val
+        elif tag.entry.d_tag in ("DT_RPATH", "DT_RUNPATH"):
+            rpath_entries.append((index, tag))
+
+    # Adding a new entry to the dynamic section, or removing one when
+    # both DT_RPATH and DT_RUNPATH are set, requires resizing the file.
+    if strtab_addr is None or len(rpath_entries) != 1:
+        return None
+
+    index, tag = rpath_entries[0]
+    current = (tag.rpath if tag.entry.d_tag == "DT_RPATH" else tag.runpath).encode()
+    data = rpath.encode()
+    if b"\0" in data or len(data) > len(current):
+        return None
+
+    strtab_offset = next(elf_file.address_offsets(strtab_addr), None)
+    if strtab_offset is None:
+        return None
+
+    writes: _Writes = []
+    if data != current:
+        # Only the new string and its terminator are written. Linkers merge
+        # strings that are a suffix of another one, the new value must not
+        # overwrite the start of any other string in the table.
+        start = tag.entry.d_val
+        references = _get_dynstr_references(elf_file, segment, skip_index=index)
+        if references is None or any(
+            start < offset <= start + len(data) for offset in references
+        ):
+            return None
+
+        writes.append((strtab_offset + start, data + b"\0"))
+
+    if tag.entry.d_tag == "DT_RUNPATH":
+        entry_size = elf_file.structs.Elf_Dyn.sizeof()
+        tag_format = ("<" if elf_file.little_endian else ">") + (
+            "q" if elf_file.elfclass == 64 else "i"
+        )
+        writes.append(
+            (
+                segment["p_offset"] + index * entry_size,
+                struct.pack(tag_format, _DT_RPATH),
+            )
+        )
+
+    return writes
+
+
+def _get_dynstr_references(
+    elf_file: ELFFile, segment: DynamicSegment, *, skip_index: int
+) -> Optional[Set[int]]:
+    """Collect the offsets of the dynamic string table in use.
+
+    :param skip_index: The index of a dynamic section entry to ignore.
+
+    :returns: The offsets referenced by the dynamic section, dynamic symbols
+        and symbol versions, or None if they cannot all be determined.
+    """
+    # Dynamic symbols and versions are found through the section headers.
+    if elf_file.num_sections() == 0:
+        return None
+
+    references: Set[int] = set()
+    for index, tag in enumerate(segment.iter_tags()):
+        if index != skip_index and tag.entry.d_tag in _STRING_TAGS:
+            references.add(tag.entry.d_val)
+
+    for section in elf_file.iter_sections():
+        if isinstance(section, SymbolTableSection):
+            if section["sh_type"] == "SHT_DYNSYM":
+                references.update(s.entry.st_name for s in section.iter_symbols())
+        elif isinstance(section, GNUVerNeedSection):
+            for verneed, vernaux_iter in section.iter_versions():
+                references.add(verneed.entry.vn_file)
+                references.update(aux.entry.vna_name for aux in vernaux_iter)
+        elif isinstance(section, GNUVerDefSection):
+            for _, verdaux_iter in section.iter_versions():
+                references.update(aux.entry.vda_name for aux in verdaux_iter)
+
+    return references
+
+
+def _apply_writes(path: Path, writes: _Writes) -> None:
+    with path.open("r+b") as file:
+        with mmap.mmap(file.fileno(), 0) as mapped:
+            for offset, data in writes:
+                mapped[offset : offset + len(data)] = data
+            mapped.flush()
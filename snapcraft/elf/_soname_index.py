@@ -0,0 +1,195 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Persistent index of the libraries available in installed snaps."""
+
+import contextlib
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from craft_cli import emit
+from elftools.elf.enums import ENUM_E_MACHINE, ENUM_EI_CLASS, ENUM_EI_DATA
+
+from snapcraft_legacy.internal.cache import CacheManager
+
+_ElfArchitectureTuple = Tuple[str, str, str]
+_Sonames = Dict[Tuple[_ElfArchitectureTuple, str], List[Path]]
+
+# Installed snaps are mounted read-only in /snap/<name>/<revision>.
+_SNAP_DIR = Path("/snap")
+
+_INDEX_FORMAT_VERSION = 2
+
+# The cache manager namespace of the index files, the index directory must
+# be named after it, in the cache root.
+_NAMESPACE = "soname-index"
+
+_EI_CLASS_NAMES = {v: k for k, v in ENUM_EI_CLASS.items()}
+_EI_DATA_NAMES = {v: k for k, v in ENUM_EI_DATA.items()}
+_E_MACHINE_NAMES = {v: k for k, v in ENUM_E_MACHINE.items() if k != "_default_"}
+
+
+class SonameIndex:
+    """An index of the ELF files contained in an installed snap.
+
+    The index maps each ELF architecture tuple and file name to the
+    matching files, relative to the indexed directory, in the order they
+    are found when walking the directory tree, which is the order a crawl
+    of the tree for a given soname would check them.
+
+    :param root: The indexed directory.
+    :param sonames: The mapping of architecture tuple and file name to the
+        relative paths of the matching files.
+    """
+
+    def __init__(self, *, root: Path, sonames: _Sonames) -> None:
+        self.root = root
+        self._sonames = sonames
+
+    def get(self, arch_tuple: _ElfArchitectureTuple, soname: str) -> List[Path]:
+        """Return the paths to the files named soname, under root."""
+        return [
+            self.root / path for path in self._sonames.get((arch_tuple, soname), [])
+        ]
+
+    @classmethod
+    def build(cls, root: Path) -> "SonameIndex":
+        """Create the index by walking the directory tree once.
+
+        :param root: The directory to index.
+        """
+        emit.debug(f"Building soname index for {str(root)!r}")
+        resolved_root = root.resolve()
+        sonames: _Sonames = {}
+        for dirpath, _, files in os.walk(resolved_root):
+            for file_name in files:
+                file_path = Path(dirpath, file_name)
+                arch_tuple = _read_arch_tuple(file_path)
+                if arch_tuple is not None:
+                    sonames.setdefault((arch_tuple, file_name), []).append(
+                        file_path.relative_to(resolved_root)
+                    )
+
+        return cls(root=root, sonames=sonames)
+
+    @classmethod
+    def load(cls, root: Path, *, index_dir: Path) -> "SonameIndex":
+        """Load the index for an installed snap, building it if needed.
+
+        The index is stored in index_dir and identified by the resolved
+        path of the installed snap revision, so it is shared by the paths
+        leading to the same revision and rebuilt when a different revision
+        is used. Index files are evicted by the cache manager of the
+        directory containing index_dir.
+
+        :param root: The directory to index, inside an installed snap.
+        :param index_dir: The directory where indexes are stored.
+        """
+        key = _get_index_key(root)
+        index_file = index_dir / (hashlib.sha256(key.encode()).hexdigest() + ".json")
+        cache_manager = CacheManager(str(index_dir.parent))
+
+        with contextlib.suppress(OSError, ValueError, KeyError, TypeError):
+            data = json.loads(index_file.read_text())
+            if data["version"] == _INDEX_FORMAT_VERSION and data["key"] == key:
+                sonames: _Sonames = {}
+                for arch_tuple, soname, path in data["sonames"]:
+                    entry = (tuple(arch_tuple), soname)
+                    sonames.setdefault(entry, []).append(Path(path))  # type: ignore
+                cache_manager.record_hit(_NAMESPACE, str(index_file))
+                return cls(root=root, sonames=sonames)
+
+        cache_manager.record_miss(_NAMESPACE)
+        index = cls.build(root)
+        data = {
+            "version": _INDEX_FORMAT_VERSION,
+            "key": key,
+            "sonames": [
+                [list(arch_tuple), soname, str(path)]
+                for (arch_tuple, soname), paths in index._sonames.items()
+                for path in paths
+            ],
+        }
+
+        try:
+            index_dir.mkdir(parents=True, exist_ok=True)
+            temp_file = index_file.with_suffix(f".{os.getpid()}.tmp")
+            temp_file.write_text(json.dumps(data))
+            temp_file.replace(index_file)
+        except OSError as error:
+            emit.debug(f"Cannot save soname index {str(index_file)!r}: {error}")
+        else:
+            cache_manager.record_access(str(index_file))
+            cache_manager.prune(_NAMESPACE)
+
+        return index
+
+
+def is_indexable(path: Path) -> bool:
+    """Verify if path is inside an installed snap revision.
+
+    Installed snaps are read-only and can be indexed once per revision.
+    """
+    try:
+        resolved_path = path.resolve(strict=True)
+    except (OSError, RuntimeError):
+        return False
+
+    relative_parts = resolved_path.parts[len(_SNAP_DIR.parts) :]
+    return (
+        _SNAP_DIR in resolved_path.parents
+        and len(relative_parts) >= 2
+        and resolved_path.is_dir()
+    )
+
+
+def _get_index_key(root: Path) -> str:
+    """Identify the snap revision and indexed directory."""
+    resolved_path = root.resolve()
+    mtime = resolved_path.stat().st_mtime_ns
+    return f"{resolved_path}:{mtime}"
+
+
+def _read_arch_tuple(path: Path) -> Optional[_ElfArchitectureTuple]:
+    """Read the architecture tuple from an ELF file header.
+
+    :returns: The architecture tuple, or None if path is not an ELF file.
+    """
+    try:
+        if not path.is_file():
+            return None
+        with path.open("rb") as elf_file:
+            header = elf_file.read(20)
+    except OSError:
+        return None
+
+    if len(header) < 20 or header[:4] != b"\x7fELF":
+        return None
+
+    if header[5] == 1:
+        machine = int.from_bytes(header[18:20], "little")
+    else:
+        machine = int.from_bytes(header[18:20], "big")
+    ei_class = _EI_CLASS_NAMES.get(header[4])
+    ei_data = _EI_DATA_NAMES.get(header[5])
+    e_machine = _E_MACHINE_NAMES.get(machine)
+    if ei_class is None or ei_data is None or e_machine is None:
+        return None
+
+    return ei_class, ei_data, e_machine
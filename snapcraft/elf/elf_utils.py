@@ -16,25 +16,33 @@
 
 """Helpers to handle ELF files."""
 
-import functools
+import concurrent.futures
 import os
 import platform
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Set
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 import elftools.common.exceptions
 import elftools.elf.elffile
 from craft_cli import emit
+from xdg import BaseDirectory  # type: ignore
 
-from . import ElfFile, errors
+from snapcraft import utils
 
+from . import ElfCache, ElfFile, errors
 
-@functools.lru_cache(maxsize=1)
-def get_elf_files(root_path: Path) -> List[ElfFile]:
+# Minimum number of files to be scanned before using worker processes.
+_PARALLEL_SCAN_MIN_FILES = 64
+
+
+def get_elf_files(
+    root_path: Path, *, elf_cache: Optional[ElfCache] = None
+) -> List[ElfFile]:
     """Obtain a set of all ELF files in a subtree.
 
     :param root_path: The root of the subtree to list ELF files from.
+    :param elf_cache: A persistent cache of previously parsed ELF files.
     :return: A set of ELF files found in the given subtree.
     """
     file_list: List[str] = []
@@ -48,50 +56,146 @@ def get_elf_files(root_path: Path) -> List[ElfFile]:
             if not os.path.islink(file_path):
                 file_list.append(file_path)
 
-    return get_elf_files_from_list(root_path, file_list)
+    return get_elf_files_from_list(root_path, file_list, elf_cache=elf_cache)
 
 
-def get_elf_files_from_list(root: Path, file_list: Iterable[str]) -> List[ElfFile]:
+def get_elf_files_from_list(
+    root: Path, file_list: Iterable[str], *, elf_cache: Optional[ElfCache] = None
+) -> List[ElfFile]:
     """Return a list of ELF files from file_list prepended with root.
 
+    Files are parsed in parallel using a pool of worker processes. The
+    number of workers is limited by ``SNAPCRAFT_MAX_PARALLEL_BUILD_COUNT``.
+    Duplicate entries in file_list are only parsed and returned once.
+    Files found in the ELF cache are not parsed again, and newly parsed
+    files are added to the cache.
+
     :param str root: the root directory from where the file_list is generated.
     :param file_list: a list of file in root.
-    :returns: a list of ElfFile objects.
+    :param elf_cache: A persistent cache of previously parsed ELF files.
+    :returns: a list of ElfFile objects, sorted by path.
     """
-    elf_files: Set[ElfFile] = set()
+    paths: List[Path] = []
+    seen_paths: Set[Path] = set()
+    results: List[Tuple[Optional[ElfFile], Optional[str]]] = []
 
     for part_file in file_list:
         # Filter out object (*.o) files-- we only care about binaries.
         if part_file.endswith(".o"):
             continue
 
-        # No need to crawl links-- the original should be here, too.
         path = Path(root, part_file)
+        if path in seen_paths:
+            continue
+        seen_paths.add(path)
+
+        # No need to crawl links-- the original should be here, too.
         if os.path.islink(path):
             emit.debug(f"Skipped link {path!r} while finding dependencies")
             continue
 
-        # Ignore if file does not have ELF header.
-        if not ElfFile.is_elf(path):
-            continue
+        cached_elf_file = _get_cached_elf_file(path, elf_cache)
+        if cached_elf_file is not None:
+            results.append((cached_elf_file, None))
+        else:
+            paths.append(path)
 
-        try:
-            elf_file = ElfFile(path=path)
-        except elftools.common.exceptions.ELFError:
-            # Ignore invalid ELF files.
-            continue
-        except errors.CorruptedElfFile as exception:
-            # Log if the ELF file seems corrupted
-            emit.message(str(exception))
-            continue
+    results.extend(_load_elf_files(paths, elf_cache=elf_cache))
+
+    elf_files: List[ElfFile] = []
+    for elf_file, message in results:
+        if message:
+            emit.message(message)
 
         # If ELF has dynamic symbols, add it.
-        if elf_file.needed:
-            elf_files.add(elf_file)
+        if elf_file is not None and elf_file.needed:
+            elf_files.append(elf_file)
 
     return sorted(elf_files, key=lambda x: x.path)
 
 
+def _get_cached_elf_file(
+    path: Path, elf_cache: Optional[ElfCache]
+) -> Optional[ElfFile]:
+    """Obtain an unmodified ELF file from the cache."""
+    if elf_cache is None:
+        return None
+
+    data = elf_cache.get(path)
+    if data is None:
+        return None
+
+    try:
+        return ElfFile.unmarshal(path=path, data=data)
+    except (KeyError, TypeError, ValueError):
+        # Entries created by a different implementation are parsed again.
+        return None
+
+
+def _load_elf_files(
+    paths: List[Path], *, elf_cache: Optional[ElfCache]
+) -> List[Tuple[Optional[ElfFile], Optional[str]]]:
+    """Parse ELF files, using worker processes if there are many files."""
+    for path in paths:
+        emit.debug(f"Extracting ELF attributes: {str(path)!r}")
+
+    jobs = utils.get_parallel_build_count()
+    if jobs <= 1 or len(paths) < _PARALLEL_SCAN_MIN_FILES:
+        results = [_load_elf_file(path) for path in paths]
+    else:
+        emit.debug(f"Scanning {len(paths)} files for ELF data using {jobs} workers")
+        # pyelftools is pure Python, files are parsed in separate processes
+        # to not be serialized by the GIL.
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            extracted = executor.map(
+                _extract_elf_file, paths, chunksize=max(1, len(paths) // (jobs * 4))
+            )
+            results = [
+                (None if data is None else ElfFile.unmarshal(path=path, data=data), msg)
+                for path, (data, msg) in zip(paths, extracted)
+            ]
+
+    if elf_cache is not None:
+        for elf_file, _ in results:
+            if elf_file is not None:
+                elf_cache.set(elf_file.path, elf_file.marshal())
+
+    return results
+
+
+def _load_elf_file(path: Path) -> Tuple[Optional[ElfFile], Optional[str]]:
+    """Parse the ELF file in path.
+
+    Errors to be reported are returned as a message instead of being
+    emitted, so they are reported in path order.
+
+    :returns: A tuple containing the parsed ELF file (or None if path is
+        not a valid ELF file) and an optional message to report.
+    """
+    # Ignore if file does not have ELF header.
+    if not ElfFile.is_elf(path):
+        return None, None
+
+    try:
+        return ElfFile(path=path), None
+    except elftools.common.exceptions.ELFError:
+        # Ignore invalid ELF files.
+        return None, None
+    except errors.CorruptedElfFile as exception:
+        # Log if the ELF file seems corrupted
+        return None, str(exception)
+
+
+def _extract_elf_file(path: Path) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Parse the ELF file in path in a worker process.
+
+    :returns: A tuple containing the marshaled ELF file attributes (or None
+        if path is not a valid ELF file) and an optional message to report.
+    """
+    elf_file, message = _load_elf_file(path)
+    return None if elf_file is None else elf_file.marshal(), message
+
+
 @dataclass(frozen=True)
 class _ArchConfig:
     arch_triplet: str
@@ -128,6 +232,11 @@ def get_dynamic_linker(*, root_path: Path, snap_path: Path) -> str:
     return str(snap_path / arch_config.dynamic_linker)
 
 
+def get_soname_index_dir() -> Path:
+    """Return the directory to store soname indexes of installed snaps."""
+    return Path(BaseDirectory.xdg_cache_home, "snapcraft", "soname-index")
+
+
 def get_arch_triplet() -> str:
     """Inform the arch triplet string for the current architecture."""
     arch = platform.machine()
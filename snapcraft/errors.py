@@ -117,6 +117,13 @@ class LegacyFallback(Exception):
     """Fall back to legacy snapcraft implementation."""
 
 
+class SnapDeltaProcessingError(SnapcraftError):
+    """The Snap Store could not apply an uploaded delta."""
+
+    def __init__(self) -> None:
+        super().__init__("There has been a problem while processing a snap delta.")
+
+
 class StoreCredentialsUnauthorizedError(SnapcraftError):
     """Error raised for 401 responses from the Snap Store."""
 
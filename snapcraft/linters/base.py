@@ -17,15 +17,17 @@
 """Snapcraft linting infrastructure."""
 
 import abc
+import copy
 import enum
 import fnmatch
-from typing import TYPE_CHECKING, List, Literal, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Literal, Optional, Sequence
 
 import pydantic
 from craft_cli import emit
 
 from snapcraft import projects
-from snapcraft.elf import ElfFile
+from snapcraft.elf import ElfCache, ElfFile, elf_utils
 
 if TYPE_CHECKING:
     from snapcraft.meta.snap_yaml import SnapMetadata
@@ -83,7 +85,11 @@ class LinterIssue(pydantic.BaseModel):
 class Linter(abc.ABC):
     """Base class for linters.
 
-    :param project: The snap project information.
+    :param name: The linter name.
+    :param snap_metadata: The snap metadata.
+    :param lint: The linter configuration defined for this project.
+    :param elf_cache: A persistent cache of previously parsed ELF files.
+    :param elf_files: The ELF files in the payload, if already scanned.
     """
 
     def __init__(
@@ -91,10 +97,19 @@ class Linter(abc.ABC):
         name: str,
         snap_metadata: "SnapMetadata",
         lint: Optional[projects.Lint],
+        elf_cache: Optional[ElfCache] = None,
+        elf_files: Optional[Sequence[ElfFile]] = None,
     ):
         self._name = name
         self._snap_metadata = snap_metadata
         self._lint = lint or projects.Lint(ignore=[])
+        self._elf_cache = elf_cache
+        self._elf_files = elf_files
+
+    @property
+    def name(self) -> str:
+        """The linter name."""
+        return self._name
 
     @abc.abstractmethod
     def run(self) -> List[LinterIssue]:
@@ -103,6 +118,30 @@ class Linter(abc.ABC):
         :return: A list of linter issues flagged by this linter.
         """
 
+    def _get_elf_files(self) -> List[ElfFile]:
+        """Obtain the ELF files in the payload.
+
+        Linters run from the payload root, the paths of the ELF files returned
+        are relative to it. The scan shared between linters is not modified,
+        each linter gets its own copy of the ELF files to load dependencies
+        into.
+        """
+        root_path = Path.cwd()
+        scanned_files = self._elf_files
+        if scanned_files is None:
+            scanned_files = elf_utils.get_elf_files(
+                root_path, elf_cache=self._elf_cache
+            )
+
+        elf_files = []
+        for elf_file in scanned_files:
+            elf_file_copy = copy.copy(elf_file)
+            elf_file_copy.path = elf_file.path.relative_to(root_path)
+            elf_file_copy.dependencies = set()
+            elf_files.append(elf_file_copy)
+
+        return elf_files
+
     def _is_file_ignored(self, elf_file: ElfFile) -> bool:
         """Check if the file name matches an ignored file pattern."""
         for pattern in self._lint.ignored_files(self._name):
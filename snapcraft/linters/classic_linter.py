@@ -73,9 +73,9 @@ class ClassicLinter(Linter):
             return []
 
         issues = [issue]
-        elf_files = elf_utils.get_elf_files(current_path)
+        elf_files = self._get_elf_files()
         patcher = Patcher(dynamic_linker=linker, root_path=current_path.absolute())
-        soname_cache = SonameCache()
+        soname_cache = SonameCache(index_dir=elf_utils.get_soname_index_dir())
         arch_triplet = elf_utils.get_arch_triplet()
 
         for elf_file in elf_files:
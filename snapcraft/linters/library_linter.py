@@ -16,8 +16,10 @@
 
 """Library linter implementation."""
 
+import hashlib
+import json
 from pathlib import Path, PurePath
-from typing import List
+from typing import List, Optional, Set
 
 from craft_cli import emit
 from overrides import overrides
@@ -43,60 +45,122 @@ class LibraryLinter(Linter):
             installed_base_path = None
 
         issues: List[LinterIssue] = []
-        elf_files = elf_utils.get_elf_files(current_path)
-        soname_cache = SonameCache()
+        elf_files = self._get_elf_files()
+        soname_cache = SonameCache(index_dir=elf_utils.get_soname_index_dir())
+        root_path = current_path.absolute()
+        arch_triplet = elf_utils.get_arch_triplet()
+        content_dirs = self._snap_metadata.get_provider_content_directories()
+
+        search_paths = [root_path, *content_dirs]
+        if installed_base_path:
+            search_paths.append(installed_base_path)
+
+        linker_name = _get_linker_name()
+
+        # Previous results can be reused if the file and the environment
+        # used to resolve its dependencies did not change.
+        environment = _get_environment_key(search_paths, arch_triplet)
+        library_dirs = _get_library_dirs(search_paths, arch_triplet)
 
         for elf_file in elf_files:
             # Skip linting files listed in the ignore list.
             if self._is_file_ignored(elf_file):
                 continue
 
-            arch_triplet = elf_utils.get_arch_triplet()
-            content_dirs = self._snap_metadata.get_provider_content_directories()
-
-            dependencies = elf_file.load_dependencies(
-                root_path=current_path.absolute(),
-                base_path=installed_base_path,
-                content_dirs=content_dirs,
-                arch_triplet=arch_triplet,
-                soname_cache=soname_cache,
-            )
-
-            search_paths = [current_path.absolute(), *content_dirs]
-            if installed_base_path:
-                search_paths.append(installed_base_path)
+            cache_key = _get_cache_key(elf_file, environment)
+            dependencies = self._get_cached_dependencies(elf_file, cache_key)
+            if dependencies is None:
+                dependencies = elf_file.load_dependencies(
+                    root_path=root_path,
+                    base_path=installed_base_path,
+                    content_dirs=content_dirs,
+                    arch_triplet=arch_triplet,
+                    soname_cache=soname_cache,
+                )
+                self._cache_dependencies(
+                    elf_file,
+                    dependencies,
+                    cache_key=cache_key,
+                    search_paths=search_paths,
+                    library_dirs=library_dirs,
+                )
 
             self._check_dependencies_satisfied(
                 elf_file,
                 search_paths=search_paths,
                 dependencies=sorted(dependencies),
+                linker_name=linker_name,
                 issues=issues,
             )
 
         return issues
 
+    def _get_cached_dependencies(
+        self, elf_file: ElfFile, cache_key: Optional[str]
+    ) -> Optional[Set[str]]:
+        """Obtain the dependencies resolved in a previous run, if still valid."""
+        if self._elf_cache is None or cache_key is None:
+            return None
+
+        dependencies = self._elf_cache.get_dependencies(elf_file.path, key=cache_key)
+        if dependencies is None:
+            return None
+
+        emit.debug(f"library linter: reuse results for {str(elf_file.path)!r}")
+        return set(dependencies)
+
+    def _cache_dependencies(
+        self,
+        elf_file: ElfFile,
+        dependencies: Set[str],
+        *,
+        cache_key: Optional[str],
+        search_paths: List[Path],
+        library_dirs: List[Path],
+    ) -> None:
+        """Store the resolved dependencies of a file for later runs.
+
+        Files with dependencies not found in the search paths are not stored,
+        as a library added anywhere in the payload could satisfy them. The
+        entry is invalidated if a library found is modified, or if a library
+        with the same name as a dependency is added to or removed from the
+        library directories of the search paths.
+        """
+        if self._elf_cache is None or cache_key is None:
+            return
+
+        dependency_paths = [Path(dependency) for dependency in dependencies]
+        for dependency_path in dependency_paths:
+            if not any(path in dependency_path.parents for path in search_paths):
+                return
+
+        names = set(elf_file.needed)
+        names.update(path.name for path in dependency_paths)
+        checked_paths = [
+            *dependency_paths,
+            *(library_dir / name for library_dir in library_dirs for name in names),
+        ]
+        self._elf_cache.set_dependencies(
+            elf_file.path, dependencies, key=cache_key, checked_paths=checked_paths
+        )
+
     def _check_dependencies_satisfied(
         self,
         elf_file: ElfFile,
         *,
         search_paths: List[Path],
         dependencies: List[str],
+        linker_name: Optional[str],
         issues: List[LinterIssue],
     ) -> None:
         """Check if ELF executable dependencies are satisfied by snap files.
 
         :param elf_file: The ELF file whose dependencies are being verified.
-        :param root_path: The absolute path to the payload directory.
+        :param search_paths: The paths where dependencies are expected to be.
+        :param dependencies: The paths to the ELF file dependencies.
+        :param linker_name: The name of the dynamic linker.
         :param issues: The list of linter issues.
         """
-        try:
-            linker = elf_utils.get_dynamic_linker(root_path=Path("/"), snap_path=Path())
-            linker_name = Path(linker).name
-        except elf_errors.DynamicLinkerNotFound:
-            linker_name = None
-
-        emit.debug(f"dynamic linker name is: {linker_name!r}")
-
         for dependency in dependencies:
             dependency_path = PurePath(dependency)
 
@@ -116,3 +180,52 @@ class LibraryLinter(Linter):
                     url="https://snapcraft.io/docs/linters-library",
                 )
                 issues.append(issue)
+
+
+def _get_linker_name() -> Optional[str]:
+    """Obtain the name of the host dynamic linker."""
+    try:
+        linker = elf_utils.get_dynamic_linker(root_path=Path("/"), snap_path=Path())
+        linker_name: Optional[str] = Path(linker).name
+    except elf_errors.DynamicLinkerNotFound:
+        linker_name = None
+
+    emit.debug(f"dynamic linker name is: {linker_name!r}")
+    return linker_name
+
+
+def _get_environment_key(search_paths: List[Path], arch_triplet: str) -> str:
+    """Identify the environment used to resolve ELF file dependencies.
+
+    Search paths are resolved, so that a different revision of a content or
+    base snap produces a different key.
+    """
+    data = {
+        "arch-triplet": arch_triplet,
+        "search-paths": [str(path.resolve()) for path in search_paths],
+    }
+    return hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
+
+def _get_library_dirs(search_paths: List[Path], arch_triplet: str) -> List[Path]:
+    """Obtain the library directories of the search paths, existing or not."""
+    return [
+        path / lib_dir
+        for path in search_paths
+        for lib_dir in (
+            "lib",
+            "usr/lib",
+            f"lib/{arch_triplet}",
+            f"usr/lib/{arch_triplet}",
+        )
+    ]
+
+
+def _get_cache_key(elf_file: ElfFile, environment: str) -> Optional[str]:
+    """Identify the file and the dependency resolution environment."""
+    try:
+        stat = elf_file.path.stat()
+    except OSError:
+        return None
+
+    return f"{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}:{environment}"
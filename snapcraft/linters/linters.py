@@ -16,17 +16,20 @@
 
 """Snapcraft linting execution and reporting."""
 
+import concurrent.futures
 import enum
 import fnmatch
 import json
 import os
+import time
 from functools import partial
 from pathlib import Path
-from typing import TYPE_CHECKING, Dict, List, Optional, Type
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Type
 
 from craft_cli import emit
 
 from snapcraft import projects
+from snapcraft.elf import ElfCache, elf_utils
 from snapcraft.meta import snap_yaml
 
 from .base import Linter, LinterIssue, LinterResult
@@ -64,7 +67,11 @@ _lint_reports: Dict[LinterResult, str] = {
 
 
 def report(
-    issues: List[LinterIssue], *, json_output: bool = False, intermediate: bool = False
+    issues: List[LinterIssue],
+    *,
+    json_output: bool = False,
+    intermediate: bool = False,
+    timings: Optional[Dict[str, float]] = None,
 ) -> LinterStatus:
     """Display the linter report in textual or json formats.
 
@@ -72,6 +79,8 @@ def report(
     :param json_output: Display issues in json format.
     :param intermediate: Set if the linter output are is not the main
         outcome of the command execution.
+    :param timings: The time taken by each linter, in seconds. Timings are
+        not displayed in json format, the output only lists the issues.
     """
     if intermediate:
         display = partial(emit.progress, permanent=True)
@@ -100,6 +109,11 @@ def report(
                 for issue in issues_by_result[result]:
                     display(f"- {issue!s}")
 
+        if timings:
+            display("Lint timings:")
+            for name, elapsed in timings.items():
+                display(f"- {name}: {elapsed:.3f}s")
+
     return status
 
 
@@ -121,11 +135,20 @@ def lint_command(parsed_args: "argparse.Namespace") -> None:
     run_linters(parsed_args.snap_file, lint=None)
 
 
-def run_linters(location: Path, *, lint: Optional[projects.Lint]) -> List[LinterIssue]:
+def run_linters(
+    location: Path,
+    *,
+    lint: Optional[projects.Lint],
+    elf_cache: Optional[ElfCache] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> List[LinterIssue]:
     """Run all the defined linters.
 
     :param location: The root of the snap payload subtree to run linters on.
     :param lint: The linter configuration defined for this project.
+    :param elf_cache: A persistent cache of previously parsed ELF files.
+    :param timings: If set, the time taken by each linter, in seconds, is
+        added to it.
     :return: A list of linter issues.
     """
     all_issues: List[LinterIssue] = []
@@ -136,15 +159,28 @@ def run_linters(location: Path, *, lint: Optional[projects.Lint]) -> List[Linter
         emit.progress("Reading snap metadata...")
         snap_metadata = snap_yaml.read(Path())
 
-        emit.progress("Running linters...")
-        for name, linter_class in LINTERS.items():
-            if lint and lint.all_ignored(name):
-                continue
-
-            linter = linter_class(name=name, lint=lint, snap_metadata=snap_metadata)
-            emit.progress(f"Running linter: {name}")
-            issues = linter.run()
-            all_issues += issues
+        enabled_linters = [
+            (name, linter_class)
+            for name, linter_class in LINTERS.items()
+            if not (lint and lint.all_ignored(name))
+        ]
+
+        if enabled_linters:
+            emit.progress("Scanning ELF files...")
+            elf_files = tuple(elf_utils.get_elf_files(Path.cwd(), elf_cache=elf_cache))
+
+            emit.progress("Running linters...")
+            linters = [
+                linter_class(
+                    name=name,
+                    lint=lint,
+                    snap_metadata=snap_metadata,
+                    elf_cache=elf_cache,
+                    elf_files=elf_files,
+                )
+                for name, linter_class in enabled_linters
+            ]
+            all_issues = _run_concurrently(linters, timings=timings)
     finally:
         os.chdir(previous_dir)
 
@@ -153,6 +189,38 @@ def run_linters(location: Path, *, lint: Optional[projects.Lint]) -> List[Linter
     return all_issues
 
 
+def _run_concurrently(
+    linters: List[Linter], *, timings: Optional[Dict[str, float]]
+) -> List[LinterIssue]:
+    """Run linters in parallel.
+
+    Issues are returned in the order the linters are listed, regardless of
+    the order in which they finish.
+
+    :param linters: The linters to run.
+    :param timings: If set, the time taken by each linter is added to it.
+    :return: A list of linter issues.
+    """
+    all_issues: List[LinterIssue] = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(linters)) as executor:
+        futures = [executor.submit(_run_linter, linter) for linter in linters]
+        for linter, future in zip(linters, futures):
+            issues, elapsed = future.result()
+            emit.verbose(f"Linter {linter.name!r} finished in {elapsed:.3f}s")
+            if timings is not None:
+                timings[linter.name] = elapsed
+            all_issues += issues
+
+    return all_issues
+
+
+def _run_linter(linter: Linter) -> Tuple[List[LinterIssue], float]:
+    emit.progress(f"Running linter: {linter.name}")
+    start_time = time.monotonic()
+    issues = linter.run()
+    return issues, time.monotonic() - start_time
+
+
 def _ignore_matching_filenames(
     issues: List[LinterIssue], *, lint: Optional[projects.Lint]
 ) -> None:
@@ -16,13 +16,27 @@
 
 """Snap file packing."""
 
+import collections
+import json
+import os
 import subprocess
+import time
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 
 from craft_cli import emit
 
-from snapcraft import errors
+from snapcraft import errors, pack_manifest, utils
+from snapcraft.meta import snap_yaml
+from snapcraft_legacy.internal import errors as legacy_errors
+from snapcraft_legacy.internal import squashfs
+
+if TYPE_CHECKING:
+    from snapcraft.projects import Pack
+
+# Snaps of these types are packed preserving file ownership and extended
+# attributes, as done by `snap pack`.
+_SYSTEM_SNAP_TYPES = ("base", "core", "os", "snapd")
 
 
 def _verify_snap(directory: Path) -> None:
@@ -95,8 +109,10 @@ def pack_snap(
     name: Optional[str] = None,
     version: Optional[str] = None,
     target_arch: Optional[str] = None,
+    pack_options: Optional["Pack"] = None,
+    manifest_path: Optional[Path] = None,
 ) -> str:
-    """Pack snap contents with `snap pack`.
+    """Pack snap contents with `snap pack`, or mksquashfs if configured.
 
     `output` may either be a directory, a file path, or just a file name.
       - directory: write snap to directory with default snap name
@@ -112,12 +128,147 @@ def pack_snap(
     :param name: Name of snap project.
     :param version: Version of snap project.
     :param target_arch: Target architecture the snap project is built to.
+    :param pack_options: The project packing configuration.
+    :param manifest_path: The file to store the manifest of packed files in,
+        used if the pack options enable skip-unchanged.
     """
     emit.debug(f"pack_snap: output={output!r}, compression={compression!r}")
 
     # TODO remove workaround once LP: #1950465 is fixed
     _verify_snap(directory)
 
+    if pack_options is not None and pack_options.skip_unchanged and manifest_path:
+        return _pack_if_changed(
+            directory,
+            output=output,
+            compression=compression,
+            name=name,
+            version=version,
+            target_arch=target_arch,
+            pack_options=pack_options,
+            manifest_path=manifest_path,
+        )
+
+    return _pack(
+        directory,
+        output=output,
+        compression=compression,
+        name=name,
+        version=version,
+        target_arch=target_arch,
+        pack_options=pack_options,
+    )
+
+
+def _pack_if_changed(
+    directory: Path,
+    *,
+    output: Optional[str],
+    compression: Optional[str],
+    name: Optional[str],
+    version: Optional[str],
+    target_arch: Optional[str],
+    pack_options: "Pack",
+    manifest_path: Path,
+) -> str:
+    """Pack snap contents if they changed since the last time they were packed.
+
+    The whole snap is packed again if anything changed, blocks of unchanged
+    files are not reused from the previous snap file.
+
+    :param manifest_path: The file to store the manifest of packed files in.
+
+    :return: The snap file name.
+    """
+    output_file = _get_filename(output, name, version, target_arch)
+    snap_path = _get_directory(output) / (
+        output_file or _get_default_filename(directory)
+    )
+
+    previous = pack_manifest.PackManifest.load(manifest_path)
+    manifest = pack_manifest.PackManifest.scan(directory, previous=previous)
+    manifest.options = _get_pack_options_key(compression, pack_options)
+
+    # Modification times do not change the snap file if mksquashfs
+    # replaces them, e.g. when the files were primed again.
+    compare_mtimes = not (
+        pack_options.backend == "mksquashfs" and os.getenv("SOURCE_DATE_EPOCH")
+    )
+
+    if previous is not None:
+        _report_changes(manifest.get_changes(previous))
+        if (
+            previous.options == manifest.options
+            and previous.is_snap_file_current(snap_path)
+            and manifest.has_same_contents(previous, compare_mtimes=compare_mtimes)
+        ):
+            emit.progress(f"Snap package {snap_path.name} is up to date")
+            return snap_path.name
+
+    snap_filename = _pack(
+        directory,
+        output=output,
+        compression=compression,
+        name=name,
+        version=version,
+        target_arch=target_arch,
+        pack_options=pack_options,
+    )
+
+    manifest.set_snap_file(snap_path.parent / snap_filename)
+    manifest.save(manifest_path)
+    return snap_filename
+
+
+def _get_pack_options_key(compression: Optional[str], pack_options: "Pack") -> str:
+    """Identify the options that change the contents of the snap file."""
+    options = pack_options.dict(exclude={"processors", "skip_unchanged"})
+    options["compression"] = compression
+    options["source_date_epoch"] = os.getenv("SOURCE_DATE_EPOCH")
+    return json.dumps(options, sort_keys=True)
+
+
+def _report_changes(changes: pack_manifest.PackChanges) -> None:
+    """Report the files changed since the last time the snap was packed."""
+    for prefix, paths in (
+        ("+", changes.added),
+        ("-", changes.removed),
+        ("M", changes.modified),
+    ):
+        for path in paths:
+            emit.verbose(f"{prefix} {path}")
+
+    emit.progress(
+        f"Changes since last pack: {len(changes.added)} added, "
+        f"{len(changes.removed)} removed, {len(changes.modified)} modified",
+        permanent=True,
+    )
+
+
+def _pack(
+    directory: Path,
+    *,
+    output: Optional[str],
+    compression: Optional[str],
+    name: Optional[str],
+    version: Optional[str],
+    target_arch: Optional[str],
+    pack_options: Optional["Pack"],
+) -> str:
+    """Pack snap contents with the configured backend.
+
+    :return: The snap file name.
+    """
+    if pack_options is not None and pack_options.backend == "mksquashfs":
+        output_file = _get_filename(output, name, version, target_arch)
+        return _pack_with_mksquashfs(
+            directory,
+            snap_path=_get_directory(output)
+            / (output_file or _get_default_filename(directory)),
+            compression=compression,
+            pack_options=pack_options,
+        )
+
     # create command formatted as `snap pack <options> <snap-dir> <output-dir>`
     command: List[Union[str, Path]] = ["snap", "pack"]
     output_file = _get_filename(output, name, version, target_arch)
@@ -142,3 +293,144 @@ def pack_snap(
 
     snap_filename = Path(str(proc.stdout).partition(":")[2].strip()).name
     return snap_filename
+
+
+def _get_default_filename(directory: Path) -> str:
+    """Get the filename `snap pack` uses for the snap in directory."""
+    metadata = snap_yaml.read(directory)
+    if len(metadata.architectures) == 1:
+        arch = metadata.architectures[0]
+    else:
+        arch = "multi"
+
+    return f"{metadata.name}_{metadata.version}_{arch}.snap"
+
+
+def _get_mksquashfs_command(
+    directory: Path,
+    *,
+    snap_path: Path,
+    compression: Optional[str],
+    pack_options: "Pack",
+) -> List[Union[str, Path]]:
+    """Get the mksquashfs command equivalent to `snap pack`, with tuning."""
+    command: List[Union[str, Path]] = [
+        utils.get_snap_tool("mksquashfs"),
+        directory,
+        snap_path,
+        "-noappend",
+        "-comp",
+        compression or "xz",
+        "-no-fragments",
+        "-no-progress",
+        "-processors",
+        str(pack_options.processors or utils.get_parallel_build_count()),
+    ]
+
+    if snap_yaml.read(directory).type not in _SYSTEM_SNAP_TYPES:
+        command.extend(["-all-root", "-no-xattrs"])
+
+    if pack_options.block_size is not None:
+        command.extend(["-b", str(pack_options.block_size)])
+
+    if not pack_options.deduplicate:
+        command.append("-no-duplicates")
+
+    # Use a fixed image creation time, so packing the same files with the
+    # same modification times produces the same snap file. File times are
+    # only replaced when SOURCE_DATE_EPOCH is set.
+    source_date_epoch = os.getenv("SOURCE_DATE_EPOCH")
+    if source_date_epoch:
+        command.extend(
+            ["-mkfs-time", source_date_epoch, "-all-time", source_date_epoch]
+        )
+    else:
+        command.extend(["-mkfs-time", "0"])
+
+    return command
+
+
+def _pack_with_mksquashfs(
+    directory: Path,
+    *,
+    snap_path: Path,
+    compression: Optional[str],
+    pack_options: "Pack",
+) -> str:
+    """Pack snap contents running mksquashfs directly.
+
+    :param directory: Directory to pack.
+    :param snap_path: The snap file to create.
+    :param compression: Compression type to use, None for defaults.
+    :param pack_options: The project packing configuration.
+
+    :return: The snap file name.
+    """
+    command = _get_mksquashfs_command(
+        directory,
+        snap_path=snap_path,
+        compression=compression,
+        pack_options=pack_options,
+    )
+
+    emit.progress("Creating snap package...")
+    emit.debug(f"Pack command: {command}")
+    start_time = time.monotonic()
+    try:
+        subprocess.run(
+            command, capture_output=True, check=True, universal_newlines=True
+        )
+    except subprocess.CalledProcessError as err:
+        msg = f"Cannot pack snap file: {err!s}"
+        if err.stderr:
+            msg += f" ({err.stderr.strip()!s})"
+        raise errors.SnapcraftError(msg)
+
+    _report_pack_statistics(snap_path, elapsed=time.monotonic() - start_time)
+    return snap_path.name
+
+
+def _report_pack_statistics(snap_path: Path, *, elapsed: float) -> None:
+    """Report the packing throughput and compression ratio per directory."""
+    directories: Dict[str, Tuple[int, int]] = collections.defaultdict(lambda: (0, 0))
+    try:
+        with squashfs.SquashfsImage(str(snap_path)) as snap_image:
+            for snap_file in snap_image.iter_files():
+                top_directory = snap_file.path.partition("/")[0]
+                if "/" not in snap_file.path:
+                    top_directory = "."
+                total_size, total_stored_size = directories[top_directory]
+                directories[top_directory] = (
+                    total_size + snap_file.size,
+                    total_stored_size + snap_file.stored_size,
+                )
+    except (
+        legacy_errors.SnapDataExtractionError,
+        legacy_errors.SquashfsCompressionNotSupportedError,
+    ) as error:
+        emit.debug(f"Cannot report pack statistics: {error}")
+        return
+
+    for name, (size, stored_size) in sorted(directories.items()):
+        emit.verbose(
+            f"{name}: {_format_size(size)} stored in {_format_size(stored_size)} "
+            f"({_get_ratio(stored_size, size):.1%})"
+        )
+
+    size = sum(x[0] for x in directories.values())
+    stored_size = sum(x[1] for x in directories.values())
+    throughput = size / elapsed if elapsed > 0 else 0
+    emit.progress(
+        f"Packed {_format_size(size)} in {elapsed:.1f}s "
+        f"({_format_size(throughput)}/s), compressed to "
+        f"{_get_ratio(stored_size, size):.1%}",
+        permanent=True,
+    )
+
+
+def _get_ratio(stored_size: int, size: int) -> float:
+    return stored_size / size if size else 1.0
+
+
+def _format_size(size: float) -> str:
+    return f"{size / 1024 / 1024:.1f} MiB"
@@ -0,0 +1,271 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Manifest of packed snap contents, used to skip packing unchanged contents."""
+
+import contextlib
+import hashlib
+import json
+import os
+import stat
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from craft_cli import emit
+
+_MANIFEST_FORMAT_VERSION = 2
+
+# (st_ino, st_mtime_ns, st_size, st_mode, st_uid, st_gid)
+_StatKey = Tuple[int, int, int, int, int, int]
+
+
+@dataclass
+class FileEntry:
+    """A file in the packed directory.
+
+    :ivar stat_key: The file status used to detect changes without reading
+        the file contents.
+    :ivar digest: The sha256 of regular file contents, the target of
+        symbolic links, or empty for directories.
+    """
+
+    stat_key: _StatKey
+    digest: str
+
+    @property
+    def mode(self) -> int:
+        """The file type and permissions."""
+        return self.stat_key[3]
+
+    @property
+    def mtime_ns(self) -> int:
+        """The file modification time."""
+        return self.stat_key[1]
+
+    @property
+    def owner(self) -> Tuple[int, int]:
+        """The user and group owning the file."""
+        return self.stat_key[4], self.stat_key[5]
+
+
+@dataclass
+class PackChanges:
+    """Files changed between two packs of the same directory."""
+
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        """Whether any file was added, removed or modified."""
+        return bool(self.added or self.removed or self.modified)
+
+
+@dataclass
+class PackManifest:
+    """The contents of a directory and the snap file it was packed to.
+
+    :ivar files: The file entries, keyed by path relative to the directory.
+    :ivar options: Identifies the options used to pack the snap file.
+    :ivar snap_file: The path to the snap file created.
+    :ivar snap_key: The status of the snap file when it was created.
+    """
+
+    files: Dict[str, FileEntry]
+    options: str = ""
+    snap_file: str = ""
+    snap_key: Optional[_StatKey] = None
+
+    @classmethod
+    def scan(
+        cls, directory: Path, *, previous: Optional["PackManifest"] = None
+    ) -> "PackManifest":
+        """Create the manifest of a directory.
+
+        Regular files are only hashed if their status differs from the
+        entry in the previous manifest.
+
+        :param directory: The directory to scan.
+        :param previous: The manifest of the previous pack, if any.
+        """
+        previous_files = previous.files if previous else {}
+        files: Dict[str, FileEntry] = {}
+        hashed = 0
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames.sort()
+            for name in sorted(dirnames + filenames):
+                path = os.path.join(dirpath, name)
+                relative_path = os.path.relpath(path, directory)
+                file_stat = os.lstat(path)
+                stat_key = _get_stat_key(file_stat)
+
+                previous_entry = previous_files.get(relative_path)
+                if previous_entry and previous_entry.stat_key == stat_key:
+                    files[relative_path] = previous_entry
+                    continue
+
+                if stat.S_ISREG(file_stat.st_mode):
+                    hashed += 1
+                files[relative_path] = FileEntry(
+                    stat_key=stat_key, digest=_get_digest(path, file_stat)
+                )
+
+        emit.debug(f"Scanned {len(files)} files for packing, hashed {hashed}")
+        return cls(files=files)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["PackManifest"]:
+        """Read a manifest from disk.
+
+        :param path: The manifest file.
+        :returns: The manifest, or None if it does not exist or is invalid.
+        """
+        with contextlib.suppress(OSError, ValueError, KeyError, TypeError):
+            data = json.loads(path.read_text())
+            if data["version"] != _MANIFEST_FORMAT_VERSION:
+                return None
+
+            snap_key = data["snap_key"]
+            return cls(
+                files={
+                    name: FileEntry(stat_key=tuple(stat_key), digest=digest)  # type: ignore
+                    for name, (stat_key, digest) in data["files"].items()
+                },
+                options=data["options"],
+                snap_file=data["snap_file"],
+                snap_key=tuple(snap_key) if snap_key else None,  # type: ignore
+            )
+
+        return None
+
+    def save(self, path: Path) -> None:
+        """Write the manifest to disk.
+
+        :param path: The manifest file.
+        """
+        data = {
+            "version": _MANIFEST_FORMAT_VERSION,
+            "options": self.options,
+            "snap_file": self.snap_file,
+            "snap_key": self.snap_key,
+            "files": {
+                name: [entry.stat_key, entry.digest]
+                for name, entry in self.files.items()
+            },
+        }
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(data))
+        temp_path.replace(path)
+
+    def set_snap_file(self, snap_path: Path) -> None:
+        """Record the snap file created from the manifest contents.
+
+        :param snap_path: The snap file.
+        """
+        self.snap_file = str(snap_path.resolve())
+        self.snap_key = _get_stat_key(snap_path.stat())
+
+    def is_snap_file_current(self, snap_path: Path) -> bool:
+        """Verify if snap_path is the unmodified snap file recorded in the manifest.
+
+        :param snap_path: The snap file.
+        """
+        try:
+            snap_key = _get_stat_key(snap_path.stat())
+        except OSError:
+            return False
+
+        return self.snap_file == str(snap_path.resolve()) and self.snap_key == snap_key
+
+    def has_same_contents(
+        self, other: "PackManifest", *, compare_mtimes: bool = True
+    ) -> bool:
+        """Verify if packing both manifests produces the same snap file.
+
+        :param other: The manifest to compare with.
+        :param compare_mtimes: Whether file modification times are packed.
+        """
+        if self.files.keys() != other.files.keys():
+            return False
+
+        return all(
+            _get_pack_key(entry, compare_mtimes)
+            == _get_pack_key(other.files[name], compare_mtimes)
+            for name, entry in self.files.items()
+        )
+
+    def get_changes(self, previous: "PackManifest") -> PackChanges:
+        """Compare the contents of the manifest with a previous manifest.
+
+        Files are compared by content, mode and ownership, changes to other
+        file status attributes alone are not reported.
+
+        :param previous: The manifest to compare with.
+        """
+        changes = PackChanges()
+        for name, entry in self.files.items():
+            previous_entry = previous.files.get(name)
+            if previous_entry is None:
+                changes.added.append(name)
+            elif (
+                previous_entry.digest != entry.digest
+                or previous_entry.mode != entry.mode
+                or previous_entry.owner != entry.owner
+            ):
+                changes.modified.append(name)
+
+        changes.removed = [name for name in previous.files if name not in self.files]
+        return changes
+
+
+def _get_pack_key(
+    entry: FileEntry, compare_mtimes: bool
+) -> Tuple[str, int, Tuple[int, int], int]:
+    return (
+        entry.digest,
+        entry.mode,
+        entry.owner,
+        entry.mtime_ns if compare_mtimes else 0,
+    )
+
+
+def _get_stat_key(file_stat: os.stat_result) -> _StatKey:
+    return (
+        file_stat.st_ino,
+        file_stat.st_mtime_ns,
+        file_stat.st_size,
+        file_stat.st_mode,
+        file_stat.st_uid,
+        file_stat.st_gid,
+    )
+
+
+def _get_digest(path: str, file_stat: os.stat_result) -> str:
+    if stat.S_ISLNK(file_stat.st_mode):
+        return os.readlink(path)
+
+    if not stat.S_ISREG(file_stat.st_mode):
+        return ""
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
@@ -31,7 +31,7 @@ from craft_parts import ProjectInfo, Step, StepInfo, callbacks
 from craft_providers import Executor
 
 from snapcraft import errors, extensions, linters, pack, providers, ua_manager, utils
-from snapcraft.elf import Patcher, SonameCache, elf_utils
+from snapcraft.elf import ElfCache, Patcher, SonameCache, elf_utils
 from snapcraft.elf import errors as elf_errors
 from snapcraft.linters import LinterStatus
 from snapcraft.meta import manifest, snap_yaml
@@ -76,6 +76,10 @@ _SNAP_PROJECT_FILES = [
 _CORE_PART_KEYS = ["build-packages", "build-snaps"]
 _CORE_PART_NAME = "snapcraft/core"
 
+# Persistent cache of parsed ELF files, relative to the parts directory.
+_ELF_CACHE_FILE = ".elf-cache.db"
+_PACK_MANIFEST_FILE = ".pack-manifest.json"
+
 
 def get_snap_project() -> _SnapProject:
     """Find the snapcraft.yaml to load.
@@ -351,8 +355,15 @@ def _run_lifecycle_and_pack(
         )
 
     if command_name in ("pack", "snap"):
-        issues = linters.run_linters(lifecycle.prime_dir, lint=project.lint)
-        status = linters.report(issues, intermediate=True)
+        timings: Dict[str, float] = {}
+        with ElfCache(lifecycle.parts_dir / _ELF_CACHE_FILE) as elf_cache:
+            issues = linters.run_linters(
+                lifecycle.prime_dir,
+                lint=project.lint,
+                elf_cache=elf_cache,
+                timings=timings,
+            )
+        status = linters.report(issues, intermediate=True, timings=timings)
 
         # In case of linter errors, stop execution and return the error code.
         if status in (LinterStatus.ERRORS, LinterStatus.FATAL):
@@ -365,6 +376,8 @@ def _run_lifecycle_and_pack(
             name=project.name,
             version=process_version(project.version),
             target_arch=project.get_build_for(),
+            pack_options=project.pack,
+            manifest_path=lifecycle.parts_dir / _PACK_MANIFEST_FILE,
         )
         emit.message(f"Created snap package {snap_filename}")
 
@@ -634,7 +647,7 @@ def _patch_elf(step_info: StepInfo) -> bool:
     migrated_files = step_info.state.files
     patcher = Patcher(dynamic_linker=linker, root_path=step_info.prime_dir)
     elf_files = elf_utils.get_elf_files_from_list(step_info.prime_dir, migrated_files)
-    soname_cache = SonameCache()
+    soname_cache = SonameCache(index_dir=elf_utils.get_soname_index_dir())
     arch_triplet = elf_utils.get_arch_triplet()
 
     for elf_file in elf_files:
@@ -646,9 +659,7 @@ def _patch_elf(step_info: StepInfo) -> bool:
             soname_cache=soname_cache,
         )
 
-        relative_path = elf_file.path.relative_to(step_info.prime_dir)
-        emit.progress(f"Patch ELF file: {str(relative_path)!r}")
-        patcher.patch(elf_file=elf_file)
+    patcher.patch_all(elf_files=elf_files)
 
     return True
 
@@ -111,6 +111,11 @@ class PartsLifecycle:
         """Return the parts prime directory path."""
         return self._lcm.project_info.prime_dir
 
+    @property
+    def parts_dir(self) -> pathlib.Path:
+        """Return the parts directory path."""
+        return self._lcm.project_info.dirs.parts_dir
+
     @property
     def target_arch(self) -> str:
         """Return the parts project target architecture."""
@@ -373,6 +373,47 @@ class ContentPlug(ProjectModel):
     default_provider: Optional[str]
 
 
+class Pack(ProjectModel):
+    """Snap packing configuration.
+
+    :ivar backend: The tool used to create the snap file: ``snap`` runs
+        ``snap pack``, ``mksquashfs`` runs mksquashfs directly and allows
+        tuning the options below.
+    :ivar processors: The number of processors used by mksquashfs, the
+        number of parallel build jobs if not set.
+    :ivar block_size: The squashfs data block size in bytes.
+    :ivar deduplicate: Store identical files only once.
+    :ivar skip_unchanged: Keep a manifest of the packed files, report the
+        files changed since the last pack and do not pack again if the snap
+        file would not change. Changed contents are packed from scratch.
+
+    With the ``mksquashfs`` backend the image creation time is always set
+    to zero, but file modification times are only replaced when
+    SOURCE_DATE_EPOCH is set. Packing the same files produces the same snap
+    file only if SOURCE_DATE_EPOCH is set or the file modification times
+    did not change.
+    """
+
+    backend: Literal["snap", "mksquashfs"] = "snap"
+    processors: Optional[pydantic.conint(ge=1)]  # type: ignore
+    block_size: Optional[
+        Literal[4096, 8192, 16384, 32768, 65536, 131072, 262144, 524288, 1048576]
+    ]
+    deduplicate: bool = True
+    skip_unchanged: bool = False
+
+    @pydantic.root_validator(pre=True)
+    @classmethod
+    def _validate_mksquashfs_options(cls, values):
+        if values.get("backend", "snap") == "snap":
+            for option in ("processors", "block-size", "deduplicate"):
+                if option in values or option.replace("-", "_") in values:
+                    raise ValueError(
+                        f"{option!r} can only be used with the 'mksquashfs' backend"
+                    )
+        return values
+
+
 MANDATORY_ADOPTABLE_FIELDS = ("version", "summary", "description")
 
 
@@ -415,6 +456,7 @@ class Project(ProjectModel):
     plugs: Optional[Dict[str, Union[ContentPlug, Any]]]
     slots: Optional[Dict[str, Any]]
     lint: Optional[Lint]
+    pack: Optional[Pack]
     parts: Dict[str, Any]  # parts are handled by craft-parts
     epoch: Optional[str]
     adopt_info: Optional[str]
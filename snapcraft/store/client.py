@@ -18,7 +18,6 @@
 
 import os
 import platform
-import time
 from datetime import timedelta
 from typing import Any, Dict, List, Optional, Sequence, Tuple, cast
 
@@ -28,6 +27,7 @@ from craft_cli import emit
 from overrides import overrides
 
 from snapcraft import __version__, errors, utils
+from snapcraft_legacy.storeapi._status_tracker import StatusPoller
 from snapcraft_legacy.storeapi.v2.releases import Releases as Revisions
 
 from . import channel_map, constants
@@ -36,7 +36,6 @@ from .onprem_client import ON_PREM_ENDPOINTS, OnPremClient
 
 _TESTING_ENV_PREFIXES = ["TRAVIS", "AUTOPKGTEST_TMP"]
 
-_POLL_DELAY = 1
 _HUMAN_STATUS = {
     "being_processed": "processing",
     "ready_to_release": "ready to release!",
@@ -60,6 +59,21 @@ def build_user_agent(
     return f"snapcraft/{version}{testing}{os_platform!s}"
 
 
+def _emit_status(status: Dict[str, Any]) -> None:
+    human_status = _HUMAN_STATUS.get(status["code"], status["code"])
+    emit.progress(f"Status: {human_status}")
+
+
+def _emit_revision_status(status: Dict[str, Any]) -> None:
+    (revision,) = status["revisions"]
+    emit.progress(f"Status: {revision['status']}")
+
+
+def _is_revision_processed(status: Dict[str, Any]) -> bool:
+    (revision,) = status["revisions"]
+    return revision["status"] in ("approved", "rejected")
+
+
 def use_candid() -> bool:
     """Return True if using candid as the auth backend."""
     return os.getenv(constants.ENVIRONMENT_STORE_AUTH) == "candid"
@@ -431,17 +445,50 @@ class LegacyStoreClientCLI:
         snap_file_size: int,
         built_at: Optional[str],
         channels: Optional[Sequence[str]],
+        delta_info: Optional[Dict[str, str]] = None,
     ) -> int:
-        """Notify an upload to the Snap Store.
+        """Notify an upload to the Snap Store and wait until it is processed.
 
         :param snap_name: name of the snap
         :param upload_id: the upload_id to register with the Snap Store
         :param snap_file_size: the file size of the uploaded snap
         :param built_at: the build timestamp for this build
         :param channels: the channels to release to after being accepted into the Snap Store
+        :param delta_info: the delta format and hashes if a delta was uploaded
         :returns: the snap's processed revision
         """
-        data = {
+        status_url = self.push_upload(
+            snap_name=snap_name,
+            upload_id=upload_id,
+            snap_file_size=snap_file_size,
+            built_at=built_at,
+            channels=channels,
+            delta_info=delta_info,
+        )
+        (status,) = self.track_uploads([status_url])
+        return self.get_upload_revision(status)
+
+    def push_upload(
+        self,
+        *,
+        snap_name: str,
+        upload_id: str,
+        snap_file_size: int,
+        built_at: Optional[str],
+        channels: Optional[Sequence[str]],
+        delta_info: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """Notify an upload to the Snap Store, without waiting for processing.
+
+        :param snap_name: name of the snap
+        :param upload_id: the upload_id to register with the Snap Store
+        :param snap_file_size: the file size of the uploaded snap
+        :param built_at: the build timestamp for this build
+        :param channels: the channels to release to after being accepted into the Snap Store
+        :param delta_info: the delta format and hashes if a delta was uploaded
+        :returns: the URL to poll for the processing status
+        """
+        data: Dict[str, Any] = {
             "name": snap_name,
             "series": constants.DEFAULT_SERIES,
             "updown_id": upload_id,
@@ -452,6 +499,8 @@ class LegacyStoreClientCLI:
             data["built_at"] = built_at
         if channels is not None:
             data["channels"] = channels
+        if delta_info is not None:
+            data.update(delta_info)
 
         response = self.request(
             "POST",
@@ -462,25 +511,36 @@ class LegacyStoreClientCLI:
             },
         )
 
-        status_url = response.json()["status_details_url"]
-        while True:
-            response = self.request("GET", status_url)
-            status = response.json()
-            human_status = _HUMAN_STATUS.get(status["code"], status["code"])
-            emit.progress(f"Status: {human_status}")
-
-            if status.get("processed", False):
-                if status.get("errors"):
-                    error_messages = [
-                        e["message"] for e in status["errors"] if "message" in e
-                    ]
-                    error_string = "\n".join([f"- {e}" for e in error_messages])
-                    raise errors.SnapcraftError(
-                        f"Issues while processing snap:\n{error_string}"
-                    )
-                break
-
-            time.sleep(_POLL_DELAY)
+        return response.json()["status_details_url"]
+
+    def track_uploads(self, status_urls: Sequence[str]) -> List[Dict[str, Any]]:
+        """Wait until the Snap Store processes uploads.
+
+        The status URLs are polled concurrently.
+
+        :param status_urls: the URLs returned by :meth:`push_upload`
+        :returns: the final status of each upload, in the same order
+        """
+        return StatusPoller(
+            self.request, on_status=lambda _, status: _emit_status(status)
+        ).track_many(status_urls)
+
+    def get_upload_revision(self, status: Dict[str, Any]) -> int:
+        """Obtain the revision created by a processed upload.
+
+        :param status: the final status returned by :meth:`track_uploads`
+        :returns: the snap's processed revision
+        :raises SnapDeltaProcessingError: if the uploaded delta was not applied
+        :raises SnapcraftError: if the upload was rejected
+        """
+        if status["code"] == "processing_upload_delta_error":
+            raise errors.SnapDeltaProcessingError()
+        if status.get("errors"):
+            error_messages = [e["message"] for e in status["errors"] if "message" in e]
+            error_string = "\n".join([f"- {e}" for e in error_messages])
+            raise errors.SnapcraftError(
+                f"Issues while processing snap:\n{error_string}"
+            )
 
         return status["revision"]
 
@@ -517,7 +577,7 @@ class OnPremStoreClientCLI(LegacyStoreClientCLI):
         emit.debug(f"Skipping verification for {snap_name!r}")
 
     @overrides
-    def notify_upload(
+    def push_upload(
         self,
         *,
         snap_name: str,
@@ -525,9 +585,12 @@ class OnPremStoreClientCLI(LegacyStoreClientCLI):
         snap_file_size: int,
         built_at: Optional[str],
         channels: Optional[Sequence[str]],
-    ) -> int:
+        delta_info: Optional[Dict[str, str]] = None,
+    ) -> str:
         if channels:
             raise errors.SnapcraftError("Releasing during currently unsupported")
+        if delta_info:
+            raise errors.SnapcraftError("Uploading deltas currently unsupported")
         emit.debug(
             f"Ignoring snap_file_size of {snap_file_size!r} and "
             f"built_at {built_at!r}"
@@ -543,24 +606,24 @@ class OnPremStoreClientCLI(LegacyStoreClientCLI):
             name=snap_name, revision_request=revision_request
         )
 
-        status_url = self._base_url + revision_response.status_url
-        while True:
-            response = self.request("GET", status_url)
-            # human_status = _HUMAN_STATUS.get(status["code"], status["code"])
-            emit.progress(f"Status checked: {response}")
-
-            (revision,) = response.json()["revisions"]
-            status = revision["status"]
-
-            if status == "approved":
-                return revision["revision"]
-            if status == "rejected":
-                # TODO: grab more that the first error
-                error = revision["errors"][0]
-                raise errors.SnapcraftError(
-                    f"Error uploading snap: {error['code']}", details=error["message"]
-                )
-            time.sleep(_POLL_DELAY)
+        return self._base_url + revision_response.status_url
+
+    @overrides
+    def track_uploads(self, status_urls: Sequence[str]) -> List[Dict[str, Any]]:
+        return StatusPoller(
+            self.request, on_status=lambda _, status: _emit_revision_status(status)
+        ).track_many(status_urls, is_processed=_is_revision_processed)
+
+    @overrides
+    def get_upload_revision(self, status: Dict[str, Any]) -> int:
+        (revision,) = status["revisions"]
+        if revision["status"] == "rejected":
+            # TODO: grab more that the first error
+            error = revision["errors"][0]
+            raise errors.SnapcraftError(
+                f"Error uploading snap: {error['code']}", details=error["message"]
+            )
+        return revision["revision"]
 
     @overrides
     def release(
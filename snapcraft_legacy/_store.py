@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import contextlib
+import io
 import json
 import logging
 import operator
@@ -37,9 +38,11 @@ from snapcraft_legacy import storeapi, yaml_utils
 # Ideally we would move stuff into more logical components
 from snapcraft_legacy.cli import echo
 from snapcraft_legacy.file_utils import get_host_tool_path, get_snap_tool_path
+from snapcraft_legacy.internal import squashfs
 from snapcraft_legacy.internal.errors import (
     SnapcraftEnvironmentError,
     SnapDataExtractionError,
+    SquashfsCompressionNotSupportedError,
 )
 from snapcraft_legacy.storeapi.constants import DEFAULT_SERIES
 from snapcraft_legacy.storeapi.metrics import MetricsFilter, MetricsResults
@@ -52,6 +55,19 @@ logger = logging.getLogger(__name__)
 
 
 def get_data_from_snap_file(snap_path):
+    try:
+        with squashfs.SquashfsImage(snap_path) as snap_image:
+            snap_yaml = snap_image.read_file(Path("meta", "snap.yaml").as_posix())
+    except SquashfsCompressionNotSupportedError as error:
+        logger.debug("%s, using unsquashfs", error)
+        return _extract_data_from_snap_file(snap_path)
+    except FileNotFoundError:
+        raise SnapDataExtractionError(os.path.basename(snap_path))
+
+    return yaml_utils.load(snap_yaml.decode())
+
+
+def _extract_data_from_snap_file(snap_path):
     with tempfile.TemporaryDirectory() as temp_dir:
         unsquashfs_path = get_snap_tool_path("unsquashfs")
         try:
@@ -78,6 +94,32 @@ def get_data_from_snap_file(snap_path):
 
 @contextlib.contextmanager
 def _get_icon_from_snap_file(snap_path):
+    try:
+        with squashfs.SquashfsImage(snap_path) as snap_image:
+            icon_file = _read_icon_from_snap_image(snap_image)
+    except SquashfsCompressionNotSupportedError as error:
+        logger.debug("%s, using unsquashfs", error)
+        with _extract_icon_from_snap_file(snap_path) as icon_file:
+            yield icon_file
+        return
+
+    yield icon_file
+
+
+def _read_icon_from_snap_image(snap_image):
+    for extension in ("png", "svg"):
+        icon_name = "meta/gui/icon.{}".format(extension)
+        try:
+            icon_file = io.BytesIO(snap_image.read_file(icon_name))
+        except (FileNotFoundError, IsADirectoryError):
+            continue
+        icon_file.name = icon_name
+        return icon_file
+    return None
+
+
+@contextlib.contextmanager
+def _extract_icon_from_snap_file(snap_path):
     icon_file = None
     with tempfile.TemporaryDirectory() as temp_dir:
         unsquashfs_path = get_snap_tool_path("unsquashfs")
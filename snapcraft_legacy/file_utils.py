@@ -31,9 +31,17 @@ from snapcraft_legacy.internal import common, errors
 
 logger = logging.getLogger(__name__)
 
+# The ioctl to share the data of a file with another, from linux/fs.h.
+_FICLONE = 0x40049409
+
 
 def replace_in_file(
-    directory: str, file_pattern: Pattern, search_pattern: Pattern, replacement: str
+    directory: str,
+    file_pattern: Pattern,
+    search_pattern: Pattern,
+    replacement: str,
+    *,
+    paths: Optional[List[str]] = None,
 ) -> None:
     """Searches and replaces patterns that match a file pattern.
 
@@ -43,16 +51,25 @@ def replace_in_file(
                            matching files.
     :param str replacement: The string to replace the matching search_pattern
                             with.
+    :param list paths: If set, the paths relative to directory to look at
+                       instead of walking directory.
     """
 
-    for root, directories, files in os.walk(directory):
-        for file_name in files:
-            if file_pattern.match(file_name):
-                file_path = os.path.join(root, file_name)
-                # Don't bother trying to rewrite a symlink. It's either invalid
-                # or the linked file will be rewritten on its own.
-                if not os.path.islink(file_path):
-                    search_and_replace_contents(file_path, search_pattern, replacement)
+    if paths is None:
+        file_paths = (
+            os.path.join(root, file_name)
+            for root, directories, files in os.walk(directory)
+            for file_name in files
+        )
+    else:
+        file_paths = (os.path.join(directory, path) for path in paths)
+
+    for file_path in file_paths:
+        if file_pattern.match(os.path.basename(file_path)):
+            # Don't bother trying to rewrite a symlink. It's either invalid
+            # or the linked file will be rewritten on its own.
+            if not os.path.islink(file_path) and os.path.isfile(file_path):
+                search_and_replace_contents(file_path, search_pattern, replacement)
 
 
 def search_and_replace_contents(
@@ -109,6 +126,42 @@ def link_or_copy(source: str, destination: str, follow_symlinks: bool = False) -
             copy(source, destination, follow_symlinks=follow_symlinks)
 
 
+def clone(source: str, destination: str) -> None:
+    """Copy the contents of source to destination, sharing data if possible.
+
+    A reflink, which shares data until either file is modified, is tried
+    first. Otherwise the contents are copied, by the kernel with
+    os.sendfile where it is supported.
+
+    :param str source: The file to copy.
+    :param str destination: Where to put the copy, replaced if it exists.
+    """
+    with suppress(FileNotFoundError):
+        os.unlink(destination)
+
+    if _reflink(source, destination):
+        return
+
+    shutil.copyfile(source, destination)
+
+
+def _reflink(source: str, destination: str) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+
+    import fcntl
+
+    with open(source, "rb") as source_file, open(destination, "wb") as dest_file:
+        try:
+            fcntl.ioctl(dest_file.fileno(), _FICLONE, source_file.fileno())
+            return True
+        except OSError:
+            pass
+
+    os.unlink(destination)
+    return False
+
+
 def link(source: str, destination: str, *, follow_symlinks: bool = False) -> None:
     """Hard-link source and destination files.
 
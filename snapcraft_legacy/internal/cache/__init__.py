@@ -17,4 +17,6 @@
 from ._apt import AptStagePackageCache  # noqa
 from ._cache import SnapcraftCache  # noqa
 from ._file import FileCache  # noqa
+from ._git import GitMirrorCache  # noqa
+from ._manager import CacheManager, CacheStats  # noqa
 from ._snap import SnapCache  # noqa
@@ -18,6 +18,8 @@ import os
 
 from xdg import BaseDirectory
 
+from ._manager import CacheManager
+
 
 class SnapcraftCache:
     """Generic cache base class.
@@ -27,6 +29,7 @@ class SnapcraftCache:
 
     def __init__(self):
         self.cache_root = os.path.join(BaseDirectory.xdg_cache_home, "snapcraft")
+        self.cache_manager = CacheManager(self.cache_root)
 
 
 class SnapcraftProjectCache(SnapcraftCache):
@@ -13,12 +13,12 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import contextlib
 import logging
 import os
-import shutil
 from typing import Optional
 
-from snapcraft_legacy.file_utils import calculate_hash
+from snapcraft_legacy.file_utils import calculate_hash, clone
 
 from ._cache import SnapcraftCache
 
@@ -35,19 +35,23 @@ class FileCache(SnapcraftCache):
                               (default: "files").
         """
         super().__init__()
+        self.namespace = namespace
         self.file_cache = os.path.join(self.cache_root, namespace)
 
-    def cache(self, *, filename: str, algorithm: str, hash: str) -> Optional[str]:
+    def cache(
+        self, *, filename: str, algorithm: str, hash: str, verify: bool = True
+    ) -> Optional[str]:
         """Cache a file revision with hash in XDG cache, unless it already exists.
         :param str filename: path to the file to cache.
         :param str algorithm: algorithm used to calculate the hash as
                               understood by hashlib.
         :param str hash: hash for filename calculated with algorithm.
+        :param bool verify: verify the hash of filename, only disable when
+                            the hash was verified as filename was written.
         :returns: path to cached file.
         """
         # First we verify
-        calculated_hash = calculate_hash(filename, algorithm=algorithm)
-        if calculated_hash != hash:
+        if verify and calculate_hash(filename, algorithm=algorithm) != hash:
             logger.warning(
                 "Skipping caching of {!r} as the expected "
                 "hash does not match the one "
@@ -56,15 +60,26 @@ class FileCache(SnapcraftCache):
             return None
         cached_file_path = os.path.join(self.file_cache, algorithm, hash)
         os.makedirs(os.path.dirname(cached_file_path), exist_ok=True)
+        if os.path.isfile(cached_file_path):
+            return cached_file_path
+
+        # Write to a temporary file first, so that an interrupted copy is
+        # never found in the cache.
+        temp_file_path = "{}.{}.partial".format(cached_file_path, os.getpid())
         try:
-            if not os.path.isfile(cached_file_path):
-                # this must not be hard-linked, as rebuilding a snap
-                # with changes should invalidate the cache, hence avoids
-                # using fileutils.link_or_copy.
-                shutil.copyfile(filename, cached_file_path)
+            # this must not be hard-linked, as rebuilding a snap
+            # with changes should invalidate the cache, hence avoids
+            # using fileutils.link_or_copy.
+            clone(filename, temp_file_path)
+            os.replace(temp_file_path, cached_file_path)
         except OSError:
             logger.warning("Unable to cache file {}.".format(cached_file_path))
+            with contextlib.suppress(OSError):
+                os.remove(temp_file_path)
             return None
+
+        self.cache_manager.record_access(cached_file_path)
+        self.cache_manager.prune(self.namespace)
         return cached_file_path
 
     def get(self, *, algorithm: str, hash: str):
@@ -78,6 +93,8 @@ class FileCache(SnapcraftCache):
         cached_file_path = os.path.join(self.file_cache, algorithm, hash)
         if os.path.exists(cached_file_path):
             logger.debug("Cache hit for hash {!r}".format(hash))
+            self.cache_manager.record_hit(self.namespace, cached_file_path)
             return cached_file_path
         else:
+            self.cache_manager.record_miss(self.namespace)
             return None
@@ -0,0 +1,59 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import hashlib
+import os
+from typing import Iterator
+
+from ._cache import SnapcraftCache
+
+
+class GitMirrorCache(SnapcraftCache):
+    """Cache of bare mirrors of git repositories, shared by all the builds.
+
+    Mirrors are updated holding an exclusive lock and cloned from holding a
+    shared lock, so a mirror is never updated while it is cloned from.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.git_cache_root = os.path.join(self.cache_root, "git")
+
+    def get_mirror_path(self, url: str) -> str:
+        """Get the path to the mirror of the repository at url."""
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.git_cache_root, key + ".git")
+
+    @contextlib.contextmanager
+    def lock(self, url: str, *, exclusive: bool) -> Iterator[str]:
+        """Lock the mirror of the repository at url.
+
+        :param str url: the url of the repository.
+        :param bool exclusive: lock exclusively, to create or update the
+                               mirror, instead of shared, to clone from it.
+        :returns: the path to the mirror.
+        """
+        import fcntl
+
+        mirror_path = self.get_mirror_path(url)
+        os.makedirs(self.git_cache_root, exist_ok=True)
+        with open(mirror_path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield mirror_path
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,316 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Size limits and least recently used eviction for the snapcraft caches.
+
+Access times and statistics are stored in a SQLite database in the cache
+root, shared by all the builds using the cache. Pruning happens in an
+exclusive transaction, so concurrent builds do not evict the same entries,
+and entries used recently are never evicted, as another build may be
+about to use them.
+"""
+
+import contextlib
+import glob
+import logging
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+_INDEX_FILE = "cache-index.db"
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS accesses (
+        path TEXT PRIMARY KEY,
+        last_access REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats (
+        namespace TEXT PRIMARY KEY,
+        hits INTEGER NOT NULL DEFAULT 0,
+        misses INTEGER NOT NULL DEFAULT 0,
+        evictions INTEGER NOT NULL DEFAULT 0,
+        evicted_bytes INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+)
+
+# The glob pattern matching the entries of each namespace, relative to the
+# cache root. FileCache namespaces not listed here use <namespace>/*/*.
+NAMESPACES = {
+    "files": "files/*/*",
+    "projects": "projects/*/snap_hashes/*/*",
+    "download": "download/*.deb",
+    "soname-index": "soname-index/*.json",
+}
+
+_GiB = 1024 * 1024 * 1024
+_DEFAULT_MAX_SIZES = {
+    "files": 5 * _GiB,
+    "projects": 2 * _GiB,
+    "download": 5 * _GiB,
+    "soname-index": _GiB // 4,
+}
+_DEFAULT_MAX_SIZE = 5 * _GiB
+
+# Entries accessed more recently than this, in seconds, are never evicted.
+MIN_EVICTION_AGE = 15 * 60
+
+_SIZE_PATTERN = re.compile(r"^\s*(\d+)\s*([KMGT]?)i?B?\s*$", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+class CacheStats(NamedTuple):
+    namespace: str
+    entries: int
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+    evicted_bytes: int
+
+
+class CacheManager:
+    """Track the use of cache entries and evict them to respect size limits.
+
+    The maximum size of each namespace can be set with the
+    SNAPCRAFT_CACHE_MAX_SIZE environment variable, either as a size for all
+    namespaces (e.g. "5G") or as a comma separated list of namespace=size
+    pairs (e.g. "files=10G,download=2G").
+
+    :param str cache_root: the root directory of the caches.
+    """
+
+    def __init__(self, cache_root: str) -> None:
+        self.cache_root = cache_root
+        self._index_path = os.path.join(cache_root, _INDEX_FILE)
+
+    def record_hit(self, namespace: str, path: str) -> None:
+        """Record that path was found in the cache."""
+        with self._connect() as connection:
+            _record_access(connection, path)
+            _increment(connection, namespace, "hits")
+
+    def record_miss(self, namespace: str) -> None:
+        """Record that an entry was not found in the cache."""
+        with self._connect() as connection:
+            _increment(connection, namespace, "misses")
+
+    def record_access(self, path: str) -> None:
+        """Record that path was used, e.g. when it was added to the cache."""
+        with self._connect() as connection:
+            _record_access(connection, path)
+
+    def get_max_size(self, namespace: str) -> int:
+        """Get the size the entries of namespace are pruned to, in bytes."""
+        value = os.getenv("SNAPCRAFT_CACHE_MAX_SIZE", "")
+        try:
+            max_sizes = _parse_max_sizes(value)
+        except ValueError:
+            logger.warning(
+                "Ignoring invalid SNAPCRAFT_CACHE_MAX_SIZE {!r}.".format(value)
+            )
+            max_sizes = {}
+
+        if namespace in max_sizes:
+            return max_sizes[namespace]
+        if "" in max_sizes:
+            return max_sizes[""]
+        return _DEFAULT_MAX_SIZES.get(namespace, _DEFAULT_MAX_SIZE)
+
+    def prune(self, namespace: str) -> List[str]:
+        """Evict the least recently used entries exceeding the namespace size.
+
+        :returns: the paths evicted.
+        """
+        max_size = self.get_max_size(namespace)
+        if sum(size for _, size in self._scan(namespace)) <= max_size:
+            return []
+
+        evicted: List[str] = []
+        with self._connect(exclusive=True) as connection:
+            # Scan again once other builds are done pruning.
+            entries = self._get_entries(connection, namespace)
+            total_size = sum(size for _, size, _ in entries)
+            evicted_bytes = 0
+            min_access = time.time() - MIN_EVICTION_AGE
+            for path, size, last_access in sorted(entries, key=lambda e: e[2]):
+                if total_size <= max_size or last_access > min_access:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as error:
+                    logger.warning("Unable to evict {}: {}".format(path, error))
+                    continue
+
+                logger.debug("Evicted {} from the cache.".format(path))
+                connection.execute("DELETE FROM accesses WHERE path = ?", (path,))
+                total_size -= size
+                evicted_bytes += size
+                evicted.append(path)
+
+            if evicted:
+                _increment(connection, namespace, "evictions", len(evicted))
+                _increment(connection, namespace, "evicted_bytes", evicted_bytes)
+
+        return evicted
+
+    def get_stats(self) -> List[CacheStats]:
+        """Get the usage statistics of all the namespaces in the cache."""
+        stats: Dict[str, Tuple[int, int, int, int]] = {}
+        with self._connect() as connection:
+            for namespace, *counters in connection.execute(
+                "SELECT namespace, hits, misses, evictions, evicted_bytes FROM stats"
+            ):
+                stats[namespace] = tuple(counters)  # type: ignore
+
+        namespaces = set(NAMESPACES) | set(stats)
+        result = []
+        for namespace in sorted(namespaces):
+            entries = list(self._scan(namespace))
+            result.append(
+                CacheStats(
+                    namespace,
+                    len(entries),
+                    sum(size for _, size in entries),
+                    self.get_max_size(namespace),
+                    *stats.get(namespace, (0, 0, 0, 0)),
+                )
+            )
+        return result
+
+    def _scan(self, namespace: str) -> Iterator[Tuple[str, int]]:
+        pattern = NAMESPACES.get(namespace, "{}/*/*".format(namespace))
+        for path in glob.iglob(os.path.join(glob.escape(self.cache_root), pattern)):
+            with contextlib.suppress(OSError):
+                if os.path.isfile(path) and not path.endswith(".partial"):
+                    yield path, os.path.getsize(path)
+
+    def _get_entries(
+        self, connection: sqlite3.Connection, namespace: str
+    ) -> List[Tuple[str, int, float]]:
+        """Get the entries of namespace, with their size and last access time.
+
+        Entries never recorded, e.g. added by older versions of snapcraft,
+        are considered last accessed when last modified.
+        """
+        last_accesses = dict(connection.execute("SELECT * FROM accesses"))
+        entries = []
+        for path, size in self._scan(namespace):
+            last_access = last_accesses.get(path)
+            if last_access is None:
+                with contextlib.suppress(OSError):
+                    last_access = os.path.getmtime(path)
+            if last_access is not None:
+                entries.append((path, size, last_access))
+        return entries
+
+    @contextlib.contextmanager
+    def _connect(self, *, exclusive: bool = False) -> Iterator[sqlite3.Connection]:
+        """Connect to the index, errors accessing it are logged and ignored.
+
+        If the index cannot be opened or is corrupt, an in-memory index is
+        used instead, so accesses are not recorded.
+        """
+        connection = self._open(exclusive=exclusive)
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except sqlite3.Error as error:
+            logger.debug("Unable to update the cache index: {}".format(error))
+            with contextlib.suppress(sqlite3.Error):
+                connection.execute("ROLLBACK")
+        finally:
+            connection.close()
+
+    def _open(self, *, exclusive: bool = False) -> sqlite3.Connection:
+        """Open the index and start a transaction on it.
+
+        An in-memory index is returned if the index cannot be used.
+        """
+        try:
+            os.makedirs(self.cache_root, exist_ok=True)
+            connection = sqlite3.connect(
+                self._index_path, timeout=60, isolation_level=None
+            )
+        except (OSError, sqlite3.Error) as error:
+            logger.debug("Unable to open the cache index: {}".format(error))
+        else:
+            try:
+                _begin(connection, exclusive=exclusive)
+                return connection
+            except sqlite3.Error as error:
+                logger.debug("Unable to use the cache index: {}".format(error))
+                connection.close()
+
+        connection = sqlite3.connect(":memory:", isolation_level=None)
+        _begin(connection, exclusive=exclusive)
+        return connection
+
+
+def _begin(connection: sqlite3.Connection, *, exclusive: bool) -> None:
+    """Start a transaction, creating the index tables if needed."""
+    connection.execute("BEGIN EXCLUSIVE" if exclusive else "BEGIN")
+    for statement in _SCHEMA:
+        connection.execute(statement)
+
+
+def _record_access(connection: sqlite3.Connection, path: str) -> None:
+    connection.execute(
+        "INSERT OR REPLACE INTO accesses VALUES (?, ?)",
+        (os.path.abspath(path), time.time()),
+    )
+
+
+def _increment(
+    connection: sqlite3.Connection, namespace: str, counter: str, value: int = 1
+) -> None:
+    connection.execute(
+        "INSERT OR IGNORE INTO stats (namespace) VALUES (?)", (namespace,)
+    )
+    connection.execute(
+        "UPDATE stats SET {0} = {0} + ? WHERE namespace = ?".format(counter),
+        (value, namespace),
+    )
+
+
+def _parse_max_sizes(value: str) -> Dict[str, int]:
+    """Parse SNAPCRAFT_CACHE_MAX_SIZE, the size for all namespaces has key ""."""
+    max_sizes = {}
+    for item in filter(None, (i.strip() for i in value.split(","))):
+        namespace, _, size = item.rpartition("=")
+        max_sizes[namespace.strip()] = parse_size(size)
+    return max_sizes
+
+
+def parse_size(value: str) -> int:
+    """Parse a size in bytes, with an optional K, M, G or T binary suffix.
+
+    :raises ValueError: if value is not a valid size.
+    """
+    match = _SIZE_PATTERN.match(value)
+    if match is None:
+        raise ValueError("invalid size {!r}".format(value))
+    return int(match.group(1)) * _SIZE_UNITS[match.group(2).upper()]
@@ -14,9 +14,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import contextlib
 import logging
 import os
-import shutil
 import subprocess
 import tempfile
 from pathlib import Path
@@ -65,25 +65,36 @@ class SnapCache(SnapcraftProjectCache):
         except KeyError:
             return "all"
 
-    def _get_snap_cache_path(self, snap_filename):
-        snap_hash = file_utils.calculate_sha3_384(snap_filename)
-        arch = self._get_snap_deb_arch(snap_filename)
+    def _get_snap_cache_path(self, snap_filename, deb_arch=None, snap_hash=None):
+        snap_hash = snap_hash or file_utils.calculate_sha3_384(snap_filename)
+        arch = deb_arch or self._get_snap_deb_arch(snap_filename)
         os.makedirs(os.path.join(self.snap_cache_root, arch), exist_ok=True)
         return os.path.join(self.snap_cache_root, arch, snap_hash)
 
-    def cache(self, *, snap_filename):
+    def cache(self, *, snap_filename, deb_arch=None, snap_hash=None):
         """Cache snap revision by sha3-384 hash in XDG cache, unless it already exists.
+
+        The snap is reflinked into the cache where the file system supports
+        it, otherwise it is copied and uses as much disk space as the snap.
+
+        :param str snap_filename: path to the snap to cache.
+        :param str deb_arch: arch of the snap, read from the snap if not set.
+        :param str snap_hash: sha3-384 of the snap, only set it when the
+                              snap was verified as it was written.
         :returns: path to cached revision.
         """
-        cached_snap_path = self._get_snap_cache_path(snap_filename)
+        cached_snap_path = self._get_snap_cache_path(snap_filename, deb_arch, snap_hash)
         try:
             if not os.path.isfile(cached_snap_path):
                 # this must not be hard-linked, as rebuilding a snap
                 # with changes should invalidate the cache, hence avoids
                 # using fileutils.link_or_copy.
-                shutil.copyfile(snap_filename, cached_snap_path)
+                file_utils.clone(snap_filename, cached_snap_path)
         except OSError:
             logger.warning("Unable to cache snap {}.".format(snap_filename))
+        else:
+            self.cache_manager.record_access(cached_snap_path)
+            self.cache_manager.prune("projects")
         return cached_snap_path
 
     def get(self, *, deb_arch, snap_hash=None):
@@ -92,8 +103,32 @@ class SnapCache(SnapcraftProjectCache):
         :deb_arch: arch as string.
         :snap_hash: get by sha3 384 hash.
 
+        A revision requested by hash is verified, and removed from the
+        cache if it does not match.
+
         :returns: full path to cached snap.
         """
+        cached_snap_path = self._find(deb_arch=deb_arch, snap_hash=snap_hash)
+        if (
+            cached_snap_path
+            and snap_hash
+            and file_utils.calculate_sha3_384(cached_snap_path) != snap_hash
+        ):
+            logger.warning(
+                "Removing cached snap {} as its hash does not match.".format(
+                    cached_snap_path
+                )
+            )
+            with contextlib.suppress(OSError):
+                os.remove(cached_snap_path)
+            cached_snap_path = None
+        if cached_snap_path:
+            self.cache_manager.record_hit("projects", cached_snap_path)
+        else:
+            self.cache_manager.record_miss("projects")
+        return cached_snap_path
+
+    def _find(self, *, deb_arch, snap_hash):
         snap_cache_dir = os.path.join(self.snap_cache_root, deb_arch)
         if not os.path.isdir(snap_cache_dir):
             return None
@@ -23,7 +23,7 @@ import re
 import shutil
 import subprocess
 import tempfile
-from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple, Union
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple, Union
 
 import elftools.common.exceptions
 import elftools.elf.elffile
@@ -32,6 +32,7 @@ from pkg_resources import parse_version
 
 from snapcraft_legacy import file_utils
 from snapcraft_legacy.internal import common, errors, repo
+from snapcraft_legacy.internal.elf_cache import ElfCache
 from snapcraft_legacy.project._project_options import ProjectOptions
 
 logger = logging.getLogger(__name__)
@@ -363,6 +364,52 @@ class ElfFile:
             logger.debug(f"Extracting ELF attributes exception: {str(exception)}")
             raise errors.CorruptedElfFileError(path, exception)
 
+    @classmethod
+    def unmarshal(cls, *, path: str, data: Dict[str, Any]) -> "ElfFile":
+        """Create an ElfFile from previously extracted attributes.
+
+        :param str path: path to an elf_file within a snapcraft project.
+        :param data: the ELF file attributes, as returned by marshal().
+        :raises KeyError: if an attribute is missing.
+        """
+        elf_file = cls.__new__(cls)
+        elf_file.path = path
+        elf_file.dependencies = set()
+
+        elf_file.arch = tuple(data["arch_tuple"])  # type: ignore
+        elf_file.interp = data["interp"]
+        elf_file.soname = data["soname"]
+        elf_file.versions = set(data["versions"])
+        elf_file.needed = dict()
+        for name, versions in data["needed"].items():
+            library = NeededLibrary(name=name)
+            library.versions = set(versions)
+            elf_file.needed[name] = library
+        elf_file.execstack_set = data["execstack_set"]
+        elf_file.is_dynamic = data["is_dynamic"]
+        elf_file.build_id = data["build_id"]
+        elf_file.has_debug_info = data["has_debug_info"]
+        elf_file.elf_type = data["elf_type"]
+
+        return elf_file
+
+    def marshal(self) -> Dict[str, Any]:
+        """Return the extracted ELF file attributes as a dictionary."""
+        return {
+            "arch_tuple": self.arch,
+            "interp": self.interp,
+            "soname": self.soname,
+            "versions": sorted(self.versions),
+            "needed": {
+                name: sorted(library.versions) for name, library in self.needed.items()
+            },
+            "execstack_set": self.execstack_set,
+            "is_dynamic": self.is_dynamic,
+            "build_id": self.build_id,
+            "has_debug_info": self.has_debug_info,
+            "elf_type": self.elf_type,
+        }
+
     def _extract_attributes(self) -> None:  # noqa: C901
         with open(self.path, "rb") as fp:
             elf = elftools.elf.elffile.ELFFile(fp)
@@ -703,11 +750,14 @@ def _extract_ld_library_paths(ld_conf_file: str) -> List[str]:
 _libraries = None
 
 
-def get_elf_files(root: str, file_list: Sequence[str]) -> FrozenSet[ElfFile]:
+def get_elf_files(
+    root: str, file_list: Sequence[str], *, elf_cache: Optional[ElfCache] = None
+) -> FrozenSet[ElfFile]:
     """Return a frozenset of elf files from file_list prepended with root.
 
     :param str root: the root directory from where the file_list is generated.
     :param file_list: a list of file in root.
+    :param elf_cache: a persistent cache of previously parsed ELF files.
     :returns: a frozentset of ElfFile objects.
     """
     elf_files = set()  # type: Set[ElfFile]
@@ -723,27 +773,43 @@ def get_elf_files(root: str, file_list: Sequence[str]) -> FrozenSet[ElfFile]:
             logger.debug("Skipped link {!r} while finding dependencies".format(path))
             continue
 
-        # Ignore if file does not have ELF header.
-        if not ElfFile.is_elf(path):
-            continue
-
-        try:
-            elf_file = ElfFile(path=path)
-        except elftools.common.exceptions.ELFError:
-            # Ignore invalid ELF files.
-            continue
-        except errors.CorruptedElfFileError as exception:
-            # Log if the ELF file seems corrupted
-            logger.warning(exception.get_brief())
-            continue
+        elf_file = _load_elf_file(path, elf_cache)
 
         # If ELF has dynamic symbols, add it.
-        if elf_file.needed:
+        if elf_file is not None and elf_file.needed:
             elf_files.add(elf_file)
 
     return frozenset(elf_files)
 
 
+def _load_elf_file(path: str, elf_cache: Optional[ElfCache]) -> Optional[ElfFile]:
+    """Return the ELF file in path, or None if it is not a valid ELF file."""
+    if elf_cache is not None:
+        data = elf_cache.get(path)
+        if data is not None:
+            with contextlib.suppress(KeyError, TypeError, ValueError):
+                return ElfFile.unmarshal(path=path, data=data)
+
+    # Ignore if file does not have ELF header.
+    if not ElfFile.is_elf(path):
+        return None
+
+    try:
+        elf_file = ElfFile(path=path)
+    except elftools.common.exceptions.ELFError:
+        # Ignore invalid ELF files.
+        return None
+    except errors.CorruptedElfFileError as exception:
+        # Log if the ELF file seems corrupted
+        logger.warning(exception.get_brief())
+        return None
+
+    if elf_cache is not None:
+        elf_cache.set(path, elf_file.marshal())
+
+    return elf_file
+
+
 def _get_dynamic_linker(library_list: List[str]) -> str:
     """Return the dynamic linker from library_list."""
     regex = re.compile(r"(?P<dynamic_linker>ld-[\d.]+.so)$")
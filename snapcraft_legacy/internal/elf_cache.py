@@ -0,0 +1,147 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2023 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# The elf_files table is shared with snapcraft.elf.ElfCache, both must be
+# kept compatible.
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS elf_files (
+        path TEXT PRIMARY KEY,
+        st_ino INTEGER NOT NULL,
+        st_mtime_ns INTEGER NOT NULL,
+        st_size INTEGER NOT NULL,
+        data TEXT NOT NULL
+    )
+"""
+
+_StatKey = Tuple[int, int, int]
+
+
+class ElfCache:
+    """A persistent cache of ELF file attributes.
+
+    Entries are keyed by the file path, inode number, modification time
+    and size, files modified after being cached are not found in the cache.
+    Errors accessing the cache database are logged and the files are parsed
+    again. New entries are written to disk when leaving the context.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        """Create a new ElfCache.
+
+        :param pathlib.Path path: the path to the cache database file.
+        """
+        self._path = path
+        self._entries = None  # type: Optional[Dict[str, Tuple[_StatKey, str]]]
+        self._updated = dict()  # type: Dict[str, Tuple[_StatKey, str]]
+
+    def __enter__(self) -> "ElfCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.save()
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """Return the cached attributes of the ELF file in path, if unmodified.
+
+        :param str path: the path to the ELF file.
+        """
+        key = _get_stat_key(path)
+        if key is None:
+            return None
+
+        entry = self._load().get(os.path.abspath(path))
+        if entry is None or entry[0] != key:
+            return None
+
+        with contextlib.suppress(ValueError):
+            return json.loads(entry[1])
+
+        return None
+
+    def set(self, path: str, data: Dict[str, Any]) -> None:
+        """Add the attributes of the ELF file in path to the cache.
+
+        :param str path: the path to the ELF file.
+        :param data: the ELF file attributes, must be serializable to JSON.
+        """
+        key = _get_stat_key(path)
+        if key is None:
+            return
+
+        entry = (key, json.dumps(data, sort_keys=True))
+        abs_path = os.path.abspath(path)
+        self._load()[abs_path] = entry
+        self._updated[abs_path] = entry
+
+    def save(self) -> None:
+        """Write new cache entries to disk."""
+        if not self._updated:
+            return
+
+        rows = [
+            (path, *key, data) for path, (key, data) in sorted(self._updated.items())
+        ]
+        self._updated = dict()
+
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with contextlib.closing(sqlite3.connect(str(self._path))) as connection:
+                with connection:
+                    connection.execute(_SCHEMA)
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO elf_files VALUES (?, ?, ?, ?, ?)", rows
+                    )
+        except (OSError, sqlite3.Error) as error:
+            logger.debug("Cannot write ELF cache {!r}: {}".format(self._path, error))
+
+    def _load(self) -> Dict[str, Tuple[_StatKey, str]]:
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = dict()
+        if not self._path.is_file():
+            return self._entries
+
+        try:
+            with contextlib.closing(sqlite3.connect(str(self._path))) as connection:
+                connection.execute(_SCHEMA)
+                for path, st_ino, st_mtime_ns, st_size, data in connection.execute(
+                    "SELECT path, st_ino, st_mtime_ns, st_size, data FROM elf_files"
+                ):
+                    self._entries[path] = ((st_ino, st_mtime_ns, st_size), data)
+        except sqlite3.Error as error:
+            logger.debug("Cannot read ELF cache {!r}: {}".format(self._path, error))
+
+        return self._entries
+
+
+def _get_stat_key(path: str) -> Optional[_StatKey]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
@@ -730,6 +730,13 @@ class SnapDataExtractionError(SnapcraftError):
         super().__init__(snap=snap)
 
 
+class SquashfsCompressionNotSupportedError(SnapcraftError):
+    fmt = "Cannot read squashfs image with {compression!r} compression."
+
+    def __init__(self, *, compression):
+        super().__init__(compression=compression)
+
+
 class ProjectNotFoundError(SnapcraftReportableError):
     fmt = "Failed to find project files."
 
@@ -15,7 +15,11 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from typing import List, Optional, Sequence, Set
+import os
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Set
 
 from snapcraft_legacy import config, plugins, storeapi
 from snapcraft_legacy.internal import (
@@ -24,6 +28,7 @@ from snapcraft_legacy.internal import (
     pluginhandler,
     project_loader,
     repo,
+    sources,
     states,
     steps,
 )
@@ -36,6 +41,26 @@ from ._status_cache import StatusCache
 
 logger = logging.getLogger(__name__)
 
+# Steps that only write to the directories of the part, which can run for
+# parts that do not depend on each other concurrently.
+_PARALLEL_STEPS = (steps.PULL, steps.BUILD)
+
+
+def _get_max_parallel_parts() -> int:
+    """Get the number of parts pulled and built concurrently."""
+    value = os.getenv("SNAPCRAFT_MAX_PARALLEL_PARTS", "1")
+    try:
+        max_parallel_parts = int(value)
+    except ValueError:
+        max_parallel_parts = 0
+
+    if max_parallel_parts < 1:
+        logger.warning(
+            "Ignoring invalid SNAPCRAFT_MAX_PARALLEL_PARTS {!r}.".format(value)
+        )
+        return 1
+    return max_parallel_parts
+
 
 def _get_required_grade(*, base: Optional[str], arch: str) -> str:
     # Some types of snap do not require a base.
@@ -177,6 +202,9 @@ class _Executor:
         self.steps_were_run = False
 
         self._cache = StatusCache(project_config)
+        self._max_parallel_parts = _get_max_parallel_parts()
+        self._running_parallel = False
+        self._lock = threading.Lock()
 
     def run(self, step: steps.Step, part_names=None):
         if part_names:
@@ -189,8 +217,20 @@ class _Executor:
             parts = self.config.all_parts
             processed_part_names = self.config.part_names
 
-        with config.CLIConfig() as cli_config:
-            for current_step in step.previous_steps() + [step]:
+        # Sources prefetched without a source-checksum are not cached, they
+        # are kept for the run.
+        with config.CLIConfig() as cli_config, tempfile.TemporaryDirectory(
+            prefix="snapcraft-prefetch-"
+        ) as prefetch_dir:
+            run_steps = step.previous_steps() + [step]
+            if steps.PULL in run_steps:
+                self._prefetch_sources(parts, download_dir=prefetch_dir)
+            if self._can_run_parallel(parts):
+                parallel_steps = [s for s in run_steps if s in _PARALLEL_STEPS]
+                self._run_parallel(part_names, parts, step, parallel_steps, cli_config)
+                run_steps = [s for s in run_steps if s not in _PARALLEL_STEPS]
+
+            for current_step in run_steps:
                 if current_step == steps.STAGE:
                     # XXX check only for collisions on the parts that have
                     # already been built --elopio - 20170713
@@ -200,6 +240,129 @@ class _Executor:
 
         self._create_meta(step, processed_part_names)
 
+    def _prefetch_sources(
+        self, parts: Sequence[pluginhandler.PluginHandler], *, download_dir: str
+    ) -> None:
+        """Download the sources of the parts to pull, and of the parts they
+        depend on, concurrently before pulling them part by part.
+        """
+        parts_to_pull = set(parts)
+        for part in parts:
+            parts_to_pull |= self.parts_config.get_dependencies(
+                part.name, recursive=True
+            )
+
+        sources.prefetch(
+            [
+                p.source_handler
+                for p in self.config.all_parts
+                if p in parts_to_pull
+                and p.source_handler is not None
+                and self._cache.should_step_run(p, steps.PULL)
+            ],
+            download_dir=download_dir,
+        )
+
+    def _can_run_parallel(self, parts: Sequence[pluginhandler.PluginHandler]) -> bool:
+        # Plugins V1 set up the environment of the part globally.
+        return (
+            self._max_parallel_parts > 1
+            and len(parts) > 1
+            and not self._running_parallel
+            and not any(
+                isinstance(p.plugin, plugins.v1.PluginV1) for p in self.config.all_parts
+            )
+        )
+
+    def _run_parallel(
+        self,
+        requested_part_names: Sequence[str],
+        parts: Sequence[pluginhandler.PluginHandler],
+        requested_step: steps.Step,
+        run_steps: Sequence[steps.Step],
+        cli_config,
+    ) -> None:
+        """Run run_steps for parts, running parts concurrently once the
+        parts they depend on are done.
+
+        The dependencies of parts are staged from this thread, as needed,
+        before running them, once no other part is running. The output of the
+        commands run for each part is prefixed with the part name.
+        """
+        part_names = {p.name for p in parts}
+        pending = list(parts)
+        done: Set[str] = set()
+        running: Dict[Future, pluginhandler.PluginHandler] = dict()
+
+        self._running_parallel = True
+        try:
+            with ThreadPoolExecutor(max_workers=self._max_parallel_parts) as executor:
+                while pending or running:
+                    for part in self._get_ready_parts(pending, part_names, done):
+                        if len(running) >= self._max_parallel_parts:
+                            break
+                        # Staging checks the install directories of all the
+                        # parts for collisions, wait for the parts running to
+                        # finish building before staging anything.
+                        if running and any(
+                            self._get_dependencies_to_run(step=run_step, part=part)
+                            for run_step in run_steps
+                        ):
+                            break
+                        pending.remove(part)
+                        for current_step in run_steps:
+                            self._handle_part_dependencies(step=current_step, part=part)
+                        future = executor.submit(
+                            self._run_part_steps,
+                            requested_part_names,
+                            part,
+                            requested_step,
+                            run_steps,
+                            cli_config,
+                        )
+                        running[future] = part
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        done.add(running.pop(future).name)
+                        # Stop scheduling parts on errors, the parts running
+                        # are waited for.
+                        future.result()
+        finally:
+            self._running_parallel = False
+
+    def _get_ready_parts(
+        self,
+        pending: Sequence[pluginhandler.PluginHandler],
+        part_names: Set[str],
+        done: Set[str],
+    ) -> List[pluginhandler.PluginHandler]:
+        ready = []
+        for part in pending:
+            dependency_names = {
+                p.name for p in self.parts_config.get_dependencies(part.name)
+            }
+            if (dependency_names & part_names) <= done:
+                ready.append(part)
+        return ready
+
+    def _run_part_steps(
+        self,
+        requested_part_names: Sequence[str],
+        part: pluginhandler.PluginHandler,
+        requested_step: steps.Step,
+        run_steps: Sequence[steps.Step],
+        cli_config,
+    ) -> None:
+        part.output_prefix = "{} | ".format(part.name)
+        try:
+            for current_step in run_steps:
+                self._handle_step(
+                    requested_part_names, part, requested_step, current_step, cli_config
+                )
+        finally:
+            part.output_prefix = None
+
     def _handle_step(
         self,
         requested_part_names: Sequence[str],
@@ -293,15 +456,7 @@ class _Executor:
     def _handle_part_dependencies(
         self, *, step: steps.Step, part: pluginhandler.PluginHandler
     ) -> None:
-        # core20 uses Plugins V2 which does not require staging parts for pull
-        # like V1 Plugins do.
         if (
-            part._build_attributes.core22_step_dependencies()
-            and self.project._get_build_base() == "core20"
-            and step == steps.PULL
-        ):
-            return
-        elif (
             part._build_attributes.core22_step_dependencies()
             and self.project._get_build_base() != "core20"
         ):
@@ -309,20 +464,11 @@ class _Executor:
                 f"Ignoring core22 lifecycle request for {part.name!r} as it is only supported for core20."
             )
 
-        all_dependencies = self.parts_config.get_dependencies(part.name)
-
-        # Filter dependencies down to only those that need to run the
-        # prerequisite step
-        prerequisite_step = steps.get_dependency_prerequisite_step(step)
-
-        dependencies = {
-            p
-            for p in all_dependencies
-            if self._cache.should_step_run(p, prerequisite_step)
-        }
+        dependencies = self._get_dependencies_to_run(step=step, part=part)
 
         if dependencies:
             dependency_names = {p.name for p in dependencies}
+            prerequisite_step = steps.get_dependency_prerequisite_step(step)
             # Dependencies need to go all the way to the prerequisite step to
             # be able to share the common assets that make them a dependency
             logger.info(
@@ -332,6 +478,28 @@ class _Executor:
             )
             self.run(prerequisite_step, dependency_names)
 
+    def _get_dependencies_to_run(
+        self, *, step: steps.Step, part: pluginhandler.PluginHandler
+    ) -> Set[pluginhandler.PluginHandler]:
+        """Get the dependencies of part not yet run to the step required by step."""
+        all_dependencies = self.parts_config.get_dependencies(part.name)
+
+        # core20 uses Plugins V2 which does not require staging parts for pull
+        # like V1 Plugins do.
+        if not all_dependencies or (
+            part._build_attributes.core22_step_dependencies()
+            and self.project._get_build_base() == "core20"
+            and step == steps.PULL
+        ):
+            return set()
+
+        prerequisite_step = steps.get_dependency_prerequisite_step(step)
+        return {
+            p
+            for p in all_dependencies
+            if self._cache.should_step_run(p, prerequisite_step)
+        }
+
     def _prepare_step(self, *, step: steps.Step, part: pluginhandler.PluginHandler):
         common.reset_env()
 
@@ -360,9 +528,11 @@ class _Executor:
         self._complete_step(part, step)
 
     def _complete_step(self, part, step):
-        self._cache.clear_step(part, step)
-        self._cache.add_step_run(part, step)
-        self.steps_were_run = True
+        # Parts run concurrently complete their steps from worker threads.
+        with self._lock:
+            self._cache.clear_step(part, step)
+            self._cache.add_step_run(part, step)
+            self.steps_were_run = True
 
     def _rerun_step(self, *, step: steps.Step, part, progress, hint=""):
         staged_state = self.config.get_project_state(steps.STAGE)
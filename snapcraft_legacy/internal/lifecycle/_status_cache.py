@@ -16,6 +16,7 @@
 
 import collections
 import contextlib
+import threading
 from typing import Any, Dict, List, Optional, Set
 
 import snapcraft_legacy.internal.project_loader._config as _config
@@ -26,7 +27,10 @@ _OutdatedReport = Dict[str, Dict[steps.Step, Optional[pluginhandler.OutdatedRepo
 
 
 class StatusCache:
-    """The StatusCache is a lazy caching interface for the status of parts."""
+    """The StatusCache is a lazy caching interface for the status of parts.
+
+    It is safe to use from the threads running parts concurrently.
+    """
 
     def __init__(self, config: _config.Config) -> None:
         """Create a new StatusCache.
@@ -37,6 +41,8 @@ class StatusCache:
         self._steps_run: Dict[str, Set[steps.Step]] = dict()
         self._outdated_reports: _OutdatedReport = collections.defaultdict(dict)
         self._dirty_reports: _DirtyReport = collections.defaultdict(dict)
+        # Reentrant, as reports for a step query the status of its dependencies.
+        self._lock = threading.RLock()
 
     def should_step_run(
         self, part: pluginhandler.PluginHandler, step: steps.Step
@@ -55,18 +61,19 @@ class StatusCache:
             4. Either (1), (2), or (3) apply to any earlier steps in the part's
                lifecycle
         """
-        if (
-            not self.has_step_run(part, step)
-            or self.get_outdated_report(part, step) is not None
-            or self.get_dirty_report(part, step) is not None
-        ):
-            return True
+        with self._lock:
+            if (
+                not self.has_step_run(part, step)
+                or self.get_outdated_report(part, step) is not None
+                or self.get_dirty_report(part, step) is not None
+            ):
+                return True
 
-        previous_step = step.previous_step()
-        if previous_step:
-            return self.should_step_run(part, previous_step)
+            previous_step = step.previous_step()
+            if previous_step:
+                return self.should_step_run(part, previous_step)
 
-        return False
+            return False
 
     def add_step_run(self, part: pluginhandler.PluginHandler, step: steps.Step) -> None:
         """Cache the fact that a given step has now run for the given part.
@@ -74,8 +81,9 @@ class StatusCache:
         :param pluginhandler.PluginHandler part: Part in question.
         :param steps.Step step: Step in question.
         """
-        self._ensure_steps_run(part)
-        self._steps_run[part.name].add(step)
+        with self._lock:
+            self._ensure_steps_run(part)
+            self._steps_run[part.name].add(step)
 
     def has_step_run(self, part: pluginhandler.PluginHandler, step: steps.Step) -> bool:
         """Determine if a given step of a given part has already run.
@@ -85,8 +93,9 @@ class StatusCache:
         :return: Whether or not the step has run.
         :rtype: bool
         """
-        self._ensure_steps_run(part)
-        return step in self._steps_run[part.name]
+        with self._lock:
+            self._ensure_steps_run(part)
+            return step in self._steps_run[part.name]
 
     def get_outdated_report(self, part, step):
         """Obtain the outdated report for a given step of the given part.
@@ -96,8 +105,9 @@ class StatusCache:
         :return: Outdated report (could be None)
         :rtype: pluginhandler.OutdatedReport
         """
-        self._ensure_outdated_report(part, step)
-        return self._outdated_reports[part.name][step]
+        with self._lock:
+            self._ensure_outdated_report(part, step)
+            return self._outdated_reports[part.name][step]
 
     def get_dirty_report(
         self, part: pluginhandler.PluginHandler, step: steps.Step
@@ -109,8 +119,9 @@ class StatusCache:
         :return: Dirty report (could be None)
         :rtype: pluginhandler.DirtyReport
         """
-        self._ensure_dirty_report(part, step)
-        return self._dirty_reports[part.name][step]
+        with self._lock:
+            self._ensure_dirty_report(part, step)
+            return self._dirty_reports[part.name][step]
 
     def clear_step(self, part: pluginhandler.PluginHandler, step: steps.Step) -> None:
         """Clear the given step of the given part from the cache.
@@ -120,16 +131,17 @@ class StatusCache:
 
         This function does nothing if the step wasn't cached.
         """
-        if part.name in self._steps_run:
-            _remove_key(self._steps_run[part.name], step)
-            if not self._steps_run[part.name]:
-                _del_key(self._steps_run, part.name)
-        _del_key(self._outdated_reports[part.name], step)
-        if not self._outdated_reports[part.name]:
-            _del_key(self._outdated_reports, part.name)
-        _del_key(self._dirty_reports[part.name], step)
-        if not self._dirty_reports[part.name]:
-            _del_key(self._dirty_reports, part.name)
+        with self._lock:
+            if part.name in self._steps_run:
+                _remove_key(self._steps_run[part.name], step)
+                if not self._steps_run[part.name]:
+                    _del_key(self._steps_run, part.name)
+            _del_key(self._outdated_reports[part.name], step)
+            if not self._outdated_reports[part.name]:
+                _del_key(self._outdated_reports, part.name)
+            _del_key(self._dirty_reports[part.name], step)
+            if not self._dirty_reports[part.name]:
+                _del_key(self._dirty_reports, part.name)
 
     def _ensure_steps_run(self, part: pluginhandler.PluginHandler) -> None:
         if part.name not in self._steps_run:
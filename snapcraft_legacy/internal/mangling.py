@@ -24,10 +24,12 @@ from snapcraft_legacy.internal import elf
 logger = logging.getLogger(__name__)
 
 
-def rewrite_python_shebangs(root_dir):
+def rewrite_python_shebangs(root_dir, *, paths=None):
     """Recursively change #!/usr/bin/pythonX shebangs to #!/usr/bin/env pythonX
 
     :param str root_dir: Directory that will be crawled for shebangs.
+    :param list paths: If set, the paths relative to root_dir to rewrite
+                       instead of crawling root_dir.
     """
 
     file_pattern = re.compile(r"")
@@ -37,7 +39,11 @@ def rewrite_python_shebangs(root_dir):
     )
 
     file_utils.replace_in_file(
-        root_dir, file_pattern, argless_shebang_pattern, r"#!/usr/bin/env \1"
+        root_dir,
+        file_pattern,
+        argless_shebang_pattern,
+        r"#!/usr/bin/env \1",
+        paths=paths,
     )
 
     # The above rewrite will barf if the shebang includes any args to python.
@@ -54,6 +60,7 @@ def rewrite_python_shebangs(root_dir):
         file_pattern,
         shebang_pattern_with_args,
         r"""#!/bin/sh\n''''exec \1 \2 -- "$0" "$@" # '''""",
+        paths=paths,
     )
 
 
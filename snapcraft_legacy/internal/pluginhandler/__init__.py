@@ -17,7 +17,6 @@
 import collections
 import contextlib
 import copy
-import filecmp
 import io
 import logging
 import os
@@ -25,6 +24,7 @@ import pathlib
 import shutil
 import subprocess
 import sys
+import threading
 from glob import iglob
 from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, cast
 
@@ -33,6 +33,7 @@ from snapcraft_legacy import file_utils, plugins, yaml_utils
 from snapcraft_legacy.internal import (
     common,
     elf,
+    elf_cache,
     errors,
     repo,
     sources,
@@ -43,6 +44,7 @@ from snapcraft_legacy.internal import (
 from snapcraft_legacy.internal.mangling import clear_execstack
 
 from ._build_attributes import BuildAttributes
+from ._collisions import check_for_collisions  # noqa: F401
 from ._dependencies import MissingDependencyResolver
 from ._dirty_report import Dependency, DirtyReport  # noqa
 from ._metadata_extraction import extract_metadata
@@ -50,13 +52,17 @@ from ._outdated_report import OutdatedReport
 from ._part_environment import get_snapcraft_part_environment
 from ._patchelf import PartPatcher
 from ._plugin_loader import load_plugin  # noqa: F401
-from ._runner import Runner
+from ._runner import Runner, run_prefixed
 
 if TYPE_CHECKING:
     from snapcraft_legacy.project import Project
 
 logger = logging.getLogger(__name__)
 
+# The apt cache stage packages are fetched with is shared by all the parts,
+# which may be pulled concurrently.
+_stage_packages_lock = threading.Lock()
+
 
 class PluginHandler:
     @property
@@ -175,6 +181,18 @@ class PluginHandler:
 
         self._current_step: Optional[steps.Step] = None
 
+    @property
+    def output_prefix(self) -> Optional[str]:
+        """The prefix of the lines output by the commands run for this part.
+
+        Set to tell apart the output of parts running concurrently.
+        """
+        return self._runner.output_prefix
+
+    @output_prefix.setter
+    def output_prefix(self, output_prefix: Optional[str]) -> None:
+        self._runner.output_prefix = output_prefix
+
     def get_pull_state(self) -> states.PullState:
         if not self._pull_state:
             self._pull_state = cast(states.PullState, self.get_state(steps.PULL))
@@ -465,12 +483,14 @@ class PluginHandler:
         stage_packages = self._grammar_processor.get_stage_packages()
         if stage_packages:
             try:
-                self.stage_packages = self._stage_packages_repo.fetch_stage_packages(
-                    package_names=stage_packages,
-                    base=self._project._get_build_base(),
-                    stage_packages_path=self.stage_packages_path,
-                    target_arch=self._project._get_stage_packages_target_arch(),
-                )
+                with _stage_packages_lock:
+                    fetched = self._stage_packages_repo.fetch_stage_packages(
+                        package_names=stage_packages,
+                        base=self._project._get_build_base(),
+                        stage_packages_path=self.stage_packages_path,
+                        target_arch=self._project._get_stage_packages_target_arch(),
+                    )
+                self.stage_packages = fetched
             except repo.errors.PackageNotFoundError as e:
                 raise errors.StagePackageDownloadError(self.name, e.message)
 
@@ -691,9 +711,16 @@ class PluginHandler:
         build_script_path.chmod(0o755)
 
         try:
-            subprocess.run(
-                [build_script_path], check=True, cwd=self.part_build_work_dir
-            )
+            if self.output_prefix is None:
+                subprocess.run(
+                    [build_script_path], check=True, cwd=self.part_build_work_dir
+                )
+            else:
+                run_prefixed(
+                    [str(build_script_path)],
+                    prefix=self.output_prefix,
+                    cwd=self.part_build_work_dir,
+                )
         except subprocess.CalledProcessError as process_error:
             raise errors.SnapcraftPluginBuildError(
                 part_name=self.name
@@ -947,7 +974,11 @@ class PluginHandler:
         )
 
     def _handle_elf(self, snap_files: Sequence[str]) -> Set[str]:
-        elf_files = elf.get_elf_files(self._project.prime_dir, snap_files)
+        elf_cache_path = pathlib.Path(self._project.parts_dir, ".elf-cache.db")
+        with elf_cache.ElfCache(elf_cache_path) as cache:
+            elf_files = elf.get_elf_files(
+                self._project.prime_dir, snap_files, elf_cache=cache
+            )
         all_dependencies: Set[str] = set()
         if self._project._snap_meta.base is not None:
             core_path = common.get_installed_snap_path(self._project._snap_meta.base)
@@ -1452,92 +1483,6 @@ def _validate_relative_paths(files):
             raise errors.PluginError('path "{}" must be relative'.format(d))
 
 
-def _file_collides(file_this, file_other):
-    if not file_this.endswith(".pc"):
-        return not filecmp.cmp(file_this, file_other, shallow=False)
-
-    pc_file_1 = open(file_this)
-    pc_file_2 = open(file_other)
-
-    try:
-        for lines in zip(pc_file_1, pc_file_2):
-            for line in zip(lines[0].split("\n"), lines[1].split("\n")):
-                if line[0].startswith("prefix="):
-                    continue
-                if line[0] != line[1]:
-                    return True
-    except Exception as e:
-        raise e from e
-    finally:
-        pc_file_1.close()
-        pc_file_2.close()
-    return False
-
-
-def check_for_collisions(parts):
-    """Raises a SnapcraftPartConflictError if conflicts are found."""
-    parts_files = {}
-    for part in parts:
-        # Gather our own files up
-        part_files, part_directories = part.migratable_fileset_for(steps.STAGE)
-        part_contents = part_files | part_directories
-
-        # Scan previous parts for collisions
-        for other_part_name in parts_files:
-            common = part_contents & parts_files[other_part_name]["files"]
-            conflict_files = []
-            for f in common:
-                this = os.path.join(part.part_install_dir, f)
-                other = os.path.join(parts_files[other_part_name]["installdir"], f)
-
-                if _paths_collide(this, other):
-                    conflict_files.append(f)
-
-            if conflict_files:
-                raise errors.SnapcraftPartConflictError(
-                    other_part_name=other_part_name,
-                    part_name=part.name,
-                    conflict_files=conflict_files,
-                )
-
-        # And add our files to the list
-        parts_files[part.name] = {
-            "files": part_contents,
-            "installdir": part.part_install_dir,
-        }
-
-
-def _paths_collide(path1: str, path2: str) -> bool:
-    if not (os.path.lexists(path1) and os.path.lexists(path2)):
-        return False
-
-    path1_is_dir = os.path.isdir(path1)
-    path2_is_dir = os.path.isdir(path2)
-    path1_is_link = os.path.islink(path1)
-    path2_is_link = os.path.islink(path2)
-
-    # Paths collide if they're both symlinks, but pointing to different places
-    if path1_is_link and path2_is_link:
-        return os.readlink(path1) != os.readlink(path2)
-
-    # Paths collide if one is a symlink, but not the other
-    elif path1_is_link or path2_is_link:
-        return True
-
-    # Paths collide if one is a directory, but not the other
-    elif path1_is_dir != path2_is_dir:
-        return True
-
-    # Paths collide if neither path is a directory, and the files have
-    # different contents
-    elif not (path1_is_dir and path2_is_dir) and _file_collides(path1, path2):
-        return True
-
-    # Otherwise, paths do not conflict
-    else:
-        return False
-
-
 def _get_includes(fileset):
     return [x for x in fileset if x[0] != "-"]
 
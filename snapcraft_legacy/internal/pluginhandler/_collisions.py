@@ -0,0 +1,239 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Detection of files staged by several parts with different contents.
+
+The install directory of each part is indexed once, as its paths are
+looked up. Files are equal if they are the same inode, and differ if
+their sizes differ. Otherwise their contents are compared by hash. Hashes
+are stored in the part directory and reused while the files are not
+modified.
+"""
+
+import contextlib
+import filecmp
+import hashlib
+import json
+import logging
+import os
+import stat
+from typing import Dict, List, Optional, Tuple
+
+from snapcraft_legacy.internal import errors, steps
+
+logger = logging.getLogger(__name__)
+
+_HASH_CACHE_FILE = "collision-hashes.json"
+_HASH_CACHE_FORMAT_VERSION = 1
+
+# The properties of a file identifying a revision of its contents.
+_FileKey = Tuple[int, int, int, int, int]
+
+
+def check_for_collisions(parts):
+    """Raises a SnapcraftPartConflictError if conflicts are found."""
+    trees: Dict[str, _InstallTree] = dict()
+    try:
+        for part in parts:
+            # Gather our own files up
+            part_files, part_directories = part.migratable_fileset_for(steps.STAGE)
+            tree = _InstallTree(part, part_files | part_directories)
+
+            # Scan previous parts for collisions
+            for other_part_name, other_tree in trees.items():
+                common = tree.contents & other_tree.contents
+                conflict_files = [
+                    f for f in common if _paths_collide(tree, other_tree, f)
+                ]
+
+                if conflict_files:
+                    raise errors.SnapcraftPartConflictError(
+                        other_part_name=other_part_name,
+                        part_name=part.name,
+                        conflict_files=conflict_files,
+                    )
+
+            # And add our files to the list
+            trees[part.name] = tree
+    finally:
+        for tree in trees.values():
+            tree.save_hashes()
+
+
+def _paths_collide(tree: "_InstallTree", other_tree: "_InstallTree", path: str) -> bool:
+    path_stat = tree.lstat(path)
+    other_stat = other_tree.lstat(path)
+    if path_stat is None or other_stat is None:
+        return False
+
+    path_is_link = stat.S_ISLNK(path_stat.st_mode)
+    other_is_link = stat.S_ISLNK(other_stat.st_mode)
+
+    # Paths collide if they're both symlinks, but pointing to different places
+    if path_is_link and other_is_link:
+        return os.readlink(tree.get_path(path)) != os.readlink(
+            other_tree.get_path(path)
+        )
+
+    # Paths collide if one is a symlink, but not the other
+    elif path_is_link or other_is_link:
+        return True
+
+    # Paths collide if one is a directory, but not the other
+    elif stat.S_ISDIR(path_stat.st_mode) != stat.S_ISDIR(other_stat.st_mode):
+        return True
+
+    # Paths do not collide if both are directories
+    elif stat.S_ISDIR(path_stat.st_mode):
+        return False
+
+    # Paths do not collide if they are hard links to the same file
+    elif (path_stat.st_dev, path_stat.st_ino) == (
+        other_stat.st_dev,
+        other_stat.st_ino,
+    ):
+        return False
+
+    # pkg-config files are compared ignoring their prefix, and files which
+    # are not regular are compared as before.
+    elif (
+        path.endswith(".pc")
+        or not stat.S_ISREG(path_stat.st_mode)
+        or not stat.S_ISREG(other_stat.st_mode)
+    ):
+        return _file_collides(tree.get_path(path), other_tree.get_path(path))
+
+    # Paths collide if the files have different contents
+    else:
+        return path_stat.st_size != other_stat.st_size or tree.get_hash(
+            path
+        ) != other_tree.get_hash(path)
+
+
+def _file_collides(file_this, file_other):
+    if not file_this.endswith(".pc"):
+        return not filecmp.cmp(file_this, file_other, shallow=False)
+
+    pc_file_1 = open(file_this)
+    pc_file_2 = open(file_other)
+
+    try:
+        for lines in zip(pc_file_1, pc_file_2):
+            for line in zip(lines[0].split("\n"), lines[1].split("\n")):
+                if line[0].startswith("prefix="):
+                    continue
+                if line[0] != line[1]:
+                    return True
+    except Exception as e:
+        raise e from e
+    finally:
+        pc_file_1.close()
+        pc_file_2.close()
+    return False
+
+
+class _InstallTree:
+    """The paths a part stages, indexed as they are looked up.
+
+    :param part: the part staging the paths.
+    :param contents: the paths staged, relative to the install directory.
+    """
+
+    def __init__(self, part, contents) -> None:
+        self.contents = contents
+        self._install_dir = part.part_install_dir
+        self._part_dir = part.part_dir
+        self._hash_cache_path = os.path.join(part.part_dir, _HASH_CACHE_FILE)
+        self._stats: Dict[str, Optional[os.stat_result]] = dict()
+        self._hashes: Optional[Dict[str, Tuple[_FileKey, str]]] = None
+        self._hashes_changed = False
+
+    def get_path(self, path: str) -> str:
+        return os.path.join(self._install_dir, path)
+
+    def lstat(self, path: str) -> Optional[os.stat_result]:
+        """Get the status of path, without following symlinks.
+
+        :returns: the status of path, or None if it does not exist.
+        """
+        if path not in self._stats:
+            try:
+                self._stats[path] = os.lstat(self.get_path(path))
+            except FileNotFoundError:
+                self._stats[path] = None
+        return self._stats[path]
+
+    def get_hash(self, path: str) -> str:
+        """Get the sha384 of the contents of the regular file at path."""
+        path_stat = self.lstat(path)
+        if path_stat is None:
+            raise FileNotFoundError(self.get_path(path))
+        key = (
+            path_stat.st_dev,
+            path_stat.st_ino,
+            path_stat.st_size,
+            path_stat.st_mtime_ns,
+            path_stat.st_ctime_ns,
+        )
+
+        hashes = self._load_hashes()
+        cached = hashes.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        hasher = hashlib.sha384()
+        with open(self.get_path(path), "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                hasher.update(block)
+        hashes[path] = (key, hasher.hexdigest())
+        self._hashes_changed = True
+        return hashes[path][1]
+
+    def _load_hashes(self) -> Dict[str, Tuple[_FileKey, str]]:
+        if self._hashes is None:
+            self._hashes = dict()
+            with contextlib.suppress(OSError, ValueError, KeyError, TypeError):
+                with open(self._hash_cache_path) as hash_cache_file:
+                    data = json.load(hash_cache_file)
+                if data["version"] == _HASH_CACHE_FORMAT_VERSION:
+                    self._hashes = {
+                        path: (tuple(key), digest)  # type: ignore
+                        for path, (key, digest) in data["hashes"].items()
+                    }
+        return self._hashes
+
+    def save_hashes(self) -> None:
+        """Store the hashes calculated for the next checks, if any."""
+        if not self._hashes_changed or not os.path.isdir(self._part_dir):
+            return
+
+        hashes: Dict[str, List] = dict()
+        for path, (key, digest) in (self._hashes or {}).items():
+            # Forget the paths no longer staged.
+            if path in self.contents:
+                hashes[path] = [list(key), digest]
+        data = {"version": _HASH_CACHE_FORMAT_VERSION, "hashes": hashes}
+
+        temp_path = self._hash_cache_path + ".tmp"
+        try:
+            with open(temp_path, "w") as hash_cache_file:
+                json.dump(data, hash_cache_file)
+            os.replace(temp_path, self._hash_cache_path)
+        except OSError as error:
+            logger.debug("Unable to store the hashes of staged files: {}".format(error))
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+        self._hashes_changed = False
@@ -21,11 +21,41 @@ import subprocess
 import sys
 import tempfile
 import textwrap
+import threading
 import time
-from typing import Any, Callable, Dict
+from typing import IO, Any, Callable, Dict, List, Optional
 
 from snapcraft_legacy.internal import common, errors, steps
 
+# Keeps the lines printed by parts running concurrently whole.
+_output_lock = threading.Lock()
+
+
+def print_prefixed(stream: IO[str], prefix: str) -> None:
+    """Print the lines read from stream, prefixed with prefix."""
+    for line in stream:
+        with _output_lock:
+            sys.stdout.write(prefix + line)
+            sys.stdout.flush()
+
+
+def run_prefixed(command: List[str], *, prefix: str, cwd: str) -> None:
+    """Run command, printing its output prefixed with prefix.
+
+    :raises subprocess.CalledProcessError: if command fails.
+    """
+    with subprocess.Popen(
+        command,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    ) as process:
+        print_prefixed(process.stdout, prefix)  # type: ignore
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+
 
 class Runner:
     """The Runner class is responsible for orchestrating scriptlets."""
@@ -75,6 +105,10 @@ class Runner:
         self._shell = shell
         self._shell_flags = shell_flags
 
+        # When set, the output of scriptlets is prefixed with it, e.g. to
+        # tell apart the output of parts running concurrently.
+        self.output_prefix: Optional[str] = None
+
     def pull(self) -> None:
         """Run override-pull scriptlet."""
         if self._override_pull_scriptlet:
@@ -162,9 +196,23 @@ class Runner:
                 script_file.flush()
                 script_file.seek(0)
 
+                output_options: Dict[str, Any] = dict()
+                if self.output_prefix is not None:
+                    output_options = dict(
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        universal_newlines=True,
+                    )
                 process = subprocess.Popen(
-                    [self._shell], stdin=script_file, cwd=workdir
+                    [self._shell], stdin=script_file, cwd=workdir, **output_options
+                )
+
+            output_thread = None
+            if self.output_prefix is not None:
+                output_thread = threading.Thread(
+                    target=print_prefixed, args=(process.stdout, self.output_prefix)
                 )
+                output_thread.start()
 
             status = None
             try:
@@ -190,6 +238,8 @@ class Runner:
             finally:
                 call_fifo.close()
                 feedback_fifo.close()
+                if output_thread is not None:
+                    output_thread.join()
 
             if process.returncode != 0:
                 raise errors.ScriptletRunError(
@@ -14,11 +14,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import heapq
 import logging
 from collections import ChainMap
 from os import path
-from typing import Set  # noqa: F401
-from typing import List
+from typing import Dict, Iterable, List, Optional, Set
 
 import snapcraft_legacy
 from snapcraft_legacy.internal import elf, pluginhandler, repo
@@ -33,6 +33,107 @@ from ._env import build_env, build_env_for_stage, runtime_env
 logger = logging.getLogger(__name__)
 
 
+class _Descending(str):
+    """A name ordered in reverse, for heapq to pop the greatest name first."""
+
+    def __lt__(self, other):
+        return str.__gt__(self, other)
+
+
+class _PartsGraph:
+    """The dependencies between parts, indexed by part name.
+
+    Transitive dependencies are computed once for each part, the first time
+    they are requested.
+    """
+
+    def __init__(
+        self,
+        parts: Iterable[pluginhandler.PluginHandler],
+        after_requests: Dict[str, List[str]],
+    ) -> None:
+        self._parts = {p.name: p for p in parts}
+        self._dependencies = {
+            name: set(after_requests.get(name, [])) for name in self._parts
+        }
+        self._reverse_dependencies = {
+            name: set() for name in self._parts
+        }  # type: Dict[str, Set[str]]
+        for name, dependency_names in self._dependencies.items():
+            for dependency_name in dependency_names:
+                if dependency_name in self._reverse_dependencies:
+                    self._reverse_dependencies[dependency_name].add(name)
+
+        self._closures = dict()  # type: Dict[str, Set[str]]
+        self._reverse_closures = dict()  # type: Dict[str, Set[str]]
+
+    def get_part(self, part_name: str) -> Optional[pluginhandler.PluginHandler]:
+        return self._parts.get(part_name)
+
+    def sort(self) -> List[pluginhandler.PluginHandler]:
+        """Sort the parts so that parts come after the parts they depend on.
+
+        Parts no remaining part depends on are taken out last, greatest name
+        first, so the order is consistent between runs.
+        """
+        dependents = {
+            name: len(names) for name, names in self._reverse_dependencies.items()
+        }
+        ready = [_Descending(name) for name, count in dependents.items() if not count]
+        heapq.heapify(ready)
+
+        reverse_sorted_names = []
+        while ready:
+            name = heapq.heappop(ready)
+            reverse_sorted_names.append(name)
+            for dependency_name in self._dependencies[name]:
+                dependents[dependency_name] -= 1
+                if not dependents[dependency_name]:
+                    heapq.heappush(ready, _Descending(dependency_name))
+
+        if len(reverse_sorted_names) != len(self._parts):
+            raise errors.SnapcraftLogicError(
+                "circular dependency chain found in parts definition"
+            )
+
+        return [self._parts[name] for name in reversed(reverse_sorted_names)]
+
+    def get_dependencies(
+        self, part_name: str, *, recursive: bool = False
+    ) -> Set[pluginhandler.PluginHandler]:
+        if recursive:
+            names = _get_closure(part_name, self._dependencies, self._closures)
+        else:
+            names = self._dependencies.get(part_name, set())
+        return {self._parts[name] for name in names}
+
+    def get_reverse_dependencies(
+        self, part_name: str, *, recursive: bool = False
+    ) -> Set[pluginhandler.PluginHandler]:
+        if recursive:
+            names = _get_closure(
+                part_name, self._reverse_dependencies, self._reverse_closures
+            )
+        else:
+            names = self._reverse_dependencies.get(part_name, set())
+        return {self._parts[name] for name in names}
+
+
+def _get_closure(
+    part_name: str, edges: Dict[str, Set[str]], closures: Dict[str, Set[str]]
+) -> Set[str]:
+    """Get the names reachable from part_name following edges, memoized in
+    closures. The graph must be acyclic.
+    """
+    if part_name not in closures:
+        closure = set()  # type: Set[str]
+        for name in edges.get(part_name, set()):
+            closure.add(name)
+            closure |= _get_closure(name, edges, closures)
+        closures[part_name] = closure
+    return closures[part_name]
+
+
 class PartsConfig:
     def __init__(self, *, parts, project, validator):
         self._soname_cache = elf.SonameCache()
@@ -44,6 +145,7 @@ class PartsConfig:
         self.all_parts = []
         self._part_names = []
         self.after_requests = {}
+        self._graph = _PartsGraph([], {})
 
         self._process_parts()
 
@@ -66,8 +168,9 @@ class PartsConfig:
 
             self.load_part(part_name, plugin_name, properties)
 
+        self._graph = _PartsGraph(self.all_parts, self.after_requests)
         self._compute_dependencies()
-        self.all_parts = self._sort_parts()
+        self.all_parts = self._graph.sort()
 
     def _compute_dependencies(self):
         """Gather the lists of dependencies and adds to all_parts."""
@@ -81,84 +184,20 @@ class PartsConfig:
 
                 part.deps.append(dep)
 
-    def _sort_parts(self):
-        """Performs an inneficient but easy to follow sorting of parts."""
-        sorted_parts = []
-
-        # We want to process parts in a consistent order between runs. The
-        # simplest way to do this is to sort them by name.
-        self.all_parts = sorted(
-            self.all_parts, key=lambda part: part.name, reverse=True
-        )
-
-        while self.all_parts:
-            top_part = None
-            for part in self.all_parts:
-                mentioned = False
-                for other in self.all_parts:
-                    if part in other.deps:
-                        mentioned = True
-                        break
-                if not mentioned:
-                    top_part = part
-                    break
-            if not top_part:
-                raise errors.SnapcraftLogicError(
-                    "circular dependency chain found in parts definition"
-                )
-            sorted_parts = [top_part] + sorted_parts
-            self.all_parts.remove(top_part)
-
-        return sorted_parts
-
     def get_dependencies(
         self, part_name: str, *, recursive: bool = False
     ) -> Set[pluginhandler.PluginHandler]:
         """Returns a set of all the parts upon which part_name depends."""
-
-        dependency_names = set(self.after_requests.get(part_name, []))
-        dependencies = {p for p in self.all_parts if p.name in dependency_names}
-
-        if recursive:
-            # No need to worry about infinite recursion due to circular
-            # dependencies since the YAML validation won't allow it.
-            for dependency_name in dependency_names:
-                dependencies |= self.get_dependencies(
-                    dependency_name, recursive=recursive
-                )
-
-        return dependencies
+        return self._graph.get_dependencies(part_name, recursive=recursive)
 
     def get_reverse_dependencies(
         self, part_name: str, *, recursive: bool = False
     ) -> Set[pluginhandler.PluginHandler]:
         """Returns a set of all the parts that depend upon part_name."""
-
-        reverse_dependency_names = set()
-        for part, dependencies in self.after_requests.items():
-            if part_name in dependencies:
-                reverse_dependency_names.add(part)
-
-        reverse_dependencies = {
-            p for p in self.all_parts if p.name in reverse_dependency_names
-        }
-
-        if recursive:
-            # No need to worry about infinite recursion due to circular
-            # dependencies since the YAML validation won't allow it.
-            for reverse_dependency_name in reverse_dependency_names:
-                reverse_dependencies |= self.get_reverse_dependencies(
-                    reverse_dependency_name, recursive=recursive
-                )
-
-        return reverse_dependencies
+        return self._graph.get_reverse_dependencies(part_name, recursive=recursive)
 
     def get_part(self, part_name):
-        for part in self.all_parts:
-            if part.name == part_name:
-                return part
-
-        return None
+        return self._graph.get_part(part_name)
 
     def clean_part(self, part_name, staged_state, primed_state, step):
         part = self.get_part(part_name)
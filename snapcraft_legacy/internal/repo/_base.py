@@ -24,10 +24,10 @@ import pathlib
 import re
 import shutil
 import stat
-from typing import List, Optional, Set
+from typing import Iterator, List, Optional, Set
 
 from snapcraft_legacy import file_utils
-from snapcraft_legacy.internal import mangling, xattrs
+from snapcraft_legacy.internal import mangling
 
 from . import errors
 
@@ -190,7 +190,7 @@ class BaseRepo:
         raise errors.NoNativeBackendError()
 
     @classmethod
-    def normalize(cls, unpackdir: str) -> None:
+    def normalize(cls, unpackdir: str, *, paths: Optional[List[str]] = None) -> None:
         """Normalize artifacts in unpackdir.
 
         Repo specific packages are generally created to live in a specific
@@ -199,29 +199,13 @@ class BaseRepo:
         when building and to also work within a snap's environment.
 
         :param str unpackdir: directory where files where unpacked.
+        :param list paths: the paths unpacked, relative to unpackdir. If not
+                           set, all the paths in unpackdir are normalized.
         """
         cls._remove_useless_files(unpackdir)
-        cls._fix_artifacts(unpackdir)
+        cls._fix_artifacts(unpackdir, paths)
         cls._fix_xml_tools(unpackdir)
-        cls._fix_shebangs(unpackdir)
-
-    @classmethod
-    def _mark_origin_stage_package(
-        cls, sources_dir: str, stage_package: str
-    ) -> Set[str]:
-        """Mark all files in sources_dir as coming from stage_package."""
-        file_list = set()
-        for (root, dirs, files) in os.walk(sources_dir):
-            for file_name in files:
-                file_path = os.path.join(root, file_name)
-
-                # Mark source.
-                xattrs.write_origin_stage_package(file_path, stage_package)
-
-                file_path = os.path.relpath(root, sources_dir)
-                file_list.add(file_path)
-
-        return file_list
+        cls._fix_shebangs(unpackdir, paths)
 
     @classmethod
     def _remove_useless_files(cls, unpackdir: str) -> None:
@@ -233,7 +217,7 @@ class BaseRepo:
             os.remove(sitecustomize_file)
 
     @classmethod
-    def _fix_artifacts(cls, unpackdir: str) -> None:
+    def _fix_artifacts(cls, unpackdir: str, paths: Optional[List[str]] = None) -> None:
         """Perform various modifications to unpacked artifacts.
 
         Sometimes distro packages will contain absolute symlinks (e.g. if the
@@ -243,22 +227,18 @@ class BaseRepo:
         Some unpacked items will also contain suid binaries which we do not
         want in the resulting snap.
         """
-        for root, dirs, files in os.walk(unpackdir):
-            # Symlinks to directories will be in dirs, while symlinks to
-            # non-directories will be in files.
-            for entry in itertools.chain(files, dirs):
-                path = os.path.join(root, entry)
-                if os.path.islink(path):
-                    cls._fix_symlink(path, unpackdir)
-                elif os.path.exists(path):
-                    _fix_filemode(path)
-
-                if (
-                    path.endswith(".pc")
-                    and os.path.isfile(path)
-                    and not os.path.islink(path)
-                ):
-                    fix_pkg_config(unpackdir, path)
+        for path in _get_paths(unpackdir, paths):
+            if os.path.islink(path):
+                cls._fix_symlink(path, unpackdir)
+            elif os.path.exists(path):
+                _fix_filemode(path)
+
+            if (
+                path.endswith(".pc")
+                and os.path.isfile(path)
+                and not os.path.islink(path)
+            ):
+                fix_pkg_config(unpackdir, path)
 
     @classmethod
     def _fix_xml_tools(cls, unpackdir: str) -> None:
@@ -319,9 +299,9 @@ class BaseRepo:
         logger.warning("%r will be a dangling symlink", relative_link)
 
     @classmethod
-    def _fix_shebangs(cls, unpackdir: str) -> None:
+    def _fix_shebangs(cls, unpackdir: str, paths: Optional[List[str]] = None) -> None:
         """Change hard-coded shebangs in unpacked files to use env."""
-        mangling.rewrite_python_shebangs(unpackdir)
+        mangling.rewrite_python_shebangs(unpackdir, paths=paths)
 
 
 class DummyRepo(BaseRepo):
@@ -382,6 +362,19 @@ def fix_pkg_config(
                 print(line, end="")
 
 
+def _get_paths(unpackdir: str, paths: Optional[List[str]]) -> Iterator[str]:
+    """Get the full paths of paths, or of all the paths in unpackdir."""
+    if paths is not None:
+        yield from (os.path.join(unpackdir, path) for path in paths)
+        return
+
+    for root, dirs, files in os.walk(unpackdir):
+        # Symlinks to directories will be in dirs, while symlinks to
+        # non-directories will be in files.
+        for entry in itertools.chain(files, dirs):
+            yield os.path.join(root, entry)
+
+
 def _fix_filemode(path: str) -> None:
     mode = stat.S_IMODE(os.stat(path, follow_symlinks=False).st_mode)
     if mode & 0o4000 or mode & 0o2000:
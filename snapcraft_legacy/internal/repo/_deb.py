@@ -16,22 +16,26 @@
 
 import fileinput
 import functools
+import itertools
 import logging
 import os
 import pathlib
 import re
 import subprocess
 import sys
-import tempfile
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Sequence, Set, Tuple  # noqa: F401
 
 from xdg import BaseDirectory
 
 from snapcraft_legacy import file_utils
+from snapcraft_legacy.internal.cache import CacheManager
 from snapcraft_legacy.internal.indicators import is_dumb_terminal
 
 from . import errors
 from ._base import BaseRepo, get_pkg_name_parts
+from .deb_file import DebFile, UnpackedDeb
 from .deb_package import DebPackage
 
 if sys.platform == "linux":
@@ -47,6 +51,8 @@ _STAGE_CACHE_DIR: pathlib.Path = pathlib.Path(
     BaseDirectory.save_cache_path("snapcraft", "stage-packages")
 )
 
+_MAX_UNPACK_JOBS = min(8, os.cpu_count() or 1)
+
 _HASHSUM_MISMATCH_PATTERN = re.compile(r"(E:Failed to fetch.+Hash Sum mismatch)+")
 _DEFAULT_FILTERED_STAGE_PACKAGES: List[str] = [
     "adduser",
@@ -487,6 +493,7 @@ class Ubuntu(BaseRepo):
         )
 
         stage_packages_path.mkdir(exist_ok=True)
+        cache_manager = CacheManager(str(_DEB_CACHE_DIR.parent))
         with AptCache(
             stage_cache=_STAGE_CACHE_DIR, stage_cache_arch=target_arch
         ) as apt_cache:
@@ -497,30 +504,56 @@ class Ubuntu(BaseRepo):
             ):
                 logger.debug(f"Extracting stage package: {pkg_name}")
                 installed.add(f"{pkg_name}={pkg_version}")
+                # Recorded before linking, so that concurrent builds do not
+                # evict the package meanwhile.
+                cache_manager.record_access(str(dl_path))
                 file_utils.link_or_copy(
                     str(dl_path), str(stage_packages_path / dl_path.name)
                 )
 
+        cache_manager.prune("download")
         return sorted(installed)
 
     @classmethod
     def unpack_stage_packages(
         cls, *, stage_packages_path: pathlib.Path, install_path: pathlib.Path
     ) -> None:
-        pkg_path = None
-
-        for pkg_path in stage_packages_path.glob("*.deb"):
-            with tempfile.TemporaryDirectory(suffix="deb-extract") as extract_dir:
-                # Extract deb package.
-                cls._extract_deb(pkg_path, extract_dir)
-                # Mark source of files.
-                marked_name = cls._extract_deb_name_version(pkg_path)
-                cls._mark_origin_stage_package(extract_dir, marked_name)
-                # Stage files to install_dir.
-                file_utils.link_or_copy_tree(extract_dir, install_path.as_posix())
+        pkg_paths = sorted(stage_packages_path.glob("*.deb"))
+        if not pkg_paths:
+            return
+
+        # Packages are extracted concurrently, then installed in a fixed
+        # order so files shipped by several packages do not depend on timing.
+        with ThreadPoolExecutor(max_workers=_MAX_UNPACK_JOBS) as executor:
+            futures = [
+                executor.submit(cls._extract_deb, pkg_path, install_path)
+                for pkg_path in pkg_paths
+            ]
+        unpacked = [f.result() for f in futures if f.exception() is None]
 
-        if pkg_path:
-            cls.normalize(str(install_path))
+        try:
+            for future in futures:
+                future.result()
+
+            owners: Dict[str, str] = dict()
+            for deb in unpacked:
+                for path in deb.files:
+                    if path in owners:
+                        logger.debug(
+                            f"{path!r} from {deb.name} replaces "
+                            f"the one from {owners[path]}"
+                        )
+                    owners[path] = deb.name
+                deb.install()
+
+            for deb in unpacked:
+                deb.set_directory_modes()
+        finally:
+            for deb in unpacked:
+                deb.discard()
+
+        paths = set(itertools.chain.from_iterable(deb.paths for deb in unpacked))
+        cls.normalize(str(install_path), paths=sorted(paths))
 
     @classmethod
     def build_package_is_valid(cls, package_name) -> bool:
@@ -541,20 +574,15 @@ class Ubuntu(BaseRepo):
             ]
 
     @classmethod
-    def _extract_deb_name_version(cls, deb_path: pathlib.Path) -> str:
+    def _extract_deb(
+        cls, deb_path: pathlib.Path, install_path: pathlib.Path
+    ) -> UnpackedDeb:
+        """Extract deb, marking the files with `<package-name>=<version>`."""
+        logger.debug(f"Unpacking stage package: {deb_path.name}")
         try:
-            output = subprocess.check_output(
-                ["dpkg-deb", "--show", "--showformat=${Package}=${Version}", deb_path]
+            deb_file = DebFile(deb_path)
+            return deb_file.extract(
+                str(install_path), origin=deb_file.get_name_version()
             )
-        except subprocess.CalledProcessError:
-            raise errors.UnpackError(deb_path)
-
-        return output.decode().strip()
-
-    @classmethod
-    def _extract_deb(cls, deb_path: pathlib.Path, extract_dir: str) -> None:
-        """Extract deb and return `<package-name>=<version>`."""
-        try:
-            subprocess.check_call(["dpkg-deb", "--extract", deb_path, extract_dir])
-        except subprocess.CalledProcessError:
-            raise errors.UnpackError(deb_path)
+        except (tarfile.TarError, EOFError, ValueError) as error:
+            raise errors.UnpackError(deb_path) from error
@@ -0,0 +1,340 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""In-process reading and unpacking of .deb packages.
+
+A .deb package is an ar archive with a control tarball, holding the
+package metadata, and a data tarball, holding the files installed. The
+tarballs are read as streams straight from the ar archive, the files are
+written next to their destination as they are read and moved into place
+once the package is installed.
+
+Compression formats tarfile does not support, e.g. zstd, are read with
+dpkg-deb.
+"""
+
+import contextlib
+import io
+import logging
+import os
+import pathlib
+import re
+import subprocess
+import tarfile
+import uuid
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from snapcraft_legacy.internal import xattrs
+
+from . import errors
+
+logger = logging.getLogger(__name__)
+
+_AR_MAGIC = b"!<arch>\n"
+_AR_HEADER_SIZE = 60
+
+# The tarfile stream modes for the supported compressions.
+_TAR_MODES = {"": "r|", ".gz": "r|gz", ".xz": "r|xz", ".bz2": "r|bz2"}
+
+_CONTROL_FIELD_PATTERN = re.compile(r"^(Package|Version):\s*(\S+)\s*$", re.MULTILINE)
+
+
+class _ArMember(NamedTuple):
+    name: str
+    offset: int
+    size: int
+
+
+class _ArMemberReader(io.RawIOBase):
+    """Read the data of a member of an ar archive as a file."""
+
+    def __init__(self, file: BinaryIO, member: _ArMember) -> None:
+        super().__init__()
+        self._file = file
+        self._file.seek(member.offset)
+        self._remaining = member.size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer)[: self._remaining]
+        size = self._file.readinto(view)  # type: ignore
+        self._remaining -= size
+        return size
+
+
+class DebFile:
+    """A .deb package.
+
+    :param pathlib.Path path: the path to the package.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self._members = self._read_members()
+
+    def _read_members(self) -> List[_ArMember]:
+        members = []
+        with self.path.open("rb") as deb_file:
+            if deb_file.read(len(_AR_MAGIC)) != _AR_MAGIC:
+                raise errors.UnpackError(self.path)
+
+            while True:
+                header = deb_file.read(_AR_HEADER_SIZE)
+                if not header:
+                    break
+                if len(header) != _AR_HEADER_SIZE or header[58:60] != b"`\n":
+                    raise errors.UnpackError(self.path)
+
+                # GNU ar terminates names with a slash.
+                name = header[0:16].decode().rstrip().rstrip("/")
+                size = int(header[48:58])
+                members.append(_ArMember(name, deb_file.tell(), size))
+                # Member data is padded to an even size.
+                deb_file.seek(size + size % 2, os.SEEK_CUR)
+
+        return members
+
+    def _get_member(self, prefix: str) -> _ArMember:
+        for member in self._members:
+            if member.name.startswith(prefix):
+                return member
+        raise errors.UnpackError(self.path)
+
+    @contextlib.contextmanager
+    def _open_tarball(
+        self, prefix: str, dpkg_deb_option: str
+    ) -> Iterator[tarfile.TarFile]:
+        member = self._get_member(prefix)
+        mode = _TAR_MODES.get(member.name[len(prefix) :])
+        if mode is not None:
+            with self.path.open("rb") as deb_file, tarfile.open(
+                fileobj=io.BufferedReader(_ArMemberReader(deb_file, member)),
+                mode=mode,
+            ) as tar:
+                yield tar
+            return
+
+        logger.debug("Reading {} with dpkg-deb".format(member.name))
+        with subprocess.Popen(
+            ["dpkg-deb", dpkg_deb_option, self.path], stdout=subprocess.PIPE
+        ) as process:
+            with tarfile.open(fileobj=process.stdout, mode="r|") as tar:
+                yield tar
+            # Read what is left after the end of the archive, for dpkg-deb
+            # to exit cleanly.
+            while process.stdout.read(1024 * 1024):  # type: ignore
+                pass
+        if process.returncode != 0:
+            raise errors.UnpackError(self.path)
+
+    def get_name_version(self) -> str:
+        """Get the name and version of the package, as <name>=<version>."""
+        fields = {}
+        with self._open_tarball("control.tar", "--ctrl-tarfile") as tar:
+            for member in tar:
+                if member.name in ("control", "./control"):
+                    control_file = tar.extractfile(member)
+                    if control_file is not None:
+                        fields = dict(
+                            _CONTROL_FIELD_PATTERN.findall(
+                                control_file.read().decode(errors="replace")
+                            )
+                        )
+                    break
+
+        if "Package" not in fields or "Version" not in fields:
+            raise errors.UnpackError(self.path)
+        return "{}={}".format(fields["Package"], fields["Version"])
+
+    def extract(
+        self, install_path: str, *, origin: Optional[str] = None
+    ) -> "UnpackedDeb":
+        """Extract the files of the package next to their destination.
+
+        Files are written to a temporary name in install_path and are only
+        moved into place with :meth:`UnpackedDeb.install`.
+
+        :param str install_path: the directory to unpack to.
+        :param str origin: the origin stage package to mark files with.
+        """
+        paths = []
+        files = []  # type: List[Tuple[str, str, str]]
+        directories = []  # type: List[Tuple[str, int]]
+        # Hard links in the package refer to files not in place yet.
+        temp_paths = dict()  # type: Dict[str, str]
+        try:
+            with self._open_tarball("data.tar", "--fsys-tarfile") as tar:
+                for member in tar:
+                    path = os.path.normpath(member.name.lstrip("/"))
+                    if path == ".":
+                        continue
+                    if path == ".." or path.startswith("../"):
+                        raise errors.UnpackError(self.path)
+
+                    target = os.path.join(install_path, path)
+                    if member.isdir():
+                        os.makedirs(target, exist_ok=True)
+                        directories.append((target, member.mode))
+                    else:
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        if _is_directory(target):
+                            logger.warning(
+                                "Not replacing directory {!r} with a file from {}".format(
+                                    path, self.path.name
+                                )
+                            )
+                            continue
+                        temp_path = self._extract_file(
+                            tar, member, install_path, target, origin, temp_paths
+                        )
+                        if temp_path is not None:
+                            files.append((temp_path, target, path))
+                            temp_paths[path] = temp_path
+                    paths.append(path)
+        except BaseException:
+            for temp_path in temp_paths.values():
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(temp_path)
+            raise
+
+        return UnpackedDeb(
+            self.path.name, paths=paths, files=files, directories=directories
+        )
+
+    def unpack(self, install_path: str, *, origin: Optional[str] = None) -> List[str]:
+        """Unpack the files of the package to install_path.
+
+        :param str install_path: the directory to unpack to.
+        :param str origin: the origin stage package to mark files with.
+        :returns: the paths unpacked, relative to install_path.
+        """
+        unpacked = self.extract(install_path, origin=origin)
+        unpacked.install()
+        unpacked.set_directory_modes()
+        return unpacked.paths
+
+    def _extract_file(
+        self,
+        tar: tarfile.TarFile,
+        member: tarfile.TarInfo,
+        install_path: str,
+        target: str,
+        origin: Optional[str],
+        temp_paths: Dict[str, str],
+    ) -> Optional[str]:
+        temp_path = "{}.{}.partial".format(target, uuid.uuid4().hex)
+        try:
+            if member.issym():
+                os.symlink(member.linkname, temp_path)
+            elif member.islnk():
+                link_target = os.path.normpath(member.linkname.lstrip("/"))
+                os.link(
+                    temp_paths.get(
+                        link_target, os.path.join(install_path, link_target)
+                    ),
+                    temp_path,
+                )
+            elif member.isreg():
+                source = tar.extractfile(member)
+                with open(temp_path, "wb") as temp_file:
+                    while source is not None:
+                        data = source.read(1024 * 1024)
+                        if not data:
+                            break
+                        temp_file.write(data)
+            else:
+                logger.debug(
+                    "Skipping {!r} from {}".format(member.name, self.path.name)
+                )
+                return None
+
+            # Hard links share the attributes of the file they link to.
+            if not member.islnk():
+                tar.chown(member, temp_path, numeric_owner=False)
+            if member.isreg():
+                tar.chmod(member, temp_path)
+                tar.utime(member, temp_path)
+                if origin is not None:
+                    xattrs.write_origin_stage_package(temp_path, origin)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+
+        return temp_path
+
+
+class UnpackedDeb:
+    """The files of a package extracted next to their destination.
+
+    Packages can be extracted concurrently, then installed one after the
+    other so files shipped by several packages are taken from the package
+    installed last.
+
+    :ivar str name: the file name of the package.
+    :ivar list paths: the paths unpacked, relative to the install path.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        paths: List[str],
+        files: List[Tuple[str, str, str]],
+        directories: List[Tuple[str, int]],
+    ) -> None:
+        self.name = name
+        self.paths = paths
+        self._files = files
+        self._directories = directories
+
+    @property
+    def files(self) -> List[str]:
+        """The paths of the files not installed yet, relative to the install path."""
+        return [path for _, _, path in self._files]
+
+    def install(self) -> None:
+        """Move the extracted files into place, replacing existing files."""
+        try:
+            for temp_path, target, path in self._files:
+                if _is_directory(target):
+                    logger.warning(
+                        "Not replacing directory {!r} with a file from {}".format(
+                            path, self.name
+                        )
+                    )
+                    continue
+                os.replace(temp_path, target)
+        finally:
+            self.discard()
+
+    def set_directory_modes(self) -> None:
+        """Set the modes of the directories, once all the files are in place."""
+        for target, mode in self._directories:
+            os.chmod(target, mode)
+
+    def discard(self) -> None:
+        """Remove the extracted files not installed."""
+        for temp_path, _, _ in self._files:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_path)
+        self._files = []
+
+
+def _is_directory(path: str) -> bool:
+    return os.path.isdir(path) and not os.path.islink(path)
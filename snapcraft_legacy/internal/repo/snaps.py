@@ -19,12 +19,19 @@ import logging
 import os
 import sys
 from subprocess import CalledProcessError, check_call, check_output
-from typing import List, Sequence, Set, Union
+from typing import List, Optional, Sequence, Set, Union
 from urllib import parse
 
+import craft_store
 import requests_unixsocket
 from requests import exceptions
 
+from snapcraft_legacy import file_utils, storeapi
+from snapcraft_legacy.internal.cache import SnapCache
+from snapcraft_legacy.project._project_options import ProjectOptions
+from snapcraft_legacy.storeapi.channels import Channel
+from snapcraft_legacy.storeapi.info import SnapChannelMapping
+
 from . import errors
 
 _STORE_ASSERTION = [
@@ -202,7 +209,28 @@ class SnapPackage:
                 snap_file.write(buf)
 
     def download(self, *, directory: str = None):
-        """Downloads a given snap."""
+        """Downloads a given snap.
+
+        The revision the store publishes for the channel on this host is
+        taken from the snap cache when it is there, otherwise it is cached
+        once downloaded. Cached revisions are copied without assertions.
+        """
+        channel_mapping = self._get_channel_mapping()
+        snap_cache = SnapCache(project_name=self.name)
+        if channel_mapping is not None:
+            snap_path = os.path.join(
+                directory or "",
+                "{}_{}.snap".format(self.name, channel_mapping.revision),
+            )
+            cached_snap = snap_cache.get(
+                deb_arch=channel_mapping.channel_details.architecture,
+                snap_hash=channel_mapping.download.sha3_384,
+            )
+            if cached_snap:
+                logger.debug("Using cached snap for {!r}".format(self.name))
+                file_utils.clone(cached_snap, snap_path)
+                return
+
         # We use the `snap download` command here on recommendation
         # of the snapd team.
         snap_download_cmd = ["snap", "download", self.name]
@@ -215,6 +243,50 @@ class SnapPackage:
                 snap_name=self.name, snap_channel=self.channel
             )
 
+        # The channel may have moved on since it was looked up, in which
+        # case a different revision was downloaded and it is not cached.
+        if channel_mapping is not None and os.path.isfile(snap_path):
+            snap_cache.cache(
+                snap_filename=snap_path,
+                deb_arch=channel_mapping.channel_details.architecture,
+            )
+
+    def _get_channel_mapping(self) -> Optional[SnapChannelMapping]:
+        """Return what the store publishes for the channel on this host.
+
+        :returns: the channel mapping, or None if it cannot be found.
+        """
+        try:
+            channel = Channel(self.channel)
+        except RuntimeError:
+            return None
+        # Branches are not listed in the channel map.
+        if channel.branch:
+            return None
+
+        try:
+            return (
+                storeapi.SnapAPI()
+                .get_info(self.name)
+                .get_channel_mapping(
+                    risk=channel.risk,
+                    track=channel.track,
+                    arch=ProjectOptions().deb_arch,
+                )
+            )
+        except (
+            storeapi.errors.StoreError,
+            storeapi.errors.SnapNotFoundError,
+            craft_store.errors.CraftStoreError,
+            exceptions.RequestException,
+        ) as e:
+            logger.debug(
+                "Unable to find the revision of {!r} in the store: {}".format(
+                    self.name, e
+                )
+            )
+            return None
+
     def install(self):
         """Installs the snap onto the system."""
         snap_install_cmd = []
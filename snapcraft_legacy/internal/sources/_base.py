@@ -13,6 +13,9 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import contextlib
+import hashlib
+import logging
 import os
 import shutil
 import subprocess
@@ -21,6 +24,7 @@ import sys
 import requests
 
 import snapcraft_legacy.internal.common
+from snapcraft_legacy import file_utils
 from snapcraft_legacy.internal.cache import FileCache
 from snapcraft_legacy.internal.indicators import (
     download_requests_stream,
@@ -30,6 +34,8 @@ from snapcraft_legacy.internal.indicators import (
 from . import errors
 from ._checksum import split_checksum, verify_checksum
 
+logger = logging.getLogger(__name__)
+
 
 class Base:
     def __init__(
@@ -53,6 +59,11 @@ class Base:
         self.source_checksum = source_checksum
         self.source_submodules = source_submodules
         self.source_details = None
+        # A local copy of the source, e.g. downloaded ahead of pulling it.
+        self.prefetched_file = None
+        # Whether prefetched_file was hashed against source_checksum as it
+        # was downloaded.
+        self.prefetched_file_verified = False
 
         self.command = command
         self._checked = False
@@ -122,8 +133,8 @@ class FileBase(Base):
             except FileNotFoundError as exc:
                 raise errors.SnapcraftSourceNotFoundError(self.source) from exc
 
-        # Verify before provisioning
-        if self.source_checksum:
+        # Verify before provisioning, downloads are verified by download().
+        if self.source_checksum and not is_source_url:
             verify_checksum(self.source_checksum, source_file)
 
         # We finally provision, but we don't clean the target so override-pull
@@ -136,32 +147,72 @@ class FileBase(Base):
         else:
             self.file = filepath
 
-        # First check if we already have the source file cached.
-        file_cache = FileCache()
         if self.source_checksum:
-            algorithm, hash = split_checksum(self.source_checksum)
-            cache_file = file_cache.get(algorithm=algorithm, hash=hash)
-            if cache_file:
-                # We make this copy as the provisioning logic can delete
-                # this file and we don't want that.
-                shutil.copy2(cache_file, self.file)
-                return self.file
+            algorithm, digest = split_checksum(self.source_checksum)
+
+        # First check if we already have the source file prefetched or cached.
+        file_cache = FileCache()
+        cache_file = None
+        verified = False
+        if self.prefetched_file and os.path.isfile(self.prefetched_file):
+            cache_file = self.prefetched_file
+            verified = self.prefetched_file_verified
+        elif self.source_checksum:
+            cache_file = file_cache.get(algorithm=algorithm, hash=digest)
+        if cache_file and (verified or self._verify_cached_file(cache_file)):
+            # We make this copy as the provisioning logic can delete
+            # this file and we don't want that.
+            file_utils.clone(cache_file, self.file)
+            return self.file
 
         # If not we download and store
         if snapcraft_legacy.internal.common.get_url_scheme(self.source) == "ftp":
             download_urllib_source(self.source, self.file)
+            if self.source_checksum:
+                verify_checksum(self.source_checksum, self.file)
         else:
-            try:
-                request = requests.get(self.source, stream=True, allow_redirects=True)
-                request.raise_for_status()
-            except requests.exceptions.RequestException as e:
-                raise errors.SnapcraftRequestError(message=e)
-
-            download_requests_stream(request, self.file)
+            self._download_http()
 
-        # We verify the file if source_checksum is defined
-        # and we cache the file for future reuse.
+        # We cache the verified file for future reuse.
         if self.source_checksum:
-            algorithm, digest = verify_checksum(self.source_checksum, self.file)
-            file_cache.cache(filename=self.file, algorithm=algorithm, hash=hash)
+            file_cache.cache(
+                filename=self.file, algorithm=algorithm, hash=digest, verify=False
+            )
         return self.file
+
+    def _verify_cached_file(self, cache_file: str) -> bool:
+        """Verify a cached or prefetched file against source_checksum.
+
+        Files that do not match are removed, so they are downloaded again.
+        """
+        if not self.source_checksum:
+            return True
+
+        algorithm, digest = split_checksum(self.source_checksum)
+        if file_utils.calculate_hash(cache_file, algorithm=algorithm) == digest:
+            return True
+
+        logger.warning(
+            "Discarding {!r} as it does not match the source-checksum "
+            "of {!r}.".format(cache_file, self.source)
+        )
+        with contextlib.suppress(OSError):
+            os.remove(cache_file)
+        return False
+
+    def _download_http(self) -> None:
+        try:
+            request = requests.get(self.source, stream=True, allow_redirects=True)
+            request.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise errors.SnapcraftRequestError(message=e)
+
+        # We verify the file while downloading if source_checksum is defined.
+        hasher = None
+        if self.source_checksum:
+            algorithm, digest = split_checksum(self.source_checksum)
+            hasher = getattr(hashlib, algorithm)()
+
+        download_requests_stream(request, self.file, hasher=hasher)
+        if hasher is not None and hasher.hexdigest() != digest:
+            raise errors.DigestDoesNotMatchError(digest, hasher.hexdigest())
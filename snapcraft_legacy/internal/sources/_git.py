@@ -14,15 +14,26 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import contextlib
+import logging
 import os
 import re
+import shutil
 import subprocess
 import sys
-from typing import List
+from typing import Iterator, List, Optional
+
+from snapcraft_legacy.internal.cache import GitMirrorCache
 
 from . import errors
 from ._base import Base
 
+logger = logging.getLogger(__name__)
+
+# Update the remote branches and tags of a clone from a mirror, as fetching
+# from origin would.
+_MIRROR_REFSPECS = ["+refs/heads/*:refs/remotes/origin/*", "+refs/tags/*:refs/tags/*"]
+
 
 class Git(Base):
     @classmethod
@@ -141,6 +152,8 @@ class Git(Base):
         if silent:
             self._call_kwargs["stdout"] = subprocess.DEVNULL
             self._call_kwargs["stderr"] = subprocess.DEVNULL
+        # The mirror of the source, if it was updated ahead of pulling it.
+        self.prefetched_mirror = None  # type: Optional[str]
 
     def _run_git_command(self, command: List[str]) -> None:
         try:
@@ -162,9 +175,70 @@ class Git(Base):
                 "origin",
                 self.source_commit,
             ],
-            **self._call_kwargs
+            **self._call_kwargs,
         )
 
+    def _use_mirror(self) -> bool:
+        # Shallow clones already limit what is downloaded, and local
+        # repositories are not worth mirroring.
+        return not self.source_depth and not os.path.isdir(self.source)
+
+    def _update_mirror(self) -> Optional[str]:
+        """Create or update the mirror of the source in the git mirror cache.
+
+        :returns: the path to the mirror, or None if it cannot be updated.
+        """
+        try:
+            with GitMirrorCache().lock(self.source, exclusive=True) as mirror_path:
+                if os.path.isdir(mirror_path):
+                    self._run(
+                        [self.command, "-C", mirror_path, "fetch", "--prune", "origin"],
+                        **self._call_kwargs,
+                    )
+                else:
+                    # Clone to a temporary path, so that an interrupted clone
+                    # is never used as a mirror.
+                    partial_path = mirror_path + ".partial"
+                    shutil.rmtree(partial_path, ignore_errors=True)
+                    self._run(
+                        [self.command, "clone", "--mirror", self.source, partial_path],
+                        **self._call_kwargs,
+                    )
+                    os.rename(partial_path, mirror_path)
+        except (errors.SnapcraftPullError, OSError) as error:
+            logger.warning(
+                "Unable to update the mirror of {!r}, cloning without it: {}".format(
+                    self.source, error
+                )
+            )
+            return None
+        return mirror_path
+
+    def prefetch_mirror(self) -> Optional[str]:
+        """Create or update the mirror of the source ahead of pulling it.
+
+        :returns: the path to the mirror, or None if no mirror is used.
+        """
+        if self.prefetched_mirror is None and self._use_mirror():
+            self.prefetched_mirror = self._update_mirror()
+        return self.prefetched_mirror
+
+    @contextlib.contextmanager
+    def _mirror(self) -> Iterator[Optional[str]]:
+        """Update the mirror of the source, unless it was prefetched, and keep
+        it from being updated by other builds while it is used.
+
+        :returns: the path to the mirror, or None if no mirror is used.
+        """
+        mirror_path = self.prefetched_mirror
+        if mirror_path is None and self._use_mirror():
+            mirror_path = self._update_mirror()
+        if mirror_path is None:
+            yield None
+        else:
+            with GitMirrorCache().lock(self.source, exclusive=False):
+                yield mirror_path
+
     def _pull_existing(self):
         refspec = "HEAD"
         if self.source_branch:
@@ -187,11 +261,14 @@ class Git(Base):
 
         if self.source_submodules is None or len(self.source_submodules) > 0:
             command.extend(["--recurse-submodules=yes"])
-        self._run(command, **self._call_kwargs)
+        with self._mirror() as mirror_path:
+            if mirror_path is not None:
+                command.extend([mirror_path] + _MIRROR_REFSPECS)
+            self._run(command, **self._call_kwargs)
 
         self._run(
             [self.command, "-C", self.source_dir, "reset", "--hard", reset_spec],
-            **self._call_kwargs
+            **self._call_kwargs,
         )
 
         if self.source_submodules is None or len(self.source_submodules) > 0:
@@ -222,14 +299,19 @@ class Git(Base):
             command.extend(["--branch", self.source_tag or self.source_branch])
         if self.source_depth:
             command.extend(["--depth", str(self.source_depth)])
-        self._run(command + [self.source, self.source_dir], **self._call_kwargs)
+        with self._mirror() as mirror_path:
+            if mirror_path is not None:
+                # Objects are copied from the mirror, only the objects missing
+                # from it are downloaded.
+                command.extend(["--reference-if-able", mirror_path, "--dissociate"])
+            self._run(command + [self.source, self.source_dir], **self._call_kwargs)
 
         if self.source_commit:
             self._fetch_origin_commit()
 
             self._run(
                 [self.command, "-C", self.source_dir, "checkout", self.source_commit],
-                **self._call_kwargs
+                **self._call_kwargs,
             )
 
     def is_local(self):
@@ -0,0 +1,263 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Concurrent downloads of the sources of parts, ahead of pulling them.
+
+Remote file sources with a source-checksum are downloaded into the file
+cache, under their checksum, and other remote file sources into a
+directory for the run, as nothing verifies what they are. The handler of
+each source is pointed at the downloaded file, so pulling the source is
+then a local copy of it.
+
+The mirrors of remote git sources are created or updated in the git
+mirror cache, so pulling the source only copies objects from its mirror.
+
+Sources failing to download are left for their part to pull, which
+reports the error in the context of the part.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import requests
+
+from snapcraft_legacy.internal.cache import FileCache
+
+from . import errors
+from ._base import Base, FileBase
+from ._checksum import split_checksum
+from ._git import Git
+
+logger = logging.getLogger(__name__)
+
+MAX_JOBS = 8
+MAX_JOBS_PER_HOST = 4
+
+_CHUNK_SIZE = 1024 * 1024
+_DEFAULT_ALGORITHM = "sha384"
+
+
+class PrefetchResult(NamedTuple):
+    source: str
+    path: str
+    size: int
+    elapsed: float
+    cached: bool
+
+
+def prefetch(
+    handlers: Sequence[Optional[Base]],
+    *,
+    download_dir: str,
+    max_jobs: int = MAX_JOBS,
+    max_jobs_per_host: int = MAX_JOBS_PER_HOST,
+) -> List[PrefetchResult]:
+    """Download the remote file sources and update the git mirrors of
+    handlers concurrently.
+
+    :param handlers: the source handlers of the parts to pull.
+    :param download_dir: the directory to download sources without a
+        source-checksum to, it must be kept until the sources are pulled.
+    :param max_jobs: the maximum number of concurrent downloads.
+    :param max_jobs_per_host: the maximum number of concurrent downloads
+        from the same host.
+    :returns: the file sources prefetched.
+    """
+    to_prefetch = [
+        h for h in handlers if isinstance(h, FileBase) and _should_prefetch(h)
+    ]
+    to_mirror = [
+        h for h in handlers if isinstance(h, Git) and h.prefetched_mirror is None
+    ]
+    if not to_prefetch and not to_mirror:
+        return []
+
+    host_semaphores: Dict[str, threading.BoundedSemaphore] = dict()
+    for handler in to_prefetch + to_mirror:
+        host = _get_host(handler.source)
+        if host not in host_semaphores:
+            host_semaphores[host] = threading.BoundedSemaphore(max_jobs_per_host)
+
+    def prefetch_source(handler: FileBase) -> Optional[PrefetchResult]:
+        with host_semaphores[_get_host(handler.source)]:
+            return _prefetch_source(handler, download_dir)
+
+    def prefetch_mirror(handler: Git) -> Optional[str]:
+        with host_semaphores[_get_host(handler.source)]:
+            return _prefetch_mirror(handler)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, max_jobs)) as executor:
+        mirror_futures = [executor.submit(prefetch_mirror, h) for h in to_mirror]
+        results = [r for r in executor.map(prefetch_source, to_prefetch) if r]
+        mirrors = [f.result() for f in mirror_futures if f.result()]
+
+    downloaded = [r for r in results if not r.cached]
+    if downloaded:
+        logger.info(
+            "Prefetched {} sources ({}) in {:.1f}s".format(
+                len(downloaded),
+                _format_size(sum(r.size for r in downloaded)),
+                time.monotonic() - start,
+            )
+        )
+    if mirrors:
+        logger.info(
+            "Updated {} git mirrors in {:.1f}s".format(
+                len(mirrors), time.monotonic() - start
+            )
+        )
+    return results
+
+
+def _get_host(source: str) -> str:
+    # scp-like git sources, e.g. git@example.com:repo.git, have no scheme.
+    return (
+        urllib.parse.urlparse(source).netloc
+        or source.split(":", 1)[0].rpartition("@")[2]
+    )
+
+
+def _should_prefetch(handler: FileBase) -> bool:
+    return handler.prefetched_file is None and urllib.parse.urlparse(
+        handler.source
+    ).scheme in ("http", "https")
+
+
+def _prefetch_source(handler: FileBase, download_dir: str) -> Optional[PrefetchResult]:
+    start = time.monotonic()
+    file_cache = FileCache()
+    if handler.source_checksum:
+        algorithm, digest = split_checksum(handler.source_checksum)
+        cache_file = file_cache.get(algorithm=algorithm, hash=digest)
+        if cache_file:
+            handler.prefetched_file = cache_file
+            return PrefetchResult(
+                handler.source, cache_file, os.path.getsize(cache_file), 0.0, True
+            )
+    else:
+        return _prefetch_unverified_source(handler, download_dir)
+
+    os.makedirs(file_cache.file_cache, exist_ok=True)
+    try:
+        with tempfile.TemporaryDirectory(
+            prefix=".prefetch-", dir=file_cache.file_cache
+        ) as tmp_dir:
+            download_path = _get_download_path(handler, tmp_dir)
+            calculated = _download(handler.source, download_path, algorithm)
+            if calculated != digest:
+                raise errors.DigestDoesNotMatchError(digest, calculated)
+            size = os.path.getsize(download_path)
+            cache_file = file_cache.cache(
+                filename=download_path,
+                algorithm=algorithm,
+                hash=calculated,
+                verify=False,
+            )
+    except (
+        requests.exceptions.RequestException,
+        OSError,
+        errors.SnapcraftSourceError,
+    ) as e:
+        logger.debug("Unable to prefetch {!r}: {}".format(handler.source, e))
+        return None
+
+    if cache_file is None:
+        return None
+
+    return _prefetched(handler, cache_file, size, start, verified=True)
+
+
+def _prefetch_mirror(handler: Git) -> Optional[str]:
+    start = time.monotonic()
+    mirror_path = handler.prefetch_mirror()
+    if mirror_path is not None:
+        logger.debug(
+            "Updated the git mirror of {!r} in {:.1f}s".format(
+                handler.source, time.monotonic() - start
+            )
+        )
+    return mirror_path
+
+
+def _prefetch_unverified_source(
+    handler: FileBase, download_dir: str
+) -> Optional[PrefetchResult]:
+    """Download a source without a source-checksum into download_dir.
+
+    These downloads are not cached, as the same URL may serve different
+    files over time.
+    """
+    start = time.monotonic()
+    try:
+        download_path = _get_download_path(
+            handler, tempfile.mkdtemp(prefix="prefetch-", dir=download_dir)
+        )
+        _download(handler.source, download_path, _DEFAULT_ALGORITHM)
+        size = os.path.getsize(download_path)
+    except (requests.exceptions.RequestException, OSError) as e:
+        logger.debug("Unable to prefetch {!r}: {}".format(handler.source, e))
+        return None
+
+    return _prefetched(handler, download_path, size, start, verified=False)
+
+
+def _prefetched(
+    handler: FileBase, path: str, size: int, start: float, *, verified: bool
+) -> PrefetchResult:
+    elapsed = time.monotonic() - start
+    logger.debug(
+        "Prefetched {!r}: {} in {:.1f}s ({}/s)".format(
+            handler.source,
+            _format_size(size),
+            elapsed,
+            _format_size(size / elapsed if elapsed else size),
+        )
+    )
+    handler.prefetched_file = path
+    handler.prefetched_file_verified = verified
+    return PrefetchResult(handler.source, path, size, elapsed, False)
+
+
+def _get_download_path(handler: FileBase, download_dir: str) -> str:
+    return os.path.join(download_dir, os.path.basename(handler.source) or "source")
+
+
+def _download(url: str, download_path: str, algorithm: str) -> str:
+    """Download url to download_path, without progress bars as downloads
+    run concurrently.
+
+    :returns: the hash of the download, calculated with algorithm.
+    """
+    hasher = getattr(hashlib, algorithm)()
+    with requests.get(url, stream=True, allow_redirects=True) as response:
+        response.raise_for_status()
+        with open(download_path, "wb") as download_file:
+            for buf in response.iter_content(_CHUNK_SIZE):
+                download_file.write(buf)
+                hasher.update(buf)
+    return hasher.hexdigest()
+
+
+def _format_size(size: float) -> str:
+    return "{:.1f} MiB".format(size / 1024 / 1024)
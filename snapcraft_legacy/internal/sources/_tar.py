@@ -14,15 +14,38 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import contextlib
+import logging
 import os
 import re
 import shutil
+import subprocess
 import tarfile
 import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from . import errors
 from ._base import FileBase
 
+logger = logging.getLogger(__name__)
+
+# Parallel decompressors for the compression formats, by magic number, in
+# order of preference.
+_DECOMPRESSORS = (
+    (b"\x1f\x8b", (["pigz", "-d", "-c"],)),
+    (b"\xfd7zXZ\x00", (["xz", "-d", "-c", "-T0"],)),
+    (b"\x28\xb5\x2f\xfd", (["zstd", "-d", "-c", "-T0"],)),
+    (b"BZh", (["lbzip2", "-d", "-c"], ["pbzip2", "-d", "-c"])),
+)
+
+# Files are written by a pool of threads, the size of the files read from
+# the tarball and waiting to be written is bounded, larger files are
+# extracted as they are read.
+_MAX_WRITERS = min(32, (os.cpu_count() or 1) + 4)
+_MAX_PENDING_BYTES = 64 * 1024 * 1024
+
 
 class Tar(FileBase):
     def __init__(
@@ -75,47 +98,212 @@ class Tar(FileBase):
             os.remove(tarball)
 
     def _extract(self, tarball, dst):
-        with tarfile.open(tarball) as tar:
-
-            def filter_members(tar):
-                """Filters members and member names:
-                - strips common prefix
-                - bans dangerous names"""
-                members = tar.getmembers()
-                common = os.path.commonprefix([m.name for m in members])
-
-                # commonprefix() works a character at a time and will
-                # consider "d/ab" and "d/abc" to have common prefix "d/ab";
-                # check all members either start with common dir
-                for m in members:
-                    if not (
-                        m.name.startswith(common + "/")
-                        or m.isdir()
-                        and m.name == common
-                    ):
-                        # commonprefix() didn't return a dir name; go up one
-                        # level
-                        common = os.path.dirname(common)
-                        break
-
-                for m in members:
-                    if m.name == common:
-                        continue
-                    self._strip_prefix(common, m)
-                    # We mask all files to be writable to be able to easily
-                    # extract on top.
-                    m.mode = m.mode | 0o200
-                    yield m
-
-            tar.extractall(members=filter_members(tar), path=dst)
-
-    def _strip_prefix(self, common, member):
-        if member.name.startswith(common + "/"):
-            member.name = member.name[len(common + "/") :]
-        # strip leading '/', './' or '../' as many times as needed
-        member.name = re.sub(r"^(\.{0,2}/)*", r"", member.name)
-        # do the same for linkname if this is a hardlink
-        if member.islnk() and not member.issym():
-            if member.linkname.startswith(common + "/"):
-                member.linkname = member.linkname[len(common + "/") :]
-            member.linkname = re.sub(r"^(\.{0,2}/)*", r"", member.linkname)
+        # Members are extracted in a single pass, before the common prefix
+        # is known, to a staging directory next to the destination. The
+        # contents under the common prefix are then moved into place.
+        os.makedirs(dst, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix=".snapcraft-tar-", dir=dst) as staging:
+            with _open_stream(tarball) as tar:
+                members = _StreamExtractor(tar, staging).extract()
+
+            common = _get_common_prefix(members)
+            # The staged names are sanitized, do the same with the prefix.
+            prefix = _sanitize(common + "/") if common else ""
+            _move_tree(os.path.join(staging, prefix), dst)
+
+
+def _sanitize(name: str) -> str:
+    """Strip leading '/', './' or '../' as many times as needed."""
+    return re.sub(r"^(\.{0,2}/)*", r"", name)
+
+
+def _get_common_prefix(members: List[Tuple[str, bool]]) -> str:
+    """Get the directory all members are in.
+
+    :param members: the name of each member and whether it is a directory.
+    """
+    common = os.path.commonprefix([name for name, _ in members])
+
+    # commonprefix() works a character at a time and will
+    # consider "d/ab" and "d/abc" to have common prefix "d/ab";
+    # check all members either start with common dir
+    for name, is_dir in members:
+        if not (name.startswith(common + "/") or is_dir and name == common):
+            # commonprefix() didn't return a dir name; go up one
+            # level
+            return os.path.dirname(common)
+
+    return common
+
+
+def _get_decompressor(tarball: str) -> Optional[List[str]]:
+    """Get a parallel decompressor command for tarball, if one is installed."""
+    with open(tarball, "rb") as tar_file:
+        magic = tar_file.read(6)
+
+    for signature, commands in _DECOMPRESSORS:
+        if magic.startswith(signature):
+            for command in commands:
+                if shutil.which(command[0]):
+                    return command
+    return None
+
+
+@contextlib.contextmanager
+def _open_stream(tarball: str) -> Iterator[tarfile.TarFile]:
+    """Open tarball for reading as a stream.
+
+    Compressed tarballs are decompressed by an external parallel
+    decompressor when available, falling back to tarfile otherwise.
+    """
+    command = _get_decompressor(tarball)
+    if command is None:
+        with tarfile.open(tarball, mode="r|*") as tar:
+            yield tar
+        return
+
+    command = command + [tarball]
+    logger.debug("Decompressing with {!r}".format(command))
+    with subprocess.Popen(
+        command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    ) as process:
+        try:
+            with tarfile.open(fileobj=process.stdout, mode="r|") as tar:
+                yield tar
+            # Read the padding after the end of the archive, for the
+            # decompressor to exit cleanly.
+            while process.stdout.read(1024 * 1024):  # type: ignore
+                pass
+        except tarfile.ReadError as error:
+            # Report the decompressor failing rather than the truncated stream,
+            # closing the pipe stops it otherwise.
+            process.stdout.close()  # type: ignore
+            if process.wait() > 0:
+                raise errors.SnapcraftPullError(command, process.returncode) from error
+            raise
+        except BaseException:
+            process.kill()
+            raise
+
+    if process.returncode != 0:
+        raise errors.SnapcraftPullError(command, process.returncode)
+
+
+class _StreamExtractor:
+    """Extract the members of a tarball opened as a stream.
+
+    Member names are sanitized as they are read. Regular files are read
+    from the stream in order and written by a pool of threads, with the
+    size of the data waiting to be written bounded. Large files, directories
+    and other members are extracted as they are read, and hard links once
+    all the files are written. Like with tarfile's extractall(), the
+    attributes of directories are set last.
+
+    :param tar: the tarball, opened as a stream.
+    :param path: the directory to extract to.
+    """
+
+    def __init__(self, tar: tarfile.TarFile, path: str) -> None:
+        self._tar = tar
+        self._path = path
+        self._condition = threading.Condition()
+        self._pending_bytes = 0
+        self._pending: Dict[str, Future] = {}
+
+    def extract(self) -> List[Tuple[str, bool]]:
+        """Extract all the members.
+
+        :returns: the original name of each member and whether it is a
+            directory.
+        """
+        members = []
+        directories = []
+        hardlinks = []
+        with ThreadPoolExecutor(max_workers=_MAX_WRITERS) as executor:
+            for member in self._tar:
+                # Do not keep all the members read in memory.
+                self._tar.members = []  # type: ignore
+
+                members.append((member.name, member.isdir()))
+                member.name = _sanitize(member.name)
+                if member.islnk() and not member.issym():
+                    member.linkname = _sanitize(member.linkname)
+                # We mask all files to be writable to be able to easily
+                # extract on top.
+                member.mode = member.mode | 0o200
+
+                self._wait_for(member.name)
+                if member.islnk():
+                    hardlinks.append(member)
+                elif member.isreg() and member.size <= _MAX_PENDING_BYTES:
+                    data = self._read(member)
+                    self._pending[member.name] = executor.submit(
+                        self._write, member, data
+                    )
+                elif member.isdir():
+                    directories.append(member)
+                    self._tar.extract(member, self._path, set_attrs=False)
+                else:
+                    self._tar.extract(member, self._path)
+
+            for future in self._pending.values():
+                future.result()
+
+        for member in hardlinks:
+            self._tar.extract(member, self._path)
+
+        # Set the attributes of the innermost directories first.
+        directories.sort(key=lambda d: d.name, reverse=True)
+        for member in directories:
+            target = os.path.join(self._path, member.name)
+            self._tar.chown(member, target, numeric_owner=False)
+            self._tar.utime(member, target)
+            self._tar.chmod(member, target)
+
+        return members
+
+    def _wait_for(self, name: str) -> None:
+        """Wait for a pending write to name, later members replace it."""
+        future = self._pending.pop(name, None)
+        if future is not None:
+            future.result()
+
+    def _read(self, member: tarfile.TarInfo) -> bytes:
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._pending_bytes + member.size <= _MAX_PENDING_BYTES
+            )
+            self._pending_bytes += member.size
+
+        tar_file = self._tar.extractfile(member)
+        return tar_file.read() if tar_file is not None else b""
+
+    def _write(self, member: tarfile.TarInfo, data: bytes) -> None:
+        try:
+            target = os.path.join(self._path, member.name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as target_file:
+                target_file.write(data)
+            self._tar.chown(member, target, numeric_owner=False)
+            self._tar.chmod(member, target)
+            self._tar.utime(member, target)
+        finally:
+            with self._condition:
+                self._pending_bytes -= member.size
+                self._condition.notify_all()
+
+
+def _move_tree(source: str, destination: str) -> None:
+    """Move the contents of source into destination, replacing entries."""
+    for entry in os.scandir(source):
+        target = os.path.join(destination, entry.name)
+        target_is_dir = os.path.isdir(target) and not os.path.islink(target)
+        if entry.is_dir(follow_symlinks=False) and target_is_dir:
+            _move_tree(entry.path, target)
+            continue
+
+        if target_is_dir:
+            shutil.rmtree(target)
+        elif os.path.lexists(target):
+            os.remove(target)
+        os.rename(entry.path, target)
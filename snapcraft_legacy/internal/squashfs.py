@@ -0,0 +1,460 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Read-only access to files in squashfs 4.0 images.
+
+Only the parts of the format needed to look up a path, read a regular file
+and list the regular files are implemented, the image is never extracted to
+disk. Only the
+compression algorithms available in the standard library (gzip, lzma and
+xz) are supported, reading images using other algorithms raises
+SquashfsCompressionNotSupportedError so that callers can fall back to
+unsquashfs.
+"""
+
+import collections
+import lzma
+import mmap
+import os
+import struct
+import zlib
+from pathlib import PurePosixPath
+from typing import Callable, Dict, Iterator, List, NamedTuple, Tuple, Union
+
+from snapcraft_legacy.internal import errors
+
+_DECOMPRESSION_ERRORS = (zlib.error, lzma.LZMAError)
+
+_SUPERBLOCK = struct.Struct("<IIIIIHHHHHHQQQQQQQQ")
+_INODE_HEADER = struct.Struct("<HHHHII")
+_DIRECTORY_HEADER = struct.Struct("<III")
+_DIRECTORY_ENTRY = struct.Struct("<HhHH")
+_FRAGMENT_ENTRY = struct.Struct("<QII")
+
+_MAGIC = 0x73717368
+_METADATA_SIZE = 8192
+_METADATA_UNCOMPRESSED = 0x8000
+_DATA_UNCOMPRESSED = 0x1000000
+_FRAGMENTS_PER_BLOCK = _METADATA_SIZE // _FRAGMENT_ENTRY.size
+_NO_FRAGMENT = 0xFFFFFFFF
+_MAX_SYMLINKS = 40
+
+_BASIC_DIRECTORY = 1
+_BASIC_FILE = 2
+_BASIC_SYMLINK = 3
+_EXTENDED_DIRECTORY = 8
+_EXTENDED_FILE = 9
+_EXTENDED_SYMLINK = 10
+
+# The size of the fixed part of the supported inode types, after the header.
+_INODE_SIZES = {
+    _BASIC_DIRECTORY: 16,
+    _BASIC_FILE: 16,
+    _BASIC_SYMLINK: 8,
+    _EXTENDED_DIRECTORY: 24,
+    _EXTENDED_FILE: 40,
+    _EXTENDED_SYMLINK: 8,
+}
+
+_COMPRESSION_NAMES = {1: "gzip", 2: "lzma", 3: "lzo", 4: "xz", 5: "lz4", 6: "zstd"}
+
+
+class _Directory(NamedTuple):
+    start: int
+    offset: int
+    size: int
+
+
+class _File(NamedTuple):
+    blocks_start: int
+    file_size: int
+    fragment: int
+    fragment_offset: int
+    block_sizes: Tuple[int, ...]
+
+
+class _Symlink(NamedTuple):
+    target: str
+
+
+class _Other(NamedTuple):
+    inode_type: int
+
+
+_Inode = Union[_Directory, _File, _Symlink, _Other]
+
+
+class SquashfsFile(NamedTuple):
+    """A regular file in a squashfs image.
+
+    :ivar path: The file path, relative to the image root.
+    :ivar size: The file size.
+    :ivar stored_size: The number of bytes used to store its data blocks. The
+        part of the file stored in a fragment block is counted as stored
+        uncompressed.
+    """
+
+    path: str
+    size: int
+    stored_size: int
+
+
+def _get_decompressor(compression_id: int) -> Callable[[bytes], bytes]:
+    """Return a function to decompress a block."""
+    if compression_id == 1:
+        return zlib.decompress
+    if compression_id == 2:
+        return lambda data: lzma.decompress(data, format=lzma.FORMAT_ALONE)
+    if compression_id == 4:
+        return lambda data: lzma.decompress(data, format=lzma.FORMAT_XZ)
+
+    raise errors.SquashfsCompressionNotSupportedError(
+        compression=_COMPRESSION_NAMES.get(compression_id, str(compression_id))
+    )
+
+
+class SquashfsImage:
+    """A squashfs image opened for reading.
+
+    :param str path: Path to the squashfs image.
+
+    :raises SnapDataExtractionError: if the file is not a squashfs image.
+    :raises SquashfsCompressionNotSupportedError: if the image compression
+        cannot be decompressed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._name = os.path.basename(path)
+        with open(path, "rb") as image_file:
+            try:
+                self._data = mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as error:
+                # an empty file cannot be mapped
+                raise errors.SnapDataExtractionError(self._name) from error
+
+        self._metadata_cache: Dict[int, Tuple[bytes, int]] = {}
+        try:
+            self._read_superblock()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self) -> "SquashfsImage":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the mapped image."""
+        self._data.close()
+
+    def read_file(self, path: str) -> bytes:
+        """Read the contents of a regular file in the image.
+
+        Symbolic links are followed inside the image.
+
+        :param str path: Path to the file, relative to the image root.
+
+        :raises FileNotFoundError: if there is no file at path.
+        :raises IsADirectoryError: if path is a directory.
+        :raises SnapDataExtractionError: if the image is corrupted.
+        """
+        try:
+            inode = self._lookup(path)
+            if isinstance(inode, _Directory):
+                raise IsADirectoryError(path)
+            if not isinstance(inode, _File):
+                raise FileNotFoundError(path)
+            return self._read_file_data(inode)
+        except (struct.error, IndexError, ValueError) as error:
+            raise errors.SnapDataExtractionError(self._name) from error
+
+    def iter_files(self) -> Iterator[SquashfsFile]:
+        """Iterate over the regular files in the image.
+
+        Symbolic links are not followed.
+
+        :raises SnapDataExtractionError: if the image is corrupted.
+        """
+        try:
+            directories = [("", self._read_inode(self._root_inode))]
+            while directories:
+                prefix, directory = directories.pop()
+                if not isinstance(directory, _Directory):
+                    continue
+                for name, reference in self._list_directory(directory):
+                    path = prefix + name.decode(errors="surrogateescape")
+                    inode = self._read_inode(reference)
+                    if isinstance(inode, _Directory):
+                        directories.append((path + "/", inode))
+                    elif isinstance(inode, _File):
+                        yield SquashfsFile(
+                            path=path,
+                            size=inode.file_size,
+                            stored_size=self._get_stored_size(inode),
+                        )
+        except (struct.error, IndexError, ValueError) as error:
+            raise errors.SnapDataExtractionError(self._name) from error
+
+    def _get_stored_size(self, inode: _File) -> int:
+        stored_size = sum(size & ~_DATA_UNCOMPRESSED for size in inode.block_sizes)
+        if inode.fragment != _NO_FRAGMENT:
+            stored_size += inode.file_size - len(inode.block_sizes) * self._block_size
+        return stored_size
+
+    def _read_superblock(self) -> None:
+        if len(self._data) < _SUPERBLOCK.size:
+            raise errors.SnapDataExtractionError(self._name)
+
+        (
+            magic,
+            _,  # inode count
+            _,  # modification time
+            self._block_size,
+            _,  # fragment count
+            compression_id,
+            _,  # block log
+            _,  # flags
+            _,  # id count
+            version_major,
+            _,  # version minor
+            self._root_inode,
+            _,  # bytes used
+            _,  # id table start
+            _,  # xattr id table start
+            self._inode_table_start,
+            self._directory_table_start,
+            self._fragment_table_start,
+            _,  # export table start
+        ) = _SUPERBLOCK.unpack_from(self._data)
+
+        if magic != _MAGIC or version_major != 4:
+            raise errors.SnapDataExtractionError(self._name)
+
+        self._decompress = _get_decompressor(compression_id)
+
+    def _lookup(self, path: str) -> _Inode:
+        """Find the inode for path, following symbolic links."""
+        parts = collections.deque(PurePosixPath(path).parts)
+        directories: List[_Inode] = [self._read_inode(self._root_inode)]
+        followed_links = 0
+
+        while parts:
+            name = parts.popleft()
+            if name in ("/", "."):
+                continue
+            if name == "..":
+                if len(directories) > 1:
+                    directories.pop()
+                continue
+
+            directory = directories[-1]
+            if not isinstance(directory, _Directory):
+                raise FileNotFoundError(path)
+
+            inode = self._read_inode(self._find_entry(directory, name, path))
+            if isinstance(inode, _Symlink):
+                followed_links += 1
+                if followed_links > _MAX_SYMLINKS:
+                    raise FileNotFoundError(path)
+                target = PurePosixPath(inode.target)
+                if target.is_absolute():
+                    del directories[1:]
+                parts.extendleft(reversed(target.parts))
+                continue
+
+            directories.append(inode)
+
+        return directories[-1]
+
+    def _find_entry(self, directory: _Directory, name: str, path: str) -> int:
+        """Obtain the reference to the inode of a directory entry."""
+        encoded_name = name.encode()
+        for entry_name, reference in self._list_directory(directory):
+            if entry_name == encoded_name:
+                return reference
+
+        raise FileNotFoundError(path)
+
+    def _list_directory(self, directory: _Directory) -> Iterator[Tuple[bytes, int]]:
+        """Iterate over the names and inode references of directory entries."""
+        # The directory size includes 3 bytes for the implicit . and .. entries.
+        listing = self._read_metadata(
+            self._directory_table_start + directory.start,
+            directory.offset,
+            max(directory.size - 3, 0),
+        )
+
+        position = 0
+        while position < len(listing):
+            count, start, _ = _DIRECTORY_HEADER.unpack_from(listing, position)
+            position += _DIRECTORY_HEADER.size
+            for _ in range(count + 1):
+                offset, _, _, name_size = _DIRECTORY_ENTRY.unpack_from(
+                    listing, position
+                )
+                position += _DIRECTORY_ENTRY.size
+                entry_name = listing[position : position + name_size + 1]
+                position += name_size + 1
+                yield entry_name, (start << 16) | offset
+
+    def _read_inode(self, reference: int) -> _Inode:
+        start = self._inode_table_start + (reference >> 16)
+        offset = reference & 0xFFFF
+
+        # Read the header, then the fixed size part for the inode type and
+        # the variable size part once its size is known.
+        header = self._read_metadata(start, offset, _INODE_HEADER.size)
+        inode_type = _INODE_HEADER.unpack(header)[0]
+        if inode_type not in _INODE_SIZES:
+            return _Other(inode_type=inode_type)
+
+        body = _INODE_HEADER.size
+        fixed = self._read_metadata(start, offset, body + _INODE_SIZES[inode_type])
+
+        if inode_type == _BASIC_DIRECTORY:
+            block, _, size, block_offset, _ = struct.unpack_from("<IIHHI", fixed, body)
+            return _Directory(start=block, offset=block_offset, size=size)
+
+        if inode_type == _EXTENDED_DIRECTORY:
+            _, size, block, _, _, block_offset, _ = struct.unpack_from(
+                "<IIIIHHI", fixed, body
+            )
+            return _Directory(start=block, offset=block_offset, size=size)
+
+        if inode_type == _BASIC_FILE:
+            blocks_start, fragment, fragment_offset, file_size = struct.unpack_from(
+                "<IIII", fixed, body
+            )
+            body += 16
+        elif inode_type == _EXTENDED_FILE:
+            (
+                blocks_start,
+                file_size,
+                _,  # sparse
+                _,  # link count
+                fragment,
+                fragment_offset,
+                _,  # xattr index
+            ) = struct.unpack_from("<QQQIIII", fixed, body)
+            body += 40
+        elif inode_type in (_BASIC_SYMLINK, _EXTENDED_SYMLINK):
+            _, target_size = struct.unpack_from("<II", fixed, body)
+            data = self._read_metadata(start, offset, body + 8 + target_size)
+            return _Symlink(target=data[body + 8 :].decode())
+
+        if fragment == _NO_FRAGMENT:
+            block_count = -(-file_size // self._block_size)
+        else:
+            block_count = file_size // self._block_size
+
+        data = self._read_metadata(start, offset, body + 4 * block_count)
+        return _File(
+            blocks_start=blocks_start,
+            file_size=file_size,
+            fragment=fragment,
+            fragment_offset=fragment_offset,
+            block_sizes=struct.unpack_from(f"<{block_count}I", data, body),
+        )
+
+    def _read_file_data(self, inode: _File) -> bytes:
+        contents = bytearray()
+        position = inode.blocks_start
+        for index, block_size in enumerate(inode.block_sizes):
+            size = block_size & ~_DATA_UNCOMPRESSED
+            if size == 0:
+                # a sparse block
+                expected = inode.file_size - index * self._block_size
+                contents += bytes(min(self._block_size, expected))
+                continue
+
+            contents += self._read_block(position, block_size)
+            position += size
+
+        if inode.fragment != _NO_FRAGMENT:
+            fragment = self._read_fragment(inode.fragment)
+            remaining = inode.file_size - len(contents)
+            contents += fragment[
+                inode.fragment_offset : inode.fragment_offset + remaining
+            ]
+
+        if len(contents) != inode.file_size:
+            raise ValueError("unexpected file size")
+
+        return bytes(contents)
+
+    def _read_fragment(self, index: int) -> bytes:
+        pointer_position = (
+            self._fragment_table_start + (index // _FRAGMENTS_PER_BLOCK) * 8
+        )
+        (metadata_position,) = struct.unpack_from("<Q", self._data, pointer_position)
+        entry = self._read_metadata(
+            metadata_position,
+            (index % _FRAGMENTS_PER_BLOCK) * _FRAGMENT_ENTRY.size,
+            _FRAGMENT_ENTRY.size,
+        )
+        start, block_size, _ = _FRAGMENT_ENTRY.unpack(entry)
+        return self._read_block(start, block_size)
+
+    def _read_block(self, position: int, block_size: int) -> bytes:
+        """Read a data block or fragment block."""
+        size = block_size & ~_DATA_UNCOMPRESSED
+        data = self._data[position : position + size]
+        if len(data) != size:
+            raise ValueError("block beyond end of image")
+
+        if block_size & _DATA_UNCOMPRESSED:
+            return data
+
+        return self._decompress_block(data)
+
+    def _decompress_block(self, data: bytes) -> bytes:
+        try:
+            return self._decompress(data)
+        except _DECOMPRESSION_ERRORS as error:
+            raise ValueError(f"cannot decompress block: {error}") from error
+
+    def _read_metadata(self, position: int, offset: int, length: int) -> bytes:
+        """Read length bytes from consecutive metadata blocks."""
+        result = bytearray()
+        while len(result) < length:
+            block, next_position = self._read_metadata_block(position)
+            chunk = block[offset : offset + length - len(result)]
+            if not chunk:
+                raise ValueError("metadata beyond end of block")
+            result += chunk
+            offset = 0
+            position = next_position
+
+        return bytes(result)
+
+    def _read_metadata_block(self, position: int) -> Tuple[bytes, int]:
+        """Read a metadata block, returning it and the next block position."""
+        if position in self._metadata_cache:
+            return self._metadata_cache[position]
+
+        (header,) = struct.unpack_from("<H", self._data, position)
+        size = header & ~_METADATA_UNCOMPRESSED
+        data = self._data[position + 2 : position + 2 + size]
+        if len(data) != size:
+            raise ValueError("metadata block beyond end of image")
+
+        if not header & _METADATA_UNCOMPRESSED:
+            data = self._decompress_block(data)
+
+        self._metadata_cache[position] = (data, position + 2 + size)
+        return self._metadata_cache[position]
@@ -0,0 +1,406 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Parallel and resumable downloads, verified while downloading.
+
+When the server accepts range requests, the file is split in parts that
+are downloaded concurrently into a partial file next to the destination.
+The progress of each part is stored in a journal, so an interrupted
+download is resumed from where it stopped.
+
+The sha3-384 of the file is calculated in order as data arrives. Data
+written ahead of the hashed offset by other parts is read back from the
+partial file, most likely from the page cache, once the offset reaches it.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+from typing import Any, Dict, List, Optional, Tuple
+
+import craft_store
+import requests
+
+from snapcraft_legacy.internal.indicators import _init_progress_bar, is_dumb_terminal
+
+from . import agent, errors
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024
+_JOURNAL_FORMAT_VERSION = 1
+
+DEFAULT_JOBS = 4
+MIN_PART_SIZE = 16 * 1024 * 1024
+MAX_ATTEMPTS = 5
+
+_DownloadErrors = (
+    requests.exceptions.RequestException,
+    craft_store.errors.NetworkError,
+    craft_store.errors.StoreServerError,
+)
+
+
+def download(
+    url: str,
+    download_path: str,
+    *,
+    sha3_384: str,
+    jobs: int = DEFAULT_JOBS,
+    min_part_size: int = MIN_PART_SIZE,
+) -> None:
+    """Download url to download_path, verifying its sha3-384.
+
+    download_path is only written once the download is complete and
+    verified.
+
+    :param url: The URL to download.
+    :param download_path: The path to write the download to.
+    :param sha3_384: The expected sha3-384 of the download.
+    :param jobs: The maximum number of parts downloaded concurrently.
+    :param min_part_size: The smallest size of a part.
+    :raises errors.SHAMismatchError: if the download does not match sha3_384.
+    """
+    http_client = craft_store.HTTPClient(user_agent=agent.get_user_agent())
+    partial_path = download_path + ".partial"
+
+    download_url, size = _probe(http_client, url)
+    calculated: Optional[str] = None
+    if size is not None:
+        try:
+            calculated = _RangeDownload(
+                http_client,
+                url=download_url,
+                journal_key=url,
+                size=size,
+                download_path=download_path,
+                jobs=jobs,
+                min_part_size=min_part_size,
+            ).download()
+        except errors.StoreDownloadRangeError as error:
+            logger.debug(str(error))
+
+    if calculated is None:
+        calculated = _download_stream(http_client, download_url, download_path)
+
+    if calculated != sha3_384:
+        os.remove(partial_path)
+        raise errors.SHAMismatchError(
+            path=download_path, expected=sha3_384, calculated=calculated
+        )
+
+    os.replace(partial_path, download_path)
+
+
+def _probe(http_client: craft_store.HTTPClient, url: str) -> Tuple[str, Optional[int]]:
+    """Resolve redirections and find out if range requests are accepted.
+
+    :returns: The final URL and the size of the file, or None as the size
+        if the file cannot be downloaded in ranges.
+    """
+    try:
+        response = http_client.request("HEAD", url, allow_redirects=True)
+    except _DownloadErrors as error:
+        logger.debug("Cannot probe {!r}: {}".format(url, error))
+        return url, None
+
+    redirections = [h.headers["Location"] for h in response.history]
+    if redirections:
+        logger.debug("Redirections for {!r}: {}".format(url, ", ".join(redirections)))
+
+    if response.headers.get("Accept-Ranges") != "bytes":
+        return response.url, None
+
+    try:
+        return response.url, int(response.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return response.url, None
+
+
+def _download_stream(
+    http_client: craft_store.HTTPClient, url: str, download_path: str
+) -> str:
+    """Download url in a single stream, restarting on errors.
+
+    :returns: The sha3-384 of the download.
+    """
+    partial_path = download_path + ".partial"
+    attempts = 0
+    while True:
+        hasher = hashlib.sha3_384()
+        try:
+            response = http_client.request("GET", url, stream=True)
+            total_length = int(response.headers.get("Content-Length", "0"))
+            progress_bar = _init_progress_bar(total_length, download_path)
+            progress_bar.start()
+            total_read = 0
+            with open(partial_path, "wb") as partial_file:
+                for buf in response.iter_content(_CHUNK_SIZE):
+                    partial_file.write(buf)
+                    hasher.update(buf)
+                    total_read += len(buf)
+                    if not is_dumb_terminal():
+                        progress_bar.update(total_read)
+            progress_bar.finish()
+            return hasher.hexdigest()
+        except _DownloadErrors as error:
+            attempts += 1
+            logger.debug(
+                "Error while downloading: {!r}. "
+                "Retries left to download: {!r}.".format(error, MAX_ATTEMPTS - attempts)
+            )
+            if attempts >= MAX_ATTEMPTS:
+                raise
+            sleep(1)
+
+
+class _Part:
+    def __init__(self, start: int, end: int, written: Optional[int] = None) -> None:
+        self.start = start
+        self.end = end
+        self.written = start if written is None else written
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"start": self.start, "end": self.end, "written": self.written}
+
+
+class _OrderedHasher:
+    """Hash the contents of a file written in parts, in order.
+
+    :param fd: The file descriptor of the file, opened for reading.
+    :param parts: The contiguous parts the file is written in.
+    """
+
+    def __init__(self, fd: int, parts: List[_Part]) -> None:
+        self._fd = fd
+        self._parts = parts
+        self._hasher = hashlib.sha3_384()
+        self._offset = 0
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def update(self, offset: int, data: bytes) -> None:
+        """Hash data written at offset, and any data written ahead of it.
+
+        Must be called after the part containing offset is updated.
+        """
+        with self._lock:
+            if offset == self._offset:
+                self._hasher.update(data)
+                self._offset += len(data)
+            self._catch_up()
+
+    def hexdigest(self) -> str:
+        with self._lock:
+            self._catch_up()
+            return self._hasher.hexdigest()
+
+    def _catch_up(self) -> None:
+        while self._index < len(self._parts):
+            part = self._parts[self._index]
+            while self._offset < part.written:
+                data = os.pread(
+                    self._fd,
+                    min(_CHUNK_SIZE, part.written - self._offset),
+                    self._offset,
+                )
+                if not data:
+                    return
+                self._hasher.update(data)
+                self._offset += len(data)
+
+            if self._offset < part.end:
+                return
+            self._index += 1
+
+
+class _RangeDownload:
+    """Download a file in parts, using range requests.
+
+    :param url: The URL to download from.
+    :param journal_key: Identifies the download in the journal, redirected
+        URLs may differ between attempts.
+    """
+
+    def __init__(
+        self,
+        http_client: craft_store.HTTPClient,
+        *,
+        url: str,
+        journal_key: str,
+        size: int,
+        download_path: str,
+        jobs: int,
+        min_part_size: int,
+    ) -> None:
+        self._http_client = http_client
+        self._url = url
+        self._journal_key = journal_key
+        self._size = size
+        self._download_path = download_path
+        self._partial_path = download_path + ".partial"
+        self._journal_path = self._partial_path + ".json"
+        self._jobs = max(1, min(jobs, size // max(min_part_size, 1)))
+        self._lock = threading.Lock()
+        self._parts: List[_Part] = []
+        self._progress_bar: Any = None
+        self._total_read = 0
+
+    def download(self) -> str:
+        """Download the file to the partial path.
+
+        :returns: The sha3-384 of the download.
+        """
+        self._parts = self._load_journal() or self._get_parts()
+        self._save_journal()
+
+        fd = os.open(self._partial_path, os.O_RDWR | os.O_CREAT, 0o644)
+        completed = False
+        try:
+            os.ftruncate(fd, self._size)
+            hasher = _OrderedHasher(fd, self._parts)
+            self._total_read = sum(p.written - p.start for p in self._parts)
+            self._progress_bar = _init_progress_bar(self._size, self._download_path)
+            self._progress_bar.start()
+
+            with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+                list(
+                    executor.map(
+                        lambda part: self._download_part(part, fd, hasher),
+                        self._parts,
+                    )
+                )
+
+            self._progress_bar.finish()
+            calculated = hasher.hexdigest()
+            completed = True
+        finally:
+            os.close(fd)
+            if completed:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self._journal_path)
+            else:
+                self._save_journal()
+
+        return calculated
+
+    def _get_parts(self) -> List[_Part]:
+        part_size = -(-self._size // self._jobs)
+        return [
+            _Part(start, min(start + part_size, self._size))
+            for start in range(0, self._size, part_size)
+        ]
+
+    def _download_part(self, part: _Part, fd: int, hasher: _OrderedHasher) -> None:
+        attempts = 0
+        while part.written < part.end:
+            written = part.written
+            error: Optional[Exception] = None
+            try:
+                self._download_range(part, fd, hasher)
+            except craft_store.errors.StoreServerError as server_error:
+                # Servers answer range requests they cannot satisfy, or do
+                # not support, with a client error.
+                if server_error.response.status_code < 500:
+                    raise errors.StoreDownloadRangeError(
+                        url=self._url
+                    ) from server_error
+                error = server_error
+            except _DownloadErrors as download_error:
+                error = download_error
+            else:
+                if part.written > written:
+                    continue
+
+            attempts += 1
+            logger.debug(
+                "Error while downloading bytes {}-{} of {!r}: {!r}. "
+                "Retries left to download: {!r}.".format(
+                    part.written,
+                    part.end - 1,
+                    self._url,
+                    error or "empty response",
+                    MAX_ATTEMPTS - attempts,
+                )
+            )
+            if attempts >= MAX_ATTEMPTS:
+                if error is None:
+                    raise errors.StoreDownloadRangeError(url=self._url)
+                raise error
+            sleep(1)
+
+        self._save_journal()
+
+    def _download_range(self, part: _Part, fd: int, hasher: _OrderedHasher) -> None:
+        response = self._http_client.request(
+            "GET",
+            self._url,
+            headers={"Range": "bytes={}-{}".format(part.written, part.end - 1)},
+            stream=True,
+        )
+        if response.status_code != 206:
+            raise errors.StoreDownloadRangeError(url=self._url)
+
+        for buf in response.iter_content(_CHUNK_SIZE):
+            buf = buf[: part.end - part.written]
+            os.pwrite(fd, buf, part.written)
+            offset = part.written
+            part.written += len(buf)
+            hasher.update(offset, buf)
+            self._advance(len(buf))
+            if part.written == part.end:
+                break
+
+    def _advance(self, size: int) -> None:
+        with self._lock:
+            self._total_read += size
+            if not is_dumb_terminal():
+                self._progress_bar.update(self._total_read)
+
+    def _load_journal(self) -> Optional[List[_Part]]:
+        if not os.path.exists(self._partial_path):
+            return None
+
+        with contextlib.suppress(OSError, ValueError, KeyError, TypeError):
+            with open(self._journal_path) as journal_file:
+                data = json.load(journal_file)
+            if (
+                data["version"] == _JOURNAL_FORMAT_VERSION
+                and data["url"] == self._journal_key
+                and data["size"] == self._size
+            ):
+                logger.debug("Resuming download of {!r}".format(self._url))
+                return [_Part(**part) for part in data["parts"]]
+
+        return None
+
+    def _save_journal(self) -> None:
+        with self._lock:
+            data = {
+                "version": _JOURNAL_FORMAT_VERSION,
+                "url": self._journal_key,
+                "size": self._size,
+                "parts": [part.to_dict() for part in self._parts],
+            }
+            temp_path = self._journal_path + ".tmp"
+            with open(temp_path, "w") as journal_file:
+                json.dump(data, journal_file)
+            os.replace(temp_path, self._journal_path)
@@ -1,12 +1,230 @@
+import asyncio
+import email.utils
+import functools
 import itertools
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from queue import Queue
 from threading import Thread
 from time import sleep
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
+import craft_store
 import requests
 from progressbar import AnimatedMarker, ProgressBar, UnknownLength
 
-from . import constants, errors
+from . import errors
+
+logger = logging.getLogger(__name__)
+
+# Status codes the Snap Store can answer with while it is overloaded.
+_RETRY_STATUS_CODES = (429, 503)
+
+MAX_REQUEST_ERRORS = 10
+MAX_CONCURRENT_REQUESTS = 8
+
+RequestFunction = Callable[..., requests.Response]
+StatusCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class Backoff:
+    """Exponential backoff with jitter.
+
+    :param initial: The first delay, in seconds.
+    :param maximum: The largest delay, in seconds.
+    :param factor: The factor the delay grows by after each attempt.
+    :param jitter: The fraction of the delay that is randomized.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: float = 1.0,
+        maximum: float = 30.0,
+        factor: float = 2.0,
+        jitter: float = 0.5,
+    ) -> None:
+        self._initial = initial
+        self._maximum = maximum
+        self._factor = factor
+        self._jitter = jitter
+        self._delay = initial
+
+    def reset(self) -> None:
+        """Restart from the initial delay."""
+        self._delay = self._initial
+
+    def next_delay(self, retry_after: Optional[float] = None) -> float:
+        """Get the time to wait before the next attempt.
+
+        :param retry_after: The delay requested by the server, if any. It is
+            used instead of the computed delay when it is longer.
+        """
+        delay = self._delay * (1 - self._jitter * random.random())
+        self._delay = min(self._delay * self._factor, self._maximum)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse the value of a Retry-After header.
+
+    :param value: The header value, in seconds or as an HTTP date.
+    :returns: The delay in seconds, or None if value is not valid.
+    """
+    if not value:
+        return None
+
+    if value.strip().isdigit():
+        return float(value)
+
+    try:
+        retry_time = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_time - time.time())
+
+
+def _is_processed(status: Dict[str, Any]) -> bool:
+    return status.get("processed", False)
+
+
+class StatusPoller:
+    """Poll status URLs until the Snap Store finishes processing.
+
+    Requests are sent with ``request`` from a pool of threads, so that many
+    status URLs can be tracked concurrently over a single pooled session.
+
+    :param request: The function used to send requests, with the signature
+        of :meth:`requests.Session.request`.
+    :param on_status: Called with the status URL and the status obtained
+        after each request.
+    :param backoff: Creates the backoff used for each status URL.
+    """
+
+    def __init__(
+        self,
+        request: RequestFunction,
+        *,
+        on_status: Optional[StatusCallback] = None,
+        backoff: Callable[[], Backoff] = Backoff,
+    ) -> None:
+        self._request = request
+        self._on_status = on_status
+        self._backoff = backoff
+
+    def track(
+        self,
+        status_url: str,
+        *,
+        is_processed: Callable[[Dict[str, Any]], bool] = _is_processed,
+    ) -> Dict[str, Any]:
+        """Poll status_url until processed.
+
+        :param status_url: The URL to poll.
+        :param is_processed: Determines if the status is final.
+        :returns: The final status.
+        """
+        return self.track_many([status_url], is_processed=is_processed)[0]
+
+    def track_many(
+        self,
+        status_urls: Sequence[str],
+        *,
+        is_processed: Callable[[Dict[str, Any]], bool] = _is_processed,
+    ) -> List[Dict[str, Any]]:
+        """Poll status_urls concurrently until all of them are processed.
+
+        :param status_urls: The URLs to poll.
+        :param is_processed: Determines if a status is final.
+        :returns: The final status for each URL, in the same order.
+        """
+        return asyncio.run(
+            self.track_many_async(status_urls, is_processed=is_processed)
+        )
+
+    async def track_many_async(
+        self,
+        status_urls: Sequence[str],
+        *,
+        is_processed: Callable[[Dict[str, Any]], bool] = _is_processed,
+    ) -> List[Dict[str, Any]]:
+        """Poll status_urls concurrently until all of them are processed.
+
+        :param status_urls: The URLs to poll.
+        :param is_processed: Determines if a status is final.
+        :returns: The final status for each URL, in the same order.
+        """
+        max_workers = max(1, min(len(status_urls), MAX_CONCURRENT_REQUESTS))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(
+                await asyncio.gather(
+                    *(
+                        self._track_async(url, executor, is_processed)
+                        for url in status_urls
+                    )
+                )
+            )
+
+    async def _track_async(
+        self,
+        status_url: str,
+        executor: ThreadPoolExecutor,
+        is_processed: Callable[[Dict[str, Any]], bool],
+    ) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        backoff = self._backoff()
+        errors = 0
+        code = None
+        while True:
+            retry_after: Optional[float] = None
+            try:
+                response = await loop.run_in_executor(
+                    executor, functools.partial(self._request, "GET", status_url)
+                )
+            except (
+                craft_store.errors.StoreServerError,
+                craft_store.errors.NetworkError,
+            ) as error:
+                errors += 1
+                if errors >= MAX_REQUEST_ERRORS or not _is_retriable(error):
+                    raise
+                logger.debug(
+                    "Cannot get status from {!r}: {}".format(status_url, error)
+                )
+                retry_after = _get_retry_after(error)
+            else:
+                errors = 0
+                status = response.json()
+                if self._on_status is not None:
+                    self._on_status(status_url, status)
+                if is_processed(status):
+                    return status
+
+                # Poll again soon when the processing stage changes.
+                if status.get("code") != code:
+                    code = status.get("code")
+                    backoff.reset()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            await asyncio.sleep(backoff.next_delay(retry_after))
+
+
+def _is_retriable(error: Exception) -> bool:
+    if isinstance(error, craft_store.errors.StoreServerError):
+        status_code = error.response.status_code
+        return status_code in _RETRY_STATUS_CODES or status_code >= 500
+    return True
+
+
+def _get_retry_after(error: Exception) -> Optional[float]:
+    if isinstance(error, craft_store.errors.StoreServerError):
+        return parse_retry_after(error.response.headers.get("Retry-After"))
+    return None
 
 
 class StatusTracker:
@@ -68,20 +286,21 @@ class StatusTracker:
             return self.__messages.get("being_processed")
 
     def _update_status(self, queue):
-        for content in self._get_status():
-            queue.put(content)
-            if content["processed"]:
-                break
-            sleep(constants.SCAN_STATUS_POLL_DELAY)
+        try:
+            StatusPoller(
+                _request, on_status=lambda _, content: queue.put(content)
+            ).track(self.__status_details_url)
+        except craft_store.errors.CraftStoreError as e:
+            queue.put(e)
 
-    def _get_status(self):
-        connection_errors_allowed = 10
-        while True:
-            try:
-                content = requests.get(self.__status_details_url).json()
-            except (requests.ConnectionError, requests.HTTPError) as e:
-                if not connection_errors_allowed:
-                    yield e
-                content = {"processed": False, "code": "being_processed"}
-                connection_errors_allowed -= 1
-            yield content
+
+def _request(method, url):
+    try:
+        response = requests.request(method, url)
+    except requests.ConnectionError as e:
+        raise craft_store.errors.NetworkError(e) from e
+
+    if not response.ok:
+        raise craft_store.errors.StoreServerError(response)
+
+    return response
@@ -17,15 +17,14 @@
 import logging
 import os
 import platform
-from time import sleep
 from typing import Any, Dict, List, Optional, Sequence, Union
 
 import craft_store
-import requests
 
-from snapcraft_legacy.internal.indicators import download_requests_stream
+from snapcraft_legacy import file_utils
+from snapcraft_legacy.internal.cache import SnapCache
 
-from . import agent, constants, errors, metrics
+from . import _download, agent, constants, errors, metrics
 from ._dashboard_api import DashboardAPI
 from ._snap_api import SnapAPI
 from .constants import DEFAULT_SERIES
@@ -231,62 +230,43 @@ class StoreClient:
         channel_mapping = snap_info.get_channel_mapping(
             risk=risk, track=track, arch=arch
         )
-        if channel_mapping.download.sha3_384 == except_hash:
-            return channel_mapping.download.sha3_384
+        download_details = channel_mapping.download
+        if download_details.sha3_384 == except_hash:
+            return download_details.sha3_384
 
         try:
-            channel_mapping.download.verify(download_path)
+            download_details.verify(download_path)
         except errors.StoreDownloadError:
-            cls._download_snap(channel_mapping.download, download_path)
+            cls._download_snap(snap_name, channel_mapping, download_path)
 
-        channel_mapping.download.verify(download_path)
-        return channel_mapping.download.sha3_384
+        return download_details.sha3_384
 
     @classmethod
-    def _download_snap(cls, download_details, download_path):
-        # we only resume when redirected to our CDN since we use internap's
-        # special sauce.
-        total_read = 0
-        probe_url = requests.head(download_details.url)
-        if probe_url.is_redirect and "internap" in probe_url.headers["Location"]:
-            download_url = probe_url.headers["Location"]
-            resume_possible = True
-        else:
-            download_url = download_details.url
-            resume_possible = False
-
-        # HttpAdapter cannot help here as this is a stream.
-        # LP: #1617765
-        not_downloaded = True
-        retry_count = 5
-        while not_downloaded and retry_count:
-            headers = {}
-            if resume_possible and os.path.exists(download_path):
-                total_read = os.path.getsize(download_path)
-                headers["Range"] = "bytes={}-".format(total_read)
-            request = craft_store.HTTPClient(user_agent=agent.get_user_agent()).request(
-                "GET", download_url, headers=headers, stream=True
+    def _download_snap(cls, snap_name, channel_mapping, download_path):
+        # Snaps are cached by sha3-384, so that the same revision is only
+        # downloaded once.
+        download_details = channel_mapping.download
+        deb_arch = channel_mapping.channel_details.architecture
+        snap_cache = SnapCache(project_name=snap_name)
+        cached_snap = snap_cache.get(
+            deb_arch=deb_arch, snap_hash=download_details.sha3_384
+        )
+        if cached_snap:
+            logger.debug(
+                "Using cached snap for {!r}".format(os.path.basename(download_path))
             )
-            request.raise_for_status()
-            redirections = [h.headers["Location"] for h in request.history]
-            if redirections:
-                logger.debug(
-                    "Redirections for {!r}: {}".format(
-                        download_url, ", ".join(redirections)
-                    )
-                )
-            try:
-                download_requests_stream(request, download_path, total_read=total_read)
-                not_downloaded = False
-            except requests.exceptions.ChunkedEncodingError as e:
-                logger.debug(
-                    "Error while downloading: {!r}. "
-                    "Retries left to download: {!r}.".format(e, retry_count)
-                )
-                retry_count -= 1
-                if not retry_count:
-                    raise e
-                sleep(1)
+            file_utils.clone(cached_snap, download_path)
+            return
+
+        # The download is verified while downloading.
+        _download.download(
+            download_details.url, download_path, sha3_384=download_details.sha3_384
+        )
+        snap_cache.cache(
+            snap_filename=download_path,
+            deb_arch=deb_arch,
+            snap_hash=download_details.sha3_384,
+        )
 
     def push_assertion(self, snap_id, assertion, endpoint, force=False):
         return self.dashboard.push_assertion(snap_id, assertion, endpoint, force)
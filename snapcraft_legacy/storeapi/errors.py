@@ -179,6 +179,14 @@ class DownloadNotFoundError(StoreDownloadError):
         super().__init__(path=path)
 
 
+class StoreDownloadRangeError(StoreDownloadError):
+
+    fmt = "The server for {url!r} did not answer a range request with partial content."
+
+    def __init__(self, *, url: str) -> None:
+        super().__init__(url=url)
+
+
 class SHAMismatchError(StoreDownloadError):
 
     fmt = (
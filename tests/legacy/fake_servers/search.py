@@ -150,6 +150,10 @@ class FakeStoreSearchServer(base.BaseFakeServer):
         )
 
         with open(snap_path, "rb") as snap_file:
+            # Range requests are answered by the conditional response.
             return response.Response(
-                snap_file.read(), response_code, [("Content-Type", content_type)]
+                snap_file.read(),
+                response_code,
+                [("Content-Type", content_type), ("Accept-Ranges", "bytes")],
+                conditional_response=True,
             )
@@ -72,3 +72,10 @@ class TestFileCache:
         )
 
         assert cached_file is None
+
+    def test_cache_without_verify(self, random_data_file, file_cache, algo):
+        cached_file = file_cache.cache(
+            filename=random_data_file, algorithm=algo, hash="1", verify=False
+        )
+
+        assert cached_file.endswith(os.path.join(algo, "1"))
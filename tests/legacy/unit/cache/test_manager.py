@@ -0,0 +1,155 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+
+import pytest
+
+from snapcraft_legacy.internal import cache
+from snapcraft_legacy.internal.cache import _manager
+
+
+@pytest.fixture
+def cache_manager(tmp_path):
+    return cache.CacheManager(str(tmp_path))
+
+
+@pytest.fixture
+def make_entry(tmp_path):
+    def _make_entry(name, size, age):
+        path = tmp_path / "files" / "sha384" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return str(path)
+
+    return _make_entry
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("", 5 * 1024**3),
+        ("100", 100),
+        ("2K", 2048),
+        ("1G", 1024**3),
+        ("files=3MiB", 3 * 1024**2),
+        ("10,files=20", 20),
+        ("snaps=20,10", 10),
+        ("invalid", 5 * 1024**3),
+    ],
+)
+def test_get_max_size(monkeypatch, cache_manager, value, expected):
+    monkeypatch.setenv("SNAPCRAFT_CACHE_MAX_SIZE", value)
+
+    assert cache_manager.get_max_size("files") == expected
+
+
+def test_parse_size_invalid():
+    with pytest.raises(ValueError):
+        _manager.parse_size("1X")
+
+
+def test_prune_least_recently_used(monkeypatch, cache_manager, make_entry):
+    monkeypatch.setenv("SNAPCRAFT_CACHE_MAX_SIZE", "250")
+    oldest = make_entry("1", 100, age=3000)
+    old = make_entry("2", 100, age=2000)
+    make_entry("3", 100, age=1000)
+    cache_manager.record_access(oldest)
+
+    assert cache_manager.prune("files") == [old]
+    assert not os.path.exists(old)
+
+    stats = {s.namespace: s for s in cache_manager.get_stats()}["files"]
+    assert stats.entries == 2
+    assert stats.size == 200
+    assert stats.evictions == 1
+    assert stats.evicted_bytes == 100
+
+
+def test_prune_keeps_recent_entries(monkeypatch, cache_manager, make_entry):
+    monkeypatch.setenv("SNAPCRAFT_CACHE_MAX_SIZE", "150")
+    old = make_entry("1", 100, age=3000)
+    make_entry("2", 100, age=10)
+    make_entry("3", 100, age=10)
+
+    assert cache_manager.prune("files") == [old]
+    assert len(list(cache_manager._scan("files"))) == 2
+
+
+def test_prune_under_limit(cache_manager, make_entry):
+    make_entry("1", 100, age=3000)
+
+    assert cache_manager.prune("files") == []
+
+
+def test_prune_ignores_partial_files(monkeypatch, cache_manager, make_entry):
+    monkeypatch.setenv("SNAPCRAFT_CACHE_MAX_SIZE", "0")
+    partial = make_entry("1.1234.partial", 100, age=3000)
+
+    assert cache_manager.prune("files") == []
+    assert os.path.exists(partial)
+
+
+def test_hits_and_misses(cache_manager, make_entry):
+    path = make_entry("1", 100, age=3000)
+    cache_manager.record_hit("files", path)
+    cache_manager.record_hit("files", path)
+    cache_manager.record_miss("files")
+
+    stats = {s.namespace: s for s in cache_manager.get_stats()}["files"]
+    assert (stats.hits, stats.misses) == (2, 1)
+
+
+def test_unwritable_index(tmp_path):
+    cache_root = tmp_path / "cache"
+    cache_root.write_text("not a directory")
+    cache_manager = cache.CacheManager(str(cache_root))
+
+    cache_manager.record_miss("files")
+
+    assert cache_manager.prune("files") == []
+
+
+def test_corrupt_index(monkeypatch, tmp_path, make_entry):
+    monkeypatch.setenv("SNAPCRAFT_CACHE_MAX_SIZE", "150")
+    (tmp_path / "cache-index.db").write_bytes(b"not a database" * 1024)
+    cache_manager = cache.CacheManager(str(tmp_path))
+    old = make_entry("1", 100, age=3000)
+    make_entry("2", 100, age=2000)
+
+    cache_manager.record_hit("files", old)
+
+    assert cache_manager.prune("files") == [old]
+    stats = {s.namespace: s for s in cache_manager.get_stats()}["files"]
+    assert (stats.entries, stats.hits, stats.evictions) == (1, 0, 0)
+
+
+def test_file_cache_records_usage(xdg_dirs, random_data_file, monkeypatch):
+    monkeypatch.setenv("SNAPCRAFT_CACHE_MAX_SIZE", "files=0")
+    file_cache = cache.FileCache()
+    assert file_cache.get(algorithm="sha1", hash="1") is None
+
+    cached_file = file_cache.cache(
+        filename=random_data_file, algorithm="sha1", hash="1", verify=False
+    )
+    assert file_cache.get(algorithm="sha1", hash="1") == cached_file
+
+    stats = {s.namespace: s for s in file_cache.cache_manager.get_stats()}["files"]
+    # Recently added entries are not evicted.
+    assert (stats.entries, stats.hits, stats.misses) == (1, 1, 1)
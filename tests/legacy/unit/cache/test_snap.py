@@ -123,6 +123,40 @@ class SnapCacheTestCase(SnapCacheBaseTestCase):
             snap, Equals(os.path.join(snap_cache.snap_cache_root, "amd64", snap_hash))
         )
 
+    def test_snap_cache_with_arch_and_hash(self):
+        snap_cache = cache.SnapCache(project_name="cache-test")
+        snap_hash = file_utils.calculate_sha3_384(self.snap_path)
+
+        with fixtures.MockPatchObject(
+            cache.SnapCache, "_get_snap_deb_arch"
+        ) as get_arch, fixtures.MockPatch(
+            "snapcraft_legacy.file_utils.calculate_sha3_384"
+        ) as calculate_hash:
+            cached_snap_path = snap_cache.cache(
+                snap_filename=self.snap_path, deb_arch="arm64", snap_hash=snap_hash
+            )
+
+        get_arch.mock.assert_not_called()
+        calculate_hash.mock.assert_not_called()
+        self.assertThat(
+            cached_snap_path,
+            Equals(os.path.join(snap_cache.snap_cache_root, "arm64", snap_hash)),
+        )
+
+    def test_snap_cache_get_by_hash_mismatch(self):
+        snap_cache = cache.SnapCache(project_name="my-snap-name")
+        snap_hash = file_utils.calculate_sha3_384(self.snap_path)
+        cached_snap_path = snap_cache.cache(
+            snap_filename=self.snap_path, deb_arch="amd64"
+        )
+        with open(cached_snap_path, "wb") as cached_snap:
+            cached_snap.write(b"corrupted")
+
+        snap = snap_cache.get(deb_arch="amd64", snap_hash=snap_hash)
+
+        self.assertIsNone(snap)
+        self.assertFalse(os.path.exists(cached_snap_path))
+
 
 class SnapCachePruneTestCase(SnapCacheBaseTestCase):
     def test_prune_snap_cache(self):
@@ -0,0 +1,270 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+from unittest import mock
+from unittest.mock import MagicMock, call
+
+import pytest
+
+from snapcraft_legacy import plugins
+from snapcraft_legacy.internal import steps
+from snapcraft_legacy.internal.lifecycle import _runner
+from snapcraft_legacy.internal.lifecycle._runner import _Executor as Executor
+from snapcraft_legacy.internal.lifecycle._status_cache import StatusCache
+
+
+class FakePart:
+    def __init__(self, name, plugin=None):
+        self.name = name
+        self.plugin = plugin if plugin is not None else object()
+        self.output_prefix = None
+        self.source_handler = None
+
+
+@pytest.fixture
+def project_config():
+    class Parts:
+        def __init__(self):
+            self.after_requests = dict()
+
+        def get_dependencies(self, part_name, *, recursive=False):
+            dependencies = {
+                p for p in all_parts if p.name in self.after_requests.get(part_name, [])
+            }
+            if recursive:
+                for dependency in list(dependencies):
+                    dependencies |= self.get_dependencies(
+                        dependency.name, recursive=True
+                    )
+            return dependencies
+
+        def validate(self, part_names):
+            pass
+
+    class Config:
+        def __init__(self):
+            self.project = MagicMock()
+            self.parts = Parts()
+            self.all_parts = all_parts
+            self.part_names = [p.name for p in all_parts]
+
+    all_parts = [FakePart("part1"), FakePart("part2"), FakePart("part3")]
+    return Config()
+
+
+@pytest.fixture(autouse=True)
+def mock_cli_config(mocker):
+    mocker.patch("snapcraft_legacy.config.CLIConfig")
+
+
+@pytest.fixture(autouse=True)
+def mock_prefetch(mocker):
+    return mocker.patch("snapcraft_legacy.internal.sources.prefetch")
+
+
+@pytest.fixture
+def handled_steps(mocker):
+    handled = []
+
+    def handle_step(requested_part_names, part, requested_step, step, cli_config):
+        handled.append((part.name, step, part.output_prefix))
+
+    mocker.patch.object(Executor, "_handle_step", side_effect=handle_step)
+    return handled
+
+
+@pytest.fixture
+def mock_handle_part_dependencies(mocker):
+    return mocker.patch.object(Executor, "_handle_part_dependencies")
+
+
+@pytest.fixture
+def parallel_parts(monkeypatch):
+    monkeypatch.setenv("SNAPCRAFT_MAX_PARALLEL_PARTS", "4")
+
+
+@pytest.mark.usefixtures("parallel_parts", "mock_handle_part_dependencies")
+def test_independent_parts_run_concurrently(project_config, mocker):
+    barrier = threading.Barrier(3, timeout=10)
+
+    def handle_step(requested_part_names, part, requested_step, step, cli_config):
+        if step == steps.PULL:
+            # Fails unless all the parts are pulled concurrently.
+            barrier.wait()
+
+    mocker.patch.object(Executor, "_handle_step", side_effect=handle_step)
+
+    Executor(project_config).run(steps.BUILD)
+
+
+@pytest.mark.usefixtures("parallel_parts")
+def test_dependencies_run_first(
+    project_config, handled_steps, mock_handle_part_dependencies
+):
+    project_config.parts.after_requests = {"part1": ["part3"], "part2": ["part1"]}
+
+    Executor(project_config).run(steps.BUILD)
+
+    assert handled_steps == [
+        ("part3", steps.PULL, "part3 | "),
+        ("part3", steps.BUILD, "part3 | "),
+        ("part1", steps.PULL, "part1 | "),
+        ("part1", steps.BUILD, "part1 | "),
+        ("part2", steps.PULL, "part2 | "),
+        ("part2", steps.BUILD, "part2 | "),
+    ]
+    part1, part2, part3 = project_config.all_parts
+    assert mock_handle_part_dependencies.mock_calls == [
+        call(step=steps.PULL, part=part3),
+        call(step=steps.BUILD, part=part3),
+        call(step=steps.PULL, part=part1),
+        call(step=steps.BUILD, part=part1),
+        call(step=steps.PULL, part=part2),
+        call(step=steps.BUILD, part=part2),
+    ]
+    assert all(p.output_prefix is None for p in project_config.all_parts)
+
+
+@pytest.mark.usefixtures("parallel_parts")
+def test_stage_is_serialized(project_config, handled_steps, mocker):
+    mocker.patch.object(Executor, "_handle_part_dependencies")
+    mocker.patch("snapcraft_legacy.internal.pluginhandler.check_for_collisions")
+
+    Executor(project_config).run(steps.STAGE)
+
+    assert handled_steps[6:] == [
+        ("part1", steps.STAGE, None),
+        ("part2", steps.STAGE, None),
+        ("part3", steps.STAGE, None),
+    ]
+
+
+@pytest.mark.usefixtures("parallel_parts")
+def test_running_parts_drained_before_staging_dependencies(project_config, mocker):
+    project_config.parts.after_requests = {"part3": ["part1"]}
+    part1, part2, part3 = project_config.all_parts
+    part1_built = threading.Event()
+    events = []
+
+    def handle_step(requested_part_names, part, requested_step, step, cli_config):
+        if part is part1:
+            part1_built.set()
+        elif part is part2 and step == steps.BUILD:
+            part1_built.wait(timeout=10)
+            events.append("part2 built")
+
+    def get_dependencies_to_run(*, step, part):
+        return {part1} if part is part3 else set()
+
+    def handle_part_dependencies(*, step, part):
+        if part is part3:
+            events.append("part1 staged")
+
+    mocker.patch.object(Executor, "_handle_step", side_effect=handle_step)
+    mocker.patch.object(
+        Executor, "_get_dependencies_to_run", side_effect=get_dependencies_to_run
+    )
+    mocker.patch.object(
+        Executor, "_handle_part_dependencies", side_effect=handle_part_dependencies
+    )
+
+    Executor(project_config).run(steps.BUILD)
+
+    assert events == ["part2 built", "part1 staged", "part1 staged"]
+
+
+def test_status_cache_is_locked(project_config, mocker):
+    cache = StatusCache(project_config)
+    mocker.patch.object(cache, "_ensure_steps_run")
+    cache._steps_run["part1"] = set()
+    part1 = project_config.all_parts[0]
+
+    with cache._lock:
+        thread = threading.Thread(target=cache.add_step_run, args=(part1, steps.PULL))
+        thread.start()
+        thread.join(timeout=0.1)
+        assert not cache.has_step_run(part1, steps.PULL)
+
+    thread.join(timeout=10)
+    assert cache.has_step_run(part1, steps.PULL)
+
+
+@pytest.mark.usefixtures("mock_handle_part_dependencies")
+def test_serial_by_default(project_config, handled_steps):
+    Executor(project_config).run(steps.BUILD)
+
+    assert handled_steps == [
+        ("part1", steps.PULL, None),
+        ("part2", steps.PULL, None),
+        ("part3", steps.PULL, None),
+        ("part1", steps.BUILD, None),
+        ("part2", steps.BUILD, None),
+        ("part3", steps.BUILD, None),
+    ]
+
+
+@pytest.mark.usefixtures("parallel_parts", "mock_handle_part_dependencies")
+def test_serial_with_plugins_v1(project_config, handled_steps):
+    project_config.all_parts[1].plugin = MagicMock(spec=plugins.v1.PluginV1)
+
+    Executor(project_config).run(steps.PULL)
+
+    assert handled_steps == [
+        ("part1", steps.PULL, None),
+        ("part2", steps.PULL, None),
+        ("part3", steps.PULL, None),
+    ]
+
+
+@pytest.mark.usefixtures("parallel_parts", "mock_handle_part_dependencies")
+def test_error_stops_scheduling(project_config, mocker):
+    project_config.parts.after_requests = {"part2": ["part1"], "part3": ["part1"]}
+    handled = []
+
+    def handle_step(requested_part_names, part, requested_step, step, cli_config):
+        handled.append(part.name)
+        raise RuntimeError("failed")
+
+    mocker.patch.object(Executor, "_handle_step", side_effect=handle_step)
+
+    with pytest.raises(RuntimeError):
+        Executor(project_config).run(steps.BUILD)
+
+    assert handled == ["part1"]
+
+
+@pytest.mark.parametrize("value", ["0", "-1", "many"])
+def test_invalid_max_parallel_parts(monkeypatch, value):
+    monkeypatch.setenv("SNAPCRAFT_MAX_PARALLEL_PARTS", value)
+
+    assert _runner._get_max_parallel_parts() == 1
+
+
+@pytest.mark.usefixtures("handled_steps", "mock_handle_part_dependencies")
+def test_sources_of_dependencies_prefetched(project_config, mock_prefetch, mocker):
+    project_config.parts.after_requests = {"part1": ["part2"], "part2": ["part3"]}
+    for part in project_config.all_parts:
+        part.source_handler = part.name + "-source"
+    mocker.patch.object(
+        StatusCache, "should_step_run", side_effect=lambda p, s: p.name != "part3"
+    )
+
+    Executor(project_config).run(steps.BUILD, ["part1"])
+
+    mock_prefetch.assert_called_once_with(
+        ["part1-source", "part2-source"], download_dir=mock.ANY
+    )
@@ -1429,6 +1429,51 @@ class CollisionTestCase(unit.TestCase):
         pluginhandler.check_for_collisions([part_built, part_not_built])
 
 
+class CollisionHashesTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.part1 = self.load_part("part1")
+        self.part2 = self.load_part("part2")
+        for part in (self.part1, self.part2):
+            os.makedirs(part.part_install_dir)
+            with open(os.path.join(part.part_install_dir, "file"), "w") as f:
+                f.write("contents")
+
+    def test_hard_links_not_hashed(self):
+        os.remove(os.path.join(self.part2.part_install_dir, "file"))
+        os.link(
+            os.path.join(self.part1.part_install_dir, "file"),
+            os.path.join(self.part2.part_install_dir, "file"),
+        )
+
+        with patch("hashlib.sha384") as mock_sha384:
+            pluginhandler.check_for_collisions([self.part1, self.part2])
+
+        mock_sha384.assert_not_called()
+
+    def test_hashes_reused(self):
+        pluginhandler.check_for_collisions([self.part1, self.part2])
+
+        with patch("hashlib.sha384") as mock_sha384:
+            pluginhandler.check_for_collisions([self.part1, self.part2])
+
+        mock_sha384.assert_not_called()
+
+    def test_hashes_not_reused_when_modified(self):
+        pluginhandler.check_for_collisions([self.part1, self.part2])
+        with open(os.path.join(self.part2.part_install_dir, "file"), "w") as f:
+            f.write("modified")
+
+        raised = self.assertRaises(
+            errors.SnapcraftPartConflictError,
+            pluginhandler.check_for_collisions,
+            [self.part1, self.part2],
+        )
+
+        self.assertThat(raised.file_paths, Equals("    file"))
+
+
 class StagePackagesTestCase(unit.TestCase):
     def test_missing_stage_package_raises_exception(self):
         fake_repo = Mock()
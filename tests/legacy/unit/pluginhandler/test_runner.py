@@ -20,7 +20,7 @@ import subprocess
 from textwrap import dedent
 from unittest import mock
 
-from testtools.matchers import Contains, FileContains, FileExists
+from testtools.matchers import Contains, Equals, FileContains, FileExists
 
 from snapcraft_legacy.internal import errors
 from snapcraft_legacy.internal.pluginhandler import _runner
@@ -130,6 +130,30 @@ class RunnerTestCase(unit.TestCase):
 
         self.assertThat(os.path.join("builddir", "build"), FileExists())
 
+    @mock.patch("sys.stdout")
+    def test_build_output_prefix(self, mock_stdout):
+        os.mkdir("builddir")
+
+        runner = _runner.Runner(
+            part_properties={"override-build": "echo built; echo done >&2"},
+            partdir=self.partdir,
+            sourcedir="sourcedir",
+            builddir="builddir",
+            stagedir="stagedir",
+            primedir="primedir",
+            builtin_functions={},
+            env_generator=lambda step: "export FOO=BAR",
+            shell_flags="set -e",
+        )
+        runner.output_prefix = "part1 | "
+
+        runner.build()
+
+        self.assertThat(
+            mock_stdout.write.mock_calls,
+            Equals([mock.call("part1 | built\n"), mock.call("part1 | done\n")]),
+        )
+
     def test_builtin_function_from_build(self):
         os.mkdir("builddir")
 
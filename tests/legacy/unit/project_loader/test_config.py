@@ -208,6 +208,46 @@ class DependenciesTest(ProjectLoaderBaseTest):
             self.config.parts.get_reverse_dependencies("main", recursive=True),
         )
 
+    def test_all_parts_sorted(self):
+        snapcraft_yaml = dedent(
+            """\
+            name: test
+            base: core18
+            version: "1"
+            summary: test
+            description: test
+            confinement: strict
+            grade: stable
+
+            parts:
+              d:
+                plugin: nil
+                after: [b, c]
+              c:
+                plugin: nil
+                after: [a]
+              b:
+                plugin: nil
+                after: [a]
+              a:
+                plugin: nil
+              e:
+                plugin: nil
+        """
+        )
+
+        config = self.make_snapcraft_project(snapcraft_yaml)
+
+        self.assertThat(
+            [p.name for p in config.parts.all_parts],
+            Equals(["a", "b", "c", "d", "e"]),
+        )
+        self.assertThat(config.parts.get_part("c").name, Equals("c"))
+        self.assertIsNone(config.parts.get_part("f"))
+        self.assert_part_names(
+            {"b", "c", "d"}, config.parts.get_reverse_dependencies("a", recursive=True)
+        )
+
     def test_dependency_loop(self):
         snapcraft_yaml = dedent(
             """\
@@ -431,6 +431,22 @@ class FixSUIDTestCase(RepoBaseTestCase):
             key="suid_guid_sticky_file", test_mod=0o7744, expected_mod=0o1744
         )
 
+    def test_only_paths(self):
+        for key in ("listed", "not-listed"):
+            file = os.path.join(self.tempdir, key)
+            with open(file, mode="w") as f:
+                f.write("#!/usr/bin/python3\n")
+            os.chmod(file, 0o4755)
+
+        BaseRepo.normalize(self.tempdir, paths=["listed"])
+
+        listed = os.path.join(self.tempdir, "listed")
+        not_listed = os.path.join(self.tempdir, "not-listed")
+        self.assertThat(stat.S_IMODE(os.stat(listed).st_mode), Equals(0o755))
+        self.assertThat(listed, FileContains("#!/usr/bin/env python3\n"))
+        self.assertThat(stat.S_IMODE(os.stat(not_listed).st_mode), Equals(0o4755))
+        self.assertThat(not_listed, FileContains("#!/usr/bin/python3\n"))
+
 
 class TestPkgNameParts(unit.TestCase):
     def test_get_pkg_name_parts_name_only(self):
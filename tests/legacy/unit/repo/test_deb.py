@@ -14,7 +14,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import contextlib
+import os
+import tarfile
 import textwrap
 from pathlib import Path
 from subprocess import CalledProcessError
@@ -31,6 +32,8 @@ from snapcraft_legacy.internal.repo import errors
 from snapcraft_legacy.internal.repo.deb_package import DebPackage
 from tests.legacy import unit
 
+from .test_deb_file import _tarinfo, _write_deb
+
 
 @pytest.fixture(autouse=True)
 def mock_env_copy():
@@ -79,19 +82,6 @@ class TestPackages(unit.TestCase):
         repo._deb._DEB_CACHE_DIR = self.debs_path
         repo._deb._STAGE_CACHE_DIR = self.stage_cache_path
 
-        @contextlib.contextmanager
-        def fake_tempdir(*, suffix: str, **kwargs):
-            temp_dir = Path(self.path, suffix)
-            temp_dir.mkdir(exist_ok=True, parents=True)
-            yield str(temp_dir)
-
-        self.fake_tmp_mock = self.useFixture(
-            fixtures.MockPatch(
-                "snapcraft_legacy.internal.repo._deb.tempfile.TemporaryDirectory",
-                new=fake_tempdir,
-            )
-        ).mock
-
         self.stage_packages_path = Path(self.path)
 
     @mock.patch(
@@ -230,6 +220,60 @@ class TestPackages(unit.TestCase):
 
         mock_normalize.assert_not_called()
 
+    @mock.patch.object(repo._deb.Ubuntu, "normalize")
+    @mock.patch("snapcraft_legacy.internal.repo._deb.DebFile")
+    def test_unpack_stage_packages(self, mock_deb_file, mock_normalize):
+        packages_path = Path(self.path, "pkg")
+        install_path = Path(self.path, "install")
+        packages_path.mkdir()
+        install_path.mkdir()
+        (packages_path / "fake-package.deb").touch()
+        (packages_path / "fake-package-dep.deb").touch()
+
+        mock_deb_file.return_value.get_name_version.return_value = "fake=1.0"
+        mock_deb_file.return_value.extract.side_effect = [
+            mock.Mock(paths=["usr", "usr/lib"], files=[]),
+            mock.Mock(paths=["usr", "usr/bin", "usr/bin/fake"], files=[]),
+        ]
+
+        repo.Ubuntu.unpack_stage_packages(
+            stage_packages_path=packages_path, install_path=install_path
+        )
+
+        self.assertThat(
+            [c.args[0].name for c in mock_deb_file.call_args_list],
+            Equals(["fake-package-dep.deb", "fake-package.deb"]),
+        )
+        mock_deb_file.return_value.extract.assert_called_with(
+            str(install_path), origin="fake=1.0"
+        )
+        mock_normalize.assert_called_once_with(
+            str(install_path), paths=["usr", "usr/bin", "usr/bin/fake", "usr/lib"]
+        )
+
+
+def test_unpack_stage_packages_same_path(tmp_path, mocker):
+    mocker.patch.object(repo._deb.Ubuntu, "normalize")
+    packages_path = tmp_path / "pkg"
+    install_path = tmp_path / "install"
+    packages_path.mkdir()
+    for name in ("c", "a", "b"):
+        _write_deb(
+            packages_path / f"{name}.deb",
+            [
+                (_tarinfo("./usr/", tarfile.DIRTYPE, 0o755), None),
+                (_tarinfo("./usr/shared"), name.encode()),
+                (_tarinfo(f"./usr/{name}"), name.encode()),
+            ],
+        )
+
+    repo.Ubuntu.unpack_stage_packages(
+        stage_packages_path=packages_path, install_path=install_path
+    )
+
+    assert (install_path / "usr" / "shared").read_text() == "c"
+    assert sorted(os.listdir(install_path / "usr")) == ["a", "b", "c", "shared"]
+
 
 class BuildPackagesTestCase(unit.TestCase):
     def setUp(self):
@@ -0,0 +1,171 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from snapcraft_legacy.internal.repo import errors
+from snapcraft_legacy.internal.repo.deb_file import DebFile
+
+
+def _tar_bytes(mode, entries):
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode=mode) as tar:
+        for tarinfo, content in entries:
+            if content is not None:
+                tarinfo.size = len(content)
+                tar.addfile(tarinfo, io.BytesIO(content))
+            else:
+                tar.addfile(tarinfo)
+    return data.getvalue()
+
+
+def _tarinfo(name, type=tarfile.REGTYPE, mode=0o644, linkname=""):
+    tarinfo = tarfile.TarInfo(name)
+    tarinfo.type = type
+    tarinfo.mode = mode
+    tarinfo.linkname = linkname
+    return tarinfo
+
+
+def _write_deb(path, data_entries, *, data_mode="w:xz", data_name="data.tar.xz"):
+    control = b"Package: fake-package\nVersion: 1.0-1\nArchitecture: amd64\n"
+    members = [
+        ("debian-binary", b"2.0\n"),
+        (
+            "control.tar.gz",
+            _tar_bytes("w:gz", [(_tarinfo("./control"), control)]),
+        ),
+        (data_name, _tar_bytes(data_mode, data_entries)),
+    ]
+    with open(path, "wb") as deb_file:
+        deb_file.write(b"!<arch>\n")
+        for name, content in members:
+            header = "{:<16}{:<12}{:<6}{:<6}{:<8}{:<10}`\n".format(
+                name + "/", 0, 0, 0, 100644, len(content)
+            )
+            deb_file.write(header.encode())
+            deb_file.write(content)
+            if len(content) % 2:
+                deb_file.write(b"\n")
+    return Path(path)
+
+
+@pytest.fixture
+def fake_deb(tmp_path):
+    return _write_deb(
+        tmp_path / "fake-package.deb",
+        [
+            (_tarinfo("./", tarfile.DIRTYPE, 0o755), None),
+            (_tarinfo("./usr/", tarfile.DIRTYPE, 0o755), None),
+            (_tarinfo("./usr/bin/", tarfile.DIRTYPE, 0o755), None),
+            (_tarinfo("./usr/bin/fake", mode=0o755), b"#!/bin/sh\n"),
+            (_tarinfo("./usr/bin/fake-link", tarfile.SYMTYPE, linkname="fake"), None),
+            (
+                _tarinfo(
+                    "./usr/bin/fake-hardlink",
+                    tarfile.LNKTYPE,
+                    linkname="./usr/bin/fake",
+                ),
+                None,
+            ),
+        ],
+    )
+
+
+def test_get_name_version(fake_deb):
+    assert DebFile(fake_deb).get_name_version() == "fake-package=1.0-1"
+
+
+def test_unpack(fake_deb, tmp_path, mocker):
+    write_origin_mock = mocker.patch(
+        "snapcraft_legacy.internal.xattrs.write_origin_stage_package"
+    )
+    install_path = tmp_path / "install"
+
+    paths = DebFile(fake_deb).unpack(str(install_path), origin="fake-package=1.0-1")
+
+    assert paths == [
+        "usr",
+        "usr/bin",
+        "usr/bin/fake",
+        "usr/bin/fake-link",
+        "usr/bin/fake-hardlink",
+    ]
+    fake_path = install_path / "usr" / "bin" / "fake"
+    assert fake_path.read_bytes() == b"#!/bin/sh\n"
+    assert os.stat(fake_path).st_mode & 0o777 == 0o755
+    assert os.readlink(install_path / "usr" / "bin" / "fake-link") == "fake"
+    assert os.path.samefile(fake_path, install_path / "usr" / "bin" / "fake-hardlink")
+    assert sorted(os.listdir(install_path / "usr" / "bin")) == [
+        "fake",
+        "fake-hardlink",
+        "fake-link",
+    ]
+    # Only regular files are marked, hard links share the mark.
+    assert [c.args[1] for c in write_origin_mock.mock_calls] == ["fake-package=1.0-1"]
+
+
+def test_unpack_replaces_files(fake_deb, tmp_path):
+    install_path = tmp_path / "install"
+    (install_path / "usr" / "bin").mkdir(parents=True)
+    (install_path / "usr" / "bin" / "fake").write_text("old")
+    (install_path / "usr" / "bin" / "other").write_text("other")
+
+    DebFile(fake_deb).unpack(str(install_path))
+
+    assert (install_path / "usr" / "bin" / "fake").read_text() == "#!/bin/sh\n"
+    assert (install_path / "usr" / "bin" / "other").read_text() == "other"
+
+
+@pytest.mark.parametrize(
+    "data_mode,data_name",
+    [("w", "data.tar"), ("w:gz", "data.tar.gz"), ("w:bz2", "data.tar.bz2")],
+)
+def test_unpack_compressions(tmp_path, data_mode, data_name):
+    deb_path = _write_deb(
+        tmp_path / "fake-package.deb",
+        [(_tarinfo("./fake"), b"fake")],
+        data_mode=data_mode,
+        data_name=data_name,
+    )
+
+    DebFile(deb_path).unpack(str(tmp_path / "install"))
+
+    assert (tmp_path / "install" / "fake").read_text() == "fake"
+
+
+def test_unpack_outside_install_path(tmp_path):
+    deb_path = _write_deb(
+        tmp_path / "fake-package.deb", [(_tarinfo("./../fake"), b"fake")]
+    )
+
+    with pytest.raises(errors.UnpackError):
+        DebFile(deb_path).unpack(str(tmp_path / "install"))
+
+    assert not (tmp_path / "fake").exists()
+
+
+def test_invalid_deb(tmp_path):
+    deb_path = tmp_path / "fake-package.deb"
+    deb_path.write_bytes(b"not a deb")
+
+    with pytest.raises(errors.UnpackError):
+        DebFile(deb_path)
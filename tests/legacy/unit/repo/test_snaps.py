@@ -14,11 +14,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import glob
+import os
 from unittest import mock
 
 import fixtures
-from testtools.matchers import Equals, FileContains, FileExists, Is
+from testtools.matchers import Equals, FileContains, FileExists, Is, Not
 
+from snapcraft_legacy import file_utils
+from snapcraft_legacy.internal import cache
 from snapcraft_legacy.internal.repo import errors, snaps
 from tests.legacy import unit
 
@@ -218,6 +222,15 @@ class SnapPackageIsValidTest(unit.TestCase):
 
 
 class SnapPackageLifecycleTest(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.useFixture(
+            fixtures.MockPatchObject(
+                snaps.SnapPackage, "_get_channel_mapping", return_value=None
+            )
+        )
+
     def test_install_classic(self):
         self.fake_snapd.find_result = [
             {"fake-snap": {"channels": {"classic/stable": {"confinement": "classic"}}}}
@@ -641,6 +654,56 @@ class SnapPackageLifecycleTest(unit.TestCase):
         )
 
 
+class SnapPackageDownloadCacheTest(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        os.makedirs("first")
+        with open(os.path.join("first", "fake-snap_7.snap"), "w") as snap_file:
+            snap_file.write("fake snap")
+        channel_mapping = mock.Mock(revision=7)
+        channel_mapping.channel_details.architecture = "amd64"
+        channel_mapping.download.sha3_384 = file_utils.calculate_sha3_384(
+            os.path.join("first", "fake-snap_7.snap")
+        )
+        self.useFixture(
+            fixtures.MockPatchObject(
+                snaps.SnapPackage,
+                "_get_channel_mapping",
+                return_value=channel_mapping,
+            )
+        )
+
+    def test_download_uses_cache(self):
+        snaps.SnapPackage("fake-snap").download(directory="first")
+        os.makedirs("second")
+
+        snaps.SnapPackage("fake-snap").download(directory="second")
+
+        self.assertThat(
+            self.fake_snap_command.calls, Equals([["snap", "download", "fake-snap"]])
+        )
+        self.assertThat(
+            os.path.join("second", "fake-snap_7.snap"), FileContains("fake snap")
+        )
+
+    def test_download_cached_snap_mismatch(self):
+        snaps.SnapPackage("fake-snap").download(directory="first")
+        snap_cache = cache.SnapCache(project_name="fake-snap")
+        (cached_snap,) = glob.glob(os.path.join(snap_cache.snap_cache_root, "*", "*"))
+        with open(cached_snap, "w") as snap_file:
+            snap_file.write("corrupted")
+        os.makedirs("second")
+
+        snaps.SnapPackage("fake-snap").download(directory="second")
+
+        self.assertThat(
+            self.fake_snap_command.calls,
+            Equals([["snap", "download", "fake-snap"]] * 2),
+        )
+        self.assertThat(os.path.join("second", "fake-snap_7.snap"), Not(FileExists()))
+
+
 class InstalledSnapsTestCase(unit.TestCase):
     def test_get_installed_snaps(self):
         self.fake_snapd.snaps_result = [
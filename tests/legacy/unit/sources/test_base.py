@@ -102,7 +102,7 @@ class TestFileBase(unit.TestCase):
             file_src.source, stream=True, allow_redirects=True
         )
         mock_request.raise_for_status.assert_called_once_with()
-        mock_download.assert_called_once_with(mock_request, file_src.file)
+        mock_download.assert_called_once_with(mock_request, file_src.file, hasher=None)
 
     @mock.patch("snapcraft_legacy.internal.sources._base.download_urllib_source")
     def test_download_ftp(self, mock_download):
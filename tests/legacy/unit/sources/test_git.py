@@ -23,6 +23,7 @@ import fixtures
 from testtools.matchers import Equals
 
 from snapcraft_legacy.internal import sources
+from snapcraft_legacy.internal.cache import GitMirrorCache
 from snapcraft_legacy.internal.sources import errors
 from tests.legacy import unit
 from tests.subprocess_utils import call, call_with_output
@@ -46,6 +47,12 @@ class TestGit(unit.sources.SourceTestCase):  # type: ignore
             fixtures.MockPatch("subprocess.check_output")
         ).mock
 
+        self.mock_use_mirror = self.useFixture(
+            fixtures.MockPatch(
+                "snapcraft_legacy.sources.Git._use_mirror", return_value=False
+            )
+        ).mock
+
     def test_pull(self):
         git = sources.Git("git://my-source", "source_dir")
 
@@ -308,6 +315,58 @@ class TestGit(unit.sources.SourceTestCase):  # type: ignore
             ]
         )
 
+    @mock.patch("os.rename")
+    def test_pull_with_mirror(self, mock_rename):
+        self.mock_use_mirror.return_value = True
+        mirror_path = GitMirrorCache().get_mirror_path("git://my-source")
+
+        git = sources.Git("git://my-source", "source_dir")
+        git.pull()
+
+        self.assertThat(
+            self.mock_run.mock_calls,
+            Equals(
+                [
+                    mock.call(
+                        [
+                            "git",
+                            "clone",
+                            "--mirror",
+                            "git://my-source",
+                            mirror_path + ".partial",
+                        ]
+                    ),
+                    mock.call(
+                        [
+                            "git",
+                            "clone",
+                            "--recursive",
+                            "--reference-if-able",
+                            mirror_path,
+                            "--dissociate",
+                            "git://my-source",
+                            "source_dir",
+                        ]
+                    ),
+                ]
+            ),
+        )
+        mock_rename.assert_called_once_with(mirror_path + ".partial", mirror_path)
+
+    def test_pull_with_mirror_error(self):
+        self.mock_use_mirror.return_value = True
+        self.mock_run.side_effect = [
+            subprocess.CalledProcessError(1, ["git", "clone"]),
+            None,
+        ]
+
+        git = sources.Git("git://my-source", "source_dir")
+        git.pull()
+
+        self.mock_run.assert_called_with(
+            ["git", "clone", "--recursive", "git://my-source", "source_dir"]
+        )
+
     def test_pull_existing(self):
         self.mock_path_exists.return_value = True
 
@@ -775,6 +834,64 @@ class TestGitConflicts(GitBaseTestCase):
         )
 
 
+class TestGitMirror(GitBaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.repo = os.path.abspath("repo.git")
+        self.working_tree = os.path.abspath("working-tree")
+        os.mkdir(self.repo)
+        call(["git", "-C", self.repo, "init", "--bare"])
+        self.clone_repo(self.repo, self.working_tree)
+        self.add_file("fake", "fake 1", "fake 1")
+        call(["git", "push", self.repo, "HEAD:master"])
+        os.chdir(self.path)
+
+        self.source = "file://" + self.repo
+        self.mirror_path = GitMirrorCache().get_mirror_path(self.source)
+
+    def test_clone_from_mirror(self):
+        sources.Git(self.source, "source-1", silent=True).pull()
+
+        self.assertTrue(os.path.isdir(self.mirror_path))
+        self.check_file_contents(os.path.join("source-1", "fake"), "fake 1")
+
+        sources.Git(self.source, "source-2", silent=True).pull()
+
+        self.check_file_contents(os.path.join("source-2", "fake"), "fake 1")
+        # Clones do not depend on the mirror.
+        self.assertFalse(
+            os.path.exists(
+                os.path.join("source-2", ".git", "objects", "info", "alternates")
+            )
+        )
+
+    def test_pull_existing_updates_mirror(self):
+        git = sources.Git(self.source, "source", silent=True)
+        git.pull()
+
+        os.chdir(self.working_tree)
+        self.add_file("fake", "fake 2", "fake 2")
+        call(["git", "push", self.repo, "HEAD:master"])
+        os.chdir(self.path)
+
+        git.pull()
+
+        self.check_file_contents(os.path.join("source", "fake"), "fake 2")
+        self.assertThat(
+            call_with_output(
+                ["git", "-C", self.mirror_path, "log", "-1", "--format=%s"]
+            ),
+            Equals("fake 2"),
+        )
+
+    def test_shallow_clone_without_mirror(self):
+        sources.Git(self.source, "source", source_depth=1, silent=True).pull()
+
+        self.check_file_contents(os.path.join("source", "fake"), "fake 1")
+        self.assertFalse(os.path.exists(self.mirror_path))
+
+
 class GitDetailsTestCase(GitBaseTestCase):
     def setUp(self):
         def _add_and_commit_file(filename, content=None, message=None):
@@ -0,0 +1,225 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import threading
+from unittest import mock
+
+import fixtures
+import requests
+from testtools.matchers import Equals, FileContains, HasLength
+
+from snapcraft_legacy import file_utils
+from snapcraft_legacy.internal import cache, sources
+from snapcraft_legacy.internal.sources import _prefetch
+from tests.legacy import unit
+
+_CHECKSUM = (
+    "sha384/d9da1f5d54432edc8963cd817ceced83f7c6d61d3"
+    "50ad76d1c2f50c4935d11d50211945ca0ecb980c04c98099"
+    "085b0c3"
+)
+
+
+class TestPrefetch(unit.FakeFileHTTPServerBasedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.download_dir = self.useFixture(fixtures.TempDir()).path
+
+    def get_source(self, file_name):
+        return "http://{}:{}/{}".format(*self.server.server_address, file_name)
+
+    @mock.patch("snapcraft_legacy.sources.Tar.provision")
+    def test_pull_uses_prefetched_file(self, mock_prov):
+        os.makedirs("src")
+        tar_source = sources.Tar(self.get_source("test.tar"), "src")
+
+        results = sources.prefetch([tar_source], download_dir=self.download_dir)
+
+        self.assertThat(results, HasLength(1))
+        self.assertThat(results[0].size, Equals(len("Test fake file")))
+        self.assertFalse(results[0].cached)
+        self.assertThat(tar_source.prefetched_file, Equals(results[0].path))
+        self.assertTrue(results[0].path.startswith(self.download_dir))
+        self.assertIsNone(
+            cache.FileCache().get(algorithm="sha384", hash=_CHECKSUM.split("/")[1])
+        )
+
+        with mock.patch(
+            "requests.get", new=mock.Mock(wraps=requests.get)
+        ) as download_spy:
+            tar_source.pull()
+            self.assertThat(download_spy.call_count, Equals(0))
+
+        self.assertThat(os.path.join("src", "test.tar"), FileContains("Test fake file"))
+
+    def test_prefetch_cached(self):
+        sources.prefetch(
+            [
+                sources.Tar(
+                    self.get_source("test.tar"), "src", source_checksum=_CHECKSUM
+                )
+            ],
+            download_dir=self.download_dir,
+        )
+        self.assertThat(os.listdir(self.download_dir), Equals([]))
+        tar_source = sources.Tar(
+            self.get_source("test.tar"), "src", source_checksum=_CHECKSUM
+        )
+
+        with mock.patch(
+            "requests.get", new=mock.Mock(wraps=requests.get)
+        ) as download_spy:
+            results = sources.prefetch([tar_source], download_dir=self.download_dir)
+            self.assertThat(download_spy.call_count, Equals(0))
+
+        self.assertTrue(results[0].cached)
+        self.assertThat(tar_source.prefetched_file, Equals(results[0].path))
+
+    @mock.patch("snapcraft_legacy.sources.Tar.provision")
+    def test_pull_verifies_cached_prefetched_file(self, mock_prov):
+        os.makedirs("src")
+        sources.prefetch(
+            [
+                sources.Tar(
+                    self.get_source("test.tar"), "src", source_checksum=_CHECKSUM
+                )
+            ],
+            download_dir=self.download_dir,
+        )
+        tar_source = sources.Tar(
+            self.get_source("test.tar"), "src", source_checksum=_CHECKSUM
+        )
+        sources.prefetch([tar_source], download_dir=self.download_dir)
+        self.assertFalse(tar_source.prefetched_file_verified)
+
+        with mock.patch(
+            "snapcraft_legacy.file_utils.calculate_hash",
+            wraps=file_utils.calculate_hash,
+        ) as hash_spy:
+            tar_source.pull()
+
+        hash_spy.assert_called_once_with(tar_source.prefetched_file, algorithm="sha384")
+
+    @mock.patch("snapcraft_legacy.sources.Tar.provision")
+    def test_pull_does_not_rehash_downloaded_prefetched_file(self, mock_prov):
+        os.makedirs("src")
+        tar_source = sources.Tar(
+            self.get_source("test.tar"), "src", source_checksum=_CHECKSUM
+        )
+        sources.prefetch([tar_source], download_dir=self.download_dir)
+        self.assertTrue(tar_source.prefetched_file_verified)
+
+        with mock.patch("snapcraft_legacy.file_utils.calculate_hash") as hash_spy:
+            tar_source.pull()
+
+        hash_spy.assert_not_called()
+
+    def test_prefetch_checksum_mismatch(self):
+        tar_source = sources.Tar(
+            self.get_source("test.tar"), "src", source_checksum="sha384/mismatch"
+        )
+
+        self.assertThat(
+            sources.prefetch([tar_source], download_dir=self.download_dir),
+            Equals([]),
+        )
+        self.assertIsNone(tar_source.prefetched_file)
+
+    def test_prefetch_error(self):
+        tar_source = sources.Tar(self.get_source("404-not-found"), "src")
+
+        self.assertThat(
+            sources.prefetch([tar_source], download_dir=self.download_dir),
+            Equals([]),
+        )
+        self.assertIsNone(tar_source.prefetched_file)
+
+    def test_prefetch_skips_local_sources(self):
+        with mock.patch("requests.get") as mock_get:
+            results = sources.prefetch(
+                [
+                    sources.Tar("test.tar", "src"),
+                    sources.Git("https://example.com/repo.git", "src", source_depth=1),
+                    None,
+                ],
+                download_dir=self.download_dir,
+            )
+
+        self.assertThat(results, Equals([]))
+        mock_get.assert_not_called()
+
+    def test_prefetch_git_mirror(self):
+        git_source = sources.Git("https://example.com/repo.git", "src")
+
+        with mock.patch.object(
+            sources.Git, "_update_mirror", return_value="mirror"
+        ) as update_mirror:
+            results = sources.prefetch([git_source], download_dir=self.download_dir)
+            with git_source._mirror() as mirror_path:
+                self.assertThat(mirror_path, Equals("mirror"))
+
+        self.assertThat(results, Equals([]))
+        self.assertThat(git_source.prefetched_mirror, Equals("mirror"))
+        # The mirror is not updated again when pulling.
+        update_mirror.assert_called_once_with()
+
+    def test_prefetch_git_mirror_error(self):
+        git_source = sources.Git("https://example.com/repo.git", "src")
+
+        with mock.patch.object(sources.Git, "_update_mirror", return_value=None):
+            sources.prefetch([git_source], download_dir=self.download_dir)
+
+        self.assertIsNone(git_source.prefetched_mirror)
+
+    def test_get_host(self):
+        self.assertThat(
+            _prefetch._get_host("https://example.com/repo.git"), Equals("example.com")
+        )
+        self.assertThat(
+            _prefetch._get_host("git@example.com:repo.git"), Equals("example.com")
+        )
+
+    def test_prefetch_bounded_per_host(self):
+        lock = threading.Lock()
+        running = [0]
+        max_running = [0]
+        download = _prefetch._download
+
+        def counting_download(*args):
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            try:
+                return download(*args)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+        tar_sources = [
+            sources.Tar(self.get_source("test-{}.tar".format(i)), "src")
+            for i in range(6)
+        ]
+        with mock.patch.object(_prefetch, "_download", side_effect=counting_download):
+            results = sources.prefetch(
+                tar_sources,
+                download_dir=self.download_dir,
+                max_jobs=4,
+                max_jobs_per_host=2,
+            )
+
+        self.assertThat(results, HasLength(6))
+        self.assertTrue(max_running[0] <= 2)
@@ -19,9 +19,9 @@ import tarfile
 from unittest import mock
 
 import requests
-from testtools.matchers import Equals
+from testtools.matchers import Equals, FileContains
 
-from snapcraft_legacy.internal import sources
+from snapcraft_legacy.internal import cache, sources
 from tests.legacy import unit
 
 
@@ -64,6 +64,67 @@ class TestTar(unit.FakeFileHTTPServerBasedTestCase):
             tar_source.pull()
             self.assertThat(download_spy.call_count, Equals(0))
 
+    @mock.patch("snapcraft_legacy.sources.Tar.provision")
+    def test_pull_verifies_while_downloading(self, mock_prov):
+        source = "http://{}:{}/{file_name}".format(
+            *self.server.server_address, file_name="test.tar"
+        )
+        expected_checksum = (
+            "sha384/d9da1f5d54432edc8963cd817ceced83f7c6d61d3"
+            "50ad76d1c2f50c4935d11d50211945ca0ecb980c04c98099"
+            "085b0c3"
+        )
+        tar_source = sources.Tar(source, self.path, source_checksum=expected_checksum)
+
+        with mock.patch(
+            "snapcraft_legacy.internal.sources._checksum.calculate_hash"
+        ) as verify_spy, mock.patch(
+            "snapcraft_legacy.internal.cache._file.calculate_hash"
+        ) as cache_spy:
+            tar_source.pull()
+
+        verify_spy.assert_not_called()
+        cache_spy.assert_not_called()
+
+    @mock.patch("snapcraft_legacy.sources.Tar.provision")
+    def test_pull_discards_corrupted_cache_file(self, mock_prov):
+        source = "http://{}:{}/{file_name}".format(
+            *self.server.server_address, file_name="test.tar"
+        )
+        expected_checksum = (
+            "sha384/d9da1f5d54432edc8963cd817ceced83f7c6d61d3"
+            "50ad76d1c2f50c4935d11d50211945ca0ecb980c04c98099"
+            "085b0c3"
+        )
+        tar_source = sources.Tar(source, self.path, source_checksum=expected_checksum)
+        tar_source.pull()
+        # Provisioning removes the downloaded file.
+        os.remove(os.path.join(self.path, "test.tar"))
+        cache_file = cache.FileCache().get(
+            algorithm="sha384", hash=expected_checksum.split("/")[1]
+        )
+        with open(cache_file, "w") as f:
+            f.write("corrupted")
+
+        with mock.patch(
+            "requests.get", new=mock.Mock(wraps=requests.get)
+        ) as download_spy:
+            tar_source.pull()
+            self.assertThat(download_spy.call_count, Equals(1))
+
+        self.assertThat(
+            os.path.join(self.path, "test.tar"), FileContains("Test fake file")
+        )
+        self.assertThat(cache_file, FileContains("Test fake file"))
+
+    def test_pull_checksum_mismatch(self):
+        source = "http://{}:{}/{file_name}".format(
+            *self.server.server_address, file_name="test.tar"
+        )
+        tar_source = sources.Tar(source, self.path, source_checksum="sha384/bad")
+
+        self.assertRaises(sources.errors.DigestDoesNotMatchError, tar_source.pull)
+
     def test_strip_common_prefix(self):
         # Create tar file for testing
         os.makedirs(os.path.join("src", "test_prefix"))
@@ -146,5 +207,88 @@ class TestTar(unit.FakeFileHTTPServerBasedTestCase):
         self.assertTrue(os.path.exists(os.path.join("dst", "test.txt")))
         self.assertTrue(os.path.exists(os.path.join("dst", "link.txt")))
 
+    def test_strip_common_prefix_dot(self):
+        os.makedirs(os.path.join("src", "test_prefix", "dir"))
+        open(os.path.join("src", "test_prefix", "dir", "test.txt"), "w").close()
+        with tarfile.open(os.path.join("src", "test.tar.gz"), "w:gz") as tar:
+            tar.add(os.path.join("src", "test_prefix"), arcname=".")
+
+        tar_source = sources.Tar(os.path.join("src", "test.tar.gz"), "dst")
+        os.mkdir("dst")
+        tar_source.pull()
+
+        self.assertTrue(os.path.exists(os.path.join("dst", "dir", "test.txt")))
+        self.assertThat(os.listdir("dst"), Equals(["dir"]))
+
+    def test_extract_on_top(self):
+        os.makedirs(os.path.join("src", "test_prefix", "dir"))
+        with open(os.path.join("src", "test_prefix", "dir", "test.txt"), "w") as f:
+            f.write("new")
+        with tarfile.open(os.path.join("src", "test.tar"), "w") as tar:
+            tar.add(os.path.join("src", "test_prefix"))
+
+        os.makedirs(os.path.join("dst", "dir"))
+        with open(os.path.join("dst", "dir", "test.txt"), "w") as f:
+            f.write("old")
+        open(os.path.join("dst", "dir", "other.txt"), "w").close()
+
+        tar_source = sources.Tar(os.path.join("src", "test.tar"), "dst")
+        tar_source.provision(
+            "dst", clean_target=False, src=os.path.join("src", "test.tar")
+        )
+
+        with open(os.path.join("dst", "dir", "test.txt")) as f:
+            self.assertThat(f.read(), Equals("new"))
+        self.assertTrue(os.path.exists(os.path.join("dst", "dir", "other.txt")))
+        self.assertThat(sorted(os.listdir("dst")), Equals(["dir"]))
+
+    def test_extract_bounds_pending_writes(self):
+        os.makedirs(os.path.join("src", "test_prefix"))
+        for i in range(20):
+            with open(os.path.join("src", "test_prefix", str(i)), "w") as f:
+                f.write(str(i) * i)
+        with tarfile.open(os.path.join("src", "test.tar.xz"), "w:xz") as tar:
+            tar.add(os.path.join("src", "test_prefix"))
+
+        tar_source = sources.Tar(os.path.join("src", "test.tar.xz"), "dst")
+        os.mkdir("dst")
+        with mock.patch(
+            "snapcraft_legacy.internal.sources._tar._MAX_PENDING_BYTES", 10
+        ):
+            tar_source.pull()
+
+        for i in range(20):
+            with open(os.path.join("dst", str(i))) as f:
+                self.assertThat(f.read(), Equals(str(i) * i))
+
+    @mock.patch("shutil.which", return_value=None)
+    def test_extract_without_decompressor(self, mock_which):
+        os.makedirs(os.path.join("src", "test_prefix"))
+        open(os.path.join("src", "test_prefix", "test.txt"), "w").close()
+        with tarfile.open(os.path.join("src", "test.tar.xz"), "w:xz") as tar:
+            tar.add(os.path.join("src", "test_prefix"))
+
+        tar_source = sources.Tar(os.path.join("src", "test.tar.xz"), "dst")
+        os.mkdir("dst")
+        tar_source.pull()
+
+        self.assertTrue(os.path.exists(os.path.join("dst", "test.txt")))
+
+    @mock.patch(
+        "snapcraft_legacy.internal.sources._tar._get_decompressor",
+        return_value=["false"],
+    )
+    def test_extract_decompressor_error(self, mock_get_decompressor):
+        os.makedirs(os.path.join("src", "test_prefix"))
+        open(os.path.join("src", "test_prefix", "test.txt"), "w").close()
+        with tarfile.open(os.path.join("src", "test.tar.gz"), "w:gz") as tar:
+            tar.add(os.path.join("src", "test_prefix"))
+
+        tar_source = sources.Tar(os.path.join("src", "test.tar.gz"), "dst")
+        os.mkdir("dst")
+
+        self.assertRaises(sources.errors.SnapcraftPullError, tar_source.pull)
+        self.assertThat(os.listdir("dst"), Equals(["test.tar.gz"]))
+
     def test_has_source_handler_entry(self):
         self.assertTrue(sources._source_handler["tar"] is sources.Tar)
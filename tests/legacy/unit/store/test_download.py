@@ -0,0 +1,199 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import re
+import threading
+from unittest import mock
+
+import craft_store
+import pytest
+import requests
+
+from snapcraft_legacy.storeapi import _download, errors
+
+URL = "https://store.test/download-snap/test-snap.snap"
+CDN_URL = "https://cdn.test/test-snap.snap"
+DATA = bytes(range(256)) * 64
+
+
+class FakeHTTPClient:
+    """Serve DATA, optionally in ranges."""
+
+    def __init__(self, *, ranges=True, fail_ranges=()):
+        self.ranges = ranges
+        self.fail_ranges = list(fail_ranges)
+        self.range_status_code = 206
+        self.empty_ranges = False
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers=None, stream=False, **kwargs):
+        with self._lock:
+            self.requests.append((method, url, (headers or {}).get("Range")))
+
+        response = mock.Mock(spec=requests.Response)
+        response.url = CDN_URL
+        response.history = []
+        response.status_code = 200
+        response.headers = {"Content-Length": str(len(DATA))}
+        if self.ranges:
+            response.headers["Accept-Ranges"] = "bytes"
+
+        data = DATA
+        range_header = (headers or {}).get("Range")
+        if range_header and self.ranges:
+            start, end = map(int, re.findall(r"\d+", range_header))
+            data = DATA[start : end + 1]
+            response.status_code = self.range_status_code
+            if response.status_code >= 400:
+                response.reason = "Range Not Satisfiable"
+                response.json.side_effect = requests.exceptions.JSONDecodeError(
+                    "", "", 0
+                )
+                raise craft_store.errors.StoreServerError(response)
+            if self.empty_ranges:
+                data = b""
+            if range_header in self.fail_ranges:
+                self.fail_ranges.remove(range_header)
+                data = data[:10]
+
+        def iter_content(chunk_size):
+            for i in range(0, len(data), 1024):
+                yield data[i : i + 1024]
+            if len(data) == 10:
+                raise requests.exceptions.ChunkedEncodingError()
+
+        response.iter_content = iter_content
+        return response
+
+
+@pytest.fixture
+def fake_http_client(mocker):
+    http_client = FakeHTTPClient()
+    mocker.patch("craft_store.HTTPClient", return_value=http_client)
+    mocker.patch("snapcraft_legacy.storeapi._download.sleep")
+    return http_client
+
+
+@pytest.fixture
+def sha3_384():
+    return hashlib.sha3_384(DATA).hexdigest()
+
+
+def test_download_parallel(tmp_path, fake_http_client, sha3_384):
+    download_path = tmp_path / "test-snap.snap"
+
+    _download.download(
+        URL, str(download_path), sha3_384=sha3_384, jobs=4, min_part_size=1024
+    )
+
+    assert download_path.read_bytes() == DATA
+    assert sorted(r for _, _, r in fake_http_client.requests if r) == [
+        "bytes=0-4095",
+        "bytes=12288-16383",
+        "bytes=4096-8191",
+        "bytes=8192-12287",
+    ]
+    assert all(url == CDN_URL for m, url, _ in fake_http_client.requests if m == "GET")
+    assert list(tmp_path.iterdir()) == [download_path]
+
+
+def test_download_retries_part(tmp_path, fake_http_client, sha3_384):
+    fake_http_client.fail_ranges = ["bytes=4096-8191"]
+    download_path = tmp_path / "test-snap.snap"
+
+    _download.download(
+        URL, str(download_path), sha3_384=sha3_384, jobs=4, min_part_size=1024
+    )
+
+    assert download_path.read_bytes() == DATA
+    assert ("GET", CDN_URL, "bytes=4106-8191") in fake_http_client.requests
+
+
+def test_download_resumes(tmp_path, fake_http_client, sha3_384):
+    download_path = tmp_path / "test-snap.snap"
+    partial_path = tmp_path / "test-snap.snap.partial"
+    partial_path.write_bytes(DATA[:100])
+    (tmp_path / "test-snap.snap.partial.json").write_text(
+        json.dumps(
+            {
+                "version": 1,
+                "url": URL,
+                "size": len(DATA),
+                "parts": [{"start": 0, "end": len(DATA), "written": 100}],
+            }
+        )
+    )
+
+    _download.download(URL, str(download_path), sha3_384=sha3_384)
+
+    assert download_path.read_bytes() == DATA
+    assert fake_http_client.requests[1:] == [
+        ("GET", CDN_URL, "bytes=100-{}".format(len(DATA) - 1))
+    ]
+
+
+def test_download_without_ranges(tmp_path, fake_http_client, sha3_384):
+    fake_http_client.ranges = False
+    download_path = tmp_path / "test-snap.snap"
+
+    _download.download(URL, str(download_path), sha3_384=sha3_384)
+
+    assert download_path.read_bytes() == DATA
+    assert fake_http_client.requests == [
+        ("HEAD", URL, None),
+        ("GET", CDN_URL, None),
+    ]
+
+
+@pytest.mark.parametrize("status_code", [400, 416])
+def test_download_range_client_error(tmp_path, fake_http_client, sha3_384, status_code):
+    fake_http_client.range_status_code = status_code
+    download_path = tmp_path / "test-snap.snap"
+
+    _download.download(URL, str(download_path), sha3_384=sha3_384)
+
+    assert download_path.read_bytes() == DATA
+    assert fake_http_client.requests == [
+        ("HEAD", URL, None),
+        ("GET", CDN_URL, "bytes=0-{}".format(len(DATA) - 1)),
+        ("GET", CDN_URL, None),
+    ]
+
+
+def test_download_range_empty(tmp_path, fake_http_client, sha3_384):
+    fake_http_client.empty_ranges = True
+    download_path = tmp_path / "test-snap.snap"
+
+    _download.download(URL, str(download_path), sha3_384=sha3_384)
+
+    assert download_path.read_bytes() == DATA
+    range_requests = [r for _, _, r in fake_http_client.requests if r]
+    assert len(range_requests) == _download.MAX_ATTEMPTS
+    assert fake_http_client.requests[-1] == ("GET", CDN_URL, None)
+
+
+def test_download_sha_mismatch(tmp_path, fake_http_client):
+    download_path = tmp_path / "test-snap.snap"
+
+    with pytest.raises(errors.SHAMismatchError):
+        _download.download(
+            URL, str(download_path), sha3_384="bad", jobs=4, min_part_size=1024
+        )
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,237 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import threading
+import time
+from email.utils import formatdate
+from unittest.mock import call
+
+import craft_store
+import pytest
+import requests
+
+from snapcraft_legacy.storeapi import _status_tracker as status
+
+############
+# Fixtures #
+############
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the delays instead of sleeping."""
+    delays = []
+
+    async def _sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(status.asyncio, "sleep", _sleep)
+    return delays
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(status.random, "random", lambda: 0.0)
+
+
+def _response(content, status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content.encode()
+    response.headers.update(headers or {})
+    return response
+
+
+def _status(code, *, processed=False, revision=None, headers=None):
+    content = {"code": code, "processed": processed}
+    if revision is not None:
+        content["revision"] = revision
+    return _response(status_code=200, content=json.dumps(content), headers=headers)
+
+
+def _server_error(status_code, headers=None):
+    return craft_store.errors.StoreServerError(
+        _response(status_code=status_code, content="{}", headers=headers)
+    )
+
+
+###########
+# Backoff #
+###########
+
+
+@pytest.mark.usefixtures("no_jitter")
+def test_backoff():
+    backoff = status.Backoff(initial=1, maximum=5, factor=2)
+
+    assert [backoff.next_delay() for _ in range(5)] == [1, 2, 4, 5, 5]
+
+    backoff.reset()
+
+    assert backoff.next_delay() == 1
+
+
+def test_backoff_jitter(monkeypatch):
+    monkeypatch.setattr(status.random, "random", lambda: 1.0)
+    backoff = status.Backoff(initial=4, jitter=0.5)
+
+    assert backoff.next_delay() == 2
+
+
+@pytest.mark.usefixtures("no_jitter")
+def test_backoff_retry_after():
+    backoff = status.Backoff(initial=4)
+
+    assert backoff.next_delay(retry_after=10) == 10
+    assert backoff.next_delay(retry_after=1) == 8
+
+
+#####################
+# parse_retry_after #
+#####################
+
+
+@pytest.mark.parametrize(
+    "value,expected", [(None, None), ("", None), ("120", 120), ("invalid", None)]
+)
+def test_parse_retry_after(value, expected):
+    assert status.parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_date():
+    value = formatdate(time.time() + 60, usegmt=True)
+
+    assert 55 < status.parse_retry_after(value) <= 60
+
+
+def test_parse_retry_after_date_in_the_past():
+    assert status.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+
+#################
+# StatusTracker #
+#################
+
+
+@pytest.mark.usefixtures("no_jitter")
+def test_track(mocker, sleeps):
+    request = mocker.Mock(
+        side_effect=[
+            _status("being_processed"),
+            _status("being_processed"),
+            _status("being_processed"),
+            _status("ready_to_release", processed=True, revision=1),
+        ]
+    )
+    on_status = mocker.Mock()
+
+    result = status.StatusPoller(request, on_status=on_status).track("https://track")
+
+    assert result == {"code": "ready_to_release", "processed": True, "revision": 1}
+    assert request.mock_calls == [call("GET", "https://track")] * 4
+    assert on_status.mock_calls[-1] == call("https://track", result)
+    assert sleeps == [1, 2, 4]
+
+
+@pytest.mark.usefixtures("no_jitter")
+def test_track_resets_backoff_on_new_code(mocker, sleeps):
+    request = mocker.Mock(
+        side_effect=[
+            _status("being_processed"),
+            _status("being_processed"),
+            _status("need_manual_review"),
+            _status("done", processed=True),
+        ]
+    )
+
+    status.StatusPoller(request).track("https://track")
+
+    assert sleeps == [1, 2, 1]
+
+
+@pytest.mark.usefixtures("no_jitter")
+def test_track_retry_after(mocker, sleeps):
+    request = mocker.Mock(
+        side_effect=[
+            _status("being_processed", headers={"Retry-After": "15"}),
+            _server_error(429, headers={"Retry-After": "30"}),
+            _server_error(503),
+            craft_store.errors.NetworkError(requests.exceptions.ConnectionError()),
+            _status("done", processed=True),
+        ]
+    )
+
+    status.StatusPoller(request).track("https://track")
+
+    assert sleeps == [15, 30, 4, 8]
+
+
+@pytest.mark.usefixtures("sleeps")
+def test_track_client_error(mocker):
+    error = _server_error(404)
+    request = mocker.Mock(side_effect=[error])
+
+    with pytest.raises(craft_store.errors.StoreServerError) as raised:
+        status.StatusPoller(request).track("https://track")
+
+    assert raised.value is error
+
+
+@pytest.mark.usefixtures("sleeps")
+def test_track_too_many_errors(mocker):
+    request = mocker.Mock(side_effect=_server_error(503))
+
+    with pytest.raises(craft_store.errors.StoreServerError):
+        status.StatusPoller(request).track("https://track")
+
+    assert request.call_count == status.MAX_REQUEST_ERRORS
+
+
+@pytest.mark.usefixtures("sleeps")
+def test_track_is_processed(mocker):
+    request = mocker.Mock(
+        side_effect=[
+            _response(status_code=200, content='{"status": "pending"}'),
+            _response(status_code=200, content='{"status": "approved"}'),
+        ]
+    )
+
+    result = status.StatusPoller(request).track(
+        "https://track", is_processed=lambda s: s["status"] != "pending"
+    )
+
+    assert result == {"status": "approved"}
+
+
+@pytest.mark.usefixtures("sleeps")
+def test_track_many():
+    polls = {"https://track/1": 3, "https://track/2": 1, "https://track/3": 2}
+    lock = threading.Lock()
+    threads = set()
+
+    def _request(_method, url):
+        with lock:
+            threads.add(threading.get_ident())
+            polls[url] -= 1
+            processed = polls[url] == 0
+        return _status("done" if processed else "being_processed", processed=processed)
+
+    results = status.StatusPoller(_request).track_many(list(polls))
+
+    assert [r["processed"] for r in results] == [True, True, True]
+    assert polls == {"https://track/1": 0, "https://track/2": 0, "https://track/3": 0}
+    assert threading.get_ident() not in threads
@@ -14,11 +14,14 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import filecmp
+import glob
 import json
 import logging
 import os
 import tempfile
 from textwrap import dedent
+from unittest import mock
 
 import fixtures
 import pytest
@@ -33,7 +36,8 @@ from testtools.matchers import (
 )
 
 from snapcraft_legacy import storeapi
-from snapcraft_legacy.storeapi import errors, metrics
+from snapcraft_legacy.internal import cache
+from snapcraft_legacy.storeapi import _download, errors, metrics
 from snapcraft_legacy.storeapi.v2 import validation_sets, whoami
 from tests.legacy import fixture_setup, unit
 
@@ -132,6 +136,39 @@ class DownloadTestCase(StoreTestCase):
         # If these are equal it means a second download did not happen.
         self.assertThat(second_stat.st_ctime, Equals(first_stat.st_ctime))
 
+    def test_download_uses_cache(self):
+        self.client.download(
+            "test-snap", risk="stable", download_path=os.path.join(self.path, "1.snap")
+        )
+
+        with mock.patch("snapcraft_legacy.storeapi._download.download") as download:
+            other_path = os.path.join(self.path, "2.snap")
+            self.client.download("test-snap", risk="stable", download_path=other_path)
+
+        download.assert_not_called()
+        self.assertThat(other_path, FileExists())
+
+    def test_download_verifies_cached_snap(self):
+        self.client.download(
+            "test-snap", risk="stable", download_path=os.path.join(self.path, "1.snap")
+        )
+        snap_cache_root = cache.SnapCache(project_name="test-snap").snap_cache_root
+        (cached_snap,) = glob.glob(os.path.join(snap_cache_root, "*", "*"))
+        with open(cached_snap, "w") as f:
+            f.write("corrupted")
+
+        with mock.patch(
+            "snapcraft_legacy.storeapi._download.download",
+            wraps=_download.download,
+        ) as download:
+            other_path = os.path.join(self.path, "2.snap")
+            self.client.download("test-snap", risk="stable", download_path=other_path)
+
+        download.assert_called_once()
+        self.assertTrue(
+            filecmp.cmp(os.path.join(self.path, "1.snap"), other_path, shallow=False)
+        )
+
     def test_download_on_sha_mismatch(self):
         fake_logger = fixtures.FakeLogger(level=logging.INFO)
         self.useFixture(fake_logger)
@@ -16,6 +16,7 @@
 
 import logging
 import os
+import pathlib
 import tempfile
 from unittest import mock
 
@@ -358,6 +359,26 @@ class TestGetElfFiles(TestElfBase):
         elf_files = elf.get_elf_files(self.fake_elf.root_path, {"fifo"})
         self.assertThat(elf_files, Equals(set()))
 
+    def test_get_elf_files_with_elf_cache(self):
+        elf_cache = elf.ElfCache(pathlib.Path(self.path, "elf-cache.db"))
+        elf_files = elf.get_elf_files(
+            self.fake_elf.root_path, {"fake_elf-2.23"}, elf_cache=elf_cache
+        )
+        elf_cache.save()
+
+        with mock.patch.object(elf.ElfFile, "_extract_attributes") as extract:
+            cached_elf_files = elf.get_elf_files(
+                self.fake_elf.root_path,
+                {"fake_elf-2.23"},
+                elf_cache=elf.ElfCache(pathlib.Path(self.path, "elf-cache.db")),
+            )
+
+        extract.assert_not_called()
+        elf_file = set(elf_files).pop()
+        cached_elf_file = set(cached_elf_files).pop()
+        self.assertThat(cached_elf_file.marshal(), Equals(elf_file.marshal()))
+        self.assertThat(cached_elf_file.path, Equals(elf_file.path))
+
 
 class TestGetRequiredGLIBC(TestElfBase):
     def setUp(self):
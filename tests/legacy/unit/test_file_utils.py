@@ -162,6 +162,33 @@ class TestLinkOrCopy(unit.TestCase):
         self.assertTrue(os.path.isfile("foo2/bar/baz/4"))
 
 
+@pytest.fixture
+def no_reflink(monkeypatch):
+    monkeypatch.setattr(file_utils, "_reflink", lambda *args: False)
+
+
+@pytest.mark.usefixtures("no_reflink")
+def test_clone_copies(tmp_path):
+    source = tmp_path / "source"
+    source.write_text("data")
+    destination = tmp_path / "destination"
+    destination.write_text("old data")
+
+    file_utils.clone(str(source), str(destination))
+
+    assert destination.read_text() == "data"
+    assert destination.stat().st_ino != source.stat().st_ino
+
+
+def test_clone_reflink(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_utils, "_reflink", lambda *args: True)
+    monkeypatch.setattr(shutil, "copyfile", mock.Mock())
+
+    file_utils.clone(str(tmp_path / "source"), str(tmp_path / "destination"))
+
+    shutil.copyfile.assert_not_called()
+
+
 class RequiresCommandSuccessTestCase(unit.TestCase):
     @mock.patch("subprocess.check_call")
     def test_requires_command_works(self, mock_check_call):
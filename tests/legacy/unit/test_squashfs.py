@@ -0,0 +1,152 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from unittest import mock
+
+from testtools.matchers import Equals, StartsWith
+
+import tests.legacy
+from snapcraft_legacy import _store
+from snapcraft_legacy.internal import errors, squashfs
+from tests.legacy import unit
+
+
+def _get_test_snap(name):
+    return os.path.join(os.path.dirname(tests.legacy.__file__), "data", name)
+
+
+class SquashfsImageTestCase(unit.TestCase):
+    def test_read_file(self):
+        with squashfs.SquashfsImage(_get_test_snap("test-snap.snap")) as image:
+            snap_yaml = image.read_file("meta/snap.yaml")
+
+        self.assertThat(snap_yaml, StartsWith(b"architectures:\n- amd64\n"))
+        self.assertIn(b"name: basic\n", snap_yaml)
+
+    def test_iter_files(self):
+        with squashfs.SquashfsImage(
+            _get_test_snap("test-snap-with-icon.snap")
+        ) as image:
+            files = {snap_file.path: snap_file for snap_file in image.iter_files()}
+
+        self.assertIn("meta/snap.yaml", files)
+        self.assertIn("meta/gui/icon.svg", files)
+        self.assertTrue(all(x.size > 0 and x.stored_size > 0 for x in files.values()))
+
+    def test_read_file_normalized_path(self):
+        with squashfs.SquashfsImage(_get_test_snap("test-snap.snap")) as image:
+            self.assertThat(
+                image.read_file("/meta/../meta/./snap.yaml"),
+                Equals(image.read_file("meta/snap.yaml")),
+            )
+
+    def test_read_icon(self):
+        snap_path = _get_test_snap("test-snap-with-icon.snap")
+        with squashfs.SquashfsImage(snap_path) as image:
+            icon = image.read_file("meta/gui/icon.svg")
+
+        self.assertThat(icon, StartsWith(b"<svg"))
+
+    def test_read_missing_file(self):
+        with squashfs.SquashfsImage(_get_test_snap("test-snap.snap")) as image:
+            self.assertRaises(FileNotFoundError, image.read_file, "meta/missing")
+            self.assertRaises(
+                FileNotFoundError, image.read_file, "meta/snap.yaml/missing"
+            )
+
+    def test_read_directory(self):
+        with squashfs.SquashfsImage(_get_test_snap("test-snap.snap")) as image:
+            self.assertRaises(IsADirectoryError, image.read_file, "meta")
+
+    def test_invalid_image(self):
+        self.assertRaises(
+            errors.SnapDataExtractionError,
+            squashfs.SquashfsImage,
+            _get_test_snap("invalid.snap"),
+        )
+
+    def test_empty_image(self):
+        open("empty.snap", "w").close()
+
+        self.assertRaises(
+            errors.SnapDataExtractionError, squashfs.SquashfsImage, "empty.snap"
+        )
+
+    def test_lzo_compression_not_supported(self):
+        with open(_get_test_snap("test-snap.snap"), "rb") as snap_file:
+            data = bytearray(snap_file.read())
+        # set the compression to lzo
+        data[20:22] = (3).to_bytes(2, "little")
+        with open("lzo.snap", "wb") as snap_file:
+            snap_file.write(data)
+
+        raised = self.assertRaises(
+            errors.SquashfsCompressionNotSupportedError,
+            squashfs.SquashfsImage,
+            "lzo.snap",
+        )
+        self.assertThat(
+            str(raised), Equals("Cannot read squashfs image with 'lzo' compression.")
+        )
+
+    def test_unsupported_compression(self):
+        with open(_get_test_snap("test-snap.snap"), "rb") as snap_file:
+            data = bytearray(snap_file.read())
+        # set the compression to lz4
+        data[20:22] = (5).to_bytes(2, "little")
+        with open("lz4.snap", "wb") as snap_file:
+            snap_file.write(data)
+
+        raised = self.assertRaises(
+            errors.SquashfsCompressionNotSupportedError,
+            squashfs.SquashfsImage,
+            "lz4.snap",
+        )
+        self.assertThat(
+            str(raised), Equals("Cannot read squashfs image with 'lz4' compression.")
+        )
+
+
+class GetDataFromSnapFileTestCase(unit.TestCase):
+    @mock.patch("subprocess.check_output")
+    def test_get_data(self, mock_check_output):
+        snap_yaml = _store.get_data_from_snap_file(
+            _get_test_snap("test-snap-with-started-at.snap")
+        )
+
+        self.assertThat(snap_yaml["name"], Equals("basic"))
+        self.assertThat(
+            snap_yaml["snapcraft-started-at"], Equals("2019-05-07T19:25:53.939041Z")
+        )
+        mock_check_output.assert_not_called()
+
+    def test_get_data_invalid_snap(self):
+        self.assertRaises(
+            errors.SnapDataExtractionError,
+            _store.get_data_from_snap_file,
+            _get_test_snap("invalid.snap"),
+        )
+
+    def test_get_icon(self):
+        snap_path = _get_test_snap("test-snap-with-icon.snap")
+        with _store._get_icon_from_snap_file(snap_path) as icon:
+            self.assertThat(icon.name, Equals("meta/gui/icon.svg"))
+            self.assertThat(icon.read(), StartsWith(b"<svg"))
+
+    def test_get_icon_no_icon(self):
+        with _store._get_icon_from_snap_file(_get_test_snap("test-snap.snap")) as icon:
+            self.assertThat(icon, Equals(None))
@@ -0,0 +1,62 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+import pytest
+from xdg import BaseDirectory
+
+from snapcraft import commands
+
+
+@pytest.fixture
+def cached_files():
+    files_dir = Path(BaseDirectory.xdg_cache_home, "snapcraft", "files", "sha384")
+    files_dir.mkdir(parents=True)
+    for name in ("1", "2"):
+        (files_dir / name).write_bytes(b"x" * 1024 * 1024)
+        mtime = time.time() - 3600
+        os.utime(files_dir / name, (mtime, mtime))
+    return files_dir
+
+
+@pytest.mark.usefixtures("cached_files")
+def test_cache(emitter):
+    cmd = commands.CacheCommand(None)
+
+    cmd.run(argparse.Namespace(prune=False))
+
+    emitter.assert_message(
+        r"Cache\s+Entries\s+Size\s+Limit.*"
+        r"files\s+2\s+2.0 MiB\s+5120.0 MiB\s+0\s+0\s+-\s+0\s+0.0 MiB",
+        regex=True,
+    )
+
+
+def test_cache_prune(emitter, monkeypatch, cached_files):
+    monkeypatch.setenv("SNAPCRAFT_CACHE_MAX_SIZE", "files=1M")
+    cmd = commands.CacheCommand(None)
+
+    cmd.run(argparse.Namespace(prune=True))
+
+    assert len(list(cached_files.iterdir())) == 1
+    emitter.assert_progress("Evicted 1 entries from 'files'", permanent=True)
+    emitter.assert_message(
+        r".*files\s+1\s+1.0 MiB\s+1.0 MiB\s+0\s+0\s+-\s+1\s+1.0 MiB", regex=True
+    )
@@ -5,7 +5,8 @@ from unittest.mock import ANY, call
 import craft_cli.errors
 import pytest
 
-from snapcraft import commands
+from snapcraft import commands, errors
+from snapcraft_legacy.internal.deltas.errors import DeltaGenerationTooBigError
 from tests import unit
 
 ############
@@ -43,6 +44,37 @@ def fake_store_verify_upload(mocker):
     return fake_client
 
 
+@pytest.fixture
+def fake_store_release(mocker):
+    fake_client = mocker.patch(
+        "snapcraft.store.StoreClientCLI.release",
+        autospec=True,
+        return_value=None,
+    )
+    return fake_client
+
+
+@pytest.fixture(autouse=True)
+def fake_snap_cache(mocker):
+    fake_cache = mocker.patch("snapcraft.commands.upload.SnapCache", autospec=True)
+    fake_cache.return_value.get.return_value = None
+    return fake_cache.return_value
+
+
+@pytest.fixture
+def fake_make_delta(mocker, tmp_path):
+    def _make_delta(output_dir):
+        delta_file = pathlib.Path(output_dir, "test-snap.snap.xdelta3")
+        delta_file.write_bytes(b"delta")
+        return str(delta_file)
+
+    mocker.patch("snapcraft_legacy.file_utils.get_snap_tool_path")
+    return mocker.patch(
+        "snapcraft_legacy.internal.deltas.XDelta3Generator.make_delta",
+        side_effect=_make_delta,
+    )
+
+
 @pytest.fixture
 def snap_file():
     return str(
@@ -91,6 +123,7 @@ def test_default(
             built_at=None,
             channels=None,
             snap_file_size=4096,
+            delta_info=None,
         )
     ]
     emitter.assert_message("Revision 10 created for 'basic'")
@@ -118,6 +151,7 @@ def test_default_channels(
             built_at=None,
             channels=["stable", "edge"],
             snap_file_size=4096,
+            delta_info=None,
         )
     ]
     emitter.assert_message(
@@ -125,6 +159,346 @@ def test_default_channels(
     )
 
 
+@pytest.mark.usefixtures("memory_keyring", "fake_store_verify_upload")
+def test_default_caches_snap(fake_store_notify_upload, fake_snap_cache, snap_file):
+    cmd = commands.StoreUploadCommand(None)
+
+    cmd.run(argparse.Namespace(snap_file=snap_file, channels=None))
+
+    assert fake_snap_cache.get.mock_calls == [call(deb_arch="amd64")]
+    assert fake_snap_cache.cache.mock_calls == [call(snap_filename=snap_file)]
+    assert fake_snap_cache.prune.mock_calls == [call(deb_arch="amd64", keep_hash=ANY)]
+
+
+@pytest.mark.usefixtures("memory_keyring", "fake_store_verify_upload")
+def test_delta(
+    emitter,
+    fake_store_client_upload_file,
+    fake_store_notify_upload,
+    fake_snap_cache,
+    fake_make_delta,
+    snap_file,
+):
+    fake_snap_cache.get.return_value = snap_file
+    cmd = commands.StoreUploadCommand(None)
+
+    cmd.run(argparse.Namespace(snap_file=snap_file, channels=None))
+
+    assert fake_store_client_upload_file.mock_calls == [
+        call(ANY, filepath=ANY, monitor_callback=ANY)
+    ]
+    assert fake_store_client_upload_file.mock_calls[0].kwargs["filepath"].name == (
+        "test-snap.snap.xdelta3"
+    )
+    assert fake_store_notify_upload.mock_calls == [
+        call(
+            ANY,
+            snap_name="basic",
+            upload_id="2ecbfac1-3448-4e7d-85a4-7919b999f120",
+            built_at=None,
+            channels=None,
+            snap_file_size=5,
+            delta_info={
+                "delta_format": "xdelta3",
+                "source_hash": ANY,
+                "target_hash": ANY,
+                "delta_hash": ANY,
+            },
+        )
+    ]
+    emitter.assert_progress(
+        "Uploading delta of 5 bytes for a snap of 4096 bytes", permanent=True
+    )
+    emitter.assert_message("Revision 10 created for 'basic'")
+
+
+@pytest.mark.usefixtures("memory_keyring", "fake_store_verify_upload")
+def test_delta_too_big(
+    emitter,
+    fake_store_client_upload_file,
+    fake_store_notify_upload,
+    fake_snap_cache,
+    fake_make_delta,
+    snap_file,
+):
+    fake_snap_cache.get.return_value = snap_file
+    fake_make_delta.side_effect = DeltaGenerationTooBigError(delta_min_percentage=10)
+    cmd = commands.StoreUploadCommand(None)
+
+    cmd.run(argparse.Namespace(snap_file=snap_file, channels=None))
+
+    assert fake_store_client_upload_file.mock_calls == [
+        call(ANY, filepath=pathlib.Path(snap_file), monitor_callback=ANY)
+    ]
+    assert fake_store_notify_upload.mock_calls == [
+        call(
+            ANY,
+            snap_name="basic",
+            upload_id="2ecbfac1-3448-4e7d-85a4-7919b999f120",
+            built_at=None,
+            channels=None,
+            snap_file_size=4096,
+            delta_info=None,
+        )
+    ]
+    emitter.assert_progress(
+        "Not uploading a delta (delta saving is less than 10%.), uploading full snap",
+        permanent=True,
+    )
+
+
+@pytest.mark.usefixtures("memory_keyring", "fake_store_verify_upload")
+def test_delta_processing_error(
+    emitter,
+    fake_store_client_upload_file,
+    fake_store_notify_upload,
+    fake_snap_cache,
+    fake_make_delta,
+    snap_file,
+):
+    fake_snap_cache.get.return_value = snap_file
+    fake_store_notify_upload.side_effect = [errors.SnapDeltaProcessingError(), 10]
+    cmd = commands.StoreUploadCommand(None)
+
+    cmd.run(argparse.Namespace(snap_file=snap_file, channels=None))
+
+    assert len(fake_store_client_upload_file.mock_calls) == 2
+    assert fake_store_notify_upload.mock_calls[1] == call(
+        ANY,
+        snap_name="basic",
+        upload_id="2ecbfac1-3448-4e7d-85a4-7919b999f120",
+        built_at=None,
+        channels=None,
+        snap_file_size=4096,
+        delta_info=None,
+    )
+    emitter.assert_progress(
+        "The Snap Store could not process the delta, uploading full snap",
+        permanent=True,
+    )
+    emitter.assert_message("Revision 10 created for 'basic'")
+
+
+@pytest.fixture
+def snap_dir(tmp_path, snap_file):
+    snap_dir = tmp_path / "snaps"
+    snap_dir.mkdir()
+    for arch in ("amd64", "arm64"):
+        (snap_dir / f"basic_1.0_{arch}.snap").write_bytes(
+            pathlib.Path(snap_file).read_bytes()
+        )
+    (snap_dir / "README").write_text("not a snap")
+    return snap_dir
+
+
+@pytest.fixture
+def fake_store_push_upload(mocker):
+    return mocker.patch(
+        "snapcraft.store.StoreClientCLI.push_upload",
+        autospec=True,
+        side_effect=lambda _, **kwargs: f"https://track/{kwargs['upload_id']}",
+    )
+
+
+@pytest.fixture
+def fake_store_track_uploads(mocker):
+    return mocker.patch(
+        "snapcraft.store.StoreClientCLI.track_uploads",
+        autospec=True,
+        side_effect=lambda _, status_urls: [
+            {"code": "ready_to_release", "revision": 10, "url": url}
+            for url in status_urls
+        ],
+    )
+
+
+@pytest.mark.usefixtures("memory_keyring")
+def test_batch_directory(
+    emitter,
+    fake_store_notify_upload,
+    fake_store_push_upload,
+    fake_store_track_uploads,
+    fake_store_verify_upload,
+    fake_store_release,
+    fake_snap_cache,
+    snap_dir,
+):
+    cmd = commands.StoreUploadCommand(None)
+
+    cmd.run(argparse.Namespace(snap_file=str(snap_dir), channels=None))
+
+    assert fake_store_verify_upload.mock_calls == [call(ANY, snap_name="basic")]
+    assert (
+        fake_store_push_upload.mock_calls
+        == [
+            call(
+                ANY,
+                snap_name="basic",
+                upload_id="2ecbfac1-3448-4e7d-85a4-7919b999f120",
+                built_at=None,
+                channels=None,
+                snap_file_size=4096,
+                delta_info=None,
+            )
+        ]
+        * 2
+    )
+    # all uploads are tracked at once
+    assert fake_store_track_uploads.mock_calls == [
+        call(ANY, ["https://track/2ecbfac1-3448-4e7d-85a4-7919b999f120"] * 2)
+    ]
+    assert fake_store_notify_upload.mock_calls == []
+    assert fake_store_release.mock_calls == []
+    assert len(fake_snap_cache.cache.mock_calls) == 2
+    emitter.assert_progress(
+        "Revision 10 created for 'basic_1.0_amd64.snap'", permanent=True
+    )
+    emitter.assert_progress(
+        "Revision 10 created for 'basic_1.0_arm64.snap'", permanent=True
+    )
+    emitter.assert_message(
+        r"Snap\s+Revision\s+Uploaded.*basic_1.0_amd64.snap\s+10\s+0.0 MiB",
+        regex=True,
+    )
+
+
+@pytest.mark.usefixtures(
+    "memory_keyring", "fake_store_verify_upload", "fake_store_track_uploads"
+)
+def test_batch_delta(
+    fake_store_client_upload_file,
+    fake_store_push_upload,
+    fake_snap_cache,
+    fake_make_delta,
+    snap_dir,
+    snap_file,
+):
+    fake_snap_cache.get.return_value = snap_file
+    cmd = commands.StoreUploadCommand(None)
+
+    cmd.run(argparse.Namespace(snap_file=str(snap_dir), channels=None))
+
+    assert [
+        c.kwargs["filepath"].name for c in fake_store_client_upload_file.mock_calls
+    ] == ["test-snap.snap.xdelta3"] * 2
+    # the summary reports the size of the delta
+    assert [c.kwargs["snap_file_size"] for c in fake_store_push_upload.mock_calls] == [
+        5,
+        5,
+    ]
+
+
+@pytest.mark.usefixtures(
+    "memory_keyring", "fake_store_verify_upload", "fake_store_push_upload"
+)
+def test_batch_delta_processing_error(
+    emitter,
+    fake_store_client_upload_file,
+    fake_store_track_uploads,
+    fake_snap_cache,
+    fake_make_delta,
+    snap_dir,
+    snap_file,
+):
+    fake_snap_cache.get.return_value = snap_file
+    fake_store_track_uploads.side_effect = [
+        [{"code": "processing_upload_delta_error"}, {"code": "ready", "revision": 10}],
+        [{"code": "ready", "revision": 11}],
+    ]
+    cmd = commands.StoreUploadCommand(None)
+
+    cmd.run(argparse.Namespace(snap_file=str(snap_dir), channels=None))
+
+    # only the snap whose delta was not processed is uploaded again, in full
+    assert [
+        c.kwargs["filepath"].name for c in fake_store_client_upload_file.mock_calls
+    ] == [
+        "test-snap.snap.xdelta3",
+        "test-snap.snap.xdelta3",
+        "basic_1.0_amd64.snap",
+    ]
+    assert len(fake_store_track_uploads.mock_calls) == 2
+    emitter.assert_progress(
+        "Revision 11 created for 'basic_1.0_amd64.snap'", permanent=True
+    )
+    emitter.assert_progress(
+        "Revision 10 created for 'basic_1.0_arm64.snap'", permanent=True
+    )
+
+
+@pytest.mark.usefixtures(
+    "memory_keyring",
+    "fake_store_verify_upload",
+    "fake_store_push_upload",
+    "fake_store_track_uploads",
+)
+def test_batch_glob_release(emitter, fake_store_release, snap_dir):
+    cmd = commands.StoreUploadCommand(None)
+
+    cmd.run(
+        argparse.Namespace(
+            snap_file=str(snap_dir / "*_amd64.snap"), channels="stable,edge"
+        )
+    )
+
+    assert fake_store_release.mock_calls == [
+        call(ANY, "basic", revision=10, channels=["stable", "edge"])
+    ]
+    emitter.assert_message("Released 1 revisions to 'edge' and 'stable'")
+
+
+@pytest.mark.usefixtures(
+    "memory_keyring", "fake_store_verify_upload", "fake_store_push_upload"
+)
+def test_batch_failure_does_not_release(
+    fake_store_track_uploads, fake_store_release, snap_dir
+):
+    fake_store_track_uploads.side_effect = [
+        [
+            {"code": "ready_to_release", "revision": 10},
+            {"code": "processing_error", "errors": [{"message": "processing failed"}]},
+        ]
+    ]
+    cmd = commands.StoreUploadCommand(None)
+
+    with pytest.raises(errors.SnapcraftError) as raised:
+        cmd.run(argparse.Namespace(snap_file=str(snap_dir), channels="stable"))
+
+    assert str(raised.value) == "Failed to upload 1 of 2 snaps"
+    assert "processing failed" in raised.value.details
+    assert fake_store_release.mock_calls == []
+
+
+@pytest.mark.usefixtures(
+    "memory_keyring",
+    "fake_store_verify_upload",
+    "fake_store_push_upload",
+    "fake_store_track_uploads",
+)
+def test_batch_release_failure(fake_store_release, snap_dir):
+    fake_store_release.side_effect = [None, errors.SnapcraftError("release failed")]
+    cmd = commands.StoreUploadCommand(None)
+
+    with pytest.raises(errors.SnapcraftError) as raised:
+        cmd.run(argparse.Namespace(snap_file=str(snap_dir), channels="stable"))
+
+    assert str(raised.value) == "Released 1 of 2 revisions to 'stable'"
+    assert raised.value.details == (
+        "- basic_1.0_amd64.snap: revision 10 released\n"
+        "- basic_1.0_arm64.snap: release failed"
+    )
+    assert len(fake_store_release.mock_calls) == 2
+
+
+def test_batch_no_snaps(tmp_path):
+    cmd = commands.StoreUploadCommand(None)
+
+    with pytest.raises(craft_cli.errors.ArgumentParsingError) as raised:
+        cmd.run(argparse.Namespace(snap_file=str(tmp_path), channels=None))
+
+    assert str(raised.value) == f"No snap files found in {str(tmp_path)!r}"
+
+
 def test_invalid_file():
     cmd = commands.StoreUploadCommand(None)
 
@@ -16,7 +16,9 @@
 
 import os
 import shutil
+import subprocess
 from pathlib import Path
+from typing import Optional, Sequence
 
 import pytest
 
@@ -93,6 +95,42 @@ def fake_tools(new_dir, monkeypatch):
     monkeypatch.setenv("PATH", f"{bin_path!s}:{os.getenv('PATH')}")
 
 
+@pytest.fixture
+def build_elf(new_dir):
+    """Build real shared objects for the host architecture.
+
+    The objects are not linked against libc, so libraries they need are
+    only resolved within the test tree.
+    """
+    if shutil.which("cc") is None:
+        pytest.skip("a C compiler is required")
+
+    source = new_dir / "empty.c"
+    source.write_text("int empty(void) { return 0; }\n")
+
+    def _build_elf(
+        path: Path,
+        *,
+        soname: Optional[str] = None,
+        needed: Sequence[Path] = (),
+        rpath: Optional[str] = None,
+        new_dtags: bool = True,
+    ) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        command = ["cc", "-shared", "-nostdlib", "-fPIC", "-o", str(path)]
+        if soname is not None:
+            command.append(f"-Wl,-soname,{soname}")
+        if rpath is not None:
+            dtags = "--enable-new-dtags" if new_dtags else "--disable-new-dtags"
+            command.extend([f"-Wl,-rpath,{rpath}", f"-Wl,{dtags}"])
+        # Libraries are linked by path, their soname is recorded as needed.
+        command.extend([str(source), "-Wl,--no-as-needed", *map(str, needed)])
+        subprocess.run(command, check=True)
+        return path
+
+    yield _build_elf
+
+
 def _fake_elffile_extract_attributes(self):  # pylint: disable=too-many-statements
     """Mock method definition for ElfFile._extract_attributes()."""
     name = self.path.name
@@ -0,0 +1,165 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from snapcraft.elf import ElfCache, ElfFile, elf_utils
+
+
+@pytest.fixture
+def cache_path(new_dir):
+    yield new_dir / "cache" / "elf-cache.db"
+
+
+class TestElfCache:
+    """ElfCache functionality."""
+
+    def test_get_not_cached(self, new_dir, cache_path):
+        Path("foo").write_text("foo")
+
+        assert ElfCache(cache_path).get(Path("foo")) is None
+
+    def test_set_and_get(self, new_dir, cache_path):
+        Path("foo").write_text("foo")
+        elf_cache = ElfCache(cache_path)
+        elf_cache.set(Path("foo"), {"soname": "libfoo.so.1"})
+
+        assert elf_cache.get(Path("foo")) == {"soname": "libfoo.so.1"}
+        assert elf_cache.get(new_dir / "foo") == {"soname": "libfoo.so.1"}
+        assert cache_path.exists() is False
+
+    def test_save_and_load(self, new_dir, cache_path):
+        Path("foo").write_text("foo")
+        with ElfCache(cache_path) as elf_cache:
+            elf_cache.set(Path("foo"), {"soname": "libfoo.so.1"})
+
+        assert cache_path.is_file()
+        assert ElfCache(cache_path).get(Path("foo")) == {"soname": "libfoo.so.1"}
+
+    def test_modified_file_not_cached(self, new_dir, cache_path):
+        Path("foo").write_text("foo")
+        with ElfCache(cache_path) as elf_cache:
+            elf_cache.set(Path("foo"), {"soname": "libfoo.so.1"})
+
+        Path("foo").write_text("foobar")
+
+        assert ElfCache(cache_path).get(Path("foo")) is None
+
+    def test_touched_file_not_cached(self, new_dir, cache_path):
+        Path("foo").write_text("foo")
+        with ElfCache(cache_path) as elf_cache:
+            elf_cache.set(Path("foo"), {"soname": "libfoo.so.1"})
+
+        stat = os.stat("foo")
+        os.utime("foo", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+        assert ElfCache(cache_path).get(Path("foo")) is None
+
+    def test_missing_file_not_cached(self, new_dir, cache_path):
+        elf_cache = ElfCache(cache_path)
+        elf_cache.set(Path("missing"), {"soname": "libfoo.so.1"})
+
+        assert elf_cache.get(Path("missing")) is None
+
+    def test_corrupted_cache_ignored(self, new_dir, cache_path):
+        Path("foo").write_text("foo")
+        cache_path.parent.mkdir()
+        cache_path.write_text("not a database")
+
+        with ElfCache(cache_path) as elf_cache:
+            assert elf_cache.get(Path("foo")) is None
+            elf_cache.set(Path("foo"), {"soname": "libfoo.so.1"})
+
+    def test_dependencies(self, new_dir, cache_path):
+        Path("foo").write_text("foo")
+        with ElfCache(cache_path) as elf_cache:
+            elf_cache.set_dependencies(
+                Path("foo"), {"/lib/libb.so.1", "/lib/liba.so.1"}, key="key"
+            )
+
+        elf_cache = ElfCache(cache_path)
+        assert elf_cache.get_dependencies(new_dir / "foo", key="key") == [
+            "/lib/liba.so.1",
+            "/lib/libb.so.1",
+        ]
+        assert elf_cache.get_dependencies(Path("foo"), key="other") is None
+        assert elf_cache.get_dependencies(Path("bar"), key="key") is None
+
+    def test_dependencies_checked_paths(self, new_dir, cache_path):
+        Path("foo").write_text("foo")
+        Path("liba.so.1").write_text("liba")
+        with ElfCache(cache_path) as elf_cache:
+            elf_cache.set_dependencies(
+                Path("foo"),
+                {"liba.so.1"},
+                key="key",
+                checked_paths=[Path("liba.so.1"), "libb.so.1"],
+            )
+
+        assert ElfCache(cache_path).get_dependencies(Path("foo"), key="key") == [
+            "liba.so.1"
+        ]
+
+        # a checked path was created
+        Path("libb.so.1").write_text("libb")
+        assert ElfCache(cache_path).get_dependencies(Path("foo"), key="key") is None
+        Path("libb.so.1").unlink()
+
+        # a checked path was modified
+        Path("liba.so.1").write_text("liba, modified")
+        assert ElfCache(cache_path).get_dependencies(Path("foo"), key="key") is None
+
+
+class TestGetElfFilesWithCache:
+    """get_elf_files using a persistent cache."""
+
+    def test_get_elf_files_cached(self, mocker, new_dir, cache_path):
+        shutil.copy("/bin/true", "elf.bin")
+        with ElfCache(cache_path) as elf_cache:
+            elf_files = elf_utils.get_elf_files(new_dir, elf_cache=elf_cache)
+
+        extract = mocker.patch("snapcraft.elf._elf_file.ElfFile._extract_attributes")
+        with ElfCache(cache_path) as elf_cache:
+            cached_elf_files = elf_utils.get_elf_files(new_dir, elf_cache=elf_cache)
+
+        assert extract.mock_calls == []
+        assert len(cached_elf_files) == 1
+        assert cached_elf_files[0].path == elf_files[0].path
+        assert cached_elf_files[0].marshal() == elf_files[0].marshal()
+
+    def test_get_elf_files_modified(self, mocker, new_dir, cache_path):
+        shutil.copy("/bin/true", "elf.bin")
+        with ElfCache(cache_path) as elf_cache:
+            elf_utils.get_elf_files(new_dir, elf_cache=elf_cache)
+
+        shutil.copy("/bin/ls", "elf.bin")
+        with ElfCache(cache_path) as elf_cache:
+            elf_files = elf_utils.get_elf_files(new_dir, elf_cache=elf_cache)
+
+        assert elf_files[0].marshal() == ElfFile(path=Path("/bin/ls")).marshal()
+
+    def test_get_elf_files_invalid_entry(self, new_dir, cache_path):
+        shutil.copy("/bin/true", "elf.bin")
+        with ElfCache(cache_path) as elf_cache:
+            elf_cache.set(new_dir / "elf.bin", {"soname": "libfoo.so.1"})
+
+        elf_files = elf_utils.get_elf_files(new_dir, elf_cache=ElfCache(cache_path))
+
+        assert elf_files[0].marshal() == ElfFile(path=Path("/bin/true")).marshal()
@@ -14,12 +14,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import copy
+import shutil
 from pathlib import Path
+from typing import Optional, Tuple
 
 import pytest
 
 from snapcraft import elf
-from snapcraft.elf import elf_utils, errors
+from snapcraft.elf import _elf_file, elf_utils, errors
 from snapcraft.elf._elf_file import _Library
 
 
@@ -76,10 +79,11 @@ class TestElfFileSmoketest:
 
 
 class TestGetLibraries:
-    """ELF file libraries."""
+    """ELF file libraries determined with the ldd fallback."""
 
     @pytest.fixture(autouse=True)
-    def setup_fixture(self, mocker, fake_tools):
+    def setup_fixture(self, mocker, monkeypatch, fake_tools):
+        monkeypatch.setenv("SNAPCRAFT_ELF_USE_LDD", "1")
         mocker.patch("os.path.exists", return_value=True)
 
     def test_get_libraries(self, new_dir, fake_elf, fake_libs):
@@ -201,6 +205,270 @@ class TestGetLibraries:
         assert libs == {str(fake_libs["moo.so.2"])}
 
 
+_ARCH_TRIPLET = "fake-linux-gnu"
+
+
+@pytest.fixture
+def library_tree(new_dir, build_elf):
+    """Build lib/libbar.so.2, lib/libfoo.so.1 needing libbar and bin/app.so."""
+
+    def _library_tree(
+        *, rpath: Optional[str] = None, new_dtags: bool = True
+    ) -> Tuple[Path, Path, Path]:
+        libbar = build_elf(new_dir / "lib" / "libbar.so.2", soname="libbar.so.2")
+        libfoo = build_elf(
+            new_dir / "lib" / "libfoo.so.1", soname="libfoo.so.1", needed=[libbar]
+        )
+        app = build_elf(
+            new_dir / "bin" / "app.so",
+            needed=[libfoo],
+            rpath=rpath,
+            new_dtags=new_dtags,
+        )
+        return app, libfoo, libbar
+
+    yield _library_tree
+
+
+class TestLoadDependencies:
+    """ELF file libraries determined with the default resolver."""
+
+    @pytest.fixture(autouse=True)
+    def setup_fixture(self, monkeypatch):
+        monkeypatch.delenv("SNAPCRAFT_ELF_USE_LDD", raising=False)
+
+    def test_get_libraries(self, new_dir, library_tree):
+        app, libfoo, libbar = library_tree()
+
+        libs = elf.ElfFile(path=app).load_dependencies(
+            root_path=new_dir,
+            base_path=new_dir / "core",
+            arch_triplet=_ARCH_TRIPLET,
+            content_dirs=[],
+        )
+
+        assert libs == {str(libfoo), str(libbar)}
+
+    def test_get_libraries_missing_libs(self, new_dir, library_tree):
+        app, libfoo, libbar = library_tree()
+        libbar.unlink()
+
+        libs = elf.ElfFile(path=app).load_dependencies(
+            root_path=new_dir,
+            base_path=new_dir / "core",
+            arch_triplet=_ARCH_TRIPLET,
+            content_dirs=[],
+        )
+
+        assert libs == {str(libfoo), "libbar.so.2"}
+
+    def test_get_libraries_with_soname_cache(self, new_dir, library_tree):
+        app, libfoo, _ = library_tree()
+        elf_file = elf.ElfFile(path=app)
+        soname_cache = elf.SonameCache()
+        soname_cache[elf_file.arch_tuple, "libbar.so.2"] = Path("/lib/libbar.so.2")
+
+        libs = elf_file.load_dependencies(
+            root_path=new_dir,
+            base_path=new_dir / "core",
+            arch_triplet=_ARCH_TRIPLET,
+            content_dirs=[],
+            soname_cache=soname_cache,
+        )
+
+        assert libs == {str(libfoo), "/lib/libbar.so.2"}
+
+    def test_base_libraries_are_excluded(self, new_dir, build_elf, library_tree):
+        app, libfoo, libbar = library_tree()
+        build_elf(new_dir / "core" / "lib" / "libbar.so.2", soname="libbar.so.2")
+        libbar.unlink()
+
+        libs = elf.ElfFile(path=app).load_dependencies(
+            root_path=new_dir,
+            base_path=new_dir / "core",
+            arch_triplet=_ARCH_TRIPLET,
+            content_dirs=[],
+        )
+
+        assert libs == {str(libfoo)}
+
+    def test_non_elf_primed_sonames_matches_are_ignored(
+        self, new_dir, build_elf, library_tree
+    ):
+        app, libfoo, libbar = library_tree()
+        base_libbar = build_elf(
+            new_dir / "core" / "lib" / "libbar.so.2", soname="libbar.so.2"
+        )
+        libbar.write_bytes(b"\x42\x5a\x68")  # a bz2 header
+        elf_file = elf.ElfFile(path=app)
+
+        libs = elf_file.load_dependencies(
+            root_path=new_dir,
+            base_path=new_dir / "core",
+            arch_triplet=_ARCH_TRIPLET,
+            content_dirs=[],
+        )
+
+        assert libs == {str(libfoo)}
+        assert str(base_libbar) in {str(lib.path) for lib in elf_file.dependencies}
+
+
+class TestResolveLibraries:
+    """Library dependencies resolved without ldd."""
+
+    @pytest.fixture(autouse=True)
+    def setup_fixture(self, monkeypatch):
+        monkeypatch.delenv("SNAPCRAFT_ELF_USE_LDD", raising=False)
+
+    @pytest.mark.parametrize("new_dtags", [True, False])
+    def test_resolve_libraries_matches_ldd(self, library_tree, new_dtags):
+        app, libfoo, libbar = library_tree(rpath="$ORIGIN/../lib", new_dtags=new_dtags)
+
+        libraries = _elf_file._resolve_libraries(
+            elf_file=elf.ElfFile(path=app),
+            ld_library_paths=[],
+            arch_triplet=_ARCH_TRIPLET,
+        )
+
+        assert libraries == _elf_file._ldd(app, [])
+        # DT_RPATH applies to the libraries loaded by the object, DT_RUNPATH
+        # only to its own dependencies.
+        assert libraries == {
+            "libfoo.so.1": str(libfoo),
+            "libbar.so.2": "libbar.so.2" if new_dtags else str(libbar),
+        }
+
+    def test_resolve_libraries_does_not_run_ldd(self, mocker, new_dir, library_tree):
+        run_ldd = mocker.patch("snapcraft.elf._elf_file._ldd")
+        app, libfoo, libbar = library_tree()
+
+        libs = elf.ElfFile(path=app).load_dependencies(
+            root_path=new_dir,
+            base_path=None,
+            arch_triplet=_ARCH_TRIPLET,
+            content_dirs=[],
+        )
+
+        assert run_ldd.mock_calls == []
+        assert libs == {str(libfoo), str(libbar)}
+
+    def test_resolve_libraries_ld_library_path(self, new_dir, library_tree):
+        app, libfoo, libbar = library_tree()
+
+        libraries = _elf_file._resolve_libraries(
+            elf_file=elf.ElfFile(path=app),
+            ld_library_paths=[str(new_dir / "lib")],
+            arch_triplet=_ARCH_TRIPLET,
+        )
+
+        assert libraries == {"libfoo.so.1": str(libfoo), "libbar.so.2": str(libbar)}
+
+    def test_resolve_libraries_missing(self, new_dir, library_tree):
+        app, libfoo, libbar = library_tree()
+        libbar.unlink()
+
+        libraries = _elf_file._resolve_libraries(
+            elf_file=elf.ElfFile(path=app),
+            ld_library_paths=[str(new_dir / "lib")],
+            arch_triplet=_ARCH_TRIPLET,
+        )
+
+        assert libraries == {"libfoo.so.1": str(libfoo), "libbar.so.2": "libbar.so.2"}
+
+    def test_resolve_libraries_skips_other_architectures(
+        self, mocker, new_dir, library_tree
+    ):
+        app, libfoo, libbar = library_tree()
+        other_libbar = new_dir / "other" / "libbar.so.2"
+        other_libbar.parent.mkdir()
+        shutil.copy(libbar, other_libbar)
+        load_library = _elf_file._load_library
+
+        def _load_other_arch(path):
+            library = load_library(path)
+            if library is not None and Path(path) == other_libbar:
+                library = copy.copy(library)
+                library.arch_tuple = ("ELFCLASS32", "ELFDATA2MSB", "EM_FAKE")
+            return library
+
+        mocker.patch(
+            "snapcraft.elf._elf_file._load_library", side_effect=_load_other_arch
+        )
+
+        libraries = _elf_file._resolve_libraries(
+            elf_file=elf.ElfFile(path=app),
+            ld_library_paths=[str(new_dir / "other"), str(new_dir / "lib")],
+            arch_triplet=_ARCH_TRIPLET,
+        )
+
+        assert libraries == {"libfoo.so.1": str(libfoo), "libbar.so.2": str(libbar)}
+
+    @pytest.mark.parametrize(
+        "paths,expected",
+        [
+            ("", []),
+            ("/foo:/bar", ["/foo", "/bar"]),
+            ("$ORIGIN/../lib", ["/root/bin/../lib"]),
+            (
+                "${ORIGIN}/lib::/usr/$LIB",
+                ["/root/bin/lib", "/usr/lib/x86_64-linux-gnu"],
+            ),
+        ],
+    )
+    def test_expand_search_paths(self, paths, expected):
+        assert (
+            _elf_file._expand_search_paths(
+                paths, origin=Path("/root/bin/foo"), arch_triplet="x86_64-linux-gnu"
+            )
+            == expected
+        )
+
+    def test_get_ld_so_conf_paths(self, new_dir):
+        conf_dir = new_dir / "ld.so.conf.d"
+        conf_dir.mkdir()
+        (conf_dir / "b.conf").write_text("/opt/b/lib\n")
+        (conf_dir / "a.conf").write_text("# comment\n/opt/a/lib:/opt/a/lib64\n")
+        conf_path = new_dir / "ld.so.conf"
+        conf_path.write_text(
+            "include ld.so.conf.d/*.conf\nhwcap 0 nosegneg\n/usr/local/lib\n"
+        )
+
+        assert _elf_file._get_ld_so_conf_paths(conf_path) == (
+            "/opt/a/lib",
+            "/opt/a/lib64",
+            "/opt/b/lib",
+            "/usr/local/lib",
+        )
+
+    def test_get_ld_so_conf_paths_missing(self, new_dir):
+        assert _elf_file._get_ld_so_conf_paths(new_dir / "missing.conf") == ()
+
+
+class TestElfFileMarshal:
+    """ElfFile marshaling."""
+
+    def test_marshal_unmarshal(self):
+        elf_file = elf.ElfFile(path=Path("/bin/ls"))
+
+        data = elf_file.marshal()
+        unmarshaled = elf.ElfFile.unmarshal(path=Path("/bin/ls"), data=data)
+
+        assert unmarshaled.path == Path("/bin/ls")
+        assert unmarshaled.marshal() == data
+        assert unmarshaled.arch_tuple == elf_file.arch_tuple
+        assert unmarshaled.get_required_glibc() == elf_file.get_required_glibc()
+        assert unmarshaled.needed.keys() == elf_file.needed.keys()
+        for name, library in elf_file.needed.items():
+            assert unmarshaled.needed[name].versions == library.versions
+
+    def test_unmarshal_missing_attribute(self):
+        data = elf.ElfFile(path=Path("/bin/ls")).marshal()
+        del data["runpath"]
+
+        with pytest.raises(KeyError):
+            elf.ElfFile.unmarshal(path=Path("/bin/ls"), data=data)
+
+
 class TestLibrary:
     """Verify the _Library class."""
 
@@ -15,19 +15,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import shutil
 from pathlib import Path
 
 import pytest
 
-from snapcraft.elf import elf_utils
+from snapcraft.elf import ElfFile, elf_utils
 from snapcraft.errors import SnapcraftError
 
 
-@pytest.fixture(autouse=True, scope="function")
-def _setup_method():
-    elf_utils.get_elf_files.cache_clear()
-
-
 class TestGetElfFiles:
     """get_elf_files functionality."""
 
@@ -95,6 +91,48 @@ class TestGetElfFiles:
         elf_files = elf_utils.get_elf_files_from_list(new_dir, {"fifo"})
         assert elf_files == []
 
+    def test_get_elf_files_from_list_parallel(self, mocker, new_dir):
+        mocker.patch("snapcraft.utils.get_parallel_build_count", return_value=4)
+        mocker.patch("snapcraft.elf.elf_utils._PARALLEL_SCAN_MIN_FILES", 2)
+        pool = mocker.spy(elf_utils.concurrent.futures, "ProcessPoolExecutor")
+        extract = mocker.spy(elf_utils, "_extract_elf_file")
+        file_list = [f"elf-{n:02d}" for n in range(20)]
+        for name in reversed(file_list):
+            shutil.copy("/bin/true", name)
+        Path("non-elf").write_bytes(b"\x42\x5a\x68")
+        Path("invalid-elf").write_bytes(b"\x7fELF\x00")
+
+        elf_files = elf_utils.get_elf_files_from_list(
+            new_dir, [*file_list, "non-elf", "invalid-elf"]
+        )
+
+        assert pool.call_count == 1
+        # Files are parsed in the worker processes, not in this one.
+        assert extract.call_count == 0
+        assert [e.path for e in elf_files] == [new_dir / n for n in file_list]
+        expected = ElfFile(path=Path("/bin/true")).marshal()
+        assert all(e.marshal() == expected for e in elf_files)
+
+    def test_get_elf_files_from_list_serial(self, mocker, new_dir):
+        mocker.patch("snapcraft.utils.get_parallel_build_count", return_value=1)
+        mocker.patch("snapcraft.elf.elf_utils._PARALLEL_SCAN_MIN_FILES", 2)
+        pool = mocker.spy(elf_utils.concurrent.futures, "ProcessPoolExecutor")
+        file_list = [f"elf-{n:02d}" for n in range(4)]
+        for name in file_list:
+            shutil.copy("/bin/true", name)
+
+        elf_files = elf_utils.get_elf_files_from_list(new_dir, file_list)
+
+        assert pool.call_count == 0
+        assert [e.path for e in elf_files] == [new_dir / n for n in file_list]
+
+    def test_get_elf_files_from_list_duplicates(self, new_dir):
+        shutil.copy("/bin/true", "elf")
+
+        elf_files = elf_utils.get_elf_files_from_list(new_dir, ["elf", "elf", "./elf"])
+
+        assert [e.path for e in elf_files] == [new_dir / "elf"]
+
 
 class TestGetDynamicLinker:
     """find_linker functionality."""
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import shutil
+import subprocess
 from pathlib import Path
 from unittest.mock import ANY, call
 
@@ -182,6 +183,8 @@ def test_patcher_patch_rpath_same_interpreter(mocker, patcher, elf_file):
 
 def test_patcher_patch_rpath_already_set(mocker, patcher, elf_file):
     run_mock = mocker.patch("subprocess.check_call")
+    # the interpreter fits in the file, force the use of patchelf
+    mocker.patch("snapcraft.elf._patcher.rewrite_in_place", return_value=False)
 
     expected_proposed_rpath = list(elf_file.dependencies)[0].path.parent
     mocker.patch(
@@ -200,3 +203,94 @@ def test_patcher_patch_rpath_already_set(mocker, patcher, elf_file):
             ]
         )
     ]
+
+
+def test_patcher_get_current_rpath_prefers_runpath(patcher, elf_file):
+    elf_file.rpath = "/rpath"
+    elf_file.runpath = "$ORIGIN/lib:/runpath"
+
+    assert patcher.get_current_rpath(elf_file) == ["$ORIGIN/lib", "/runpath"]
+
+
+def test_patcher_get_current_rpath_no_runpath(patcher, elf_file):
+    elf_file.rpath = "/rpath:/other"
+    elf_file.runpath = ""
+
+    assert patcher.get_current_rpath(elf_file) == ["/rpath", "/other"]
+
+
+def test_patcher_run_patchelf_breaks_hard_link(mocker, patcher, new_dir):
+    run_mock = mocker.patch("subprocess.check_call")
+    elf_path = new_dir / "elf"
+    elf_path.write_bytes(b"content")
+    elf_path.chmod(0o755)
+    linked_path = new_dir / "linked"
+    linked_path.hardlink_to(elf_path)
+
+    patcher._run_patchelf(patchelf_args=["--foo"], elf_file_path=elf_path)
+
+    temp_name = run_mock.mock_calls[0].args[0][-1]
+    assert Path(temp_name).parent == new_dir
+    assert not Path(temp_name).exists()
+    assert elf_path.stat().st_ino != linked_path.stat().st_ino
+    assert elf_path.stat().st_mode & 0o777 == 0o755
+    assert elf_path.read_bytes() == b"content"
+    assert sorted(new_dir.iterdir()) == [elf_path, linked_path]
+
+
+def test_patcher_run_patchelf_error_keeps_original(mocker, patcher, new_dir):
+    mocker.patch(
+        "subprocess.check_call",
+        side_effect=subprocess.CalledProcessError(1, ["patchelf"]),
+    )
+    elf_path = new_dir / "elf"
+    elf_path.write_bytes(b"content")
+
+    with pytest.raises(errors.PatcherError):
+        patcher._run_patchelf(patchelf_args=["--foo"], elf_file_path=elf_path)
+
+    assert elf_path.read_bytes() == b"content"
+    assert list(new_dir.iterdir()) == [elf_path]
+
+
+def test_patcher_patch_all(mocker, patcher, elf_file, emitter):
+    run_mock = mocker.patch("snapcraft.elf._patcher.Patcher._run_patchelf")
+    mocker.patch("snapcraft.elf._patcher.Patcher.get_current_rpath", return_value=[])
+    expected_proposed_rpath = list(elf_file.dependencies)[0].path.parent
+
+    timings = patcher.patch_all(elf_files=[elf_file], jobs=2)
+
+    assert list(timings) == [elf_file.path]
+    assert run_mock.mock_calls == [
+        call(
+            patchelf_args=[
+                "--set-interpreter",
+                "/my/dynamic/linker",
+                "--force-rpath",
+                "--set-rpath",
+                str(expected_proposed_rpath),
+            ],
+            elf_file_path=elf_file.path,
+        )
+    ]
+    emitter.assert_progress(f"Patch ELF file: {str(elf_file.path)!r}")
+    emitter.assert_progress(r"Patched 1 ELF files in .*s", regex=True)
+
+
+def test_patcher_patch_all_nothing_to_patch(mocker, patcher, elf_file):
+    run_mock = mocker.patch("snapcraft.elf._patcher.Patcher._run_patchelf")
+    patcher._dynamic_linker = elf_file.interp
+    elf_file.dependencies = set()
+
+    assert patcher.patch_all(elf_files=[elf_file]) == {}
+    assert run_mock.mock_calls == []
+
+
+def test_patcher_patch_interpreter_in_place(mocker, patcher, elf_file):
+    run_mock = mocker.patch("subprocess.check_call")
+    elf_file.dependencies = set()
+
+    patcher.patch(elf_file=elf_file)
+
+    assert run_mock.mock_calls == []
+    assert elf.ElfFile(path=elf_file.path).interp == "/my/dynamic/linker"
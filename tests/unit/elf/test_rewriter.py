@@ -0,0 +1,132 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from snapcraft.elf import ElfFile
+from snapcraft.elf._rewriter import rewrite_in_place
+
+
+@pytest.fixture
+def elf_path(new_dir):
+    path = Path(new_dir, "elf")
+    shutil.copy("/bin/true", path)
+    yield path
+
+
+@pytest.fixture
+def rpath_elf(new_dir):
+    """Build an executable with the given rpath."""
+
+    def _build(rpath: str, *, new_dtags: bool) -> Path:
+        source = Path(new_dir, "main.c")
+        source.write_text("int main() { return 0; }\n")
+        path = Path(new_dir, "rpath-elf")
+        dtags = "--enable-new-dtags" if new_dtags else "--disable-new-dtags"
+        subprocess.run(
+            ["cc", "-o", path, source, f"-Wl,-rpath,{rpath}", f"-Wl,{dtags}"],
+            check=True,
+        )
+        return path
+
+    if shutil.which("cc") is None:
+        pytest.skip("a C compiler is required")
+
+    yield _build
+
+
+def test_rewrite_interpreter(elf_path):
+    inode = elf_path.stat().st_ino
+
+    assert rewrite_in_place(elf_path, interpreter="/lib/ld.so") is True
+    assert ElfFile(path=elf_path).interp == "/lib/ld.so"
+    assert elf_path.stat().st_ino == inode
+
+
+def test_rewrite_interpreter_too_long(elf_path):
+    content = elf_path.read_bytes()
+
+    assert rewrite_in_place(elf_path, interpreter="/snap/" + "x" * 256) is False
+    assert elf_path.read_bytes() == content
+
+
+def test_rewrite_interpreter_hard_link(elf_path, new_dir):
+    linked_path = Path(new_dir, "linked")
+    linked_path.hardlink_to(elf_path)
+    interp = ElfFile(path=linked_path).interp
+
+    assert rewrite_in_place(elf_path, interpreter="/lib/ld.so") is True
+    assert ElfFile(path=elf_path).interp == "/lib/ld.so"
+    assert ElfFile(path=linked_path).interp == interp
+    assert elf_path.stat().st_ino != linked_path.stat().st_ino
+    assert sorted(new_dir.iterdir()) == [elf_path, linked_path]
+
+
+def test_rewrite_no_rpath(elf_path):
+    content = elf_path.read_bytes()
+
+    assert rewrite_in_place(elf_path, interpreter="/lib/ld.so", rpath="/a") is False
+    assert elf_path.read_bytes() == content
+
+
+def test_rewrite_not_elf(new_dir):
+    path = Path(new_dir, "text")
+    path.write_text("not an elf file")
+
+    assert rewrite_in_place(path, interpreter="/lib/ld.so") is False
+    assert path.read_text() == "not an elf file"
+
+
+@pytest.mark.parametrize("new_dtags", [True, False])
+def test_rewrite_rpath(rpath_elf, new_dtags):
+    path = rpath_elf("/a/long/rpath/that/will/be/replaced", new_dtags=new_dtags)
+
+    assert rewrite_in_place(path, rpath="$ORIGIN/../lib:/snap/lib") is True
+
+    elf_file = ElfFile(path=path)
+    assert elf_file.rpath == "$ORIGIN/../lib:/snap/lib"
+    assert elf_file.runpath == ""
+
+
+def test_rewrite_rpath_too_long(rpath_elf):
+    path = rpath_elf("/short", new_dtags=True)
+    content = path.read_bytes()
+
+    assert rewrite_in_place(path, rpath="/a/longer/rpath") is False
+    assert path.read_bytes() == content
+
+
+def test_rewrite_rpath_shared_suffix(rpath_elf):
+    # The linker stores DT_NEEDED libc.so.6 as a suffix of the rpath string.
+    path = rpath_elf("/opt/xlibc.so.6", new_dtags=False)
+    content = path.read_bytes()
+
+    assert rewrite_in_place(path, rpath="/a/b/c/d") is False
+    assert path.read_bytes() == content
+
+
+def test_rewrite_rpath_before_shared_suffix(rpath_elf):
+    path = rpath_elf("/opt/xlibc.so.6", new_dtags=False)
+
+    assert rewrite_in_place(path, rpath="/a") is True
+
+    elf_file = ElfFile(path=path)
+    assert elf_file.rpath == "/a"
+    assert "libc.so.6" in elf_file.needed
@@ -0,0 +1,223 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from snapcraft.elf import SonameCache, _soname_index
+from snapcraft.elf._elf_file import _Library
+from snapcraft.elf._soname_index import SonameIndex
+
+_ARCH = ("ELFCLASS64", "ELFDATA2LSB", "EM_X86_64")
+
+
+@pytest.fixture
+def snap_dir(mocker, new_dir):
+    snap_dir = new_dir / "snap"
+    mocker.patch("snapcraft.elf._soname_index._SNAP_DIR", snap_dir)
+    yield snap_dir
+
+
+@pytest.fixture
+def fake_base(snap_dir):
+    def _fake_base(revision: str) -> Path:
+        lib_dir = snap_dir / "core22" / revision / "usr" / "lib"
+        lib_dir.mkdir(parents=True)
+        shutil.copy("/bin/true", lib_dir / "libfoo.so.1")
+        (lib_dir / "libbar.so.2").write_text("not an ELF file")
+
+        current = snap_dir / "core22" / "current"
+        current.unlink(missing_ok=True)
+        current.symlink_to(revision)
+        return current
+
+    yield _fake_base
+
+
+class TestSonameIndex:
+    """SonameIndex functionality."""
+
+    def test_build(self, fake_base):
+        base_path = fake_base("10")
+
+        index = SonameIndex.build(base_path)
+
+        assert index.get(_ARCH, "libfoo.so.1") == [base_path / "usr/lib/libfoo.so.1"]
+        assert index.get(_ARCH, "libbar.so.2") == []
+        assert index.get(("ELFCLASS32", "ELFDATA2LSB", "EM_386"), "libfoo.so.1") == []
+
+    def test_build_all_candidates(self, fake_base):
+        base_path = fake_base("10")
+        (base_path / "usr/lib/sub").mkdir()
+        shutil.copy("/bin/true", base_path / "usr/lib/sub/libfoo.so.1")
+
+        index = SonameIndex.build(base_path)
+
+        assert index.get(_ARCH, "libfoo.so.1") == [
+            base_path / "usr/lib/libfoo.so.1",
+            base_path / "usr/lib/sub/libfoo.so.1",
+        ]
+
+    def test_load_stored_index(self, mocker, new_dir, fake_base):
+        base_path = fake_base("10")
+        index_dir = new_dir / "index"
+        SonameIndex.load(base_path, index_dir=index_dir)
+        assert len(list(index_dir.iterdir())) == 1
+
+        build = mocker.spy(SonameIndex, "build")
+        index = SonameIndex.load(base_path, index_dir=index_dir)
+
+        assert build.call_count == 0
+        assert index.get(_ARCH, "libfoo.so.1") == [base_path / "usr/lib/libfoo.so.1"]
+
+    def test_load_other_root_path(self, mocker, new_dir, snap_dir, fake_base):
+        index_dir = new_dir / "index"
+        SonameIndex.load(fake_base("10"), index_dir=index_dir)
+        revision_path = snap_dir / "core22" / "10"
+
+        build = mocker.spy(SonameIndex, "build")
+        index = SonameIndex.load(revision_path, index_dir=index_dir)
+
+        # The index is shared, paths are under the root used to load it.
+        assert build.call_count == 0
+        assert index.get(_ARCH, "libfoo.so.1") == [
+            revision_path / "usr/lib/libfoo.so.1"
+        ]
+
+    def test_load_new_revision(self, mocker, new_dir, fake_base):
+        index_dir = new_dir / "index"
+        SonameIndex.load(fake_base("10"), index_dir=index_dir)
+
+        build = mocker.spy(SonameIndex, "build")
+        SonameIndex.load(fake_base("11"), index_dir=index_dir)
+
+        assert build.call_count == 1
+        assert len(list(index_dir.iterdir())) == 2
+
+    def test_load_corrupted_index(self, mocker, new_dir, fake_base):
+        base_path = fake_base("10")
+        index_dir = new_dir / "index"
+        SonameIndex.load(base_path, index_dir=index_dir)
+        for index_file in index_dir.iterdir():
+            index_file.write_text("{")
+
+        build = mocker.spy(SonameIndex, "build")
+        index = SonameIndex.load(base_path, index_dir=index_dir)
+
+        assert build.call_count == 1
+        assert index.get(_ARCH, "libfoo.so.1") == [base_path / "usr/lib/libfoo.so.1"]
+
+    def test_load_prunes_old_indexes(self, monkeypatch, new_dir, fake_base):
+        monkeypatch.setenv("SNAPCRAFT_CACHE_MAX_SIZE", "soname-index=1")
+        index_dir = new_dir / "soname-index"
+        index_dir.mkdir()
+        old_index = index_dir / "old.json"
+        old_index.write_text("{}")
+        os.utime(old_index, (0, 0))
+
+        SonameIndex.load(fake_base("10"), index_dir=index_dir)
+
+        assert not old_index.exists()
+        assert len(list(index_dir.iterdir())) == 1
+
+    def test_is_indexable(self, new_dir, snap_dir, fake_base):
+        base_path = fake_base("10")
+
+        assert _soname_index.is_indexable(base_path) is True
+        assert _soname_index.is_indexable(base_path / "usr/lib") is True
+        assert _soname_index.is_indexable(snap_dir / "core22") is False
+        assert _soname_index.is_indexable(snap_dir / "missing" / "current") is False
+        assert _soname_index.is_indexable(new_dir) is False
+
+
+class TestSonameCacheIndex:
+    """Library lookups using soname indexes."""
+
+    def test_get_index_disabled(self, fake_base):
+        assert SonameCache().get_index(fake_base("10")) is None
+
+    def test_get_index(self, new_dir, fake_base):
+        base_path = fake_base("10")
+        soname_cache = SonameCache(index_dir=new_dir / "index")
+
+        index = soname_cache.get_index(base_path)
+
+        assert index is not None
+        assert soname_cache.get_index(base_path) is index
+        assert soname_cache.get_index(new_dir) is None
+
+    def test_library_found_in_index(self, mocker, new_dir, fake_base):
+        base_path = fake_base("10")
+        walk = mocker.spy(_soname_index.os, "walk")
+        soname_cache = SonameCache(index_dir=new_dir / "index")
+        soname_cache.get_index(base_path)
+        walk.reset_mock()
+
+        library = _Library(
+            soname="libfoo.so.1",
+            soname_path=Path("/usr/lib/libfoo.so.1"),
+            search_paths=[base_path],
+            base_path=base_path,
+            arch_tuple=_ARCH,
+            soname_cache=soname_cache,
+        )
+
+        assert library.path == base_path / "usr/lib/libfoo.so.1"
+        assert library.in_base_snap is True
+        assert walk.call_count == 0
+
+    def test_library_not_found_in_index(self, new_dir, fake_base):
+        base_path = fake_base("10")
+
+        library = _Library(
+            soname="libbar.so.2",
+            soname_path=Path("/usr/lib/libbar.so.2"),
+            search_paths=[base_path],
+            base_path=base_path,
+            arch_tuple=_ARCH,
+            soname_cache=SonameCache(index_dir=new_dir / "index"),
+        )
+
+        assert library.path == Path("/usr/lib/libbar.so.2")
+        assert library.in_base_snap is False
+
+    def test_library_invalid_candidate_in_index(self, mocker, new_dir, fake_base):
+        base_path = fake_base("10")
+        (base_path / "usr/lib/sub").mkdir()
+        shutil.copy("/bin/true", base_path / "usr/lib/sub/libfoo.so.1")
+        invalid_path = base_path / "usr/lib/libfoo.so.1"
+        is_valid_elf = _Library._is_valid_elf
+        mocker.patch.object(
+            _Library,
+            "_is_valid_elf",
+            autospec=True,
+            side_effect=lambda s, p: p != invalid_path and is_valid_elf(s, p),
+        )
+
+        library = _Library(
+            soname="libfoo.so.1",
+            soname_path=Path("/usr/lib/libfoo.so.1"),
+            search_paths=[base_path],
+            base_path=base_path,
+            arch_tuple=_ARCH,
+            soname_cache=SonameCache(index_dir=new_dir / "index"),
+        )
+
+        assert library.path == base_path / "usr/lib/sub/libfoo.so.1"
+        assert library.in_base_snap is True
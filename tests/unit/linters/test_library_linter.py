@@ -18,16 +18,12 @@ import shutil
 from pathlib import Path
 
 from snapcraft import linters, projects
-from snapcraft.elf import elf_utils
+from snapcraft.elf import ElfCache, ElfFile
 from snapcraft.linters.base import LinterIssue, LinterResult
 from snapcraft.linters.library_linter import LibraryLinter
 from snapcraft.meta import snap_yaml
 
 
-def setup_function():
-    elf_utils.get_elf_files.cache_clear()
-
-
 def test_library_linter(mocker, new_dir):
     shutil.copy("/bin/true", "elf.bin")
 
@@ -109,3 +105,128 @@ def test_library_linter_filter(mocker, new_dir):
         new_dir, lint=projects.Lint(ignore=[{"library": ["elf.*"]}])
     )
     assert issues == []
+
+
+def _write_prime(prime_dir: Path) -> None:
+    prime_dir.mkdir(exist_ok=True)
+    shutil.copy("/bin/true", prime_dir / "elf.bin")
+    yaml_data = {
+        "name": "mytest",
+        "version": "1.29.3",
+        "base": "core22",
+        "summary": "Single-line elevator pitch for your amazing snap",
+        "description": "test-description",
+        "confinement": "strict",
+        "parts": {},
+    }
+
+    project = projects.Project.unmarshal(yaml_data)
+    snap_yaml.write(
+        project,
+        prime_dir=prime_dir,
+        arch="amd64",
+        arch_triplet="x86_64-linux-gnu",
+    )
+
+
+def _run_linters(prime_dir: Path, cache_path: Path):
+    with ElfCache(cache_path) as elf_cache:
+        return linters.run_linters(prime_dir, lint=None, elf_cache=elf_cache)
+
+
+def test_library_linter_cached(mocker, new_dir):
+    prime_dir = new_dir / "prime"
+    _write_prime(prime_dir)
+    library = prime_dir / "lib/x86_64-linux-gnu/libfoo.so.1"
+    library.parent.mkdir(parents=True)
+    library.write_text("libfoo")
+
+    mocker.patch("snapcraft.linters.linters.LINTERS", {"library": LibraryLinter})
+    determine_mock = mocker.patch(
+        "snapcraft.elf._elf_file._determine_libraries",
+        return_value={"libfoo.so.1": str(library)},
+    )
+
+    assert _run_linters(prime_dir, new_dir / "cache.db") == []
+    assert determine_mock.call_count == 1
+
+    # the results of the previous run are used
+    assert _run_linters(prime_dir, new_dir / "cache.db") == []
+    assert determine_mock.call_count == 1
+
+    # unrelated payload changes do not invalidate the results
+    (prime_dir / "data.txt").write_text("data")
+    (prime_dir / "lib/libunrelated.so.1").write_text("libunrelated")
+
+    assert _run_linters(prime_dir, new_dir / "cache.db") == []
+    assert determine_mock.call_count == 1
+
+    # a modified dependency invalidates the results
+    library.write_text("libfoo, modified")
+
+    assert _run_linters(prime_dir, new_dir / "cache.db") == []
+    assert determine_mock.call_count == 2
+
+
+def test_library_linter_cached_missing_dependency(mocker, new_dir):
+    prime_dir = new_dir / "prime"
+    _write_prime(prime_dir)
+
+    mocker.patch("snapcraft.linters.linters.LINTERS", {"library": LibraryLinter})
+    determine_mock = mocker.patch(
+        "snapcraft.elf._elf_file._determine_libraries",
+        return_value={"libfoo.so.1": "/prime/lib/x86_64-linux-gnu/libfoo.so.1"},
+    )
+    expected_issues = [
+        LinterIssue(
+            name="library",
+            result=LinterResult.WARNING,
+            filename="elf.bin",
+            text="missing dependency 'libfoo.so.1'.",
+            url="https://snapcraft.io/docs/linters-library",
+        ),
+    ]
+
+    assert _run_linters(prime_dir, new_dir / "cache.db") == expected_issues
+
+    # a library added anywhere in the payload could satisfy the dependency
+    assert _run_linters(prime_dir, new_dir / "cache.db") == expected_issues
+    assert determine_mock.call_count == 2
+
+
+def test_library_linter_cached_file_changed(mocker, new_dir):
+    prime_dir = new_dir / "prime"
+    _write_prime(prime_dir)
+
+    mocker.patch("snapcraft.linters.linters.LINTERS", {"library": LibraryLinter})
+    determine_mock = mocker.patch(
+        "snapcraft.elf._elf_file._determine_libraries", return_value={}
+    )
+
+    assert _run_linters(prime_dir, new_dir / "cache.db") == []
+
+    with (prime_dir / "elf.bin").open("ab") as elf_file:
+        elf_file.write(b"\0")
+
+    assert _run_linters(prime_dir, new_dir / "cache.db") == []
+    assert determine_mock.call_count == 2
+
+
+def test_library_linter_cached_library_added(mocker, new_dir):
+    prime_dir = new_dir / "prime"
+    _write_prime(prime_dir)
+
+    mocker.patch("snapcraft.linters.linters.LINTERS", {"library": LibraryLinter})
+    determine_mock = mocker.patch(
+        "snapcraft.elf._elf_file._determine_libraries", return_value={}
+    )
+
+    assert _run_linters(prime_dir, new_dir / "cache.db") == []
+
+    # a new library could shadow a dependency found in the base snap
+    needed = next(iter(ElfFile(path=prime_dir / "elf.bin").needed))
+    (prime_dir / "usr/lib").mkdir(parents=True)
+    (prime_dir / "usr/lib" / needed).write_text("not an elf file")
+
+    assert _run_linters(prime_dir, new_dir / "cache.db") == []
+    assert determine_mock.call_count == 2
@@ -14,14 +14,17 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import shutil
+import threading
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 from unittest.mock import call
 
 import pytest
 from overrides import overrides
 
 from snapcraft import linters, projects
+from snapcraft.elf import ElfFile, elf_utils
 from snapcraft.linters.base import Linter, LinterResult
 from snapcraft.linters.linters import _ignore_matching_filenames
 from snapcraft.meta import snap_yaml
@@ -78,6 +81,29 @@ class TestLinterReport:
             ),
         ]
 
+    def test_linter_report_timings(self, emitter, linter_issue):
+        issues = [linter_issue(result=LinterResult.WARNING, text="Some warning")]
+        linters.report(issues, timings={"classic": 0.0123, "library": 1.5})
+        assert emitter.interactions == [
+            call("message", "Lint warnings:"),
+            call("message", "- test: Some warning (https://some/url)"),
+            call("message", "Lint timings:"),
+            call("message", "- classic: 0.012s"),
+            call("message", "- library: 1.500s"),
+        ]
+
+    def test_linter_report_json_no_timings(self, emitter, linter_issue):
+        issues = [linter_issue(filename="foo.txt")]
+        linters.report(issues, json_output=True, timings={"classic": 0.0123})
+        assert emitter.interactions == [
+            call(
+                "message",
+                '[{"type": "lint", "name": "test", "result": "ok", "filename": '
+                '"foo.txt", "text": "Linter message text", "url": '
+                '"https://some/url"}]',
+            )
+        ]
+
     def test_linter_report_json(self, emitter, linter_issue):
         issues = [
             linter_issue(result=LinterResult.WARNING),
@@ -202,6 +228,100 @@ class TestLinterRun:
         issues = linters.run_linters(new_dir, lint=lint)
         assert issues == []
 
+    def test_run_linters_concurrently(self, mocker, emitter, new_dir):
+        started = threading.Event()
+
+        class _WaitingLinter(Linter):
+            @overrides
+            def run(self) -> List[linters.LinterIssue]:
+                # only finishes if the other linter runs at the same time
+                assert started.wait(timeout=10)
+                return [
+                    linters.LinterIssue(
+                        name=self.name, result=LinterResult.WARNING, text="first"
+                    )
+                ]
+
+        class _SignalingLinter(Linter):
+            @overrides
+            def run(self) -> List[linters.LinterIssue]:
+                started.set()
+                return [
+                    linters.LinterIssue(
+                        name=self.name, result=LinterResult.WARNING, text="second"
+                    )
+                ]
+
+        mocker.patch(
+            "snapcraft.linters.linters.LINTERS",
+            {"waiting": _WaitingLinter, "signaling": _SignalingLinter},
+        )
+        self._write_snap_yaml(new_dir)
+
+        timings: Dict[str, float] = {}
+        issues = linters.run_linters(new_dir, lint=None, timings=timings)
+        assert [(issue.name, issue.text) for issue in issues] == [
+            ("waiting", "first"),
+            ("signaling", "second"),
+        ]
+        assert list(timings) == ["waiting", "signaling"]
+        emitter.assert_verbose(r"Linter 'waiting' finished in .*s", regex=True)
+        emitter.assert_verbose(r"Linter 'signaling' finished in .*s", regex=True)
+
+    def test_run_linters_shared_scan(self, mocker, new_dir):
+        scanned_files: List[List[ElfFile]] = []
+        dependency = mocker.Mock()
+
+        class _ScanLinter(Linter):
+            @overrides
+            def run(self) -> List[linters.LinterIssue]:
+                elf_files = self._get_elf_files()
+                elf_files[0].dependencies.add(dependency)
+                scanned_files.append(elf_files)
+                return []
+
+        shutil.copy("/bin/true", new_dir / "elf.bin")
+        get_elf_files = mocker.spy(elf_utils, "get_elf_files")
+        mocker.patch(
+            "snapcraft.linters.linters.LINTERS",
+            {"scan1": _ScanLinter, "scan2": _ScanLinter},
+        )
+        self._write_snap_yaml(new_dir)
+
+        linters.run_linters(new_dir, lint=None)
+
+        assert get_elf_files.call_count == 1
+        assert len(scanned_files) == 2
+        first = scanned_files[0]
+        second = scanned_files[1]
+        assert get_elf_files.call_args.args == (new_dir,)
+        assert [x.path for x in first] == [Path("elf.bin")]
+        assert [x.path for x in second] == [Path("elf.bin")]
+        assert first[0] is not second[0]
+        assert first[0].dependencies == {dependency}
+        assert second[0].dependencies == {dependency}
+        assert first[0].dependencies is not second[0].dependencies
+
+    @staticmethod
+    def _write_snap_yaml(prime_dir: Path) -> None:
+        yaml_data = {
+            "name": "mytest",
+            "version": "1.29.3",
+            "base": "core22",
+            "summary": "Single-line elevator pitch for your amazing snap",
+            "description": "test-description",
+            "confinement": "strict",
+            "parts": {},
+        }
+
+        project = projects.Project.unmarshal(yaml_data)
+        snap_yaml.write(
+            project,
+            prime_dir=prime_dir,
+            arch="amd64",
+            arch_triplet="x86_64-linux-gnu",
+        )
+
     def test_ignore_matching_filenames(self, linter_issue):
         lint = projects.Lint(ignore=[{"test": ["foo*", "some/dir/*"]}])
         issues = [
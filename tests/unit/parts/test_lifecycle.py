@@ -340,6 +340,8 @@ def test_lifecycle_run_command_pack(cmd, snapcraft_yaml, project_vars, new_dir,
             name="mytest",
             version="0.1",
             target_arch=get_host_architecture(),
+            pack_options=None,
+            manifest_path=new_dir / "parts/.pack-manifest.json",
         )
     ]
 
@@ -389,6 +391,8 @@ def test_lifecycle_pack_destructive_mode(
             name="mytest",
             version="0.1",
             target_arch=get_host_architecture(),
+            pack_options=None,
+            manifest_path=new_dir / "home/parts/.pack-manifest.json",
         )
     ]
 
@@ -439,6 +443,8 @@ def test_lifecycle_pack_managed(cmd, snapcraft_yaml, project_vars, new_dir, mock
             name="mytest",
             version="0.1",
             target_arch=get_host_architecture(),
+            pack_options=None,
+            manifest_path=new_dir / "home/parts/.pack-manifest.json",
         )
     ]
 
@@ -29,6 +29,7 @@ from snapcraft import errors
 from snapcraft.store import LegacyUbuntuOne, client, constants
 from snapcraft.store.channel_map import ChannelMap
 from snapcraft.utils import OSPlatform
+from snapcraft_legacy.storeapi import _status_tracker
 from snapcraft_legacy.storeapi.v2.releases import Releases
 
 from .utils import FakeResponse
@@ -41,6 +42,7 @@ from .utils import FakeResponse
 @pytest.fixture
 def no_wait(monkeypatch):
     monkeypatch.setattr(time, "sleep", lambda x: None)
+    monkeypatch.setattr(_status_tracker.Backoff, "next_delay", lambda *args: 0)
 
 
 @pytest.fixture
@@ -830,6 +832,129 @@ def test_notify_upload(fake_client):
     ]
 
 
+def test_push_upload(fake_client):
+    fake_client.request.side_effect = [
+        FakeResponse(
+            status_code=200, content=json.dumps({"status_details_url": "https://track"})
+        ),
+    ]
+
+    status_url = client.StoreClientCLI().push_upload(
+        snap_name="foo",
+        upload_id="some-id",
+        channels=None,
+        built_at=None,
+        snap_file_size=999,
+    )
+
+    assert status_url == "https://track"
+    assert fake_client.request.mock_calls == [
+        call(
+            "POST",
+            "https://dashboard.snapcraft.io/dev/api/snap-push/",
+            json={
+                "name": "foo",
+                "series": "16",
+                "updown_id": "some-id",
+                "binary_filesize": 999,
+                "source_uploaded": False,
+            },
+            headers={"Accept": "application/json"},
+        ),
+    ]
+
+
+@pytest.mark.usefixtures("no_wait")
+def test_track_uploads(fake_client):
+    statuses = {
+        "https://track/1": {"code": "done", "processed": True, "revision": 1},
+        "https://track/2": {"code": "done", "processed": True, "revision": 2},
+    }
+    fake_client.request.side_effect = lambda method, url: FakeResponse(
+        status_code=200, content=json.dumps(statuses[url])
+    )
+    store_client = client.StoreClientCLI()
+
+    assert store_client.track_uploads(["https://track/1", "https://track/2"]) == [
+        statuses["https://track/1"],
+        statuses["https://track/2"],
+    ]
+    assert store_client.get_upload_revision(statuses["https://track/2"]) == 2
+
+
+@pytest.mark.usefixtures("no_wait")
+def test_notify_upload_delta(fake_client):
+    fake_client.request.side_effect = [
+        FakeResponse(
+            status_code=200, content=json.dumps({"status_details_url": "https://track"})
+        ),
+        FakeResponse(
+            status_code=200,
+            content=json.dumps({"code": "done", "processed": True, "revision": 42}),
+        ),
+    ]
+
+    client.StoreClientCLI().notify_upload(
+        snap_name="foo",
+        upload_id="some-id",
+        channels=None,
+        built_at=None,
+        snap_file_size=999,
+        delta_info={
+            "delta_format": "xdelta3",
+            "source_hash": "source",
+            "target_hash": "target",
+            "delta_hash": "delta",
+        },
+    )
+
+    assert fake_client.request.mock_calls[0] == call(
+        "POST",
+        "https://dashboard.snapcraft.io/dev/api/snap-push/",
+        json={
+            "name": "foo",
+            "series": "16",
+            "updown_id": "some-id",
+            "binary_filesize": 999,
+            "source_uploaded": False,
+            "delta_format": "xdelta3",
+            "source_hash": "source",
+            "target_hash": "target",
+            "delta_hash": "delta",
+        },
+        headers={"Accept": "application/json"},
+    )
+
+
+@pytest.mark.usefixtures("no_wait")
+def test_notify_upload_delta_error(fake_client):
+    fake_client.request.side_effect = [
+        FakeResponse(
+            status_code=200, content=json.dumps({"status_details_url": "https://track"})
+        ),
+        FakeResponse(
+            status_code=200,
+            content=json.dumps(
+                {
+                    "code": "processing_upload_delta_error",
+                    "processed": True,
+                    "errors": [{"message": "bad-delta"}],
+                }
+            ),
+        ),
+    ]
+
+    with pytest.raises(errors.SnapDeltaProcessingError):
+        client.StoreClientCLI().notify_upload(
+            snap_name="foo",
+            upload_id="some-id",
+            channels=None,
+            built_at=None,
+            snap_file_size=999,
+            delta_info={"delta_format": "xdelta3"},
+        )
+
+
 @pytest.mark.usefixtures("no_wait")
 def test_notify_upload_built_at(fake_client):
     fake_client.request.side_effect = [
@@ -1067,6 +1192,8 @@ def test_on_prem_notify_revision_approved(on_prem_client, fake_client_request, e
     )
 
     emitter.assert_debug("Ignoring snap_file_size of 10 and built_at None")
+    emitter.assert_progress("Status: progress")
+    emitter.assert_progress("Status: approved")
 
 
 @pytest.mark.usefixtures("fake_client_notify_revision")
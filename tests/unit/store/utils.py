@@ -17,14 +17,18 @@
 import json
 
 import requests
+from requests.structures import CaseInsensitiveDict
 
 
 class FakeResponse(requests.Response):
     """A fake requests.Response."""
 
-    def __init__(self, content, status_code):  # pylint: disable=super-init-not-called
+    def __init__(
+        self, content, status_code, headers=None
+    ):  # pylint: disable=super-init-not-called
         self._content = content
         self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
 
     @property
     def content(self):
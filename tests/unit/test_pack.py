@@ -14,12 +14,16 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import subprocess
+from pathlib import Path
 from unittest.mock import call
 
 import pytest
 
+import tests.legacy
 from snapcraft import errors, pack
+from snapcraft.projects import Pack
 
 
 def test_pack_snap(mocker, new_dir):
@@ -291,3 +295,272 @@ def test_pack_snap_error(mocker, new_dir):
     assert str(raised.value) == (
         "Cannot pack snap file: Command 'cmd' returned non-zero exit status 42."
     )
+
+
+@pytest.fixture
+def snap_dir(new_dir):
+    meta_dir = Path(new_dir, "prime", "meta")
+    meta_dir.mkdir(parents=True)
+
+    def _write_snap_yaml(**kwargs):
+        snap_yaml = {
+            "name": "mytest",
+            "version": "1.0",
+            "architectures": ["amd64"],
+            "confinement": "strict",
+            "grade": "stable",
+            "summary": "summary",
+            "description": "description",
+            "type": "app",
+            **kwargs,
+        }
+        (meta_dir / "snap.yaml").write_text(
+            "".join(f"{key}: {value}\n" for key, value in snap_yaml.items())
+        )
+        return meta_dir.parent
+
+    yield _write_snap_yaml
+
+
+@pytest.fixture
+def mock_mksquashfs(mocker):
+    mocker.patch("snapcraft.utils.get_snap_tool", return_value="/bin/mksquashfs")
+    mocker.patch("snapcraft.utils.get_parallel_build_count", return_value=3)
+    mocker.patch("snapcraft.pack._report_pack_statistics")
+    yield mocker.patch("subprocess.run")
+
+
+def test_pack_snap_mksquashfs(monkeypatch, mock_mksquashfs, new_dir, snap_dir):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    directory = snap_dir()
+
+    snap_filename = pack.pack_snap(
+        directory,
+        output=None,
+        name="hello",
+        version="1.0",
+        target_arch="armhf",
+        pack_options=Pack(backend="mksquashfs"),
+    )
+
+    assert snap_filename == "hello_1.0_armhf.snap"
+    assert mock_mksquashfs.mock_calls[1] == call(
+        [
+            "/bin/mksquashfs",
+            directory,
+            new_dir / "hello_1.0_armhf.snap",
+            "-noappend",
+            "-comp",
+            "xz",
+            "-no-fragments",
+            "-no-progress",
+            "-processors",
+            "3",
+            "-all-root",
+            "-no-xattrs",
+            "-mkfs-time",
+            "0",
+        ],
+        capture_output=True,
+        check=True,
+        universal_newlines=True,
+    )
+
+
+def test_pack_snap_mksquashfs_options(monkeypatch, mock_mksquashfs, new_dir, snap_dir):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1234")
+    directory = snap_dir(type="base")
+    Path("out").mkdir()
+
+    snap_filename = pack.pack_snap(
+        directory,
+        output="out/",
+        compression="lzo",
+        pack_options=Pack(
+            backend="mksquashfs", processors=8, block_size=1048576, deduplicate=False
+        ),
+    )
+
+    assert snap_filename == "mytest_1.0_amd64.snap"
+    assert mock_mksquashfs.mock_calls[1] == call(
+        [
+            "/bin/mksquashfs",
+            directory,
+            new_dir / "out" / "mytest_1.0_amd64.snap",
+            "-noappend",
+            "-comp",
+            "lzo",
+            "-no-fragments",
+            "-no-progress",
+            "-processors",
+            "8",
+            "-b",
+            "1048576",
+            "-no-duplicates",
+            "-mkfs-time",
+            "1234",
+            "-all-time",
+            "1234",
+        ],
+        capture_output=True,
+        check=True,
+        universal_newlines=True,
+    )
+
+
+def test_pack_snap_mksquashfs_multiple_architectures(mock_mksquashfs, snap_dir):
+    directory = snap_dir(architectures=["amd64", "arm64"])
+
+    snap_filename = pack.pack_snap(
+        directory, output=None, pack_options=Pack(backend="mksquashfs")
+    )
+
+    assert snap_filename == "mytest_1.0_multi.snap"
+
+
+def test_pack_snap_mksquashfs_error(mock_mksquashfs, snap_dir):
+    mock_mksquashfs.side_effect = [
+        None,
+        subprocess.CalledProcessError(1, "mksquashfs", stderr="bad"),
+    ]
+
+    with pytest.raises(errors.SnapcraftError) as raised:
+        pack.pack_snap(snap_dir(), output=None, pack_options=Pack(backend="mksquashfs"))
+
+    assert str(raised.value) == (
+        "Cannot pack snap file: Command 'mksquashfs' returned non-zero exit "
+        "status 1. (bad)"
+    )
+
+
+def test_pack_snap_snap_backend(mocker, new_dir):
+    mock_run = mocker.patch("subprocess.run")
+    pack.pack_snap(new_dir, output=None, pack_options=Pack(backend="snap"))
+    assert mock_run.mock_calls[1] == call(
+        ["snap", "pack", new_dir, new_dir],
+        capture_output=True,
+        check=True,
+        universal_newlines=True,
+    )
+
+
+def test_report_pack_statistics(emitter):
+    snap_path = Path(
+        os.path.dirname(tests.legacy.__file__), "data", "test-snap-with-icon.snap"
+    )
+
+    pack._report_pack_statistics(snap_path, elapsed=2.0)
+
+    emitter.assert_verbose(r"meta: 0.0 MiB stored in 0.0 MiB \(\d+\.\d%\)", regex=True)
+    emitter.assert_progress(
+        r"Packed 0.0 MiB in 2.0s \(0.0 MiB/s\), compressed to \d+\.\d%",
+        regex=True,
+        permanent=True,
+    )
+
+
+def test_report_pack_statistics_error(emitter, new_dir):
+    snap_path = Path("not-squashfs.snap")
+    snap_path.write_bytes(b"\0" * 1024)
+
+    pack._report_pack_statistics(snap_path, elapsed=2.0)
+
+    emitter.assert_debug(
+        "Cannot report pack statistics: Cannot read data from snap "
+        "'not-squashfs.snap'. The file may be corrupted."
+    )
+
+
+def test_pack_snap_skip_unchanged(emitter, mock_mksquashfs, new_dir, snap_dir):
+    def _mksquashfs(command, **_):
+        if command[0] == "/bin/mksquashfs":
+            Path(command[2]).write_text(str(mock_mksquashfs.call_count))
+
+    mock_mksquashfs.side_effect = _mksquashfs
+    directory = snap_dir()
+    manifest_path = new_dir / "parts/.pack-manifest.json"
+    pack_options = Pack(backend="mksquashfs", skip_unchanged=True)
+
+    for _ in range(2):
+        snap_filename = pack.pack_snap(
+            directory,
+            output=None,
+            pack_options=pack_options,
+            manifest_path=manifest_path,
+        )
+        assert snap_filename == "mytest_1.0_amd64.snap"
+
+    # verify and pack, then only verify
+    assert mock_mksquashfs.call_count == 3
+    emitter.assert_progress(
+        "Changes since last pack: 0 added, 0 removed, 0 modified", permanent=True
+    )
+    emitter.assert_progress("Snap package mytest_1.0_amd64.snap is up to date")
+
+    (directory / "data").write_text("data")
+    pack.pack_snap(
+        directory, output=None, pack_options=pack_options, manifest_path=manifest_path
+    )
+
+    assert mock_mksquashfs.call_count == 5
+    emitter.assert_verbose("+ data")
+    emitter.assert_progress(
+        "Changes since last pack: 1 added, 0 removed, 0 modified", permanent=True
+    )
+
+
+def test_pack_snap_skip_unchanged_modified_snap(mock_mksquashfs, new_dir, snap_dir):
+    def _mksquashfs(command, **_):
+        if command[0] == "/bin/mksquashfs":
+            Path(command[2]).write_text("snap")
+
+    mock_mksquashfs.side_effect = _mksquashfs
+    directory = snap_dir()
+    manifest_path = new_dir / "parts/.pack-manifest.json"
+    pack_options = Pack(backend="mksquashfs", skip_unchanged=True)
+
+    pack.pack_snap(
+        directory, output=None, pack_options=pack_options, manifest_path=manifest_path
+    )
+    Path("mytest_1.0_amd64.snap").unlink()
+    pack.pack_snap(
+        directory, output=None, pack_options=pack_options, manifest_path=manifest_path
+    )
+    pack.pack_snap(
+        directory,
+        output=None,
+        compression="lzo",
+        pack_options=pack_options,
+        manifest_path=manifest_path,
+    )
+
+    assert mock_mksquashfs.call_count == 6
+
+
+@pytest.mark.parametrize("source_date_epoch,call_count", [(None, 4), ("1234", 3)])
+def test_pack_snap_skip_unchanged_modification_time(
+    monkeypatch, mock_mksquashfs, new_dir, snap_dir, source_date_epoch, call_count
+):
+    def _mksquashfs(command, **_):
+        if command[0] == "/bin/mksquashfs":
+            Path(command[2]).write_text("snap")
+
+    if source_date_epoch:
+        monkeypatch.setenv("SOURCE_DATE_EPOCH", source_date_epoch)
+    else:
+        monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    mock_mksquashfs.side_effect = _mksquashfs
+    directory = snap_dir()
+    manifest_path = new_dir / "parts/.pack-manifest.json"
+    pack_options = Pack(backend="mksquashfs", skip_unchanged=True)
+
+    pack.pack_snap(
+        directory, output=None, pack_options=pack_options, manifest_path=manifest_path
+    )
+    os.utime(directory / "meta/snap.yaml", ns=(0, 0))
+    pack.pack_snap(
+        directory, output=None, pack_options=pack_options, manifest_path=manifest_path
+    )
+
+    # verify and pack, then verify and only pack if file times are packed
+    assert mock_mksquashfs.call_count == call_count
@@ -0,0 +1,159 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import os
+from pathlib import Path
+
+import pytest
+
+from snapcraft.pack_manifest import PackChanges, PackManifest
+
+
+@pytest.fixture
+def prime_dir(new_dir):
+    prime = Path("prime")
+    (prime / "bin").mkdir(parents=True)
+    (prime / "bin/hello").write_text("hello")
+    (prime / "bin/hi").symlink_to("hello")
+    (prime / "data").write_text("data")
+    yield prime
+
+
+def test_scan(prime_dir):
+    manifest = PackManifest.scan(prime_dir)
+
+    assert list(manifest.files) == ["bin", "data", "bin/hello", "bin/hi"]
+    assert manifest.files["bin"].digest == ""
+    assert manifest.files["bin/hello"].digest == hashlib.sha256(b"hello").hexdigest()
+    assert manifest.files["bin/hi"].digest == "hello"
+
+
+def test_scan_reuses_previous_digest(prime_dir, mocker):
+    previous = PackManifest.scan(prime_dir)
+    hash_spy = mocker.spy(hashlib, "sha256")
+
+    manifest = PackManifest.scan(prime_dir, previous=previous)
+
+    assert manifest.files == previous.files
+    assert hash_spy.call_count == 0
+
+
+def test_scan_hashes_modified_files(prime_dir, mocker):
+    previous = PackManifest.scan(prime_dir)
+    (prime_dir / "data").write_text("changed")
+    hash_spy = mocker.spy(hashlib, "sha256")
+
+    manifest = PackManifest.scan(prime_dir, previous=previous)
+
+    assert hash_spy.call_count == 1
+    assert manifest.files["data"].digest == hashlib.sha256(b"changed").hexdigest()
+
+
+def test_get_changes(prime_dir):
+    previous = PackManifest.scan(prime_dir)
+    (prime_dir / "bin/hi").unlink()
+    (prime_dir / "data").write_text("changed")
+    (prime_dir / "bin/hello").chmod(0o755)
+    (prime_dir / "new").write_text("new")
+    os.utime(prime_dir / "bin", ns=(0, 0))
+
+    manifest = PackManifest.scan(prime_dir, previous=previous)
+
+    assert manifest.get_changes(previous) == PackChanges(
+        added=["new"], removed=["bin/hi"], modified=["data", "bin/hello"]
+    )
+    assert not manifest.has_same_contents(previous)
+
+
+def test_get_changes_none(prime_dir):
+    previous = PackManifest.scan(prime_dir)
+    manifest = PackManifest.scan(prime_dir)
+
+    assert not manifest.get_changes(previous)
+    assert manifest.has_same_contents(previous)
+
+
+def test_has_same_contents_modification_time(prime_dir):
+    previous = PackManifest.scan(prime_dir)
+    os.utime(prime_dir / "data", ns=(0, 0))
+
+    manifest = PackManifest.scan(prime_dir, previous=previous)
+
+    assert not manifest.get_changes(previous)
+    assert not manifest.has_same_contents(previous)
+    assert manifest.has_same_contents(previous, compare_mtimes=False)
+
+
+def test_get_changes_owner(prime_dir, mocker):
+    previous = PackManifest.scan(prime_dir)
+    lstat = os.lstat
+
+    def _lstat(path):
+        file_stat = lstat(path)
+        if not path.endswith("data"):
+            return file_stat
+        return mocker.Mock(
+            st_ino=file_stat.st_ino,
+            st_mtime_ns=file_stat.st_mtime_ns,
+            st_size=file_stat.st_size,
+            st_mode=file_stat.st_mode,
+            st_uid=file_stat.st_uid + 1,
+            st_gid=file_stat.st_gid,
+        )
+
+    mocker.patch("os.lstat", side_effect=_lstat)
+    hash_spy = mocker.spy(hashlib, "sha256")
+
+    manifest = PackManifest.scan(prime_dir, previous=previous)
+
+    assert hash_spy.call_count == 1
+    assert manifest.get_changes(previous) == PackChanges(modified=["data"])
+    assert not manifest.has_same_contents(previous)
+
+
+def test_save_and_load(prime_dir, new_dir):
+    snap_path = Path("hello.snap")
+    snap_path.write_text("snap")
+    manifest = PackManifest.scan(prime_dir)
+    manifest.options = "options"
+    manifest.set_snap_file(snap_path)
+
+    manifest.save(new_dir / "state/manifest.json")
+
+    assert PackManifest.load(new_dir / "state/manifest.json") == manifest
+    assert manifest.is_snap_file_current(snap_path)
+
+
+def test_is_snap_file_current_modified(prime_dir):
+    snap_path = Path("hello.snap")
+    snap_path.write_text("snap")
+    manifest = PackManifest.scan(prime_dir)
+    manifest.set_snap_file(snap_path)
+
+    snap_path.write_text("other snap")
+
+    assert not manifest.is_snap_file_current(snap_path)
+    assert not manifest.is_snap_file_current(Path("missing.snap"))
+
+
+@pytest.mark.parametrize("data", ["", "{}", '{"version": 0}', "invalid"])
+def test_load_invalid(new_dir, data):
+    manifest_path = Path("manifest.json")
+    manifest_path.write_text(data)
+
+    assert PackManifest.load(manifest_path) is None
+    assert PackManifest.load(Path("missing.json")) is None
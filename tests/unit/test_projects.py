@@ -106,6 +106,7 @@ class TestProjectDefaults:
         assert project.ua_services is None
         assert project.system_usernames is None
         assert project.provenance is None
+        assert project.pack is None
 
     def test_app_defaults(self, project_yaml_data):
         data = project_yaml_data(apps={"app1": {"command": "/bin/true"}})
@@ -332,6 +333,50 @@ class TestProjectValidation:
             with pytest.raises(pydantic.ValidationError, match=error):
                 project.grade = grade
 
+    def test_project_pack(self, project_yaml_data):
+        data = project_yaml_data(
+            pack={
+                "backend": "mksquashfs",
+                "processors": 4,
+                "block-size": 1048576,
+                "deduplicate": False,
+            }
+        )
+
+        project = Project.unmarshal(data)
+        assert project.pack is not None
+        assert project.pack.backend == "mksquashfs"
+        assert project.pack.processors == 4
+        assert project.pack.block_size == 1048576
+        assert project.pack.deduplicate is False
+
+    def test_project_pack_defaults(self, project_yaml_data):
+        project = Project.unmarshal(project_yaml_data(pack={}))
+
+        assert project.pack is not None
+        assert project.pack.backend == "snap"
+        assert project.pack.processors is None
+        assert project.pack.block_size is None
+        assert project.pack.deduplicate is True
+
+    @pytest.mark.parametrize(
+        "option,value",
+        [("processors", 4), ("block-size", 1048576), ("deduplicate", False)],
+    )
+    def test_project_pack_snap_backend_options(self, project_yaml_data, option, value):
+        data = project_yaml_data(pack={option: value})
+
+        error = f"{option!r} can only be used with the 'mksquashfs' backend"
+        with pytest.raises(errors.ProjectValidationError, match=error):
+            Project.unmarshal(data)
+
+    def test_project_pack_invalid_block_size(self, project_yaml_data):
+        data = project_yaml_data(pack={"backend": "mksquashfs", "block-size": 1000})
+
+        error = "unexpected value; permitted: 4096, 8192"
+        with pytest.raises(errors.ProjectValidationError, match=error):
+            Project.unmarshal(data)
+
     def test_project_summary_valid(self, project_yaml_data):
         summary = "x" * 78
         project = Project.unmarshal(project_yaml_data(summary=summary))